@@ -0,0 +1,313 @@
+"""Índices aproximados (partições por k-means ou por documento) para busca top-k em corpora muito grandes, só com NumPy."""
+
+import argparse
+import math
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from embedding_store import file_signature, is_store_path, load_embeddings, store_paths
+
+# Sufixos dos índices, gravados ao lado do store (embeddings.npy -> embeddings.ivf.npz)
+ANN_SUFFIX = ".ivf.npz"
+DOCUMENT_INDEX_SUFFIX = ".docs.npz"
+
+# Pontos de treino do k-means por partição (amostra limitada ao tamanho do corpus)
+TRAINING_POINTS_PER_LIST = 64
+DEFAULT_ITERATIONS = 10
+# Linhas processadas por vez ao atribuir o corpus às partições (limita a memória)
+ASSIGN_BLOCK_ROWS = 65536
+
+
+def ann_index_path(embeddings_path: str, documents: bool = False) -> str:
+    """
+    Caminho do índice IVF (ou, com ``documents=True``, do índice de
+    centróides por documento) associado a um arquivo de embeddings
+    (``embeddings.npy`` -> ``embeddings.ivf.npz``; ``embeddings.json`` ->
+    ``embeddings.json.ivf.npz``).
+    """
+    matrix_path, _ = store_paths(embeddings_path)
+    return matrix_path[: -len(".npy")] + (DOCUMENT_INDEX_SUFFIX if documents else ANN_SUFFIX)
+
+
+def embeddings_source(embeddings_path: str) -> Dict[str, int]:
+    """``file_signature`` do arquivo de embeddings indexado (a matriz, para um store ``.npy``)."""
+    return file_signature(store_paths(embeddings_path)[0] if is_store_path(embeddings_path) else embeddings_path)
+
+
+def document_key(chunk: Dict[str, Any]) -> str:
+    """Documento de um chunk: caminho do arquivo, ou slug/título na falta dele."""
+    return str(chunk.get('document_filepath') or chunk.get('document_slug') or chunk.get('document_title') or "")
+
+
+def default_nlist(rows: int) -> int:
+    """Número de partições padrão: a raiz quadrada do número de chunks."""
+    return max(1, int(round(math.sqrt(rows))))
+
+
+def default_nprobe(nlist: int) -> int:
+    """Partições visitadas por consulta por padrão (1/16 das partições, no mínimo 1)."""
+    return max(1, int(math.ceil(nlist / 16)))
+
+
+def _normalized(block: np.ndarray) -> np.ndarray:
+    block = np.array(block, dtype=np.float32)
+    norms = np.sqrt(np.einsum('ij,ij->i', block, block))
+    norms[norms == 0] = 1.0
+    block /= norms[:, None]
+    return block
+
+
+def _nearest_centroids(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Partição (maior similaridade de cosseno) de cada linha, em blocos."""
+    assignments = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], ASSIGN_BLOCK_ROWS):
+        block = _normalized(matrix[start:start + ASSIGN_BLOCK_ROWS])
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+def _partition_centroids(matrix: np.ndarray, assignments: np.ndarray, nlist: int) -> np.ndarray:
+    """Média normalizada das linhas (normalizadas) de cada partição, somadas em blocos."""
+    sums = np.zeros((nlist, matrix.shape[1]), dtype=np.float32)
+    for start in range(0, matrix.shape[0], ASSIGN_BLOCK_ROWS):
+        np.add.at(sums, assignments[start:start + ASSIGN_BLOCK_ROWS], _normalized(matrix[start:start + ASSIGN_BLOCK_ROWS]))
+    return _normalized(sums)
+
+
+def train_centroids(sample: np.ndarray, nlist: int, iterations: int = DEFAULT_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    K-means esférico sobre ``sample`` (linhas normalizadas): cada centróide é
+    a média normalizada das linhas mais similares a ele. Partições vazias
+    recebem um ponto aleatório da amostra.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.flatnonzero(np.bincount(assignments, minlength=nlist) == 0)
+        if empty.size:
+            sums[empty] = sample[rng.choice(len(sample), size=empty.size, replace=False)]
+        centroids = _normalized(sums)
+    return centroids
+
+
+class IVFIndex:
+    """
+    Índice IVF (inverted file) sobre a matriz de embeddings.
+
+    As linhas são agrupadas em ``nlist`` partições por k-means; uma consulta
+    compara-se apenas aos centróides, visita as ``nprobe`` partições mais
+    próximas e calcula a similaridade exata só com os chunks delas. Mais
+    partições visitadas aumentam o recall e o custo. A matriz não é copiada:
+    o índice guarda apenas os centróides e as linhas de cada partição.
+
+    As partições também podem ser os documentos do corpus
+    (``from_documents``): o centróide de cada documento é a média dos
+    embeddings das suas seções, e ``nprobe`` passa a ser o número de
+    documentos pré-selecionados por consulta, cujos chunks são pontuados.
+    """
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        list_rows: np.ndarray,
+        nprobe: Optional[int] = None,
+        labels: Optional[Sequence[str]] = None,
+        source: Optional[Dict[str, int]] = None,
+    ):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.nprobe = min(self.nlist, nprobe or default_nprobe(self.nlist))
+        # Nome de cada partição (o documento, no índice por documento)
+        self.labels = list(labels) if labels is not None else None
+        # ``embeddings_source`` do arquivo indexado, para detectar índices desatualizados
+        self.source = source
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def rows(self) -> int:
+        return self.list_rows.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        return self.centroids.shape[1]
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        nlist: Optional[int] = None,
+        iterations: int = DEFAULT_ITERATIONS,
+        seed: int = 0,
+        nprobe: Optional[int] = None,
+    ) -> "IVFIndex":
+        """Treina os centróides com uma amostra de ``matrix`` e atribui todas as linhas às partições."""
+        rows = matrix.shape[0]
+        if rows == 0:
+            raise ValueError("Não é possível criar um índice aproximado sem embeddings.")
+        nlist = min(rows, nlist or default_nlist(rows))
+        rng = np.random.default_rng(seed)
+        sample_size = min(rows, nlist * TRAINING_POINTS_PER_LIST)
+        sample_rows = np.sort(rng.choice(rows, size=sample_size, replace=False))
+        centroids = train_centroids(_normalized(matrix[sample_rows]), nlist, iterations, seed)
+
+        return cls._from_assignments(centroids, _nearest_centroids(matrix, centroids), nprobe)
+
+    @classmethod
+    def from_documents(cls, chunks: Sequence[Dict[str, Any]], matrix: np.ndarray, nprobe: Optional[int] = None) -> "IVFIndex":
+        """Uma partição por documento (``document_key``), com o centróide das suas seções."""
+        if matrix.shape[0] == 0:
+            raise ValueError("Não é possível criar um índice aproximado sem embeddings.")
+        positions: Dict[str, int] = {}
+        assignments = np.fromiter(
+            (positions.setdefault(document_key(chunk), len(positions)) for chunk in chunks), dtype=np.int32, count=len(chunks)
+        )
+        centroids = _partition_centroids(matrix, assignments, len(positions))
+        return cls._from_assignments(centroids, assignments, nprobe, labels=list(positions))
+
+    @classmethod
+    def _from_assignments(cls, centroids, assignments, nprobe, labels=None) -> "IVFIndex":
+        # Linhas agrupadas por partição, em ordem crescente dentro de cada uma
+        rows = assignments.shape[0]
+        nlist = centroids.shape[0]
+        list_rows = np.argsort(assignments, kind="stable").astype(np.int32 if rows < 2**31 else np.int64)
+        list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=nlist), out=list_offsets[1:])
+        return cls(centroids, list_offsets, list_rows, nprobe, labels)
+
+    def candidate_rows(self, normalized_queries: np.ndarray, nprobe: Optional[int] = None) -> List[np.ndarray]:
+        """Linhas (em ordem crescente) das ``nprobe`` partições mais próximas de cada consulta normalizada."""
+        nprobe = min(self.nlist, nprobe or self.nprobe)
+        centroid_scores = normalized_queries @ self.centroids.T
+        if nprobe < self.nlist:
+            probed = np.argpartition(-centroid_scores, nprobe - 1, axis=1)[:, :nprobe]
+        else:
+            probed = np.broadcast_to(np.arange(self.nlist), centroid_scores.shape)
+        offsets, list_rows = self.list_offsets, self.list_rows
+        return [
+            np.sort(np.concatenate([list_rows[offsets[probe]:offsets[probe + 1]] for probe in lists]))
+            for lists in probed
+        ]
+
+    def save(self, path: str) -> None:
+        """Grava o índice em ``.npz`` (arquivo temporário renomeado ao final)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        arrays = dict(
+            centroids=self.centroids,
+            list_offsets=self.list_offsets,
+            list_rows=self.list_rows,
+            nprobe=np.array(self.nprobe),
+        )
+        if self.labels is not None:
+            arrays["labels"] = np.array(self.labels, dtype=str)
+        if self.source is not None:
+            arrays["source"] = np.array([self.source["size"], self.source["mtime_ns"]], dtype=np.int64)
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, nprobe: Optional[int] = None) -> "IVFIndex":
+        with np.load(path) as data:
+            labels = data["labels"].tolist() if "labels" in data.files else None
+            source = dict(zip(("size", "mtime_ns"), map(int, data["source"]))) if "source" in data.files else None
+            return cls(data["centroids"], data["list_offsets"], data["list_rows"], nprobe or int(data["nprobe"]), labels, source)
+
+
+def build_ann_index(
+    embeddings_path: str,
+    nlist: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    iterations: int = DEFAULT_ITERATIONS,
+    documents: bool = False,
+) -> bool:
+    """
+    Cria o índice IVF dos embeddings em ``embeddings_path`` (ou, com
+    ``documents=True``, o índice de centróides por documento) e o grava ao
+    lado deles.
+    """
+    try:
+        # Lida antes dos embeddings: uma regravação durante a indexação deixa o índice desatualizado
+        source = embeddings_source(embeddings_path)
+        chunks, matrix = load_embeddings(embeddings_path, load_mode="auto")
+    except Exception as e:
+        print(f"Erro ao carregar '{embeddings_path}': {e}")
+        return False
+    if matrix.shape[0] == 0:
+        print("Erro: Nenhum embedding válido para indexar.")
+        return False
+    started = time.perf_counter()
+    if documents:
+        index = IVFIndex.from_documents(chunks, matrix, nprobe=nprobe)
+        partitions, probe = "documentos", "documentos pré-selecionados por padrão"
+    else:
+        index = IVFIndex.build(matrix, nlist=nlist, iterations=iterations, nprobe=nprobe)
+        partitions, probe = "partições", "nprobe padrão"
+    index.source = source
+    output_path = ann_index_path(embeddings_path, documents)
+    index.save(output_path)
+    sizes = np.diff(index.list_offsets)
+    print(
+        f"Índice aproximado salvo em '{output_path}': {index.rows} chunks em {index.nlist} {partitions} "
+        f"(tamanho médio {sizes.mean():.0f}, máximo {sizes.max()}), {probe} {index.nprobe}, "
+        f"em {time.perf_counter() - started:.1f} s."
+    )
+    return True
+
+
+def load_ann_index(
+    embeddings_path: str, matrix: np.ndarray, nprobe: Optional[int] = None, documents: bool = False
+) -> Optional[IVFIndex]:
+    """
+    Índice IVF (ou de centróides por documento) gravado ao lado de
+    ``embeddings_path``, se existir e corresponder à matriz carregada; caso
+    contrário avisa e retorna ``None`` (a busca exata é usada).
+    """
+    path = ann_index_path(embeddings_path, documents)
+    if not os.path.exists(path):
+        option = "--doc-index" if documents else "--ann"
+        print(f"Aviso: índice aproximado '{path}' não encontrado; usando a busca exata. Crie-o com 'docs-tc-ann-index' ou 'generate_embeddings {option}'.")
+        return None
+    index = IVFIndex.load(path, nprobe)
+    # O índice vale para os embeddings exatamente como estavam ao ser criado (mesmo tamanho e mtime)
+    stale = index.source != embeddings_source(embeddings_path)
+    if stale or index.rows != matrix.shape[0] or index.dimension != matrix.shape[1]:
+        print(f"Aviso: índice aproximado '{path}' desatualizado em relação aos embeddings; usando a busca exata.")
+        return None
+    if documents:
+        print(f"Usando o índice por documento '{path}': {index.nprobe} de {index.nlist} documentos pré-selecionados por pergunta.")
+    else:
+        print(f"Usando o índice aproximado '{path}' ({index.nlist} partições, nprobe {index.nprobe}).")
+    return index
+
+
+def cli_main():
+    """Ponto de entrada de linha de comando para criar o índice aproximado."""
+    parser = argparse.ArgumentParser(description="Cria o índice aproximado (IVF ou por documento) de um arquivo de embeddings.")
+    parser.add_argument("embeddings_filepath", help="Arquivo de embeddings (JSON ou store binário .npy); o índice é gravado ao lado dele.")
+    parser.add_argument("--nlist", type=int, help="Número de partições (padrão: raiz quadrada do número de chunks).")
+    parser.add_argument("--nprobe", type=int, help="Partições (ou documentos, com --documents) visitadas por consulta gravadas como padrão (padrão: 1/16 delas).")
+    parser.add_argument("--documents", action="store_true",
+                        help="Cria o índice de centróides por documento (<embeddings>.docs.npz) em vez das partições por k-means.")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS,
+                        help=f"Iterações do k-means (padrão: {DEFAULT_ITERATIONS}).")
+    args = parser.parse_args()
+
+    if not build_ann_index(
+        args.embeddings_filepath, nlist=args.nlist, nprobe=args.nprobe, iterations=args.iterations, documents=args.documents
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli_main()
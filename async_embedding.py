@@ -0,0 +1,110 @@
+"""Execução concorrente (asyncio) de requisições de embedding, com limite de requisições em andamento."""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from flow_dag import check_cancelled
+
+# Número padrão de requisições simultâneas por provedor.
+# Valores conservadores: cada requisição já agrupa muitos textos (ver batching.py)
+# e o rate limiting de cada provedor continua sendo aplicado.
+PROVIDER_CONCURRENCY: Dict[str, int] = {
+    "openai": 8,
+    "deepinfra": 4,
+    "gemini": 4,
+}
+
+# Usado para provedores sem valor conhecido
+DEFAULT_CONCURRENCY = 1
+
+
+def get_concurrency(provider: str, concurrency: Optional[int] = None) -> int:
+    """
+    Retorna o máximo de requisições simultâneas para ``provider``.
+
+    Um valor explícito tem prioridade sobre a variável de ambiente
+    ``DOCS_CLI_<PROVEDOR>_CONCURRENCY``, que tem prioridade sobre
+    ``PROVIDER_CONCURRENCY``.
+    """
+    provider_key = "deepinfra" if provider.lower() == "maritaca" else provider.lower()
+    env_value = os.getenv(f"DOCS_CLI_{provider_key.upper()}_CONCURRENCY")
+    if concurrency is not None:
+        value = int(concurrency)
+    elif env_value:
+        value = int(env_value)
+    else:
+        value = PROVIDER_CONCURRENCY.get(provider_key, DEFAULT_CONCURRENCY)
+    if value < 1:
+        raise ValueError(f"Concorrência deve ser positiva para o provedor '{provider}'.")
+    return value
+
+
+async def gather_bounded(
+    items: Sequence[Any],
+    func: Callable[[Any], Any],
+    concurrency: int,
+    on_result: Optional[Callable[[int, Any], None]] = None,
+) -> List[Any]:
+    """
+    Aplica ``func`` (bloqueante) a cada item com no máximo ``concurrency``
+    chamadas em andamento e devolve os resultados na ordem de ``items``.
+
+    As chamadas rodam em um pool de threads via ``run_in_executor``; um
+    ``asyncio.Semaphore`` limita quantas estão em andamento. ``on_result``
+    é chamado no loop de eventos (sem concorrência) à medida que cada
+    item termina, com o índice do item e seu resultado. Se o fluxo for
+    interrompido (``flow_dag.check_cancelled``), nenhuma nova chamada é
+    iniciada e ``FlowCancelled`` é levantada.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embedding")
+
+    async def run_one(index: int, item: Any) -> Any:
+        async with semaphore:
+            check_cancelled()
+            result = await loop.run_in_executor(executor, func, item)
+        if on_result is not None:
+            on_result(index, result)
+        return result
+
+    try:
+        return list(await asyncio.gather(*(run_one(index, item) for index, item in enumerate(items))))
+    finally:
+        executor.shutdown(wait=True)
+
+
+def run_concurrently(
+    items: Sequence[Any],
+    func: Callable[[Any], Any],
+    concurrency: int = 1,
+    on_result: Optional[Callable[[int, Any], None]] = None,
+) -> List[Any]:
+    """
+    Versão síncrona de ``gather_bounded`` para uso nos scripts.
+
+    Com ``concurrency`` igual a 1 (ou um único item) as chamadas são feitas
+    em sequência, sem loop de eventos. Se já houver um loop em execução na
+    thread atual (por exemplo, em um notebook), o loop próprio roda em uma
+    thread auxiliar.
+    """
+    items = list(items)
+    if concurrency <= 1 or len(items) <= 1:
+        results = []
+        for index, item in enumerate(items):
+            check_cancelled()
+            result = func(item)
+            if on_result is not None:
+                on_result(index, result)
+            results.append(result)
+        return results
+
+    coroutine_factory = lambda: gather_bounded(items, func, concurrency, on_result)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine_factory())
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(lambda: asyncio.run(coroutine_factory())).result()
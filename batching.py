@@ -0,0 +1,67 @@
+"""Planejamento de lotes de textos para requisições de embedding, com orçamento por provedor."""
+
+import os
+from typing import Dict, List, Optional, Sequence
+
+# Limites por requisição de cada provedor.
+# "max_items" é o número máximo de textos por requisição e "max_chars" é um
+# orçamento de caracteres (aproximação de tokens, ~4 caracteres por token,
+# com margem de segurança) somando todos os textos do lote.
+# OpenAI: até 2048 entradas e ~300k tokens por requisição.
+# Gemini (batchEmbedContents): até 100 textos por requisição.
+PROVIDER_BATCH_LIMITS: Dict[str, Dict[str, int]] = {
+    "openai": {"max_items": 2048, "max_chars": 600_000},
+    "deepinfra": {"max_items": 100, "max_chars": 200_000},
+    "gemini": {"max_items": 100, "max_chars": 400_000},
+}
+
+# Usado para provedores sem limites conhecidos
+DEFAULT_BATCH_LIMITS = {"max_items": 100, "max_chars": 200_000}
+
+
+def get_batch_limits(
+    provider: str, max_items: Optional[int] = None, max_chars: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Retorna os limites de lote de ``provider``.
+
+    Valores explícitos têm prioridade sobre as variáveis de ambiente
+    ``DOCS_CLI_<PROVEDOR>_BATCH_MAX_ITEMS``/``_BATCH_MAX_CHARS``, que por sua
+    vez têm prioridade sobre ``PROVIDER_BATCH_LIMITS``.
+    """
+    provider_key = "deepinfra" if provider.lower() == "maritaca" else provider.lower()
+    limits = dict(PROVIDER_BATCH_LIMITS.get(provider_key, DEFAULT_BATCH_LIMITS))
+    env_prefix = f"DOCS_CLI_{provider_key.upper()}_BATCH"
+    for key, value in (("max_items", max_items), ("max_chars", max_chars)):
+        env_value = os.getenv(f"{env_prefix}_{key.upper()}")
+        if value is not None:
+            limits[key] = int(value)
+        elif env_value:
+            limits[key] = int(env_value)
+        if limits[key] < 1:
+            raise ValueError(f"Limite de lote '{key}' deve ser positivo para o provedor '{provider}'.")
+    return limits
+
+
+def plan_batches(texts: Sequence[str], max_chars: int, max_items: int) -> List[List[int]]:
+    """
+    Agrupa ``texts`` em lotes respeitando ``max_items`` textos e ``max_chars`` caracteres por lote.
+
+    Retorna listas de índices de ``texts``; os lotes são contíguos e seguem a
+    ordem original, de modo que concatená-los reproduz a sequência de
+    entrada. Um texto maior que ``max_chars`` sozinho forma um lote próprio.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_chars = 0
+    for index, text in enumerate(texts):
+        length = len(text)
+        if current and (len(current) >= max_items or current_chars + length > max_chars):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(index)
+        current_chars += length
+    if current:
+        batches.append(current)
+    return batches
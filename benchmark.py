@@ -0,0 +1,869 @@
+"""Benchmark do toolkit com corpus e CSV de perguntas sintéticos: vazão e pico de memória de cada etapa, offline."""
+
+import argparse
+import contextlib
+import csv
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+from profiling import peak_rss_mb
+
+# Etapas medidas, na ordem em que são executadas (cada uma lê a saída das anteriores)
+BENCHMARK_STAGES = (
+    "merge",
+    "extract",
+    "chunk",
+    "generate_embeddings",
+    "clean_csv",
+    "evaluate",
+    "report_md",
+    "report_html",
+)
+
+RESULTS_VERSION = 1
+
+# Arquivo padrão de cada modo (chave dos resultados no JSON), para um modo não sobrescrever o outro
+DEFAULT_RESULTS_FILES = {
+    "stages": "benchmark_results.json",
+    "imports": "benchmark_imports.json",
+    "scoring": "benchmark_scoring.json",
+    "ann": "benchmark_ann.json",
+    "doc_index": "benchmark_doc_index.json",
+}
+
+# Vocabulário das frases sintéticas (o conteúdo não importa, só o volume e a variedade)
+WORDS = (
+    "acesso agente ajuste alerta análise aplicação arquivo atualização autenticação backup banco base build "
+    "cache campo canal carga chave cliente cluster código coleta comando componente conexão configuração "
+    "console consulta contêiner conta contrato cota credencial dados depuração deploy desempenho diretório "
+    "disco documento domínio endpoint entrada erro escala esquema estado evento execução exportação falha "
+    "fila filtro fluxo formato função gatilho grupo histórico host identidade imagem importação índice "
+    "instância integração interface item janela job lote log limite mensagem métrica migração modelo módulo "
+    "monitor nó nuvem objeto operação painel parâmetro partição perfil permissão pipeline plano política "
+    "porta processo projeto protocolo provedor rede região registro relatório réplica repositório requisição "
+    "recurso resposta rota saída segredo serviço sessão sistema status tabela tarefa template teste token "
+    "tráfego usuário valor variável versão volume webhook zona"
+).split()
+VERBS = (
+    "configura atualiza remove cria valida exporta importa monitora registra consulta replica sincroniza "
+    "autentica agenda processa publica restaura habilita desabilita limita"
+).split()
+
+# Respostas inválidas, removidas por clean_csv (um subconjunto dos padrões de limpa_csv)
+INVALID_ANSWERS = ("Click here", "Select an option", "Please choose", "1 2 3 4 5")
+
+# Máximo de frases do corpus guardadas para montar respostas cobertas
+_SENTENCE_SAMPLE_SIZE = 5000
+
+# Orçamento de tempo de importação (segundos) do módulo de cada comando: cada etapa do
+# docs-cli roda em um interpretador novo e paga esse custo (--imports)
+IMPORT_TIME_BUDGETS = {
+    "docs_tc": 0.15,
+    "merge_markdown": 0.05,
+    "extract_data_from_markdown": 0.05,
+    "limpa_csv": 0.1,
+    "generate_embeddings": 0.6,
+    "evaluate_coverage": 0.6,
+    "coverage_sweep": 0.6,
+    "ann_index": 0.6,
+    "generate_report": 0.05,
+    "generate_report_html": 0.05,
+    "style_checker": 0.6,
+    "embedding_cache": 0.1,
+    "fake_embedding_server": 0.6,
+}
+
+# Bibliotecas pesadas que nenhum comando deve importar só por ser carregado
+# (os SDKs e o pandas são importados pelo caminho que os usa, ver lazy_imports)
+HEAVY_MODULES = ("google.generativeai", "openai", "requests", "pandas", "numpy")
+# O NumPy é usado no carregamento dos módulos de embeddings; os demais comandos não o importam
+NUMPY_MODULES = ("generate_embeddings", "evaluate_coverage", "coverage_sweep", "ann_index", "style_checker", "fake_embedding_server")
+
+
+def synthetic_sentence(rng: random.Random, words: int) -> str:
+    """Uma frase com ``words`` palavras (no mínimo 4), com sujeito, verbo e complementos."""
+    words = max(4, words)
+    tokens = [rng.choice(WORDS), rng.choice(VERBS)] + [rng.choice(WORDS) for _ in range(words - 2)]
+    sentence = " ".join(tokens)
+    return sentence[0].upper() + sentence[1:] + "."
+
+
+def _section_text(rng: random.Random, section_words: int, sample: List[str], seen: List[int]) -> str:
+    sentences = []
+    written = 0
+    while written < section_words:
+        sentence = synthetic_sentence(rng, rng.randint(8, 16))
+        written += len(sentence.split())
+        sentences.append(sentence)
+        # Amostragem de reservatório: frases do corpus para as respostas cobertas
+        seen[0] += 1
+        if len(sample) < _SENTENCE_SAMPLE_SIZE:
+            sample.append(sentence)
+        else:
+            slot = rng.randrange(seen[0])
+            if slot < _SENTENCE_SAMPLE_SIZE:
+                sample[slot] = sentence
+    return " ".join(sentences)
+
+
+def generate_corpus(directory: str, docs: int = 100, sections: int = 5, section_words: int = 150, seed: int = 0) -> List[str]:
+    """
+    Grava ``docs`` arquivos .md sintéticos em ``directory`` (em subpastas de
+    até 100 arquivos), cada um com o bloco de metadados e ``sections``
+    seções H2 de cerca de ``section_words`` palavras.
+
+    Retorna uma amostra das frases geradas (para ``generate_qa_csv``).
+    """
+    rng = random.Random(seed)
+    sample: List[str] = []
+    seen = [0]
+    root = Path(directory)
+    for index in range(docs):
+        folder = root / f"parte_{index // 100:03d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        topic = " ".join(rng.choice(WORDS) for _ in range(3))
+        lines = [
+            "## Metadata_Start",
+            f"## title: Documento {index}: {topic}",
+            f"## slug: documento-{index}",
+            "## Metadata_End",
+            "",
+        ]
+        for section in range(sections):
+            lines.append(f"## Seção {section + 1}: {rng.choice(WORDS)} {rng.choice(WORDS)}")
+            lines.append(_section_text(rng, section_words, sample, seen))
+            lines.append("")
+        (folder / f"documento_{index:05d}.md").write_text("\n".join(lines), encoding="utf-8")
+    return sample
+
+
+def generate_qa_csv(
+    path: str,
+    rows: int = 200,
+    sentences: int = 3,
+    corpus_sentences: Sequence[str] = (),
+    covered_ratio: float = 0.5,
+    invalid_ratio: float = 0.05,
+    seed: int = 0,
+) -> None:
+    """
+    Grava um CSV (colunas ``question`` e ``response``) com ``rows`` linhas.
+
+    Cada resposta tem ``sentences`` frases. Uma fração ``covered_ratio``
+    das respostas é montada com frases copiadas de ``corpus_sentences`` e
+    as demais com frases novas; uma fração
+    ``invalid_ratio`` das linhas tem respostas inválidas, que ``clean_csv``
+    remove.
+    """
+    rng = random.Random(seed + 1)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["question", "response"])
+        for index in range(rows):
+            question = f"Como o {rng.choice(WORDS)} {rng.choice(VERBS)} o {rng.choice(WORDS)}? ({index})"
+            if rng.random() < invalid_ratio:
+                answer = rng.choice(INVALID_ANSWERS)
+            elif corpus_sentences and rng.random() < covered_ratio:
+                answer = " ".join(rng.choice(corpus_sentences) for _ in range(sentences))
+            else:
+                answer = " ".join(synthetic_sentence(rng, rng.randint(8, 16)) for _ in range(sentences))
+            writer.writerow([question, answer])
+
+
+def benchmark_paths(workdir: str, store: str = "json") -> Dict[str, str]:
+    """Caminhos dos arquivos de entrada e intermediários do benchmark em ``workdir``."""
+    root = Path(workdir)
+    return {
+        "docs": str(root / "docs"),
+        "qa": str(root / "qa.csv"),
+        "corpus": str(root / "corpus_consolidated.md"),
+        "raw_docs": str(root / "raw_docs.json"),
+        "embeddings": str(root / ("embeddings.npy" if store == "npy" else "embeddings.json")),
+        "qa_clean": str(root / "qa_data_clean.csv"),
+        "eval_results": str(root / "evaluation_results.json"),
+        "md_report": str(root / "coverage_report.md"),
+        "html_report": str(root / "coverage_report.html"),
+    }
+
+
+def _size(path: str) -> int:
+    target = Path(path)
+    if target.is_dir():
+        return sum(file.stat().st_size for file in target.rglob("*.md"))
+    return target.stat().st_size if target.exists() else 0
+
+
+def _json_length(path: str) -> int:
+    with open(path, "r", encoding="utf-8") as f:
+        return len(json.load(f))
+
+
+# Cada etapa retorna os itens processados ou, quando contá-los exige reler a saída,
+# uma função que os conta (chamada fora da medição)
+def _stage_merge(paths, options):
+    from merge_markdown import consolidate_markdown_files
+
+    consolidate_markdown_files(paths["docs"], paths["corpus"])
+    return lambda: len(list(Path(paths["docs"]).rglob("*.md")))
+
+
+def _stage_extract(paths, options):
+    from extract_data_from_markdown import extract_docs_from_consolidated_md
+
+    if not extract_docs_from_consolidated_md(paths["corpus"], paths["raw_docs"]):
+        raise RuntimeError("a extração não gerou documentos")
+    return lambda: _json_length(paths["raw_docs"])
+
+
+def _stage_chunk(paths, options):
+    from generate_embeddings import load_raw_docs, split_content_into_semantic_chunks
+
+    chunks = 0
+    for doc in load_raw_docs(paths["raw_docs"]) or []:
+        chunks += len(split_content_into_semantic_chunks(
+            doc.get("content", ""), doc.get("title", ""), doc.get("filepath", ""), doc.get("slug", "")
+        ))
+    return chunks
+
+
+def _stage_generate_embeddings(paths, options):
+    from embedding_store import load_embeddings
+    from generate_embeddings import generate_embeddings_for_docs
+
+    if not generate_embeddings_for_docs(paths["raw_docs"], paths["embeddings"], provider=options["provider"]):
+        raise RuntimeError("a geração de embeddings falhou")
+    return lambda: len(load_embeddings(paths["embeddings"], load_mode="auto")[0])
+
+
+def _stage_clean_csv(paths, options):
+    from limpa_csv import clean_csv_data
+
+    stats = clean_csv_data(paths["qa"], paths["qa_clean"])
+    if stats is None:
+        raise RuntimeError("a limpeza do CSV falhou")
+    return stats["original_rows"]
+
+
+def _stage_evaluate(paths, options):
+    from evaluate_coverage import evaluate_coverage
+
+    if not evaluate_coverage(
+        paths["qa_clean"],
+        paths["embeddings"],
+        top_k_chunks=options["top_k"],
+        output_json_path=paths["eval_results"],
+        provider=options["provider"],
+    ):
+        raise RuntimeError("a avaliação falhou")
+    return lambda: _json_length(paths["eval_results"])
+
+
+def _stage_report_md(paths, options):
+    from generate_report import generate_md_report
+
+    if not generate_md_report(paths["eval_results"], paths["md_report"], options["top_k"]):
+        raise RuntimeError("o relatório Markdown falhou")
+    return lambda: _json_length(paths["eval_results"])
+
+
+def _stage_report_html(paths, options):
+    from generate_report_html import generate_html_report
+
+    if not generate_html_report(paths["eval_results"], paths["html_report"], options["top_k"]):
+        raise RuntimeError("o relatório HTML falhou")
+    return lambda: _json_length(paths["eval_results"])
+
+
+STAGE_RUNNERS: Dict[str, Callable[[Dict[str, str], Dict[str, Any]], Any]] = {
+    "merge": _stage_merge,
+    "extract": _stage_extract,
+    "chunk": _stage_chunk,
+    "generate_embeddings": _stage_generate_embeddings,
+    "clean_csv": _stage_clean_csv,
+    "evaluate": _stage_evaluate,
+    "report_md": _stage_report_md,
+    "report_html": _stage_report_html,
+}
+
+# Módulos de cada etapa, importados antes da medição (o custo de importação não entra no tempo da etapa)
+STAGE_MODULES = {
+    "merge": ("merge_markdown",),
+    "extract": ("extract_data_from_markdown",),
+    "chunk": ("generate_embeddings",),
+    "generate_embeddings": ("generate_embeddings", "embedding_store"),
+    "clean_csv": ("limpa_csv",),
+    "evaluate": ("evaluate_coverage",),
+    "report_md": ("generate_report",),
+    "report_html": ("generate_report_html",),
+}
+
+# Arquivo lido por cada etapa, para a vazão em MB/s
+STAGE_INPUTS = {
+    "merge": "docs",
+    "extract": "corpus",
+    "chunk": "raw_docs",
+    "generate_embeddings": "raw_docs",
+    "clean_csv": "qa",
+    "evaluate": "qa_clean",
+    "report_md": "eval_results",
+    "report_html": "eval_results",
+}
+
+
+def measure_stage(stage: str, paths: Dict[str, str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Executa ``stage`` no processo atual e mede tempo, CPU e pico de RSS.
+
+    O pico de RSS é o do processo (``ru_maxrss``), por isso cada etapa é
+    medida em um processo novo por ``run_benchmark``; ``baseline_rss_mb`` é
+    o pico antes da etapa (interpretador e módulos da etapa já importados).
+    """
+    for module in STAGE_MODULES[stage]:
+        importlib.import_module(module)
+    input_bytes = _size(paths[STAGE_INPUTS[stage]])
+    baseline = peak_rss_mb()
+    output = open(os.devnull, "w", encoding="utf-8") if not options.get("verbose") else None
+    try:
+        with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+            started, cpu_started = time.perf_counter(), time.process_time()
+            items = STAGE_RUNNERS[stage](paths, options)
+            seconds, cpu_seconds = time.perf_counter() - started, time.process_time() - cpu_started
+            if callable(items):
+                items = items()
+    finally:
+        if output:
+            output.close()
+    return {
+        "stage": stage,
+        "seconds": round(seconds, 6),
+        "cpu_seconds": round(cpu_seconds, 6),
+        "items": items,
+        "items_per_s": round(items / seconds, 3) if seconds > 0 else None,
+        "input_mb": round(input_bytes / (1024 * 1024), 3),
+        "mb_per_s": round(input_bytes / (1024 * 1024) / seconds, 3) if seconds > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline,
+    }
+
+
+def _median_run(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Tempo mediano entre as repetições; o pico de memória é o maior
+    median = sorted(runs, key=lambda run: run["seconds"])[len(runs) // 2]
+    summary = dict(median, repeats=len(runs))
+    summary["seconds_all"] = [run["seconds"] for run in runs]
+    if any(run["peak_rss_mb"] is not None for run in runs):
+        summary["peak_rss_mb"] = max(run["peak_rss_mb"] or 0.0 for run in runs)
+    return summary
+
+
+def run_benchmark(
+    workdir: str,
+    stages: Sequence[str] = BENCHMARK_STAGES,
+    provider: str = "local",
+    top_k: int = 5,
+    store: str = "json",
+    repeat: int = 1,
+    isolate: bool = True,
+    verbose: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Executa ``stages`` sobre os arquivos de ``workdir`` (ver ``benchmark_paths``)
+    e retorna as medições de cada etapa.
+
+    Com ``isolate`` (padrão), cada execução de uma etapa roda em um processo
+    novo, como no ``docs-cli``, para que o pico de memória seja só dela.
+    Com ``repeat`` > 1, cada etapa é repetida e o tempo mediano é reportado.
+    """
+    paths = benchmark_paths(workdir, store)
+    options = {"provider": provider, "top_k": top_k, "verbose": verbose}
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for stage in stages:
+        runs = []
+        for _ in range(max(1, repeat)):
+            if isolate:
+                with context.Pool(1) as pool:
+                    runs.append(pool.apply(measure_stage, (stage, paths, options)))
+            else:
+                runs.append(measure_stage(stage, paths, options))
+        result = _median_run(runs)
+        print(
+            f"  {stage:<20} {result['seconds']:8.3f}s  {result['items']:>8} itens  "
+            f"{result['items_per_s'] or 0:10.1f} itens/s  pico RSS {result['peak_rss_mb'] or 0:.0f} MB",
+            flush=True,
+        )
+        results.append(result)
+    return results
+
+
+def measure_import(module: str, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Tempo de importação de ``module`` em um interpretador novo (o menor de
+    ``repeat`` execuções, sem a inicialização do interpretador) e as
+    bibliotecas de ``HEAVY_MODULES`` que a importação carregou.
+    """
+    code = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - started)\n"
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n"
+    )
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.getenv("PYTHONPATH")))))
+    timings = []
+    heavy: List[str] = []
+    for _ in range(max(1, repeat)):
+        completed = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", code],
+            capture_output=True, text=True, cwd=root, env=env, check=True,
+        )
+        seconds, loaded = (completed.stdout.splitlines() + [""])[:2]
+        timings.append(float(seconds))
+        heavy = [name for name in loaded.split(",") if name]
+    allowed = {"numpy"} if module in NUMPY_MODULES else set()
+    budget = IMPORT_TIME_BUDGETS.get(module)
+    seconds = min(timings)
+    unexpected = [name for name in heavy if name not in allowed]
+    return {
+        "module": module,
+        "seconds": round(seconds, 6),
+        "budget_s": budget,
+        "heavy_modules": heavy,
+        "unexpected_modules": unexpected,
+        "within_budget": (budget is None or seconds <= budget) and not unexpected,
+    }
+
+
+def run_import_benchmark(modules: Sequence[str] = tuple(IMPORT_TIME_BUDGETS), repeat: int = 3) -> List[Dict[str, Any]]:
+    """Mede ``measure_import`` para cada módulo e imprime o resultado frente ao orçamento."""
+    results = []
+    for module in modules:
+        result = measure_import(module, repeat)
+        status = "ok" if result["within_budget"] else "ACIMA DO ORÇAMENTO"
+        extra = f"  importou {', '.join(result['unexpected_modules'])}" if result["unexpected_modules"] else ""
+        print(f"  {module:<28} {result['seconds'] * 1000:7.1f} ms  (orçamento {result['budget_s'] * 1000:.0f} ms)  {status}{extra}", flush=True)
+        results.append(result)
+    return results
+
+
+def benchmark_scoring(
+    questions: int = 10_000,
+    sentences: int = 6,
+    top_k: int = 5,
+    dimension: int = 768,
+    distinct: int = 200,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Compara a pontuação de cobertura das frases da avaliação: o laço por par
+    (frase, chunk) de ``score_sentence_coverage_loop`` e o produto de
+    matrizes de ``score_sentence_coverage``, sobre ``questions`` perguntas.
+
+    As frases chegam como listas Python (como as devolvidas pelos
+    provedores) e os chunks como vetores float32 normalizados (como os do
+    ``ChunkIndex``). Para limitar a memória, ``distinct`` blocos de
+    pergunta são gerados e reaproveitados em ciclo. Também conta as frases
+    em que as duas implementações divergem (decisão, similaridade com 4
+    casas ou chunk correspondente).
+    """
+    import numpy as np
+
+    from evaluate_coverage import score_sentence_coverage, score_sentence_coverage_loop
+
+    rng = np.random.default_rng(seed)
+    threshold = 0.65
+    blocks = []
+    for _ in range(min(distinct, questions)):
+        chunks = rng.normal(size=(top_k, dimension)).astype(np.float32)
+        chunks /= np.linalg.norm(chunks, axis=1, keepdims=True)
+        anchors = chunks[rng.integers(0, top_k, size=sentences)]
+        # Ruído de norma entre 0,5 e 2,2: similaridades dos dois lados do limiar, em qualquer dimensão
+        noise = rng.normal(size=(sentences, dimension)) * rng.uniform(0.5, 2.2, size=(sentences, 1)) / np.sqrt(dimension)
+        blocks.append(((anchors + noise).tolist(), list(chunks)))
+    workload = [blocks[index % len(blocks)] for index in range(questions)]
+
+    timings = {}
+    outputs = {}
+    for name, scorer in (("loop", score_sentence_coverage_loop), ("matrix", score_sentence_coverage)):
+        started = time.perf_counter()
+        outputs[name] = [scorer(sentence_block, chunk_block, threshold) for sentence_block, chunk_block in workload]
+        timings[name] = time.perf_counter() - started
+
+    mismatches = 0
+    for (covered, best, chunk), (covered_ref, best_ref, chunk_ref) in zip(outputs["matrix"], outputs["loop"]):
+        for values in zip(covered, best, chunk, covered_ref, best_ref, chunk_ref):
+            if values[0] != values[3] or f"{values[1]:.4f}" != f"{values[4]:.4f}" or values[2] != values[5]:
+                mismatches += 1
+    return {
+        "questions": questions,
+        "sentences": sentences,
+        "top_k": top_k,
+        "dimension": dimension,
+        "covered_sentences": sum(sum(covered) for covered, _, _ in outputs["matrix"]),
+        "loop_s": round(timings["loop"], 6),
+        "matrix_s": round(timings["matrix"], 6),
+        "speedup": round(timings["loop"] / timings["matrix"], 2) if timings["matrix"] else None,
+        "mismatches": mismatches,
+    }
+
+
+def synthetic_embeddings(rows: int, dimension: int, topics: int, seed: int = 0):
+    """
+    Matriz float32 de embeddings agrupados em ``topics`` assuntos (centro
+    aleatório + ruído de norma ~0,8), parecida com a de um corpus de
+    documentação, gerada em blocos para limitar a memória.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dimension)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    matrix = np.empty((rows, dimension), dtype=np.float32)
+    for start in range(0, rows, 65536):
+        size = min(65536, rows - start)
+        noise = rng.normal(size=(size, dimension)).astype(np.float32) * np.float32(0.8 / np.sqrt(dimension))
+        matrix[start:start + size] = centers[rng.integers(0, topics, size=size)] + noise
+    return matrix
+
+
+def benchmark_ann(
+    rows: int = 200_000,
+    dimension: int = 256,
+    queries: int = 200,
+    top_k: int = 5,
+    nprobes: Sequence[int] = (1, 2, 4, 8, 16, 32, 64),
+    nlist: int | None = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Recall x latência do índice aproximado (``ann_index.IVFIndex``) frente à
+    busca exata do ``ChunkIndex``, consulta a consulta (como na avaliação),
+    para cada valor de ``nprobe``. O recall é a fração dos top-k exatos
+    devolvida pela busca aproximada.
+    """
+    import numpy as np
+
+    from ann_index import IVFIndex
+    from retrieval import ChunkIndex
+
+    rng = np.random.default_rng(seed + 1)
+    matrix = synthetic_embeddings(rows, dimension, topics=max(1, rows // 50), seed=seed)
+    # Consultas: chunks do corpus com ruído (perguntas próximas de um trecho)
+    query_vectors = _noisy_queries(rng, matrix, queries)
+    chunks = [{"row": row} for row in range(rows)]
+    exact_index = ChunkIndex(chunks, matrix, copy=False)
+    exact, exact_ms = _timed_search(exact_index, query_vectors, top_k)
+
+    started = time.perf_counter()
+    ivf = IVFIndex.build(exact_index.matrix, nlist=nlist, seed=seed)
+    build_s = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "dimension": dimension,
+        "queries": queries,
+        "top_k": top_k,
+        "nlist": ivf.nlist,
+        "build_s": round(build_s, 3),
+        "exact_ms_per_query": round(exact_ms, 4),
+        "nprobes": _recall_by_nprobe(chunks, exact_index.matrix, ivf, query_vectors, top_k, exact, exact_ms, nprobes, "nprobe"),
+    }
+
+
+def synthetic_documents(docs: int, sections: int, dimension: int, seed: int = 0):
+    """
+    Chunks e matriz de ``docs`` documentos sintéticos com ``sections`` seções
+    cada: centro do documento + assunto da seção + ruído. Os assuntos
+    (instalação, autenticação...) se repetem entre documentos, então os
+    trechos mais próximos de uma pergunta nem sempre estão no documento de
+    centróide mais próximo, como numa documentação real.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    scale = np.float32(1 / np.sqrt(dimension))
+    subjects = rng.normal(size=(max(1, docs // 10), dimension)).astype(np.float32) * scale
+    matrix = np.empty((docs * sections, dimension), dtype=np.float32)
+    for doc in range(docs):
+        center = rng.normal(size=dimension).astype(np.float32) * np.float32(0.7 * scale)
+        noise = rng.normal(size=(sections, dimension)).astype(np.float32) * np.float32(0.5 * scale)
+        matrix[doc * sections:(doc + 1) * sections] = center + subjects[rng.integers(0, len(subjects), size=sections)] + noise
+    chunks = [
+        {"row": row, "document_slug": f"documento-{row // sections}", "document_filepath": f"docs/documento-{row // sections}.md"}
+        for row in range(docs * sections)
+    ]
+    return chunks, matrix
+
+
+def benchmark_document_index(
+    docs: int = 2000,
+    sections: int = 100,
+    dimension: int = 256,
+    queries: int = 200,
+    top_k: int = 5,
+    shortlists: Sequence[int] = (1, 2, 4, 8, 16, 32, 64, 128, 256),
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Recall x latência da busca em dois estágios (centróides por documento,
+    ``ann_index.IVFIndex.from_documents``) frente à busca exata, para cada
+    número de documentos pré-selecionados por consulta.
+    """
+    import numpy as np
+
+    from ann_index import IVFIndex
+    from retrieval import ChunkIndex
+
+    rng = np.random.default_rng(seed + 1)
+    chunks, matrix = synthetic_documents(docs, sections, dimension, seed=seed)
+    query_vectors = _noisy_queries(rng, matrix, queries)
+    exact_index = ChunkIndex(chunks, matrix, copy=False)
+    exact, exact_ms = _timed_search(exact_index, query_vectors, top_k)
+
+    started = time.perf_counter()
+    document_index = IVFIndex.from_documents(chunks, exact_index.matrix)
+    build_s = time.perf_counter() - started
+    return {
+        "docs": docs,
+        "sections": sections,
+        "dimension": dimension,
+        "queries": queries,
+        "top_k": top_k,
+        "build_s": round(build_s, 3),
+        "exact_ms_per_query": round(exact_ms, 4),
+        "shortlists": _recall_by_nprobe(chunks, exact_index.matrix, document_index, query_vectors, top_k, exact, exact_ms, shortlists, "shortlist"),
+    }
+
+
+def _noisy_queries(rng, matrix, queries: int):
+    """Consultas próximas de chunks sorteados do corpus (o chunk mais um ruído pequeno)."""
+    import numpy as np
+
+    dimension = matrix.shape[1]
+    noise = rng.normal(size=(queries, dimension)).astype(np.float32) * np.float32(0.5 / np.sqrt(dimension))
+    return matrix[rng.integers(0, matrix.shape[0], size=queries)] + noise
+
+
+def _timed_search(chunk_index, query_vectors, top_k: int):
+    """Linhas do top-k de cada consulta e o tempo médio por consulta, em ms."""
+    started = time.perf_counter()
+    found = [[item["row"] for item in chunk_index.search(query, top_k)] for query in query_vectors]
+    return found, (time.perf_counter() - started) / len(query_vectors) * 1000
+
+
+def _recall_by_nprobe(chunks, matrix, index, query_vectors, top_k, exact, exact_ms, nprobes, label: str) -> List[Dict[str, Any]]:
+    """Recall, latência, ganho e candidatos médios do índice aproximado para cada ``nprobe``."""
+    import numpy as np
+
+    from retrieval import ChunkIndex
+
+    approximate_index = ChunkIndex(chunks, matrix, copy=False, ann=index)
+    normalized_queries = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    results = []
+    for nprobe in sorted({min(nprobe, index.nlist) for nprobe in nprobes}):
+        index.nprobe = nprobe
+        approximate, ms = _timed_search(approximate_index, query_vectors, top_k)
+        recall = np.mean([len(set(found) & set(expected)) / len(expected) for found, expected in zip(approximate, exact) if expected])
+        candidates = np.mean([len(candidate) for candidate in index.candidate_rows(normalized_queries)])
+        results.append({
+            label: nprobe,
+            "recall": round(float(recall), 4),
+            "ms_per_query": round(ms, 4),
+            "speedup": round(exact_ms / ms, 2) if ms else None,
+            "candidates": round(float(candidates), 1),
+        })
+    return results
+
+
+def write_results(path: str, parameters: Dict[str, Any], results: List[Dict[str, Any]], key: str = "stages") -> None:
+    """Grava as medições em JSON, com os parâmetros do corpus e o ambiente."""
+    payload = {
+        "version": RESULTS_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": parameters,
+        key: results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def cli_main():
+    """Interface de linha de comando do benchmark."""
+    parser = argparse.ArgumentParser(
+        description="Gera um corpus e um CSV de perguntas sintéticos e mede vazão e pico de memória de cada etapa (offline)."
+    )
+    parser.add_argument("--workdir", default="benchmark_data", help="Diretório dos arquivos gerados (padrão: benchmark_data).")
+    parser.add_argument("--docs", type=int, default=200, help="Número de documentos (padrão: 200).")
+    parser.add_argument("--sections", type=int, default=5, help="Seções por documento (padrão: 5).")
+    parser.add_argument("--section-words", type=int, default=150, help="Palavras por seção, aproximadamente (padrão: 150).")
+    parser.add_argument("--qa-rows", type=int, default=200, help="Linhas do CSV de perguntas (padrão: 200).")
+    parser.add_argument("--qa-sentences", type=int, default=3, help="Frases por resposta ideal (padrão: 3).")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do gerador (padrão: 0).")
+    parser.add_argument("--stages", nargs="+", choices=BENCHMARK_STAGES, default=list(BENCHMARK_STAGES), help="Etapas a medir (padrão: todas).")
+    parser.add_argument("--store", choices=["json", "npy"], default="json", help="Formato dos embeddings (padrão: json).")
+    parser.add_argument("-k", "--top-k", type=int, default=5, help="Chunks por pergunta na avaliação (padrão: 5).")
+    parser.add_argument("--repeat", type=int, default=1, help="Repetições de cada etapa; reporta o tempo mediano (padrão: 1).")
+    parser.add_argument(
+        "--fake-server",
+        action="store_true",
+        help="Gera os embeddings pelo servidor falso (provedor openai, via HTTP) em vez do provedor local.",
+    )
+    parser.add_argument("--fake-latency-ms", type=float, default=20.0, help="Latência por requisição do servidor falso (padrão: 20).")
+    parser.add_argument("--no-isolate", action="store_true", help="Executa as etapas no próprio processo (o pico de memória passa a ser cumulativo).")
+    parser.add_argument("--reuse-data", action="store_true", help="Reaproveita o corpus e o CSV já gerados em --workdir.")
+    parser.add_argument(
+        "-o",
+        "--output",
+        help=f"Arquivo JSON com os resultados (padrão: {DEFAULT_RESULTS_FILES['stages']}; "
+        "--imports, --scoring, --ann e --doc-index gravam em benchmark_<modo>.json).",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Exibe a saída das etapas.")
+    parser.add_argument(
+        "--imports",
+        action="store_true",
+        help="Mede só o tempo de importação de cada comando frente ao orçamento (sai com código 1 se algum exceder).",
+    )
+    parser.add_argument(
+        "--scoring",
+        action="store_true",
+        help="Compara só a pontuação de cobertura das frases (laço por par x produto de matrizes), sem corpus.",
+    )
+    parser.add_argument("--scoring-questions", type=int, default=10_000, help="Perguntas na comparação de --scoring (padrão: 10000).")
+    parser.add_argument(
+        "--ann",
+        action="store_true",
+        help="Mede só o recall x latência do índice aproximado (IVF) frente à busca exata, com embeddings sintéticos.",
+    )
+    parser.add_argument("--ann-rows", type=int, default=200_000, help="Chunks sintéticos de --ann (padrão: 200000).")
+    parser.add_argument("--ann-dimension", type=int, default=256, help="Dimensão dos embeddings de --ann e --doc-index (padrão: 256).")
+    parser.add_argument("--ann-nlist", type=int, help="Partições do índice de --ann (padrão: raiz quadrada do número de chunks).")
+    parser.add_argument(
+        "--doc-index",
+        action="store_true",
+        help="Mede só o recall x latência da busca em dois estágios (centróides por documento) frente à busca exata, com embeddings sintéticos.",
+    )
+    parser.add_argument("--doc-index-docs", type=int, default=2000, help="Documentos sintéticos de --doc-index (padrão: 2000).")
+    parser.add_argument("--doc-index-sections", type=int, default=100, help="Seções por documento de --doc-index (padrão: 100).")
+    args = parser.parse_args()
+    mode = next((mode for mode in ("doc_index", "ann", "scoring", "imports") if getattr(args, mode)), "stages")
+    if args.output is None:
+        args.output = DEFAULT_RESULTS_FILES[mode]
+
+    if args.doc_index:
+        print(
+            f"Busca em dois estágios: {args.doc_index_docs} documentos x {args.doc_index_sections} seções sintéticas "
+            f"de dimensão {args.ann_dimension}, top {args.top_k}..."
+        )
+        result = benchmark_document_index(
+            docs=args.doc_index_docs, sections=args.doc_index_sections, dimension=args.ann_dimension, top_k=args.top_k, seed=args.seed
+        )
+        print(f"  centróides criados em {result['build_s']:.2f} s; busca exata: {result['exact_ms_per_query']:.3f} ms/consulta")
+        print(f"  {'docs':>6}  {'recall':>7}  {'ms/consulta':>11}  {'ganho':>6}  {'candidatos':>10}")
+        for row in result["shortlists"]:
+            print(f"  {row['shortlist']:>6}  {row['recall']:>7.4f}  {row['ms_per_query']:>11.3f}  {row['speedup']:>5.1f}x  {row['candidates']:>10.0f}")
+        write_results(args.output, {"seed": args.seed}, [result], key="doc_index")
+        print(f"Resultados salvos em '{args.output}'.")
+        return
+
+    if args.ann:
+        print(f"Índice aproximado: {args.ann_rows} chunks sintéticos de dimensão {args.ann_dimension}, top {args.top_k}...")
+        result = benchmark_ann(rows=args.ann_rows, dimension=args.ann_dimension, top_k=args.top_k, nlist=args.ann_nlist, seed=args.seed)
+        print(f"  {result['nlist']} partições criadas em {result['build_s']:.2f} s; busca exata: {result['exact_ms_per_query']:.3f} ms/consulta")
+        print(f"  {'nprobe':>6}  {'recall':>7}  {'ms/consulta':>11}  {'ganho':>6}  {'candidatos':>10}")
+        for row in result["nprobes"]:
+            print(f"  {row['nprobe']:>6}  {row['recall']:>7.4f}  {row['ms_per_query']:>11.3f}  {row['speedup']:>5.1f}x  {row['candidates']:>10.0f}")
+        write_results(args.output, {"seed": args.seed}, [result], key="ann")
+        print(f"Resultados salvos em '{args.output}'.")
+        return
+
+    if args.scoring:
+        print(f"Pontuação de cobertura de {args.scoring_questions} perguntas (6 frases x {args.top_k} chunks, dimensão 768):")
+        result = benchmark_scoring(questions=args.scoring_questions, top_k=args.top_k, seed=args.seed)
+        print(f"  laço por par:        {result['loop_s']:8.3f} s")
+        print(f"  produto de matrizes: {result['matrix_s']:8.3f} s  ({result['speedup']}x)")
+        print(f"  frases divergentes:  {result['mismatches']}")
+        write_results(args.output, {"seed": args.seed}, [result], key="scoring")
+        print(f"Resultados salvos em '{args.output}'.")
+        if result["mismatches"]:
+            sys.exit(1)
+        return
+
+    if args.imports:
+        print("Tempo de importação dos comandos (interpretador novo, menor de 3 execuções):")
+        results = run_import_benchmark(repeat=max(3, args.repeat))
+        write_results(args.output, {"repeat": max(3, args.repeat)}, results, key="imports")
+        print(f"Resultados salvos em '{args.output}'.")
+        if not all(result["within_budget"] for result in results):
+            sys.exit(1)
+        return
+
+    paths = benchmark_paths(args.workdir, args.store)
+    Path(args.workdir).mkdir(parents=True, exist_ok=True)
+    if not (args.reuse_data and Path(paths["docs"]).exists() and Path(paths["qa"]).exists()):
+        print(f"Gerando corpus sintético em '{paths['docs']}' ({args.docs} documentos x {args.sections} seções)...")
+        sample = generate_corpus(paths["docs"], args.docs, args.sections, args.section_words, args.seed)
+        generate_qa_csv(paths["qa"], args.qa_rows, args.qa_sentences, sample, seed=args.seed)
+
+    # Sem cache: cada execução mede a geração dos embeddings, não a leitura do cache
+    os.environ["DOCS_CLI_CACHE"] = "0"
+    provider = "local"
+    server = None
+    if args.fake_server:
+        from fake_embedding_server import FakeServerConfig, environment_for, start_server
+
+        server, _ = start_server(FakeServerConfig(latency_ms=args.fake_latency_ms))
+        os.environ.update(environment_for(server))
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+        provider = "openai"
+
+    parameters = {
+        "docs": args.docs,
+        "sections": args.sections,
+        "section_words": args.section_words,
+        "qa_rows": args.qa_rows,
+        "qa_sentences": args.qa_sentences,
+        "seed": args.seed,
+        "provider": provider,
+        "fake_latency_ms": args.fake_latency_ms if args.fake_server else None,
+        "store": args.store,
+        "top_k": args.top_k,
+        "repeat": args.repeat,
+        "isolated": not args.no_isolate,
+    }
+    print(f"Medindo {len(args.stages)} etapas (provedor {provider}):")
+    try:
+        results = run_benchmark(
+            args.workdir,
+            args.stages,
+            provider=provider,
+            top_k=args.top_k,
+            store=args.store,
+            repeat=args.repeat,
+            isolate=not args.no_isolate,
+            verbose=args.verbose,
+        )
+    except RuntimeError as e:
+        print(f"❌ Benchmark interrompido: {e}")
+        sys.exit(1)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    write_results(args.output, parameters, results)
+    print(f"Resultados salvos em '{args.output}'.")
+
+
+if __name__ == "__main__":
+    cli_main()
@@ -0,0 +1,140 @@
+"""Manifesto de build: hashes das entradas, parâmetros e saídas de cada etapa, para pular etapas inalteradas."""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Arquivo padrão do manifesto (no diretório de trabalho)
+DEFAULT_MANIFEST = ".docs-cli-manifest.json"
+
+MANIFEST_VERSION = 1
+
+# Opções do fluxo (nomes de PipelineConfig) lidas e gravadas por cada etapa
+STAGE_FILES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "merge": (("doc_input_dir",), ("corpus_file",)),
+    "clean_csv": (("qa_input_file",), ("cleaned_qa_file",)),
+    "extract": (("corpus_file",), ("raw_docs_file",)),
+    "generate_embeddings": (("raw_docs_file",), ("embeddings_file",)),
+    "evaluate": (("cleaned_qa_file", "embeddings_file"), ("eval_results_file",)),
+    "report_md": (("eval_results_file",), ("md_report_file",)),
+    "report_html": (("eval_results_file",), ("html_report_file",)),
+}
+
+# Opções que alteram o resultado de cada etapa (além dos arquivos de entrada).
+# O provedor é registrado com o modelo de embedding (ver ``_param_value``).
+STAGE_PARAMS: Dict[str, Tuple[str, ...]] = {
+    "generate_embeddings": ("provider",),
+    "evaluate": ("provider", "top_k"),
+    "report_md": ("top_k",),
+    "report_html": ("top_k",),
+}
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_digest(path: str) -> Optional[str]:
+    """SHA-256 do conteúdo de ``path`` (ou de todos os .md, se for um diretório); ``None`` se não existir."""
+    target = Path(path)
+    if target.is_dir():
+        digest = hashlib.sha256()
+        for md_file in sorted(target.rglob('*.md'), key=lambda x: str(x)):
+            digest.update(str(md_file.relative_to(target)).encode("utf-8") + b"\0")
+            digest.update((file_digest(str(md_file)) or "").encode("ascii") + b"\n")
+        return digest.hexdigest()
+    if not target.is_file():
+        return None
+    digest = hashlib.sha256()
+    with open(target, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _expand(path: str) -> List[str]:
+    # Um store binário são dois arquivos: a matriz e os metadados (import local: evita carregar o NumPy no docs-cli)
+    from embedding_store import is_store_path, store_paths
+
+    return list(store_paths(path)) if is_store_path(path) else [path]
+
+
+def _param_value(name: str, value: Any) -> Any:
+    # Trocar o modelo (ou a dimensão do provedor local) sem trocar o provedor também invalida os embeddings
+    if name == "provider" and value:
+        from embedding_providers import embedding_namespace
+
+        return embedding_namespace(value)
+    return value
+
+
+def stage_signature(step: str, options: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Hashes das entradas, parâmetros e caminhos das saídas de ``step``.
+
+    ``options`` tem os nomes de arquivo e parâmetros do fluxo (os mesmos
+    atributos de ``pipeline.PipelineConfig``).
+    """
+    input_names, output_names = STAGE_FILES[step]
+    inputs = {path: file_digest(path) for name in input_names for path in _expand(options[name])}
+    params = {name: _param_value(name, options.get(name)) for name in STAGE_PARAMS.get(step, ())}
+    outputs = [path for name in output_names for path in _expand(options[name])]
+    return {"inputs": inputs, "params": params, "outputs": outputs}
+
+
+class BuildManifest:
+    """
+    Registro, em JSON, do que cada etapa leu e produziu na última execução bem-sucedida.
+
+    Uma etapa está atualizada quando suas entradas têm os mesmos hashes,
+    os parâmetros são os mesmos e cada saída ainda existe com o hash
+    registrado. Como as saídas entram no hash das etapas seguintes, uma
+    etapa refeita que produz o mesmo conteúdo não invalida as demais.
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST):
+        self.path = path
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        # Etapas concorrentes (full_flow --parallel) registram no mesmo manifesto
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.stages = data.get("stages", {})
+        except (OSError, ValueError):
+            self.stages = {}
+
+    def is_up_to_date(self, step: str, options: Mapping[str, Any]) -> bool:
+        """Indica se ``step`` pode ser pulada com as opções atuais."""
+        entry = self.stages.get(step)
+        if not entry:
+            return False
+        signature = stage_signature(step, options)
+        if None in signature["inputs"].values():
+            return False
+        if entry.get("inputs") != signature["inputs"] or entry.get("params") != signature["params"]:
+            return False
+        recorded_outputs = entry.get("outputs", {})
+        if sorted(recorded_outputs) != sorted(signature["outputs"]):
+            return False
+        return all(digest is not None and file_digest(path) == digest for path, digest in recorded_outputs.items())
+
+    def record(self, step: str, options: Mapping[str, Any]) -> None:
+        """Registra a execução bem-sucedida de ``step`` e grava o manifesto."""
+        signature = stage_signature(step, options)
+        entry = {
+            "inputs": signature["inputs"],
+            "params": signature["params"],
+            "outputs": {path: file_digest(path) for path in signature["outputs"]},
+        }
+        with self._lock:
+            self.stages[step] = entry
+            self.save()
+
+    def save(self) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "stages": self.stages}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
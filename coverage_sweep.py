@@ -0,0 +1,288 @@
+"""Varredura de limiares e top-k da avaliação de cobertura a partir de um único cálculo de similaridades."""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from itertools import product
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from embedding_store import load_embeddings
+from evaluate_coverage import (
+    MIN_PHRASES_COVERED_PERCENTAGE,
+    MIN_SENTENCE_SIMILARITY_THRESHOLD,
+    embed_questions,
+    load_qa_pairs,
+    prepare_questions,
+    sentence_chunk_similarities,
+)
+from profiling import span
+from retrieval import ChunkIndex
+
+DEFAULT_TOP_K = (3, 5, 10)
+DEFAULT_THRESHOLDS = (0.55, 0.60, 0.65, 0.70, 0.75)
+DEFAULT_MIN_COVERAGE = (0.50, 0.70, 0.90)
+DEFAULT_OUTPUT = "coverage_sweep.csv"
+
+SWEEP_FIELDS = (
+    "top_k",
+    "threshold",
+    "min_coverage",
+    "found",
+    "questions",
+    "coverage_pct",
+    "sentences_covered",
+    "sentences",
+)
+
+
+class SimilarityCache:
+    """
+    Similaridades de cada frase das respostas ideais com os ``max_top_k``
+    chunks mais próximos da sua pergunta, calculadas uma única vez.
+
+    Para cada frase guarda-se o máximo acumulado das similaridades ao longo
+    dos chunks, em ordem de relevância: com ``top_k = k`` e limiar ``t`` a
+    frase é coberta se a coluna ``k - 1`` for >= ``t``, a mesma decisão de
+    ``evaluate_coverage`` (cujos top-k são um prefixo dos top-``max_top_k``).
+    Cada configuração da grade é então avaliada sem chamadas ao provedor
+    nem novas buscas.
+    """
+
+    def __init__(self, prefix_max: np.ndarray, sentence_question: np.ndarray, sentence_totals: np.ndarray, eligible: np.ndarray):
+        self.prefix_max = prefix_max
+        self.sentence_question = sentence_question
+        self.sentence_totals = sentence_totals
+        self.eligible = eligible
+
+    @property
+    def max_top_k(self) -> int:
+        return self.prefix_max.shape[1]
+
+    @classmethod
+    def build(
+        cls,
+        qa_pairs: List[dict],
+        question_embeddings: List[List[list | None]],
+        chunk_index: ChunkIndex,
+        max_top_k: int,
+    ) -> "SimilarityCache":
+        """
+        Calcula o cache a partir dos pares, dos embeddings de ``embed_questions``
+        (``[pergunta] + frases`` por par) e do índice de chunks.
+        """
+        prepared_questions = prepare_questions(qa_pairs)
+        totals = np.array([len(sentences) for sentences, _ in prepared_questions], dtype=np.int64)
+        # Perguntas sem embedding ou sem frases nunca são consideradas "Encontradas"
+        eligible = np.array([batch[0] is not None for batch in question_embeddings], dtype=bool) & (totals > 0)
+
+        asked = np.flatnonzero(eligible)
+        searches = chunk_index.search_batch([question_embeddings[i][0] for i in asked], top_k=max_top_k) if asked.size else []
+
+        blocks = []
+        owners = []
+        for question, relevant_chunks in zip(asked, searches):
+            sentence_embeddings = [embedding for embedding in question_embeddings[question][1:] if embedding is not None]
+            if not sentence_embeddings:
+                continue
+            block = np.full((len(sentence_embeddings), max_top_k), -np.inf)
+            if relevant_chunks:
+                chunk_vectors = [chunk_index.vector(item['row']) for item in relevant_chunks]
+                block[:, :len(chunk_vectors)] = sentence_chunk_similarities(sentence_embeddings, chunk_vectors)
+            blocks.append(np.maximum.accumulate(block, axis=1))
+            owners.append(np.full(len(sentence_embeddings), question, dtype=np.int64))
+
+        prefix_max = np.concatenate(blocks) if blocks else np.zeros((0, max_top_k))
+        sentence_question = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int64)
+        return cls(prefix_max, sentence_question, totals, eligible)
+
+    def evaluate(self, top_k: int, threshold: float, min_coverage: float) -> Dict[str, float]:
+        """Resultado agregado de uma configuração (``top_k`` <= ``max_top_k``)."""
+        if not 1 <= top_k <= self.max_top_k:
+            raise ValueError(f"top_k deve estar entre 1 e {self.max_top_k} (o maior k calculado), mas foi {top_k}.")
+        covered = self.prefix_max[:, top_k - 1] >= threshold
+        covered_counts = np.bincount(self.sentence_question[covered], minlength=len(self.sentence_totals))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            coverage = covered_counts / self.sentence_totals
+        found = int((self.eligible & (coverage >= min_coverage)).sum())
+        questions = len(self.sentence_totals)
+        return {
+            "top_k": top_k,
+            "threshold": threshold,
+            "min_coverage": min_coverage,
+            "found": found,
+            "questions": questions,
+            "coverage_pct": round(found / questions * 100, 2) if questions else 0.0,
+            "sentences_covered": int(covered.sum()),
+            "sentences": int(self.sentence_totals.sum()),
+        }
+
+    def sweep(self, top_ks: Sequence[int], thresholds: Sequence[float], min_coverages: Sequence[float]) -> List[Dict[str, float]]:
+        """Avalia todas as combinações da grade, ordenadas por top_k, limiar e % mínima de frases."""
+        return [
+            self.evaluate(top_k, threshold, min_coverage)
+            for top_k, threshold, min_coverage in product(sorted(set(top_ks)), sorted(set(thresholds)), sorted(set(min_coverages)))
+        ]
+
+
+def print_sweep_table(results: List[Dict[str, float]]) -> None:
+    """Imprime a tabela de cobertura por configuração; ``*`` marca a configuração padrão da avaliação."""
+    print(f"\n{'top_k':>5}  {'limiar':>6}  {'% frases':>8}  {'encontradas':>11}  {'cobertura':>9}  {'frases cobertas':>15}")
+    for result in results:
+        default = (
+            result["top_k"] == 5
+            and result["threshold"] == MIN_SENTENCE_SIMILARITY_THRESHOLD
+            and result["min_coverage"] == MIN_PHRASES_COVERED_PERCENTAGE
+        )
+        print(
+            f"{result['top_k']:>5}  {result['threshold']:>6.2f}  {result['min_coverage'] * 100:>7.0f}%  "
+            f"{result['found']:>5}/{result['questions']:<5}  {result['coverage_pct']:>8.2f}%  "
+            f"{result['sentences_covered']:>7}/{result['sentences']:<7}{'  *' if default else ''}"
+        )
+
+
+def write_sweep_results(path: str, results: List[Dict[str, float]]) -> None:
+    """Grava a tabela em CSV ou, com extensão ``.json``, em JSON."""
+    if path.lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        return
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SWEEP_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def run_sweep(
+    qa_filepath: str,
+    chunks_filepath: str,
+    top_ks: Sequence[int] = DEFAULT_TOP_K,
+    thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+    min_coverages: Sequence[float] = DEFAULT_MIN_COVERAGE,
+    output_path: str | None = DEFAULT_OUTPUT,
+    provider: str | None = None,
+    gemini_api_key: str | None = None,
+    openai_api_key: str | None = None,
+    load_mode: str = "auto",
+    concurrency: int | None = None,
+) -> List[Dict[str, float]] | None:
+    """
+    Avalia a grade ``top_ks`` × ``thresholds`` × ``min_coverages`` com uma
+    única geração de embeddings e um único cálculo de similaridades (para o
+    maior k). Retorna os resultados por configuração (e os grava em
+    ``output_path``, se informado) ou ``None`` em caso de erro.
+    """
+    if not top_ks or not thresholds or not min_coverages:
+        print("Erro: informe ao menos um valor de top-k, de limiar e de % mínima de frases.")
+        return None
+    if min(top_ks) < 1:
+        print("Erro: os valores de top-k devem ser positivos.")
+        return None
+    for path, description in ((qa_filepath, "perguntas e respostas"), (chunks_filepath, "chunks processados")):
+        if not os.path.exists(path):
+            print(f"Erro: O arquivo de {description} '{path}' não foi encontrado.")
+            return None
+
+    print(f"Carregando chunks de '{chunks_filepath}'...")
+    try:
+        with span("sweep.load") as phase:
+            processed_chunks, embedding_matrix = load_embeddings(chunks_filepath, load_mode=load_mode)
+            phase.set(items=len(processed_chunks))
+    except Exception as e:
+        print(f"Erro ao carregar '{chunks_filepath}': {e}")
+        return None
+    if not processed_chunks:
+        print("Erro: Nenhum chunk com embedding válido encontrado.")
+        return None
+    qa_pairs = load_qa_pairs(qa_filepath)
+    if not qa_pairs:
+        print("Erro: Nenhum par de pergunta-resposta válido encontrado no CSV.")
+        return None
+
+    with span("sweep.embed", items=len(qa_pairs)):
+        question_embeddings = embed_questions(
+            qa_pairs,
+            provider=provider,
+            gemini_api_key=gemini_api_key,
+            openai_api_key=openai_api_key,
+            concurrency=concurrency,
+        )
+
+    max_top_k = max(top_ks)
+    started = time.perf_counter()
+    with span("sweep.similarities", items=len(qa_pairs)):
+        chunk_index = ChunkIndex(processed_chunks, embedding_matrix, copy=False)
+        cache = SimilarityCache.build(qa_pairs, question_embeddings, chunk_index, max_top_k)
+    print(
+        f"Similaridades de {len(cache.prefix_max)} frases com os top {max_top_k} chunks de {len(qa_pairs)} perguntas "
+        f"calculadas em {time.perf_counter() - started:.2f} s."
+    )
+
+    started = time.perf_counter()
+    with span("sweep.grid") as phase:
+        results = cache.sweep(top_ks, thresholds, min_coverages)
+        phase.set(items=len(results))
+    print(f"{len(results)} configurações avaliadas em {time.perf_counter() - started:.3f} s.")
+    print_sweep_table(results)
+
+    if output_path:
+        try:
+            write_sweep_results(output_path, results)
+            print(f"\nTabela de cobertura salva em '{output_path}'.")
+        except Exception as e:
+            print(f"Erro ao salvar a tabela de cobertura: {e}")
+            return None
+    return results
+
+
+def cli_main():
+    """Ponto de entrada de linha de comando para a varredura de configurações da avaliação."""
+    parser = argparse.ArgumentParser(
+        description="Avalia a cobertura para uma grade de top-k, limiares e % mínima de frases, calculando as similaridades uma única vez."
+    )
+    parser.add_argument("qa_filepath", help="Caminho para o arquivo CSV de perguntas e respostas ideais.")
+    parser.add_argument("embeddings_filepath", help="Caminho para o arquivo de chunks processados com embeddings (JSON ou store binário .npy).")
+    parser.add_argument("-k", "--top-k", type=int, nargs="+", default=list(DEFAULT_TOP_K),
+                        help=f"Valores de top-k (padrão: {' '.join(map(str, DEFAULT_TOP_K))}).")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=list(DEFAULT_THRESHOLDS),
+                        help=f"Similaridades mínimas para uma frase ser coberta (padrão: {' '.join(map(str, DEFAULT_THRESHOLDS))}).")
+    parser.add_argument("--min-coverage", type=float, nargs="+", default=list(DEFAULT_MIN_COVERAGE),
+                        help=f"Frações mínimas de frases cobertas para a resposta ser 'Encontrada' (padrão: {' '.join(map(str, DEFAULT_MIN_COVERAGE))}).")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT,
+                        help=f"Arquivo da tabela de cobertura, CSV ou .json (padrão: {DEFAULT_OUTPUT}).")
+    parser.add_argument(
+        "--provider",
+        choices=["gemini", "openai", "local"],
+        help="Provedor usado para gerar embeddings das perguntas (detectado automaticamente); use o mesmo da geração dos embeddings.",
+    )
+    parser.add_argument("--gemini-api-key", help="Chave da API do Google Gemini (opcional)")
+    parser.add_argument("--openai-api-key", help="Chave da API OpenAI (opcional)")
+    parser.add_argument("--load-mode", choices=["auto", "mmap", "memory"], default="auto",
+                        help="Carregamento da matriz de embeddings: mmap, memory ou auto (padrão).")
+    parser.add_argument("--concurrency", type=int, help="Máximo de requisições de embedding simultâneas (padrão depende do provedor).")
+    args = parser.parse_args()
+
+    results = run_sweep(
+        args.qa_filepath,
+        args.embeddings_filepath,
+        top_ks=args.top_k,
+        thresholds=args.thresholds,
+        min_coverages=args.min_coverage,
+        output_path=args.output,
+        provider=args.provider,
+        gemini_api_key=args.gemini_api_key,
+        openai_api_key=args.openai_api_key,
+        load_mode=args.load_mode,
+        concurrency=args.concurrency,
+    )
+    if results is None:
+        print("\nA varredura da avaliação de cobertura falhou.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    cli_main()
@@ -14,6 +14,11 @@ except Exception:  # pragma: no cover - fallback if dotenv is missing
         return None
 from pathlib import Path
 
+from build_manifest import DEFAULT_MANIFEST, BuildManifest
+from flow_dag import format_timing_report, run_dag, step_dependencies
+from process_output import StreamedProcess
+from profiling import ProfileSession, span
+
 # Nomes de arquivo padrão intermediários e finais
 DEFAULT_CORPUS_CONSOLIDATED = "corpus_consolidated.md"
 DEFAULT_RAW_DOCS = "raw_docs.json"
@@ -49,39 +54,40 @@ def save_config(config):
         json.dump(config, f, indent=4)
 
 def run_script(command_args, verbose=False):
-    """Executa um script (entry point) como um subprocesso."""
+    """
+    Executa um script (entry point) como um subprocesso.
+
+    A saída é transmitida enquanto o processo roda (ver
+    ``process_output.StreamedProcess``): stderr e as linhas de progresso
+    (com ETA) sempre, o restante do stdout com ``verbose``. Em caso de
+    falha, as últimas linhas da saída são repetidas no resumo do erro.
+    """
     # Espera que command_args[0] seja um executável no PATH (ex: 'docs-tc-extract-data')
     command = command_args
     print(f"🚀 Executando: {' '.join(command)}")
     try:
-        process = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-        )
-
-        if verbose and process.stdout:
-            print("Output:\n", process.stdout)
-        if process.stderr:
-            print("Errors:\n", process.stderr, file=sys.stderr)
+        process = StreamedProcess(command, verbose=verbose, label=command[0].replace("docs-tc-", ""))
+        returncode = process.run()
 
-        if process.returncode != 0:
-            if not process.stderr and not process.stdout:
+        if returncode != 0:
+            tail = process.failure_summary()
+            if not tail:
                 print(
                     f"❌ Erro ao executar {' '.join(command)}. O processo terminou sem produzir saída.",
                     file=sys.stderr,
                 )
             else:
                 print(
-                    f"❌ Erro ao executar {' '.join(command)}. Código de saída: {process.returncode}",
+                    f"❌ Erro ao executar {' '.join(command)}. Código de saída: {returncode}",
                     file=sys.stderr,
                 )
+                print(f"Últimas {len(tail)} linhas da saída:", file=sys.stderr)
+                for line in tail:
+                    print(f"  {line}", file=sys.stderr)
             return None  # Indica falha para as funções run_step_or_exit
 
         print(f"✅ Script {' '.join(command_args)} concluído com sucesso.")
-        return process
+        return subprocess.CompletedProcess(command, returncode)
 
     except FileNotFoundError:
         print(f"🚨 Erro: Comando '{command[0]}' não encontrado. Verifique se o docs-cli está instalado corretamente e se os scripts dos subcomandos (ex: {command[0]}.exe) foram criados na pasta Scripts do seu ambiente virtual e se o ambiente virtual está ativo.", file=sys.stderr)
@@ -91,6 +97,86 @@ def run_script(command_args, verbose=False):
         sys.exit(1)
 
 
+def flow_options(args, provider):
+    """Arquivos e parâmetros de full_flow/custom_flow com os nomes de ``pipeline.PipelineConfig`` (para o manifesto)."""
+    return {
+        "doc_input_dir": args.doc_input_dir,
+        "qa_input_file": args.qa_input_file,
+        "corpus_file": args.corpus_file,
+        "raw_docs_file": args.raw_docs_file,
+        "embeddings_file": args.embeddings_file,
+        "cleaned_qa_file": args.cleaned_qa_file,
+        "eval_results_file": args.eval_results_file,
+        "md_report_file": args.md_report_file,
+        "html_report_file": args.html_report_file,
+        "top_k": args.eval_top_k,
+        "provider": provider,
+    }
+
+
+def run_flow_steps(args, step_commands, provider, flow_label, announce_steps=False):
+    """
+    Executa os subprocessos ``(etapa, comando)`` de full_flow/custom_flow.
+
+    Cada etapa começa quando as etapas das quais depende terminam (ver
+    ``flow_dag``); com ``--parallel``, ramos independentes rodam ao mesmo
+    tempo. Ao final, mostra o tempo de cada etapa e o caminho crítico.
+    """
+    manifest = BuildManifest(args.manifest) if args.incremental else None
+    options = flow_options(args, provider)
+    steps = [step for step, _ in step_commands]
+
+    def run_step_or_exit(index):
+        step, step_command_args = step_commands[index]
+        if announce_steps:
+            print(f"\n--- Executando etapa: {step} ---")
+        if manifest is not None and manifest.is_up_to_date(step, options):
+            print(f"⏭️ Etapa {step} inalterada desde a última execução. Pulando.")
+            return
+        with span(step, category="stage", children=True) as stage_span:
+            succeeded = run_script(step_command_args, verbose=args.verbose) is not None
+            stage_span.set(failed=not succeeded)
+        if not succeeded:
+            print(f"❌ Etapa {step_command_args[0]} falhou. Abortando {flow_label}.")
+            sys.exit(1)
+        if manifest is not None:
+            manifest.record(step, options)
+
+    dependencies = step_dependencies(steps)
+    timings = run_dag(steps, dependencies, run_step_or_exit, max_workers=len(steps) if args.parallel else 1)
+    print(format_timing_report(timings, dependencies))
+
+
+def run_flow_in_process(args, steps, api_key, flow_label):
+    """Executa ``steps`` com o executor em processo (pipeline.py), usando as opções de full_flow/custom_flow."""
+    from pipeline import PipelineConfig, PipelineError, run_pipeline
+
+    config = PipelineConfig(
+        doc_input_dir=args.doc_input_dir,
+        qa_input_file=args.qa_input_file,
+        corpus_file=args.corpus_file,
+        raw_docs_file=args.raw_docs_file,
+        embeddings_file=args.embeddings_file,
+        cleaned_qa_file=args.cleaned_qa_file,
+        eval_results_file=args.eval_results_file,
+        md_report_file=args.md_report_file,
+        html_report_file=args.html_report_file,
+        top_k=args.eval_top_k,
+        provider=args.provider,
+        gemini_api_key=api_key,
+        concurrency=args.concurrency,
+        save_intermediate=args.save_intermediate,
+        incremental=args.incremental,
+        manifest_file=args.manifest,
+        parallel=args.parallel,
+    )
+    try:
+        run_pipeline(steps, config)
+    except PipelineError as e:
+        print(f"❌ Etapa {e.step} falhou: {e} Abortando {flow_label}.")
+        sys.exit(1)
+
+
 def main():
     """Função principal que interpreta argumentos e despacha subcomandos."""
     load_dotenv()
@@ -113,6 +199,16 @@ def main():
         action="store_false",
         help="Executa os subcomandos sem exibir sua saída",
     )
+    parser.add_argument(
+        "--profile",
+        metavar="ARQUIVO_JSON",
+        help="Grava em ARQUIVO_JSON o perfil da execução: tempo, CPU, pico de memória, itens e chamadas de API por etapa e por fase.",
+    )
+    parser.add_argument(
+        "--chrome-trace",
+        metavar="ARQUIVO_JSON",
+        help="Grava os spans do perfil no formato Chrome trace (abra em chrome://tracing ou ui.perfetto.dev).",
+    )
     
     subparsers = parser.add_subparsers(dest="command", help="Comandos disponíveis", required=True)
 
@@ -194,9 +290,9 @@ def main():
     )
     parser_generate.add_argument(
         "--provider",
-        choices=["gemini", "deepinfra", "maritaca", "openai"],
+        choices=["gemini", "deepinfra", "maritaca", "openai", "local"],
         default=None,
-        help="Provedor de embeddings (detectado automaticamente se omitido).",
+        help="Provedor de embeddings (detectado automaticamente se omitido); local gera embeddings offline, sem chave de API.",
     )
     parser_generate.add_argument(
         "--deepinfra-api-key",
@@ -206,6 +302,47 @@ def main():
         "--openai-api-key",
         help="Chave da API OpenAI (opcional, pode ser fornecida via .env)",
     )
+    parser_generate.add_argument(
+        "--format",
+        choices=["json", "npy"],
+        default=None,
+        help="Formato de saída: json ou npy (matriz .npy + metadados .meta.jsonl). Inferido pela extensão se omitido.",
+    )
+    parser_generate.add_argument(
+        "--batch-max-items",
+        type=int,
+        help="Máximo de textos por requisição de embeddings (padrão depende do provedor).",
+    )
+    parser_generate.add_argument(
+        "--batch-max-chars",
+        type=int,
+        help="Máximo de caracteres somados por requisição de embeddings (padrão depende do provedor).",
+    )
+    parser_generate.add_argument(
+        "--concurrency",
+        type=int,
+        help="Máximo de requisições de embedding simultâneas (padrão depende do provedor).",
+    )
+    parser_generate.add_argument(
+        "--resume",
+        action="store_true",
+        help="Retoma uma geração interrompida a partir do checkpoint <saída>.partial.jsonl.",
+    )
+    parser_generate.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reaproveita da saída existente os embeddings dos chunks inalterados.",
+    )
+    parser_generate.add_argument(
+        "--ann",
+        action="store_true",
+        help="Cria também o índice aproximado (IVF) ao lado dos embeddings, usado por 'evaluate --ann'.",
+    )
+    parser_generate.add_argument(
+        "--doc-index",
+        action="store_true",
+        help="Cria também o índice de centróides por documento, usado por 'evaluate --doc-shortlist'.",
+    )
 
     # --- Subparser para limpa_csv.py ---
     parser_clean_csv = subparsers.add_parser("clean_csv", help="Limpa o arquivo CSV de Perguntas e Respostas.")
@@ -230,11 +367,48 @@ def main():
     parser_evaluate.add_argument("qa_file",
                                  help="Caminho para o arquivo CSV limpo com perguntas e respostas.")
     parser_evaluate.add_argument("embeddings_file",
-                                 help="Caminho para o arquivo JSON com chunks processados e embeddings.")
+                                 help="Caminho para o arquivo com chunks processados e embeddings (JSON ou store binário .npy).")
     parser_evaluate.add_argument("-k", "--top_k", type=int, default=5,
                                  help="Número de chunks mais relevantes a considerar (padrão: 5).")
     parser_evaluate.add_argument("-o", "--output", default=DEFAULT_EVAL_RESULTS,
-                                 help=f"Arquivo de saída para os resultados da avaliação (padrão: {DEFAULT_EVAL_RESULTS}).")
+                                 help=f"Arquivo de saída para os resultados da avaliação (padrão: {DEFAULT_EVAL_RESULTS}); "
+                                      "com extensão .jsonl cada resultado é gravado assim que a pergunta é avaliada.")
+    parser_evaluate.add_argument("--ann", action="store_true",
+                                 help="Usa o índice aproximado (IVF) gravado ao lado dos embeddings em vez da busca exata.")
+    parser_evaluate.add_argument("--nprobe", type=int,
+                                 help="Partições do índice aproximado visitadas por pergunta (mais partições, mais recall).")
+    parser_evaluate.add_argument("--doc-shortlist", type=int, metavar="N",
+                                 help="Busca em dois estágios: pontua só os chunks dos N documentos mais similares à pergunta.")
+    parser_evaluate.add_argument("--resume", action="store_true",
+                                 help="Retoma uma avaliação interrompida, avaliando só as perguntas ausentes do arquivo .jsonl de saída.")
+    parser_evaluate.add_argument("--load-mode", choices=["auto", "mmap", "memory"], default=None,
+                                 help="Carregamento da matriz de embeddings: mmap, memory ou auto (padrão).")
+    parser_evaluate.add_argument("--concurrency", type=int,
+                                 help="Máximo de requisições de embedding simultâneas (padrão depende do provedor).")
+    parser_evaluate.add_argument("--provider", choices=["gemini", "openai", "local"], default=None,
+                                 help="Provedor dos embeddings das perguntas; use o mesmo da geração dos embeddings (detectado automaticamente se omitido).")
+
+    # --- Subparser para coverage_sweep.py ---
+    parser_sweep = subparsers.add_parser(
+        "evaluate_sweep",
+        help="Avalia a cobertura para uma grade de top-k, limiares e % mínima de frases, com um único cálculo de similaridades.",
+    )
+    parser_sweep.add_argument("qa_file", help="Arquivo CSV com perguntas e respostas.")
+    parser_sweep.add_argument("embeddings_file", help="Arquivo com embeddings (JSON ou store binário .npy).")
+    parser_sweep.add_argument("-k", "--top_k", type=int, nargs="+", default=None,
+                              help="Valores de top-k (padrão: 3 5 10).")
+    parser_sweep.add_argument("--thresholds", type=float, nargs="+", default=None,
+                              help="Similaridades mínimas para uma frase ser coberta (padrão: 0.55 0.6 0.65 0.7 0.75).")
+    parser_sweep.add_argument("--min-coverage", type=float, nargs="+", default=None,
+                              help="Frações mínimas de frases cobertas (padrão: 0.5 0.7 0.9).")
+    parser_sweep.add_argument("-o", "--output", default="coverage_sweep.csv",
+                              help="Arquivo da tabela de cobertura, CSV ou .json (padrão: coverage_sweep.csv).")
+    parser_sweep.add_argument("--load-mode", choices=["auto", "mmap", "memory"], default=None,
+                              help="Carregamento da matriz de embeddings: mmap, memory ou auto (padrão).")
+    parser_sweep.add_argument("--concurrency", type=int,
+                              help="Máximo de requisições de embedding simultâneas (padrão depende do provedor).")
+    parser_sweep.add_argument("--provider", choices=["gemini", "openai", "local"], default=None,
+                              help="Provedor dos embeddings das perguntas; use o mesmo da geração dos embeddings (detectado automaticamente se omitido).")
 
     # --- Subparser para generate_report.py (Markdown) ---
     parser_report_md = subparsers.add_parser(
@@ -297,9 +471,30 @@ def main():
     # --- Subparser para style_checker.py ---
     parser_style = subparsers.add_parser("style_check", help="Verifica o estilo de um texto.")
     parser_style.add_argument("input_file", help="Arquivo de texto a ser analisado.")
-    parser_style.add_argument("embeddings_file", help="Arquivo JSON com embeddings do guia de estilo.")
+    parser_style.add_argument("embeddings_file", help="Arquivo com embeddings do guia de estilo (JSON ou store binário .npy).")
     parser_style.add_argument("threshold", type=float, default=0.8, help="Similaridade mínima (padrão: 0.8).")
     parser_style.add_argument("--api_key", help="Chave da API opcional.")
+    parser_style.add_argument("--load-mode", choices=["auto", "mmap", "memory"], default=None,
+                              help="Carregamento da matriz de embeddings: mmap, memory ou auto (padrão).")
+    parser_style.add_argument("--provider", choices=["gemini", "local"], default=None,
+                              help="Provedor dos embeddings das frases (padrão: gemini).")
+
+    # --- Subparser para embedding_cache.py ---
+    parser_cache = subparsers.add_parser("cache", help="Gerencia o cache local de embeddings.")
+    parser_cache.add_argument("action", choices=["stats", "prune", "clear"],
+                              help="stats (estatísticas), prune (remove entradas antigas além do limite) ou clear (esvazia o cache).")
+    parser_cache.add_argument("--max-mb", type=float, help="Tamanho máximo em MB para 'prune'.")
+
+    # --- Subparser para fake_embedding_server.py ---
+    parser_fake_server = subparsers.add_parser(
+        "fake_server",
+        help="Inicia um servidor local que imita as APIs de embeddings da OpenAI e da DeepInfra (para benchmarks).",
+    )
+    parser_fake_server.add_argument(
+        "server_args",
+        nargs=argparse.REMAINDER,
+        help="Opções repassadas ao servidor (ex: --port 8765 --latency-ms 80 --rpm 600 --error-rate 0.01).",
+    )
 
     # --- Subparser para o fluxo completo ---
     parser_full_flow = subparsers.add_parser("full_flow", help="Executa o fluxo completo de processamento e avaliação.")
@@ -313,6 +508,35 @@ def main():
     parser_full_flow.add_argument("--eval_results_file", default=DEFAULT_EVAL_RESULTS)
     parser_full_flow.add_argument("--md_report_file", default=DEFAULT_MD_REPORT)
     parser_full_flow.add_argument("--html_report_file", default=DEFAULT_HTML_REPORT)
+    parser_full_flow.add_argument("--concurrency", type=int,
+                                  help="Máximo de requisições de embedding simultâneas em generate_embeddings e evaluate.")
+    parser_full_flow.add_argument("--provider", choices=["gemini", "openai", "local"], default=None,
+                                  help="Provedor de embeddings para generate_embeddings e evaluate (detectado automaticamente se omitido).")
+    parser_full_flow.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Executa as etapas no próprio processo, passando os dados em memória entre elas (sem subprocessos).",
+    )
+    parser_full_flow.add_argument(
+        "--save-intermediate",
+        action="store_true",
+        help="Com --in-process, grava também os arquivos intermediários consumidos por etapas seguintes.",
+    )
+    parser_full_flow.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Executa ao mesmo tempo as etapas independentes (ex: clean_csv junto de merge/extract/generate_embeddings).",
+    )
+    parser_full_flow.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Pula etapas cujas entradas, parâmetros e saídas não mudaram desde a última execução e só gera embeddings de chunks novos ou alterados.",
+    )
+    parser_full_flow.add_argument(
+        "--manifest",
+        default=DEFAULT_MANIFEST,
+        help=f"Manifesto com os hashes da última execução, usado por --incremental (padrão: {DEFAULT_MANIFEST}).",
+    )
 
 
     # --- Subparser para fluxo customizado ---
@@ -385,9 +609,49 @@ def main():
         default=5,
         help="Valor de top_k a ser utilizado na avaliação e relatórios",
     )
+    parser_custom_flow.add_argument(
+        "--concurrency",
+        type=int,
+        help="Máximo de requisições de embedding simultâneas em generate_embeddings e evaluate.",
+    )
+    parser_custom_flow.add_argument(
+        "--provider",
+        choices=["gemini", "openai", "local"],
+        default=None,
+        help="Provedor de embeddings para generate_embeddings e evaluate (detectado automaticamente se omitido).",
+    )
+    parser_custom_flow.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Executa as etapas no próprio processo, passando os dados em memória entre elas (sem subprocessos).",
+    )
+    parser_custom_flow.add_argument(
+        "--save-intermediate",
+        action="store_true",
+        help="Com --in-process, grava também os arquivos intermediários consumidos por etapas seguintes.",
+    )
+    parser_custom_flow.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Executa ao mesmo tempo as etapas independentes (ex: clean_csv junto de merge/extract/generate_embeddings).",
+    )
+    parser_custom_flow.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Pula etapas cujas entradas, parâmetros e saídas não mudaram desde a última execução e só gera embeddings de chunks novos ou alterados.",
+    )
+    parser_custom_flow.add_argument(
+        "--manifest",
+        default=DEFAULT_MANIFEST,
+        help=f"Manifesto com os hashes da última execução, usado por --incremental (padrão: {DEFAULT_MANIFEST}).",
+    )
 
     args = parser.parse_args()
 
+    if args.profile or args.chrome_trace:
+        # Os subprocessos gravam seus spans no mesmo arquivo de eventos; o relatório sai ao final (atexit)
+        ProfileSession(args.profile, args.chrome_trace, command_name=args.command).start()
+
     # Carrega a configuração
     config = load_config()
 
@@ -418,9 +682,12 @@ def main():
         "generate_embeddings": "docs-tc-generate-embeddings",
         "clean_csv": "docs-tc-clean-csv",
         "evaluate": "docs-tc-evaluate-coverage",
+        "evaluate_sweep": "docs-tc-coverage-sweep",
         "report_md": "docs-tc-generate-report-md",
         "report_html": "docs-tc-generate-report-html",
-        "style_check": "docs-tc-style-checker"
+        "style_check": "docs-tc-style-checker",
+        "cache": "docs-tc-cache",
+        "fake_server": "docs-tc-fake-embedding-server",
     }
 
     if args.command == "merge":
@@ -438,11 +705,27 @@ def main():
             command_args.extend(["--deepinfra-api-key", args.deepinfra_api_key])
         if hasattr(args, "openai_api_key") and args.openai_api_key:
             command_args.extend(["--openai-api-key", args.openai_api_key])
+        if args.format:
+            command_args.extend(["--format", args.format])
+        if args.batch_max_items:
+            command_args.extend(["--batch-max-items", str(args.batch_max_items)])
+        if args.batch_max_chars:
+            command_args.extend(["--batch-max-chars", str(args.batch_max_chars)])
+        if args.concurrency:
+            command_args.extend(["--concurrency", str(args.concurrency)])
+        if args.resume:
+            command_args.append("--resume")
+        if args.incremental:
+            command_args.append("--incremental")
+        if args.ann:
+            command_args.append("--ann")
+        if args.doc_index:
+            command_args.append("--doc-index")
         run_script(command_args, verbose=args.verbose)
     elif args.command == "clean_csv":
         run_script([SCRIPT_MAP["clean_csv"], args.input_file, args.output_file], verbose=args.verbose)
     elif args.command == "evaluate":
-        run_script([
+        command_args = [
             SCRIPT_MAP["evaluate"],
             args.qa_file,
             args.embeddings_file,
@@ -450,7 +733,34 @@ def main():
             str(args.top_k),
             "-o",
             args.output,
-        ], verbose=args.verbose)
+        ]
+        if args.load_mode:
+            command_args.extend(["--load-mode", args.load_mode])
+        if args.concurrency:
+            command_args.extend(["--concurrency", str(args.concurrency)])
+        if args.provider:
+            command_args.extend(["--provider", args.provider])
+        if args.resume:
+            command_args.append("--resume")
+        if args.ann:
+            command_args.append("--ann")
+        if args.nprobe:
+            command_args.extend(["--nprobe", str(args.nprobe)])
+        if args.doc_shortlist:
+            command_args.extend(["--doc-shortlist", str(args.doc_shortlist)])
+        run_script(command_args, verbose=args.verbose)
+    elif args.command == "evaluate_sweep":
+        command_args = [SCRIPT_MAP["evaluate_sweep"], args.qa_file, args.embeddings_file, "-o", args.output]
+        for option, values in (("--top-k", args.top_k), ("--thresholds", args.thresholds), ("--min-coverage", args.min_coverage)):
+            if values:
+                command_args.extend([option, *map(str, values)])
+        if args.load_mode:
+            command_args.extend(["--load-mode", args.load_mode])
+        if args.concurrency:
+            command_args.extend(["--concurrency", str(args.concurrency)])
+        if args.provider:
+            command_args.extend(["--provider", args.provider])
+        run_script(command_args, verbose=args.verbose)
     elif args.command == "report_md":
         run_script([
             SCRIPT_MAP["report_md"],
@@ -474,20 +784,46 @@ def main():
         ]
         if args.api_key:
             command_args.extend(["--api_key", args.api_key])
+        if args.load_mode:
+            command_args.extend(["--load-mode", args.load_mode])
+        if args.provider:
+            command_args.extend(["--provider", args.provider])
         run_script(command_args, verbose=args.verbose)
+    elif args.command == "cache":
+        command_args = [SCRIPT_MAP["cache"], args.action]
+        if args.max_mb is not None:
+            command_args.extend(["--max-mb", str(args.max_mb)])
+        run_script(command_args, verbose=True)
+    elif args.command == "fake_server":
+        # O servidor roda até Ctrl+C: sua saída é exibida diretamente, sem captura
+        command = [SCRIPT_MAP["fake_server"], *args.server_args]
+        print(f"🚀 Executando: {' '.join(command)}")
+        try:
+            sys.exit(subprocess.call(command))
+        except KeyboardInterrupt:
+            pass
+        except FileNotFoundError:
+            print(f"🚨 Erro: Comando '{command[0]}' não encontrado. Verifique se o docs-cli está instalado corretamente.", file=sys.stderr)
+            sys.exit(1)
+    elif args.command == "full_flow" and args.in_process:
+        from pipeline import FULL_FLOW_STEPS
+
+        print("🚀 Iniciando fluxo completo (em processo)...")
+        run_flow_in_process(args, FULL_FLOW_STEPS, api_key, "fluxo completo")
+        print("🎉 Fluxo completo concluído!")
     elif args.command == "full_flow":
         print("🚀 Iniciando fluxo completo...")
-        def run_step_or_exit(step_command_args):
-            if run_script(step_command_args, verbose=args.verbose) is None:
-                print(f"❌ Etapa {step_command_args[0]} falhou. Abortando fluxo completo.")
-                sys.exit(1)
-
-        run_step_or_exit([SCRIPT_MAP["merge"], args.doc_input_dir, args.corpus_file])
-        run_step_or_exit([SCRIPT_MAP["clean_csv"], args.qa_input_file, args.cleaned_qa_file])
-        run_step_or_exit([SCRIPT_MAP["extract"], args.corpus_file, args.raw_docs_file])
+        provider_env = args.provider or ("openai" if os.getenv("OPENAI_API_KEY") else "gemini")
+        concurrency_args = ["--concurrency", str(args.concurrency)] if args.concurrency else []
+        provider_args = ["--provider", args.provider] if args.provider else []
+
+        step_commands = [
+            ("merge", [SCRIPT_MAP["merge"], args.doc_input_dir, args.corpus_file]),
+            ("clean_csv", [SCRIPT_MAP["clean_csv"], args.qa_input_file, args.cleaned_qa_file]),
+            ("extract", [SCRIPT_MAP["extract"], args.corpus_file, args.raw_docs_file]),
+        ]
         
         # Adiciona a chave da API ao comando generate_embeddings se fornecida
-        provider_env = "openai" if os.getenv("OPENAI_API_KEY") else "gemini"
         generate_embeddings_args = [
             SCRIPT_MAP["generate_embeddings"],
             args.raw_docs_file,
@@ -497,29 +833,36 @@ def main():
         ]
         if provider_env == "gemini" and api_key:
             generate_embeddings_args.extend(["--gemini-api-key", api_key])
-        run_step_or_exit(generate_embeddings_args)
+        if args.incremental:
+            generate_embeddings_args.append("--incremental")
+        step_commands.append(("generate_embeddings", generate_embeddings_args + concurrency_args))
         
-        run_step_or_exit([
+        step_commands.append(("evaluate", [
             SCRIPT_MAP["evaluate"],
             args.cleaned_qa_file,
             args.embeddings_file,
             "-k", str(args.eval_top_k),
             "-o", args.eval_results_file
-        ])
-        run_step_or_exit([
+        ] + concurrency_args + provider_args))
+        step_commands.append(("report_md", [
             SCRIPT_MAP["report_md"],
             args.eval_results_file,
             args.md_report_file,
             str(args.eval_top_k)
-        ])
-        run_step_or_exit([
+        ]))
+        step_commands.append(("report_html", [
             SCRIPT_MAP["report_html"],
             args.eval_results_file,
             args.html_report_file,
             str(args.eval_top_k)
-        ])
+        ]))
+        run_flow_steps(args, step_commands, provider_env, "fluxo completo")
         print("🎉 Fluxo completo concluído!")
 
+    elif args.command == "custom_flow" and args.in_process:
+        print(f"▶️ Iniciando fluxo customizado (em processo): {' -> '.join(args.steps)}")
+        run_flow_in_process(args, args.steps, api_key, "fluxo customizado")
+        print("⏹️ Fluxo customizado concluído.")
     elif args.command == "custom_flow":
         print(f"▶️ Iniciando fluxo customizado: {' -> '.join(args.steps)}")
         current_corpus_file = args.corpus_file
@@ -527,28 +870,28 @@ def main():
         current_embeddings_file = args.embeddings_file
         current_cleaned_qa_file = args.cleaned_qa_file
         current_eval_results_file = args.eval_results_file
+        concurrency_args = ["--concurrency", str(args.concurrency)] if args.concurrency else []
+        provider_args = ["--provider", args.provider] if args.provider else []
+        provider_env = args.provider or ("openai" if os.getenv("OPENAI_API_KEY") else "gemini")
+        step_commands = []
 
-        def run_custom_step_or_exit(step_command_args):
-            if run_script(step_command_args, verbose=args.verbose) is None:
-                print(f"❌ Etapa {step_command_args[0]} falhou. Abortando fluxo customizado.")
-                sys.exit(1)
+        def add_step(step_command_args):
+            step_commands.append((step, step_command_args))
 
         for step in args.steps:
-            print(f"\n--- Executando etapa: {step} ---")
             if step == "merge":
-                run_custom_step_or_exit([
+                add_step([
                     SCRIPT_MAP["merge"],
                     args.doc_input_dir,
                     current_corpus_file,
                 ])
             elif step == "extract":
-                run_custom_step_or_exit([
+                add_step([
                     SCRIPT_MAP["extract"],
                     current_corpus_file,
                     current_raw_docs_file,
                 ])
             elif step == "generate_embeddings":
-                provider_env = "openai" if os.getenv("OPENAI_API_KEY") else "gemini"
                 command_args = [
                     SCRIPT_MAP["generate_embeddings"],
                     current_raw_docs_file,
@@ -562,16 +905,18 @@ def main():
                     command_args.extend(["--deepinfra-api-key", args.deepinfra_api_key])
                 if hasattr(args, "openai_api_key") and args.openai_api_key:
                     command_args.extend(["--openai-api-key", args.openai_api_key])
-                run_custom_step_or_exit(command_args)
+                if args.incremental:
+                    command_args.append("--incremental")
+                add_step(command_args + concurrency_args)
             elif step == "clean_csv":
-                run_custom_step_or_exit([
+                add_step([
                     SCRIPT_MAP["clean_csv"],
                     args.qa_input_file,
                     "--output_file",
                     current_cleaned_qa_file,
                 ])
             elif step == "evaluate":
-                run_custom_step_or_exit([
+                add_step([
                     SCRIPT_MAP["evaluate"],
                     current_cleaned_qa_file,
                     current_embeddings_file,
@@ -579,21 +924,22 @@ def main():
                     str(args.eval_top_k),
                     "-o",
                     current_eval_results_file,
-                ])
+                ] + concurrency_args + provider_args)
             elif step == "report_md":
-                run_custom_step_or_exit([
+                add_step([
                     SCRIPT_MAP["report_md"],
                     current_eval_results_file,
                     args.md_report_file,
                     str(args.eval_top_k),
                 ])
             elif step == "report_html":
-                run_custom_step_or_exit([
+                add_step([
                     SCRIPT_MAP["report_html"],
                     current_eval_results_file,
                     args.html_report_file,
                     str(args.eval_top_k),
                 ])
+        run_flow_steps(args, step_commands, provider_env, "fluxo customizado", announce_steps=True)
         print("⏹️ Fluxo customizado concluído.")
 
 if __name__ == "__main__":
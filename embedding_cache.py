@@ -0,0 +1,388 @@
+"""Cache persistente (SQLite) de embeddings endereçado por conteúdo, compartilhado por todos os comandos."""
+
+import argparse
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Local padrão do cache (pode ser alterado com DOCS_CLI_CACHE_PATH)
+DEFAULT_CACHE_PATH = Path.home() / ".docs-cli" / "embedding_cache.sqlite"
+
+# Tamanho máximo padrão dos vetores armazenados (DOCS_CLI_CACHE_MAX_MB)
+DEFAULT_MAX_MB = 2048
+
+# A cada quantas inserções o limite de tamanho é verificado
+_PRUNE_CHECK_INTERVAL = 500
+
+# A cada quantas leituras pendentes o ``last_used`` e os contadores são gravados
+_TOUCH_FLUSH_INTERVAL = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (provider, model, text_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def text_hash(text: str) -> str:
+    """Hash SHA-256 do texto (já limpo) usado como chave do cache."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _encode_vector(embedding: Sequence[float]) -> bytes:
+    return array("d", embedding).tobytes()
+
+
+def _decode_vector(blob: bytes) -> List[float]:
+    values = array("d")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """
+    Cache de embeddings em SQLite com chave (provedor, modelo, hash do texto).
+
+    Mantém contadores de acertos/faltas (da execução atual e acumulados no
+    arquivo) e remove as entradas usadas há mais tempo (LRU) quando o total
+    armazenado ultrapassa ``max_bytes``. Seguro para uso entre threads; o
+    modo WAL permite vários processos usando o mesmo arquivo. As leituras
+    não escrevem no banco: ``last_used`` e os contadores ficam pendentes e
+    são gravados junto com a próxima inserção, em ``prune``/``stats`` ou
+    no ``close``.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = str(path or os.getenv("DOCS_CLI_CACHE_PATH") or DEFAULT_CACHE_PATH)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("DOCS_CLI_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts_since_check = 0
+        self._pending_touches: Dict[tuple, float] = {}
+        self._pending_hits = 0
+        self._pending_misses = 0
+        self._lock = threading.Lock()
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def get_many(self, provider: str, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Busca os embeddings de ``texts``; ``None`` para os que não estão no cache."""
+        if not texts:
+            return []
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+            for start in range(0, len(unique_hashes), 500):
+                block = unique_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(block))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE provider = ? AND model = ? AND text_hash IN ({placeholders})",
+                    [provider, model, *block],
+                ).fetchall()
+                for row_hash, blob in rows:
+                    found[row_hash] = _decode_vector(blob)
+
+            hits = sum(1 for h in hashes if h in found)
+            misses = len(hashes) - hits
+            self.hits += hits
+            self.misses += misses
+            self._pending_hits += hits
+            self._pending_misses += misses
+            now = time.time()
+            for h in found:
+                self._pending_touches[(provider, model, h)] = now
+            if len(self._pending_touches) >= _TOUCH_FLUSH_INTERVAL:
+                self._flush_locked()
+                self._conn.commit()
+        return [found.get(h) for h in hashes]
+
+    def _flush_locked(self) -> None:
+        """Grava o ``last_used`` e os contadores pendentes (sem commit; requer ``self._lock``)."""
+        if self._pending_touches:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE provider = ? AND model = ? AND text_hash = ?",
+                [(now, *key) for key, now in self._pending_touches.items()],
+            )
+        if self._pending_hits or self._pending_misses:
+            self._conn.executemany(
+                "INSERT INTO counters (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                [("hits", self._pending_hits), ("misses", self._pending_misses)],
+            )
+        self._pending_touches = {}
+        self._pending_hits = 0
+        self._pending_misses = 0
+
+    def flush(self) -> None:
+        """Grava no banco o ``last_used`` e os contadores acumulados pelas leituras."""
+        with self._lock:
+            if self._pending_touches or self._pending_hits or self._pending_misses:
+                self._flush_locked()
+                self._conn.commit()
+
+    def get(self, provider: str, model: str, text: str) -> Optional[List[float]]:
+        """Busca o embedding de um único texto."""
+        return self.get_many(provider, model, [text])[0]
+
+    def put_many(
+        self,
+        provider: str,
+        model: str,
+        texts: Sequence[str],
+        embeddings: Sequence[Optional[Sequence[float]]],
+    ) -> None:
+        """Armazena os embeddings válidos (ignora ``None``)."""
+        now = time.time()
+        rows = [
+            (provider, model, text_hash(text), _encode_vector(embedding), now, now)
+            for text, embedding in zip(texts, embeddings)
+            if embedding is not None
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (provider, model, text_hash, vector, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._flush_locked()
+            self._conn.commit()
+            self._puts_since_check += len(rows)
+            check_size = self._puts_since_check >= _PRUNE_CHECK_INTERVAL
+        if check_size:
+            self.prune()
+
+    def put(self, provider: str, model: str, text: str, embedding: Optional[Sequence[float]]) -> None:
+        """Armazena o embedding de um único texto."""
+        self.put_many(provider, model, [text], [embedding])
+
+    def size_bytes(self) -> int:
+        """Total de bytes dos vetores armazenados."""
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+        return int(row[0])
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """Remove as entradas menos usadas recentemente até caber em ``max_bytes``. Retorna quantas saíram."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        removed = 0
+        with self._lock:
+            self._puts_since_check = 0
+            # A ordem LRU depende dos ``last_used`` ainda pendentes
+            self._flush_locked()
+            self._conn.commit()
+            total = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+            if total <= limit:
+                return 0
+            excess = total - limit
+            cursor = self._conn.execute(
+                "SELECT provider, model, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_used ASC"
+            )
+            to_delete = []
+            for provider, model, row_hash, length in cursor:
+                if excess <= 0:
+                    break
+                to_delete.append((provider, model, row_hash))
+                excess -= length
+            cursor.close()
+            self._conn.executemany(
+                "DELETE FROM embeddings WHERE provider = ? AND model = ? AND text_hash = ?", to_delete
+            )
+            self._conn.commit()
+            removed = len(to_delete)
+        return removed
+
+    def clear(self) -> int:
+        """Remove todas as entradas e zera os contadores. Retorna quantas entradas saíram."""
+        with self._lock:
+            self._pending_touches = {}
+            self._pending_hits = 0
+            self._pending_misses = 0
+            removed = self._conn.execute("DELETE FROM embeddings").rowcount
+            self._conn.execute("DELETE FROM counters")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        self.hits = 0
+        self.misses = 0
+        return removed
+
+    def stats(self) -> Dict[str, object]:
+        """Estatísticas do cache: entradas por provedor/modelo, tamanho e contadores."""
+        self.flush()
+        with self._lock:
+            by_model = self._conn.execute(
+                "SELECT provider, model, COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) "
+                "FROM embeddings GROUP BY provider, model ORDER BY provider, model"
+            ).fetchall()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            "path": self.path,
+            "entries": sum(row[2] for row in by_model),
+            "size_bytes": sum(row[3] for row in by_model),
+            "max_bytes": self.max_bytes,
+            "by_model": [
+                {"provider": p, "model": m, "entries": n, "size_bytes": b} for p, m, n, b in by_model
+            ],
+            "total_hits": counters.get("hits", 0),
+            "total_misses": counters.get("misses", 0),
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+        }
+
+    def close(self) -> None:
+        """Grava as leituras pendentes e fecha a conexão com o banco."""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_cache_lock = threading.Lock()
+# Fica True quando o cache não pôde ser aberto, para não tentar (e avisar) de novo a cada lote
+_default_cache_disabled = False
+# Fica True depois do primeiro aviso de erro do SQLite durante o uso do cache
+_cache_error_reported = False
+
+
+def cache_enabled() -> bool:
+    """O cache é desativado com DOCS_CLI_CACHE=0 (ou off/false/no)."""
+    return os.getenv("DOCS_CLI_CACHE", "1").strip().lower() not in ("0", "off", "false", "no")
+
+
+def get_default_cache() -> Optional[EmbeddingCache]:
+    """Retorna o cache compartilhado do processo, ou ``None`` se estiver desativado ou indisponível."""
+    global _default_cache, _default_cache_disabled
+    if not cache_enabled() or _default_cache_disabled:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None and not _default_cache_disabled:
+            try:
+                _default_cache = EmbeddingCache()
+            except (sqlite3.Error, OSError) as e:
+                _default_cache_disabled = True
+                print(f"Aviso: cache de embeddings indisponível ({e}). Continuando sem cache.")
+                return None
+            atexit.register(_close_cache, _default_cache)
+        return _default_cache
+
+
+def _close_cache(cache: EmbeddingCache) -> None:
+    """Fecha o cache na saída do processo, gravando as leituras pendentes."""
+    try:
+        cache.close()
+    except sqlite3.Error as e:
+        _report_cache_error(e)
+
+
+def _report_cache_error(error: sqlite3.Error) -> None:
+    """Avisa (uma única vez por processo) que o cache falhou e foi ignorado."""
+    global _cache_error_reported
+    if not _cache_error_reported:
+        _cache_error_reported = True
+        print(f"Aviso: erro no cache de embeddings ({error}). Continuando sem cache.")
+
+
+def cached_embeddings(
+    provider: str,
+    model: str,
+    texts: Sequence[str],
+    embed_missing: Callable[[List[str]], Sequence[Optional[Sequence[float]]]],
+    cache: Optional[EmbeddingCache] = None,
+) -> List[Optional[List[float]]]:
+    """
+    Retorna os embeddings de ``texts`` consultando o cache primeiro.
+
+    Apenas os textos ausentes (sem repetição) são enviados para
+    ``embed_missing``, que deve devolver um embedding (ou ``None``) por
+    texto, na mesma ordem. Os resultados válidos são gravados no cache.
+    Erros do SQLite (banco travado, disco cheio) não interrompem a
+    execução: o cache é ignorado e os embeddings são gerados normalmente.
+    """
+    cache = cache or get_default_cache()
+    if cache is None:
+        return list(embed_missing(list(texts)))
+
+    try:
+        results = cache.get_many(provider, model, texts)
+    except sqlite3.Error as e:
+        _report_cache_error(e)
+        return list(embed_missing(list(texts)))
+    missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+    if not missing:
+        return results
+
+    new_embeddings = list(embed_missing(missing))
+    try:
+        cache.put_many(provider, model, missing, new_embeddings)
+    except sqlite3.Error as e:
+        _report_cache_error(e)
+    by_text = dict(zip(missing, new_embeddings))
+    return [result if result is not None else by_text.get(text) for text, result in zip(texts, results)]
+
+
+def cache_summary() -> Optional[str]:
+    """Resumo dos acertos/faltas do cache nesta execução (``None`` se o cache não foi usado)."""
+    cache = _default_cache
+    if cache is None or (cache.hits + cache.misses) == 0:
+        return None
+    return f"Cache de embeddings: {cache.hits} acertos, {cache.misses} faltas ({cache.path})"
+
+
+def cli_main():
+    """Interface de linha de comando para inspecionar e manter o cache de embeddings."""
+    parser = argparse.ArgumentParser(description="Gerencia o cache local de embeddings.")
+    parser.add_argument("action", choices=["stats", "prune", "clear"], help="Ação: stats, prune ou clear.")
+    parser.add_argument("--max-mb", type=float, help="Tamanho máximo (MB) ao usar 'prune' (padrão: limite configurado).")
+    parser.add_argument("--path", help=f"Arquivo do cache (padrão: DOCS_CLI_CACHE_PATH ou {DEFAULT_CACHE_PATH}).")
+    args = parser.parse_args()
+
+    cache = EmbeddingCache(path=args.path)
+    if args.action == "stats":
+        stats = cache.stats()
+        total_lookups = stats["total_hits"] + stats["total_misses"]
+        hit_rate = (stats["total_hits"] / total_lookups * 100) if total_lookups else 0.0
+        print(f"Cache: {stats['path']}")
+        print(f"Entradas: {stats['entries']:,}")
+        print(f"Tamanho: {stats['size_bytes'] / (1024 * 1024):.1f} MB de {stats['max_bytes'] / (1024 * 1024):.0f} MB")
+        print(f"Acertos: {stats['total_hits']:,} | Faltas: {stats['total_misses']:,} | Taxa de acerto: {hit_rate:.1f}%")
+        for item in stats["by_model"]:
+            print(f"  - {item['provider']} / {item['model']}: {item['entries']:,} entradas ({item['size_bytes'] / (1024 * 1024):.1f} MB)")
+    elif args.action == "prune":
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+        removed = cache.prune(max_bytes)
+        print(f"{removed} entradas removidas do cache.")
+    else:
+        removed = cache.clear()
+        print(f"Cache limpo ({removed} entradas removidas).")
+    cache.close()
+
+
+if __name__ == "__main__":
+    cli_main()
@@ -0,0 +1,97 @@
+"""Checkpoint append-only dos embeddings já gerados, para retomar uma geração interrompida."""
+
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+# Sufixo do arquivo de checkpoint, ao lado do arquivo de saída
+CHECKPOINT_SUFFIX = ".partial.jsonl"
+
+
+def checkpoint_path(output_path: str) -> str:
+    """Caminho do checkpoint associado ao arquivo de saída ``output_path``."""
+    return output_path + CHECKPOINT_SUFFIX
+
+
+def checkpoint_key(namespace: str, text: str) -> str:
+    """Chave de um texto no checkpoint: hash do ``namespace`` (provedor/modelo) e do texto."""
+    return hashlib.sha256(f"{namespace}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCheckpoint:
+    """
+    Arquivo JSONL append-only com um registro ``{"key", "embedding"}`` por texto.
+
+    Os lotes são gravados (e sincronizados com o disco) à medida que
+    terminam, de modo que uma interrupção perde no máximo os lotes em
+    andamento. Em memória fica apenas o deslocamento de cada registro no
+    arquivo; os vetores são relidos sob demanda com ``get``. Uma linha
+    final incompleta (processo interrompido durante a escrita) é ignorada.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self._offsets: Dict[str, int] = {}
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        self._file = open(path, "a+b")
+        self._load_offsets()
+
+    def _load_offsets(self) -> None:
+        self._file.seek(0)
+        offset = 0
+        valid_end = 0
+        for line in self._file:
+            line_offset = offset
+            offset += len(line)
+            if not line.endswith(b"\n"):
+                break
+            try:
+                key = json.loads(line)["key"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            self._offsets[key] = line_offset
+            valid_end = offset
+        if valid_end < offset:
+            # Remove a linha truncada para que os próximos registros comecem em uma linha nova
+            self._file.truncate(valid_end)
+        self._file.seek(0, os.SEEK_END)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._offsets
+
+    def append_many(self, keys: Sequence[str], embeddings: Sequence[Optional[List[float]]]) -> int:
+        """Grava os embeddings válidos de um lote e força a escrita em disco. Retorna quantos foram gravados."""
+        self._file.seek(0, os.SEEK_END)
+        written = 0
+        for key, embedding in zip(keys, embeddings):
+            if embedding is None or len(embedding) == 0:
+                continue
+            self._offsets[key] = self._file.tell()
+            record = {"key": key, "embedding": [float(value) for value in embedding]}
+            self._file.write((json.dumps(record) + "\n").encode("utf-8"))
+            written += 1
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return written
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Relê do arquivo o embedding gravado para ``key`` (``None`` se não houver)."""
+        offset = self._offsets.get(key)
+        if offset is None:
+            return None
+        self._file.seek(offset)
+        return json.loads(self._file.readline())["embedding"]
+
+    def close(self) -> None:
+        self._file.close()
+
+    def discard(self) -> None:
+        """Fecha e remove o checkpoint (após a saída final ser gravada)."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,389 @@
+"""Provedores de embeddings (Gemini, OpenAI, DeepInfra e local/offline) com um cliente HTTP persistente por processo."""
+
+import os
+import re
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+from async_embedding import get_concurrency
+from batching import get_batch_limits, plan_batches
+from embedding_cache import cached_embeddings
+from lazy_imports import LazyModule
+from profiling import count_api_call
+from rate_limiter import RateLimiter, estimate_tokens, get_rate_limiter
+
+# SDKs importados só quando o provedor correspondente cria seu cliente; o NumPy, só
+# quando o provedor local gera vetores (o docs-cli importa este módulo para o manifesto)
+genai = LazyModule("google.generativeai")
+openai = LazyModule("openai")
+requests = LazyModule("requests")
+np = LazyModule("numpy")
+
+# Modelos padrão de cada provedor
+GEMINI_EMBEDDING_MODEL = "models/embedding-001"
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+DEEPINFRA_EMBEDDING_MODEL = "intfloat/multilingual-e5-large"
+LOCAL_EMBEDDING_MODEL = "hashed-ngrams-v1"
+
+# Dimensão padrão dos vetores do provedor local (DOCS_CLI_LOCAL_DIMENSION)
+LOCAL_EMBEDDING_DIMENSION = 512
+
+# Dimensão dos vetores dos modelos conhecidos (None para modelos não listados)
+MODEL_DIMENSIONS: Dict[str, int] = {
+    GEMINI_EMBEDDING_MODEL: 768,
+    "models/text-embedding-004": 768,
+    OPENAI_EMBEDDING_MODEL: 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    DEEPINFRA_EMBEDDING_MODEL: 1024,
+}
+
+# Tentativas por requisição (com espera exponencial entre elas)
+REQUEST_RETRIES = 3
+
+
+class EmbeddingProvider(ABC):
+    """
+    Interface comum dos provedores de embeddings.
+
+    Cada instância mantém um único cliente (ou sessão HTTP) reutilizado por
+    todas as requisições, de modo que conexões e handshakes TLS não se
+    repetem a cada lote. ``embed`` é o caminho usado pelos comandos: consulta
+    o cache, divide os textos ausentes em lotes dentro de ``max_batch_items``
+    e ``max_batch_chars`` e envia cada lote com ``embed_batch``, que aplica
+    rate limiting e retry. As subclasses implementam apenas ``_request``.
+    """
+
+    name = ""
+    label = ""
+    default_model = ""
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+        self.api_key = api_key
+        self.model = model or self.default_model
+        limits = get_batch_limits(self.name)
+        self.max_batch_items: int = limits["max_items"]
+        self.max_batch_chars: int = limits["max_chars"]
+        self.dimension: Optional[int] = MODEL_DIMENSIONS.get(self.model)
+        self.rate_limiter: RateLimiter = get_rate_limiter(self.name)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def embed(self, texts: Sequence[str]) -> List[Optional[list]]:
+        """Embeddings de ``texts`` (um por texto, ``None`` em caso de falha), consultando o cache."""
+        return cached_embeddings(self.name, self.model, list(texts), self._embed_uncached)
+
+    def _embed_uncached(self, texts: List[str]) -> List[Optional[list]]:
+        embeddings: List[Optional[list]] = [None] * len(texts)
+        for batch in plan_batches(texts, max_chars=self.max_batch_chars, max_items=self.max_batch_items):
+            batch_embeddings = self.embed_batch([texts[index] for index in batch])
+            for index, embedding in zip(batch, batch_embeddings):
+                embeddings[index] = embedding
+        return embeddings
+
+    def embed_batch(self, texts: Sequence[str]) -> List[Optional[list]]:
+        """
+        Uma requisição (sem cache) com retry; ``None`` para todos os textos em
+        caso de falha. Um SDK ausente não é uma falha da requisição: o
+        ``ImportError`` é levantado sem novas tentativas.
+        """
+        texts = list(texts)
+        self._ensure_client()
+        request_bytes = sum(len(text.encode("utf-8")) for text in texts)
+        for attempt in range(REQUEST_RETRIES):
+            self.rate_limiter.acquire(estimate_tokens(texts))
+            try:
+                embeddings = self._request(texts)
+                count_api_call(request_bytes)
+                return embeddings
+            except Exception as e:
+                count_api_call(request_bytes, failed=True)
+                print(f"Erro ao gerar embeddings com {self.label} (tentativa {attempt+1}/{REQUEST_RETRIES}): {e}")
+                if attempt < REQUEST_RETRIES - 1:
+                    time.sleep(2 ** attempt)
+        return [None] * len(texts)
+
+    @property
+    def client(self):
+        """Cliente do provedor, criado na primeira requisição e reutilizado depois."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def _ensure_client(self):
+        """Cria o cliente fora do retry (um SDK ausente falha aqui, não como erro de requisição)."""
+        return self.client
+
+    def _create_client(self):
+        return None
+
+    @abstractmethod
+    def _request(self, texts: List[str]) -> List[list]:
+        """Envia um lote ao provedor e devolve um embedding por texto (levanta exceção em caso de falha)."""
+
+
+_gemini_configured_key = None
+_gemini_lock = threading.Lock()
+
+
+class GeminiProvider(EmbeddingProvider):
+    """Gemini via ``google.generativeai`` (endpoint de lote ``batchEmbedContents``)."""
+
+    name = "gemini"
+    label = "Gemini"
+    default_model = GEMINI_EMBEDDING_MODEL
+
+    def _create_client(self):
+        # O SDK guarda a configuração globalmente; só reconfigura quando a chave muda
+        global _gemini_configured_key
+        with _gemini_lock:
+            if self.api_key != _gemini_configured_key:
+                genai.configure(api_key=self.api_key)
+                _gemini_configured_key = self.api_key
+        return genai
+
+    def _request(self, texts: List[str]) -> List[list]:
+        response = self.client.embed_content(model=self.model, content=texts)  # type: ignore
+        return response["embedding"]
+
+
+class OpenAIProvider(EmbeddingProvider):
+    """OpenAI via um único ``openai.OpenAI`` (pool de conexões do httpx)."""
+
+    name = "openai"
+    label = "OpenAI"
+    default_model = OPENAI_EMBEDDING_MODEL
+
+    def _create_client(self):
+        try:
+            client_class = openai.OpenAI
+        except ImportError:
+            raise ImportError("openai package is required for OpenAI embeddings") from None
+        # Retries ficam a cargo de embed_batch (e do rate limiter), não do SDK.
+        # DOCS_CLI_OPENAI_BASE_URL aponta para outro endpoint compatível
+        # (por exemplo, fake_embedding_server.py).
+        return client_class(
+            api_key=self.api_key,
+            base_url=os.getenv("DOCS_CLI_OPENAI_BASE_URL") or None,
+            max_retries=0,
+        )
+
+    def _request(self, texts: List[str]) -> List[list]:
+        response = self.client.embeddings.create(input=texts, model=self.model)
+        return [item.embedding for item in response.data]
+
+
+class DeepInfraProvider(EmbeddingProvider):
+    """DeepInfra/Maritaca via uma ``requests.Session`` com pool de conexões."""
+
+    name = "deepinfra"
+    label = "DeepInfra"
+    default_model = DEEPINFRA_EMBEDDING_MODEL
+    base_url = "https://api.deepinfra.com/v1/inference"
+
+    def _create_client(self):
+        try:
+            session = requests.Session()
+        except ImportError:
+            raise ImportError("requests package is required for DeepInfra embeddings") from None
+        pool_size = max(get_concurrency(self.name), 1)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Authorization": f"bearer {self.api_key}"})
+        return session
+
+    def _request(self, texts: List[str]) -> List[list]:
+        # DOCS_CLI_DEEPINFRA_BASE_URL aponta para outro endpoint compatível
+        base_url = (os.getenv("DOCS_CLI_DEEPINFRA_BASE_URL") or self.base_url).rstrip("/")
+        response = self.client.post(f"{base_url}/{self.model}", json={"inputs": texts})
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code} {response.text}")
+        return response.json()["embeddings"]
+
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class LocalProvider(EmbeddingProvider):
+    """
+    Provedor offline: projeção de n-gramas por hashing (feature hashing).
+
+    Cada texto vira um vetor de dimensão fixa somando, em posições dadas por
+    hashes (CRC32) com sinal, os pesos de suas palavras, dos trigramas de
+    caracteres das palavras e dos bigramas de palavras. As somas são
+    amortecidas com ``log1p`` (como o tf sublinear do TF-IDF) e o vetor é
+    normalizado pela norma L2. Não usa IDF, de modo que o vetor de um texto
+    não depende do corpus nem do lote, e não precisa de rede nem de download
+    de modelo: serve para testes, CI e execuções rápidas. A similaridade
+    capturada é lexical, não semântica.
+    """
+
+    name = "local"
+    label = "Local"
+    default_model = LOCAL_EMBEDDING_MODEL
+
+    # Pesos relativos de cada tipo de n-grama
+    WORD_WEIGHT = 1.0
+    BIGRAM_WEIGHT = 0.7
+    CHAR_WEIGHT = 0.3
+
+    # Máximo de palavras memorizadas (o vocabulário é descartado ao atingir o limite)
+    VOCABULARY_CACHE_SIZE = 200_000
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, dimension: Optional[int] = None):
+        super().__init__(api_key=api_key, model=model)
+        self.dimension = int(dimension or os.getenv("DOCS_CLI_LOCAL_DIMENSION") or LOCAL_EMBEDDING_DIMENSION)
+        # A dimensão faz parte do nome do modelo para não misturar vetores no cache
+        self.model = f"{self.model}-{self.dimension}"
+        self._lock = threading.Lock()
+        self._reset_vocabulary()
+
+    def _reset_vocabulary(self) -> None:
+        self._word_ids: Dict[str, int] = {}
+        self._word_hashes: List[int] = []
+        self._word_columns: List[np.ndarray] = []
+        self._word_weights: List[np.ndarray] = []
+
+    def embed(self, texts: Sequence[str]) -> List[Optional[list]]:
+        """Embeddings de ``texts``; calculados direto, sem cache (é mais barato que consultá-lo)."""
+        return self.embed_batch(texts)
+
+    def embed_batch(self, texts: Sequence[str]) -> List[Optional[list]]:
+        return self._request(list(texts))
+
+    def _request(self, texts: List[str]) -> List[list]:
+        return self.embed_matrix(texts).tolist()
+
+    def embed_matrix(self, texts: Sequence[str]) -> "np.ndarray":
+        """Matriz float32 (uma linha normalizada por texto) com os embeddings de ``texts``."""
+        with self._lock:
+            return self._embed_matrix(texts)
+
+    def _embed_matrix(self, texts: Sequence[str]) -> "np.ndarray":
+        dimension = self.dimension
+        token_lists = [_WORD_RE.findall(text.lower()) if isinstance(text, str) else [] for text in texts]
+        if len(self._word_ids) > self.VOCABULARY_CACHE_SIZE:
+            self._reset_vocabulary()
+        word_ids = self._word_ids
+        ids: List[int] = []
+        for tokens in token_lists:
+            for word in tokens:
+                word_id = word_ids.get(word)
+                if word_id is None:
+                    word_id = self._add_word(word)
+                ids.append(word_id)
+
+        lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+        matrix = np.zeros(len(token_lists) * dimension, dtype=np.float64)
+        if ids:
+            token_ids = np.asarray(ids, dtype=np.int64)
+            token_rows = np.repeat(np.arange(len(token_lists), dtype=np.int64), lengths)
+
+            # Expande cada ocorrência nos n-gramas (palavra + trigramas) da sua palavra
+            unique_ids, inverse = np.unique(token_ids, return_inverse=True)
+            columns = [self._word_columns[word_id] for word_id in unique_ids]
+            feature_counts = np.fromiter((len(c) for c in columns), dtype=np.int64, count=len(columns))
+            feature_starts = np.cumsum(feature_counts) - feature_counts
+            all_columns = np.concatenate(columns)
+            all_weights = np.concatenate([self._word_weights[word_id] for word_id in unique_ids])
+            token_counts = feature_counts[inverse]
+            token_of_feature = np.repeat(np.arange(len(token_ids), dtype=np.int64), token_counts)
+            position = np.arange(token_of_feature.size, dtype=np.int64) - np.repeat(np.cumsum(token_counts) - token_counts, token_counts)
+            feature_index = feature_starts[inverse][token_of_feature] + position
+            flat_index = token_rows[token_of_feature] * dimension + all_columns[feature_index]
+            matrix += np.bincount(flat_index, weights=all_weights[feature_index], minlength=matrix.size)
+
+            # Bigramas: hash combinado dos hashes das duas palavras, apenas dentro do mesmo texto
+            same_text = token_rows[1:] == token_rows[:-1]
+            if same_text.any():
+                hashes = np.asarray(self._word_hashes, dtype=np.uint64)[token_ids]
+                combined = (hashes[:-1] * np.uint64(0x9E3779B1) + hashes[1:]) & np.uint64(0xFFFFFFFF)
+                combined = ((combined ^ (combined >> np.uint64(15))) * np.uint64(0x2C1B3C6D)) & np.uint64(0xFFFFFFFF)
+                combined = combined[same_text]
+                signs = np.where(combined & np.uint64(0x80000000), self.BIGRAM_WEIGHT, -self.BIGRAM_WEIGHT)
+                flat_index = token_rows[1:][same_text] * dimension + (combined % np.uint64(dimension)).astype(np.int64)
+                matrix += np.bincount(flat_index, weights=signs, minlength=matrix.size)
+
+        matrix = matrix.reshape(len(token_lists), dimension)
+        matrix = (np.sign(matrix) * np.log1p(np.abs(matrix))).astype(np.float32)
+        norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+        norms[norms == 0] = 1.0
+        matrix /= norms[:, None]
+        return matrix
+
+    def _add_word(self, word: str) -> int:
+        """Registra ``word`` com as posições e pesos (com sinal) da palavra e de seus trigramas."""
+        features = [("w:" + word, self.WORD_WEIGHT)]
+        padded = f"<{word}>"
+        features.extend(("c:" + padded[start:start + 3], self.CHAR_WEIGHT) for start in range(len(padded) - 2))
+        hashes = [zlib.crc32(feature.encode("utf-8")) for feature, _ in features]
+        self._word_hashes.append(hashes[0])
+        self._word_columns.append(np.array([hashed % self.dimension for hashed in hashes], dtype=np.int64))
+        self._word_weights.append(np.array(
+            [weight if hashed & 0x80000000 else -weight for hashed, (_, weight) in zip(hashes, features)],
+            dtype=np.float64,
+        ))
+        word_id = len(self._word_ids)
+        self._word_ids[word] = word_id
+        return word_id
+
+
+PROVIDERS: Dict[str, Type[EmbeddingProvider]] = {
+    "gemini": GeminiProvider,
+    "openai": OpenAIProvider,
+    "deepinfra": DeepInfraProvider,
+    "local": LocalProvider,
+}
+
+_providers: Dict[Tuple[str, Optional[str], Optional[str]], EmbeddingProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name: str, api_key: Optional[str] = None, model: Optional[str] = None) -> EmbeddingProvider:
+    """
+    Retorna o provedor ``name`` compartilhado pelo processo para a chave e o modelo informados.
+
+    ``maritaca`` é um alias de ``deepinfra``.
+    """
+    provider_key = "deepinfra" if name.lower() == "maritaca" else name.lower()
+    if provider_key not in PROVIDERS:
+        raise ValueError(f"Provedor de embeddings desconhecido: '{name}'.")
+    registry_key = (provider_key, api_key, model)
+    with _providers_lock:
+        provider = _providers.get(registry_key)
+        if provider is None:
+            provider = PROVIDERS[provider_key](api_key=api_key, model=model)
+            _providers[registry_key] = provider
+        return provider
+
+
+def embedding_namespace(provider: str) -> str:
+    """
+    Identifica provedor e modelo dos embeddings (usado nas chaves do checkpoint e no manifesto).
+
+    Não cria o provedor: a dimensão do provedor local vem de DOCS_CLI_LOCAL_DIMENSION.
+    """
+    provider_key = provider.lower()
+    if provider_key == "gemini":
+        return f"gemini:{GEMINI_EMBEDDING_MODEL}"
+    elif provider_key == "openai":
+        return f"openai:{OPENAI_EMBEDDING_MODEL}"
+    elif provider_key == "local":
+        dimension = int(os.getenv("DOCS_CLI_LOCAL_DIMENSION") or LOCAL_EMBEDDING_DIMENSION)
+        return f"local:{LOCAL_EMBEDDING_MODEL}-{dimension}"
+    return f"deepinfra:{DEEPINFRA_EMBEDDING_MODEL}"
+
+
+def reset_providers() -> None:
+    """Descarta os provedores (e seus clientes) criados até aqui."""
+    global _gemini_configured_key
+    with _providers_lock:
+        _providers.clear()
+    with _gemini_lock:
+        _gemini_configured_key = None
@@ -0,0 +1,221 @@
+"""Armazenamento binário de embeddings: matriz ``.npy`` contígua + metadados JSONL por linha."""
+
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Sufixos dos arquivos que compõem o store
+MATRIX_SUFFIX = ".npy"
+METADATA_SUFFIX = ".meta.jsonl"
+
+# Chave da primeira linha de metadados de um sidecar, com a identificação do JSON de origem
+HEADER_KEY = "__store__"
+
+# Tipo usado para gravar a matriz de embeddings
+STORE_DTYPE = np.float32
+
+# Modos de carregamento da matriz: "mmap" abre o .npy somente leitura, mapeado
+# em memória (compartilhando o page cache entre processos); "memory" copia a
+# matriz para o heap; "auto" usa mmap sempre que houver um store disponível.
+LOAD_MODES = ("auto", "mmap", "memory")
+
+
+def store_paths(path: str) -> Tuple[str, str]:
+    """
+    Retorna os caminhos (matriz, metadados) do store associado a ``path``.
+
+    Para a matriz de um store (``embeddings.npy``) são ``embeddings.npy`` +
+    ``embeddings.meta.jsonl``. Para um JSON de chunks (``embeddings.json``)
+    é o sidecar ``embeddings.json.npy`` + ``embeddings.json.meta.jsonl``,
+    que nunca se confunde com um store ``embeddings.npy`` gravado à parte.
+    """
+    if is_store_path(path):
+        base = path[: -len(MATRIX_SUFFIX)]
+    else:
+        base = path
+    return base + MATRIX_SUFFIX, base + METADATA_SUFFIX
+
+
+def is_store_path(path: str) -> bool:
+    """Indica se ``path`` aponta para a matriz de um store binário."""
+    return path.lower().endswith(MATRIX_SUFFIX)
+
+
+def file_signature(path: str) -> Dict[str, int]:
+    """Tamanho e instante de modificação (ns) de ``path``: muda a cada nova gravação do arquivo."""
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def save_embedding_store(chunks: Iterable[Dict[str, Any]], path: str, source: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Salva chunks com embeddings no formato binário.
+
+    Cada chunk vira uma linha no JSONL de metadados (sem a chave
+    ``embedding``) com o campo ``row`` apontando para a linha da matriz, ou
+    ``None`` se o chunk não tiver embedding. ``source`` (a
+    ``file_signature`` do JSON de origem de um sidecar) é gravado numa
+    primeira linha de cabeçalho. Retorna o número de linhas da matriz.
+    """
+    matrix_path, metadata_path = store_paths(path)
+    rows = 0
+    dimension: Optional[int] = None
+
+    # Grava em arquivos temporários e renomeia ao final, para que processos
+    # concorrentes nunca abram um store pela metade. As linhas da matriz vão
+    # direto para um arquivo bruto (sem acumular os vetores em memória) e o
+    # cabeçalho .npy é escrito quando o formato final já é conhecido.
+    tmp_matrix_path = f"{matrix_path}.{os.getpid()}.tmp"
+    tmp_rows_path = f"{matrix_path}.{os.getpid()}.rows.tmp"
+    tmp_metadata_path = f"{metadata_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_metadata_path, 'w', encoding='utf-8') as meta_file, open(tmp_rows_path, 'wb') as rows_file:
+            if source is not None:
+                meta_file.write(json.dumps({HEADER_KEY: {"source": source}}) + "\n")
+            for chunk in chunks:
+                metadata = {key: value for key, value in chunk.items() if key != 'embedding'}
+                embedding = chunk.get('embedding')
+                row = None
+                if embedding is not None and len(embedding) > 0:
+                    if dimension is None:
+                        dimension = len(embedding)
+                    if len(embedding) == dimension:
+                        row = rows
+                        rows += 1
+                        rows_file.write(np.asarray(embedding, dtype=STORE_DTYPE).tobytes())
+                metadata['row'] = row
+                meta_file.write(json.dumps(metadata, ensure_ascii=False) + "\n")
+
+        header = {
+            'descr': np.lib.format.dtype_to_descr(np.dtype(STORE_DTYPE)),
+            'fortran_order': False,
+            'shape': (rows, dimension or 0),
+        }
+        with open(tmp_matrix_path, 'wb') as matrix_file, open(tmp_rows_path, 'rb') as rows_file:
+            np.lib.format.write_array_header_1_0(matrix_file, header)
+            shutil.copyfileobj(rows_file, matrix_file)
+    finally:
+        if os.path.exists(tmp_rows_path):
+            os.remove(tmp_rows_path)
+    os.replace(tmp_matrix_path, matrix_path)
+    os.replace(tmp_metadata_path, metadata_path)
+    return rows
+
+
+def sidecar_source(json_path: str) -> Optional[Dict[str, Any]]:
+    """``file_signature`` do JSON registrada no sidecar de ``json_path``, ou ``None`` se não houver."""
+    matrix_path, metadata_path = store_paths(json_path)
+    if not (os.path.exists(matrix_path) and os.path.exists(metadata_path)):
+        return None
+    with open(metadata_path, 'r', encoding='utf-8') as meta_file:
+        first_line = meta_file.readline()
+    try:
+        header = json.loads(first_line).get(HEADER_KEY)
+    except (ValueError, AttributeError):
+        return None
+    return header.get("source") if isinstance(header, dict) else None
+
+
+def has_fresh_sidecar(json_path: str) -> bool:
+    """Indica se o sidecar de ``json_path`` foi gerado a partir do JSON como ele está agora (mesmo tamanho e mtime)."""
+    source = sidecar_source(json_path)
+    return source is not None and source == file_signature(json_path)
+
+
+def load_embedding_store(path: str, mmap: bool = False) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Carrega um store binário.
+
+    Retorna ``(chunks, matriz)`` contendo apenas os chunks com embedding,
+    na mesma ordem das linhas da matriz. Com ``mmap=True`` a matriz é
+    mapeada somente leitura em vez de copiada para o heap.
+    """
+    matrix_path, metadata_path = store_paths(path)
+    if not os.path.exists(metadata_path):
+        raise FileNotFoundError(f"Arquivo de metadados '{metadata_path}' não encontrado.")
+
+    matrix = np.load(matrix_path, mmap_mode='r' if mmap else None)
+    chunks: List[Dict[str, Any]] = []
+    with open(metadata_path, 'r', encoding='utf-8') as meta_file:
+        for line in meta_file:
+            if not line.strip():
+                continue
+            metadata = json.loads(line)
+            if HEADER_KEY in metadata:
+                continue
+            if metadata.get('row') is not None:
+                chunks.append(metadata)
+
+    chunks.sort(key=lambda chunk: chunk['row'])
+    if len(chunks) != matrix.shape[0]:
+        raise ValueError(
+            f"Store inconsistente: {len(chunks)} linhas de metadados para {matrix.shape[0]} embeddings."
+        )
+    return chunks, matrix
+
+
+def load_embeddings(path: str, load_mode: str = "memory") -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Carrega embeddings de um store binário (``.npy``) ou de um JSON de chunks.
+
+    Em ambos os casos retorna ``(chunks, matriz)``: os chunks não carregam
+    mais a chave ``embedding`` e cada um tem ``row`` igual à sua linha na
+    matriz. Chunks sem embedding (ou com dimensão diferente do primeiro
+    embedding válido) são descartados.
+
+    Para um JSON, o sidecar ``<json>.npy`` gerado a partir do JSON atual
+    (ver ``has_fresh_sidecar``) é usado no lugar dele nos modos ``auto`` e
+    ``mmap``; no modo ``mmap`` o sidecar é criado (ou refeito) se preciso.
+    """
+    if load_mode not in LOAD_MODES:
+        raise ValueError(f"Modo de carregamento inválido: '{load_mode}'. Use um de {LOAD_MODES}.")
+
+    if is_store_path(path):
+        return load_embedding_store(path, mmap=load_mode != "memory")
+
+    if load_mode != "memory" and has_fresh_sidecar(path):
+        print(f"Usando o store binário '{store_paths(path)[0]}', gerado a partir de '{path}'.")
+        return load_embedding_store(path, mmap=True)
+
+    if load_mode == "mmap":
+        # A assinatura é lida antes do conteúdo: uma regravação do JSON durante a leitura invalida o sidecar
+        source = file_signature(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            save_embedding_store(json.load(f), path, source=source)
+        print(f"Store binário '{store_paths(path)[0]}' criado a partir de '{path}'.")
+        return load_embedding_store(path, mmap=True)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return embeddings_from_chunks(json.load(f))
+
+
+def embeddings_from_chunks(processed_chunks: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Separa chunks com a chave ``embedding`` em ``(chunks, matriz)``, no
+    mesmo formato de ``load_embeddings``, sem passar por arquivo.
+
+    Chunks sem embedding (ou com dimensão diferente do primeiro embedding
+    válido) são descartados. Cada vetor é convertido para ``STORE_DTYPE``
+    ao ser lido, de modo que ``processed_chunks`` pode ser um gerador.
+    """
+    chunks: List[Dict[str, Any]] = []
+    vectors: List[np.ndarray] = []
+    dimension: Optional[int] = None
+    for chunk in processed_chunks:
+        embedding = chunk.pop('embedding', None)
+        if embedding is None or len(embedding) == 0:
+            continue
+        if dimension is None:
+            dimension = len(embedding)
+        if len(embedding) != dimension:
+            continue
+        chunk['row'] = len(vectors)
+        chunks.append(chunk)
+        vectors.append(np.asarray(embedding, dtype=STORE_DTYPE))
+
+    if not vectors:
+        return chunks, np.zeros((0, dimension or 0), dtype=STORE_DTYPE)
+    return chunks, np.stack(vectors)
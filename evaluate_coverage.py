@@ -3,26 +3,37 @@
 import json
 import csv
 import os
-import google.generativeai as genai
 from dotenv import load_dotenv
 import time
-from typing import Callable
+from typing import Callable, Iterable, Iterator, List, Tuple
 
-try:
-    import openai  # type: ignore
-except Exception:  # pragma: no cover
-    openai = None  # type: ignore
 import numpy as np  # Para cálculo de similaridade de cosseno
 import re  # Para manipulação de texto e divisão de frases
 import argparse  # Adicionado para parsing de argumentos CLI
 import sys  # Adicionado para sys.exit
 
+from ann_index import load_ann_index
+from async_embedding import get_concurrency, run_concurrently
+from batching import get_batch_limits, plan_batches
+from embedding_cache import cache_summary
+from embedding_providers import get_provider
+from embedding_store import load_embeddings
+from profiling import span
+from results_io import (
+    QUESTION_EMBEDDING_FAILED,
+    SENTENCE_EMBEDDING_FAILED,
+    JsonlResultsWriter,
+    is_jsonl_path,
+    iter_results,
+    write_results,
+)
+from retrieval import ChunkIndex
 from utils import (
     clean_text_for_embedding,
-    generate_embedding_with_retry,
-    generate_openai_embedding,
+    generate_gemini_embeddings_batch,
     GEMINI_EMBEDDING_MODEL,
     OPENAI_EMBEDDING_MODEL,
+    format_memory_usage,
 )
 
 # Carrega as variáveis de ambiente do arquivo .env
@@ -34,6 +45,10 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # Limite de caracteres para o embedding, para evitar exceder o limite de tokens da API
 EMBEDDING_TEXT_MAX_LENGTH = 1024
 
+# Limiares para a avaliação de frases
+MIN_SENTENCE_SIMILARITY_THRESHOLD = 0.65  # Similaridade mínima para uma frase ser considerada "coberta"
+MIN_PHRASES_COVERED_PERCENTAGE = 0.70  # % mínima de frases da resposta ideal que devem ser cobertas
+
 # Funções auxiliares
 
 
@@ -58,24 +73,95 @@ def cosine_similarity(vecA, vecB):
         return 0.0
     return dot_product / (norm_A * norm_B)
 
+def sentence_chunk_similarities(sentence_embeddings, chunk_vectors) -> np.ndarray:
+    """
+    Matriz (frases × chunks) de similaridades de cosseno, em float64, com
+    um único produto de matrizes; vetores nulos têm similaridade 0.
+    """
+    sentences = np.asarray(sentence_embeddings, dtype=np.float64)
+    chunks = np.asarray(chunk_vectors, dtype=np.float32)
+    if sentences.size == 0 or chunks.size == 0:
+        return np.zeros((len(sentence_embeddings), len(chunk_vectors)))
+    sentence_norms = np.sqrt(np.einsum('ij,ij->i', sentences, sentences))
+    chunk_norms = np.sqrt(np.einsum('ij,ij->i', chunks, chunks)).astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarities = (sentences @ chunks.T.astype(np.float64)) / np.outer(sentence_norms, chunk_norms)
+    similarities[(sentence_norms == 0)[:, None] | (chunk_norms == 0)[None, :]] = 0.0
+    return similarities
+
+
+def score_sentence_coverage(sentence_embeddings, chunk_vectors, threshold: float):
+    """
+    Cobertura das frases de uma resposta ideal pelos chunks relevantes
+    (na ordem de relevância), com um único produto de matrizes
+    frases × chunks.
+
+    Retorna, por frase: se foi coberta, a maior similaridade considerada e o
+    índice do chunk correspondente (``-1`` se nenhum teve similaridade
+    positiva). Reproduz ``score_sentence_coverage_loop``: cada frase só
+    considera os chunks até o primeiro com similaridade >= ``threshold``, e
+    empates mantêm o primeiro chunk.
+    """
+    n_sentences, n_chunks = len(sentence_embeddings), len(chunk_vectors)
+    if n_sentences == 0 or n_chunks == 0:
+        return [False] * n_sentences, [0.0] * n_sentences, [-1] * n_sentences
+    similarities = sentence_chunk_similarities(sentence_embeddings, chunk_vectors)
+
+    # Só contam os chunks até o primeiro que cobre a frase (inclusive)
+    hits = similarities >= threshold
+    covered = hits.any(axis=1)
+    last_considered = np.where(covered, hits.argmax(axis=1), n_chunks - 1)
+    considered = np.where(np.arange(n_chunks)[None, :] <= last_considered[:, None], similarities, -np.inf)
+    best_chunk = considered.argmax(axis=1)
+    best_similarity = considered[np.arange(n_sentences), best_chunk]
+    unmatched = ~(best_similarity > 0.0)
+    best_similarity[unmatched] = 0.0
+    best_chunk[unmatched] = -1
+    return covered.tolist(), best_similarity.tolist(), best_chunk.tolist()
+
+
+def score_sentence_coverage_loop(sentence_embeddings, chunk_vectors, threshold: float):
+    """
+    Implementação de referência de ``score_sentence_coverage``: um
+    ``cosine_similarity`` por par (frase, chunk). Usada nos testes de
+    equivalência e no benchmark de pontuação.
+    """
+    covered, best_similarities, best_chunks = [], [], []
+    for sentence_embedding in sentence_embeddings:
+        sentence_covered_by_chunk = False
+        best_similarity_for_sentence = 0.0
+        best_chunk = -1
+        for position, chunk_vector in enumerate(chunk_vectors):
+            current_similarity = cosine_similarity(sentence_embedding, chunk_vector)
+            if current_similarity > best_similarity_for_sentence:
+                best_similarity_for_sentence = current_similarity
+                best_chunk = position
+            if current_similarity >= threshold:
+                sentence_covered_by_chunk = True
+                break # Já encontrou um chunk relevante para esta frase
+        covered.append(sentence_covered_by_chunk)
+        best_similarities.append(float(best_similarity_for_sentence))
+        best_chunks.append(best_chunk)
+    return covered, best_similarities, best_chunks
+
 def get_relevant_chunks(query_embedding, processed_chunks, top_k=5):
     """
     Encontra os chunks mais relevantes com base na similaridade de cosseno.
+
+    Atalho sobre ``ChunkIndex``: para várias consultas sobre os mesmos
+    chunks, crie o índice uma única vez e use ``ChunkIndex.search``.
     """
-    similarities = []
-    for chunk_info in processed_chunks:
-        chunk_embedding = chunk_info.get('embedding')
-        if chunk_embedding and len(chunk_embedding) > 0 and len(query_embedding) == len(chunk_embedding):
-            try:
-                similarity = cosine_similarity(query_embedding, chunk_embedding)
-                similarities.append({'similarity': similarity, 'chunk': chunk_info})
-            except Exception as e:
-                print(f"Aviso: Erro ao calcular similaridade para chunk '{chunk_info.get('chunk_title', 'N/A')}' do documento '{chunk_info.get('document_title', 'N/A')}': {e}")
-        else:
-            pass # Silenciar avisos excessivos para embeddings inválidos/incompatíveis
-
-    similarities.sort(key=lambda x: x['similarity'], reverse=True)
-    return similarities[:top_k]
+    index = ChunkIndex.from_chunks(processed_chunks, dimension=len(query_embedding))
+    return index.search(query_embedding, top_k=top_k)
+
+def _load_search_index(chunks_filepath, embedding_matrix, ann, nprobe, doc_shortlist):
+    """Índice aproximado pedido (IVF ou por documento), ou ``None`` para a busca exata."""
+    if doc_shortlist:
+        return load_ann_index(chunks_filepath, embedding_matrix, doc_shortlist, documents=True)
+    if ann:
+        return load_ann_index(chunks_filepath, embedding_matrix, nprobe)
+    return None
+
 
 # MODIFICADO: Adicionado output_json_path como parâmetro
 def evaluate_coverage(
@@ -86,12 +172,42 @@ def evaluate_coverage(
     provider: str | None = None,
     gemini_api_key: str | None = None,
     openai_api_key: str | None = None,
+    load_mode: str = "auto",
+    concurrency: int | None = None,
+    resume: bool = False,
+    ann: bool = False,
+    nprobe: int | None = None,
+    doc_shortlist: int | None = None,
 ) -> bool:
     """
     Avalia a cobertura da documentação usando um arquivo CSV de perguntas e respostas ideais.
     A avaliação considera a similaridade de frases da resposta ideal com os chunks relevantes.
     Salva os resultados no caminho especificado por output_json_path.
+    Os embeddings das perguntas e das frases das respostas ideais são gerados
+    antes da avaliação, sem repetir textos, em lotes do tamanho máximo do
+    provedor e com até ``concurrency`` requisições simultâneas.
+
+    Se output_json_path terminar em ``.jsonl``, cada resultado é gravado assim
+    que a pergunta é avaliada; com ``resume=True`` as perguntas já presentes
+    nesse arquivo não são avaliadas de novo.
+
+    Com ``ann=True`` a busca dos chunks relevantes usa o índice aproximado
+    gravado ao lado dos embeddings (ver ``ann_index``), visitando ``nprobe``
+    partições por pergunta; sem índice atualizado, a busca exata é usada.
+    Com ``doc_shortlist=N`` a busca é em dois estágios: a pergunta é comparada
+    aos centróides dos documentos (``generate_embeddings --doc-index``) e só
+    os chunks dos N documentos mais similares são pontuados.
     """
+    streaming = is_jsonl_path(output_json_path)
+    if ann and doc_shortlist:
+        print("Erro: use --ann ou --doc-shortlist, não ambos.")
+        return False
+    if doc_shortlist is not None and doc_shortlist < 1:
+        print(f"Erro: --doc-shortlist deve ser positivo, mas foi informado {doc_shortlist}.")
+        return False
+    if resume and not streaming:
+        print(f"Erro: --resume requer um arquivo de saída JSONL (.jsonl), mas foi informado '{output_json_path}'.")
+        return False
     if not os.path.exists(qa_filepath):
         print(f"Erro: O arquivo de perguntas e respostas '{qa_filepath}' não foi encontrado.")
         return False
@@ -101,8 +217,9 @@ def evaluate_coverage(
 
     print(f"Carregando chunks de '{chunks_filepath}'...")
     try:
-        with open(chunks_filepath, 'r', encoding='utf-8') as f:
-            processed_chunks = json.load(f)
+        with span("evaluate.load") as phase:
+            processed_chunks, embedding_matrix = load_embeddings(chunks_filepath, load_mode=load_mode)
+            phase.set(items=len(processed_chunks))
     except json.JSONDecodeError as e:
         print(f"Erro ao decodificar JSON de '{chunks_filepath}': {e}")
         return False
@@ -110,186 +227,409 @@ def evaluate_coverage(
         print(f"Erro inesperado ao carregar '{chunks_filepath}': {e}")
         return False
 
-    # Filtrar chunks que não têm embedding válido (se houver algum)
-    processed_chunks = [c for c in processed_chunks if c.get('embedding') is not None]
+    # Somente chunks com embedding válido são carregados
     if not processed_chunks:
         print(
             "Erro: Nenhum chunk com embedding válido encontrado após o carregamento. Verifique o arquivo de chunks com embeddings."
         )
         return False
 
-    # Determina o provedor a ser usado
+    qa_pairs = load_qa_pairs(qa_filepath)
+    if qa_pairs is None:
+        return False
+
+    if not qa_pairs:
+        print("Atenção: Nenhum par de pergunta-resposta válido encontrado no CSV.")
+        return False
+
+    evaluation_options = dict(
+        top_k_chunks=top_k_chunks,
+        provider=provider,
+        gemini_api_key=gemini_api_key,
+        openai_api_key=openai_api_key,
+        concurrency=concurrency,
+        ann_index=_load_search_index(chunks_filepath, embedding_matrix, ann, nprobe, doc_shortlist),
+    )
+    if streaming:
+        return _evaluate_to_jsonl(qa_pairs, processed_chunks, embedding_matrix, output_json_path, resume, evaluation_options)
+
+    try:
+        evaluation_results = evaluate_qa_pairs(qa_pairs, processed_chunks, embedding_matrix, **evaluation_options)
+    except ImportError as e:
+        print(f"Erro de configuração do provedor de embeddings: {e}")
+        return False
+
+    # Salvar resultados da avaliação
+    # MODIFICADO: usa output_json_path
+    try:
+        with span("evaluate.write", items=len(evaluation_results)):
+            write_results(output_json_path, evaluation_results)
+        print(f"\nResultados da avaliação salvos em '{output_json_path}'.")
+    except Exception as e:
+        print(f"Erro ao salvar os resultados da avaliação: {e}")
+        return False
+
+    print_evaluation_summary(evaluation_results)
+    return True
+
+
+def _evaluate_to_jsonl(qa_pairs, processed_chunks, embedding_matrix, output_path, resume, evaluation_options) -> bool:
+    # Cada resultado vai para o disco assim que a pergunta termina; nada é acumulado em memória
+    try:
+        writer = JsonlResultsWriter(output_path, resume=resume)
+    except Exception as e:
+        print(f"Erro ao abrir '{output_path}' para gravar os resultados da avaliação: {e}")
+        return False
+    with writer:
+        pending_pairs = writer.pending(qa_pairs)
+        if resume:
+            print(
+                f"Retomando a avaliação: {writer.completed} perguntas já avaliadas em '{output_path}', "
+                f"{len(pending_pairs)} restantes."
+            )
+            if writer.retried:
+                print(f"{writer.retried} resultados com falha de embedding serão avaliados de novo.")
+        if pending_pairs:
+            try:
+                for result in iter_qa_pair_results(pending_pairs, processed_chunks, embedding_matrix, **evaluation_options):
+                    writer.write(result)
+            except Exception as e:
+                print(f"Erro durante a avaliação: {e}")
+                print(f"{writer.written} resultados novos foram salvos em '{output_path}'; use --resume para continuar.")
+                return False
+    print(f"\nResultados da avaliação salvos em '{output_path}' ({writer.written} novos).")
+    print_evaluation_summary(iter_results(output_path))
+    return True
+
+
+def load_qa_pairs(qa_filepath: str) -> List[dict] | None:
+    """
+    Lê o CSV de perguntas e respostas ideais (colunas 'question' e 'response').
+    Retorna ``None`` se o arquivo não puder ser lido.
+    """
+    print(f"Carregando perguntas e respostas de '{qa_filepath}'...")
+    try:
+        with open(qa_filepath, 'r', encoding='utf-8') as f:
+            qa_pairs = qa_pairs_from_rows(csv.DictReader(f))
+    except Exception as e:
+        print(f"Erro ao carregar ou ler o arquivo CSV '{qa_filepath}': {e}")
+        return None
+    return qa_pairs
+
+
+def qa_pairs_from_rows(rows: Iterable[dict]) -> List[dict]:
+    """Converte linhas com 'question' e 'response' (ex: de um CSV) em pares pergunta/resposta ideal."""
+    qa_pairs = []
+    for row in rows:
+        # Adaptação para as colunas do seu CSV: 'question' e 'response'
+        if 'question' in row and 'response' in row:
+            qa_pairs.append({'pergunta': row['question'], 'resposta_ideal': row['response']})
+        else:
+            print(f"Aviso: Linha ignorada no CSV. Esperava 'question' e 'response': {row}")
+    return qa_pairs
+
+
+def prepare_questions(qa_pairs: List[dict]) -> List[Tuple[List[str], List[str]]]:
+    """
+    Para cada par, as frases da resposta ideal e os textos a enviar ao
+    provedor: ``[pergunta] + frases`` (limpos e truncados).
+    """
+    prepared_questions = []
+    for qa in qa_pairs:
+        # Divide a resposta ideal em frases e as limpa
+        # Usa um regex mais robusto para split de frases, considerando múltiplos delimitadores
+        ideal_answer_sentences_raw = re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s', qa['resposta_ideal'])
+        ideal_answer_sentences = [clean_text_for_embedding(s).strip() for s in ideal_answer_sentences_raw if clean_text_for_embedding(s).strip()]
+        sentence_texts = []
+        for ideal_sentence in ideal_answer_sentences:
+            sentence_clean = clean_text_for_embedding(ideal_sentence)
+            if len(sentence_clean) > EMBEDDING_TEXT_MAX_LENGTH:
+                sentence_clean = sentence_clean[:EMBEDDING_TEXT_MAX_LENGTH]
+            sentence_texts.append(sentence_clean)
+
+        question_clean = clean_text_for_embedding(qa['pergunta'])
+        if len(question_clean) > EMBEDDING_TEXT_MAX_LENGTH:
+            question_clean = question_clean[:EMBEDDING_TEXT_MAX_LENGTH]
+        prepared_questions.append((ideal_answer_sentences, [question_clean] + sentence_texts))
+    return prepared_questions
+
+
+def _query_embedder(provider: str | None, gemini_api_key: str | None, openai_api_key: str | None):
+    """Provedor escolhido, o ``EmbeddingProvider`` das perguntas e a função que embeda um lote de textos."""
     chosen_provider = (
         provider or ("openai" if (openai_api_key or OPENAI_API_KEY) else "gemini")
     ).lower()
     actual_gemini_key = gemini_api_key or GOOGLE_API_KEY
     actual_openai_key = openai_api_key or OPENAI_API_KEY
 
+    # embed_batch_func recebe uma lista de textos e devolve um embedding (ou None) por texto
     if chosen_provider == "openai":
         if not actual_openai_key:
             raise ValueError("OPENAI_API_KEY nao configurada")
-        embed_func: Callable[[str], list | None] = lambda txt: generate_openai_embedding(txt, actual_openai_key)
+        query_provider = get_provider("openai", actual_openai_key, OPENAI_EMBEDDING_MODEL)
+        embed_batch_func: Callable[[List[str]], List[list | None]] = query_provider.embed
+    elif chosen_provider == "local":
+        query_provider = get_provider("local")
+        embed_batch_func = query_provider.embed
     else:
         if not actual_gemini_key:
             raise ValueError("GOOGLE_API_KEY nao configurada")
-        embed_func = lambda txt: generate_embedding_with_retry(txt, actual_gemini_key, model=GEMINI_EMBEDDING_MODEL)
+        query_provider = get_provider("gemini", actual_gemini_key, GEMINI_EMBEDDING_MODEL)
+        embed_batch_func = lambda txts: generate_gemini_embeddings_batch(txts, actual_gemini_key, model=GEMINI_EMBEDDING_MODEL)
+    return chosen_provider, query_provider, embed_batch_func
 
 
-    print(f"Carregando perguntas e respostas de '{qa_filepath}'...")
-    qa_pairs = []
-    try:
-        with open(qa_filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Adaptação para as colunas do seu CSV: 'question' e 'response'
-                if 'question' in row and 'response' in row:
-                    qa_pairs.append({'pergunta': row['question'], 'resposta_ideal': row['response']})
-                else:
-                    print(f"Aviso: Linha ignorada no CSV. Esperava 'question' e 'response': {row}")
-    except Exception as e:
-        print(f"Erro ao carregar ou ler o arquivo CSV '{qa_filepath}': {e}")
-        return False
-
-    if not qa_pairs:
-        print("Atenção: Nenhum par de pergunta-resposta válido encontrado no CSV.")
-        return False
+def plan_question_texts(prepared_questions) -> Tuple[List[str], List[List[int]]]:
+    """
+    Textos distintos (perguntas e frases de todas as respostas ideais, na
+    ordem em que aparecem) e, para cada pergunta, a posição de cada um dos
+    seus textos nessa lista.
+    """
+    positions: dict = {}
+    unique_texts: List[str] = []
+    text_positions = []
+    for _, texts in prepared_questions:
+        question_positions = []
+        for text in texts:
+            position = positions.get(text)
+            if position is None:
+                position = positions[text] = len(unique_texts)
+                unique_texts.append(text)
+            question_positions.append(position)
+        text_positions.append(question_positions)
+    return unique_texts, text_positions
+
+
+def _embed_prepared_questions(prepared_questions, chosen_provider, embed_batch_func, concurrency):
+    # Pré-passo: os textos de todas as perguntas são deduplicados e enviados em
+    # lotes do tamanho máximo do provedor (em vez de uma requisição por pergunta);
+    # a avaliação depois só consulta os vetores em memória
+    unique_texts, text_positions = plan_question_texts(prepared_questions)
+    total_texts = sum(len(positions) for positions in text_positions)
+    limits = get_batch_limits(chosen_provider)
+    batches = plan_batches(unique_texts, max_chars=limits["max_chars"], max_items=limits["max_items"])
+    max_in_flight = get_concurrency(chosen_provider, concurrency)
+    print(
+        f"Gerando embeddings de {len(prepared_questions)} perguntas: {total_texts} textos, "
+        f"{len(unique_texts)} distintos ({total_texts - len(unique_texts)} repetidos ignorados), "
+        f"em {len(batches)} requisições de lote ({max_in_flight} simultâneas)."
+    )
+    saved_requests = len(prepared_questions) - len(batches)
+    if saved_requests > 0:
+        print(f"  {saved_requests} requisições a menos que uma por pergunta ({len(prepared_questions)}).")
+
+    batch_results = run_concurrently(
+        [[unique_texts[index] for index in batch] for batch in batches], embed_batch_func, concurrency=max_in_flight
+    )
+    embeddings: List[list | None] = [None] * len(unique_texts)
+    for batch, vectors in zip(batches, batch_results):
+        for index, vector in zip(batch, vectors):
+            embeddings[index] = vector
+    return [[embeddings[position] for position in positions] for positions in text_positions]
+
+
+def embed_questions(
+    qa_pairs: List[dict],
+    provider: str | None = None,
+    gemini_api_key: str | None = None,
+    openai_api_key: str | None = None,
+    concurrency: int | None = None,
+) -> List[List[list | None]]:
+    """
+    Gera os embeddings de cada pergunta e das frases de sua resposta ideal
+    (``[pergunta] + frases``, um vetor ou ``None`` por texto), sem depender
+    dos chunks. O resultado pode ser passado a ``evaluate_qa_pairs`` como
+    ``question_embeddings``.
+    """
+    chosen_provider, _, embed_batch_func = _query_embedder(provider, gemini_api_key, openai_api_key)
+    return _embed_prepared_questions(prepare_questions(qa_pairs), chosen_provider, embed_batch_func, concurrency)
+
+
+def evaluate_qa_pairs(
+    qa_pairs: List[dict],
+    processed_chunks: List[dict],
+    embedding_matrix: np.ndarray,
+    top_k_chunks: int = 5,
+    provider: str | None = None,
+    gemini_api_key: str | None = None,
+    openai_api_key: str | None = None,
+    concurrency: int | None = None,
+    question_embeddings: List[List[list | None]] | None = None,
+    ann_index=None,
+) -> List[dict]:
+    """
+    Avalia pares pergunta/resposta ideal já carregados contra os chunks
+    (e a matriz de embeddings) retornados por ``load_embeddings``, sem ler
+    nem gravar arquivos. Retorna os resultados no formato de
+    evaluation_results.json.
+
+    ``question_embeddings`` (de ``embed_questions`` para os mesmos pares)
+    dispensa a geração dos embeddings das perguntas aqui. ``ann_index`` (um
+    ``ann_index.IVFIndex`` da mesma matriz) torna a busca aproximada.
+    """
+    return list(
+        iter_qa_pair_results(
+            qa_pairs,
+            processed_chunks,
+            embedding_matrix,
+            top_k_chunks=top_k_chunks,
+            provider=provider,
+            gemini_api_key=gemini_api_key,
+            openai_api_key=openai_api_key,
+            concurrency=concurrency,
+            question_embeddings=question_embeddings,
+            ann_index=ann_index,
+        )
+    )
+
+
+def iter_qa_pair_results(
+    qa_pairs: List[dict],
+    processed_chunks: List[dict],
+    embedding_matrix: np.ndarray,
+    top_k_chunks: int = 5,
+    provider: str | None = None,
+    gemini_api_key: str | None = None,
+    openai_api_key: str | None = None,
+    concurrency: int | None = None,
+    question_embeddings: List[List[list | None]] | None = None,
+    ann_index=None,
+) -> Iterator[dict]:
+    """
+    Versão incremental de ``evaluate_qa_pairs``: produz o resultado de cada
+    pergunta assim que ela é avaliada, na ordem de ``qa_pairs``.
+    """
+    # Carrega todos os embeddings em uma matriz normalizada uma única vez por execução
+    chunk_index = ChunkIndex(processed_chunks, embedding_matrix, copy=False, ann=ann_index)
+    mapped = "mmap" if isinstance(embedding_matrix, np.memmap) else "memória"
+    print(f"{len(chunk_index)} chunks carregados ({mapped}). Memória: {format_memory_usage()}")
+
+    chosen_provider, query_provider, embed_batch_func = _query_embedder(provider, gemini_api_key, openai_api_key)
+    if query_provider.dimension and query_provider.dimension != chunk_index.dimension:
+        print(
+            f"Aviso: os chunks têm embeddings de dimensão {chunk_index.dimension}, mas o modelo '{query_provider.model}' "
+            f"gera vetores de dimensão {query_provider.dimension}. Use o mesmo provedor da geração dos embeddings."
+        )
 
-    evaluation_results = []
     total_questions = len(qa_pairs)
-    found_in_top_k_count = 0
-
-    # Limiares para a avaliação de frases
-    MIN_SENTENCE_SIMILARITY_THRESHOLD = 0.65  # Similaridade mínima para uma frase ser considerada "coberta"
-    MIN_PHRASES_COVERED_PERCENTAGE = 0.70  # % mínima de frases da resposta ideal que devem ser cobertas
 
     print(f"\nIniciando avaliação de cobertura para {total_questions} perguntas...")
     print(f"Configuração de avaliação: Considerar 'Encontrada' se {MIN_PHRASES_COVERED_PERCENTAGE*100:.0f}% das frases da resposta ideal tiverem similaridade >= {MIN_SENTENCE_SIMILARITY_THRESHOLD:.2f} com os top {top_k_chunks} chunks.")
 
-
-    for i, qa in enumerate(qa_pairs):
-        question = qa['pergunta']
-        ideal_answer = qa['resposta_ideal']
-
-        print(f"\n--- Avaliando Pergunta {i + 1}/{total_questions}: '{question[:100]}...' ---") # Mostra o começo da pergunta
-
-        # 1. Gerar embedding da pergunta
-        question_clean = clean_text_for_embedding(question)
-        if len(question_clean) > EMBEDDING_TEXT_MAX_LENGTH:
-            question_clean = question_clean[:EMBEDDING_TEXT_MAX_LENGTH]
-        query_embedding = embed_func(question_clean)
-        if query_embedding is None:
-            print(f"  Falha ao gerar embedding para a pergunta. Pulando.")
-            evaluation_results.append({
+    prepared_questions = prepare_questions(qa_pairs)
+    if question_embeddings is None:
+        with span("evaluate.embed", items=total_questions):
+            question_batches = _embed_prepared_questions(prepared_questions, chosen_provider, embed_batch_func, concurrency)
+    else:
+        question_batches = question_embeddings
+
+    with span("evaluate.search", items=total_questions):
+        for i, qa in enumerate(qa_pairs):
+            question = qa['pergunta']
+            ideal_answer = qa['resposta_ideal']
+
+            print(f"\n--- Avaliando Pergunta {i + 1}/{total_questions}: '{question[:100]}...' ---") # Mostra o começo da pergunta
+
+            ideal_answer_sentences = prepared_questions[i][0]
+            batch_embeddings = question_batches[i]
+            query_embedding = batch_embeddings[0]
+            sentence_embeddings = batch_embeddings[1:]
+            if query_embedding is None:
+                print(f"  Falha ao gerar embedding para a pergunta. Pulando.")
+                yield {
+                    "pergunta": question,
+                    "resposta_ideal": ideal_answer,
+                    "status": QUESTION_EMBEDDING_FAILED,
+                    "cobertura_detalhes": [],
+                    "top_k_chunks_relevantes": []
+                }
+                continue
+
+            # 2. Encontrar chunks relevantes
+            relevant_chunks_with_similarity = chunk_index.search(query_embedding, top_k=top_k_chunks)
+
+            # Preparar detalhes dos chunks relevantes para o relatório
+            top_chunks_report = []
+            for item in relevant_chunks_with_similarity:
+                chunk = item['chunk']
+                top_chunks_report.append({
+                    "document_title": chunk.get('document_title', 'N/A'),
+                    "chunk_title": chunk.get('chunk_title', 'N/A'),
+                    "filepath": chunk.get('document_filepath', 'N/A'),
+                    "similarity_to_query": f"{item['similarity']:.4f}",
+                    "content_preview": chunk.get('chunk_content', '')[:200] + "..." if len(chunk.get('chunk_content', '')) > 200 else chunk.get('chunk_content', '')
+                })
+
+            # 3. Avaliar cobertura da resposta ideal pelas frases
+            answer_covered = False
+            covered_sentences_count = 0
+            coverage_details = []
+            coverage_percentage = 0.0 # Inicializa coverage_percentage
+
+            if not ideal_answer_sentences:
+                print(f"  Aviso: Resposta ideal vazia ou não divisível em frases após limpeza para '{question}'.")
+                status = "Resposta Ideal Vazia/Inválida"
+            else:
+                # Similaridades de todas as frases (com embedding) contra os chunks relevantes de uma vez
+                embedded_sentences = [embedding for embedding in sentence_embeddings if embedding is not None]
+                chunk_vectors = [chunk_index.vector(item['row']) for item in relevant_chunks_with_similarity] # Embeddings (normalizados) dos chunks
+                sentence_scores = iter(zip(*score_sentence_coverage(embedded_sentences, chunk_vectors, MIN_SENTENCE_SIMILARITY_THRESHOLD)))
+
+                for ideal_sentence, sentence_embedding in zip(ideal_answer_sentences, sentence_embeddings):
+
+                    if sentence_embedding is None:
+                        coverage_details.append({
+                            "frase_ideal": ideal_sentence,
+                            "status": SENTENCE_EMBEDDING_FAILED,
+                            "similaridade_max": 0.0,
+                            "chunk_correspondente": "N/A"
+                        })
+                        continue
+
+                    sentence_covered_by_chunk, best_similarity_for_sentence, best_chunk = next(sentence_scores)
+                    covered_by_chunk_info = "N/A"
+                    if best_chunk >= 0:
+                        chunk = relevant_chunks_with_similarity[best_chunk]['chunk']
+                        covered_by_chunk_info = f"Doc: {chunk.get('document_title', 'N/A')} | Sec: {chunk.get('chunk_title', 'N/A')}"
+
+                    if sentence_covered_by_chunk:
+                        covered_sentences_count += 1
+
+                    coverage_details.append({
+                        "frase_ideal": ideal_sentence,
+                        "status": "Coberta" if sentence_covered_by_chunk else "Não Coberta",
+                        "similaridade_max": f"{best_similarity_for_sentence:.4f}",
+                        "chunk_correspondente": covered_by_chunk_info
+                    })
+
+                # Determinar o status geral da cobertura
+                total_sentences = len(ideal_answer_sentences)
+                if total_sentences > 0:
+                    coverage_percentage = covered_sentences_count / total_sentences
+                    if coverage_percentage >= MIN_PHRASES_COVERED_PERCENTAGE:
+                        answer_covered = True
+
+                status = "Encontrada (Cobertura Suficiente)" if answer_covered else "Não Encontrada (Cobertura Insuficiente)"
+                print(f"  Status: {status}. Frases cobertas: {covered_sentences_count}/{total_sentences} ({coverage_percentage*100:.2f}%)")
+
+            yield {
                 "pergunta": question,
                 "resposta_ideal": ideal_answer,
-                "status": "Falha no Embedding da Pergunta",
-                "cobertura_detalhes": [],
-                "top_k_chunks_relevantes": []
-            })
-            continue
-
-        # 2. Encontrar chunks relevantes
-        relevant_chunks_with_similarity = get_relevant_chunks(query_embedding, processed_chunks, top_k=top_k_chunks)
-
-        # Preparar detalhes dos chunks relevantes para o relatório
-        top_chunks_report = []
-        for item in relevant_chunks_with_similarity:
-            chunk = item['chunk']
-            top_chunks_report.append({
-                "document_title": chunk.get('document_title', 'N/A'),
-                "chunk_title": chunk.get('chunk_title', 'N/A'),
-                "filepath": chunk.get('document_filepath', 'N/A'),
-                "similarity_to_query": f"{item['similarity']:.4f}",
-                "content_preview": chunk.get('chunk_content', '')[:200] + "..." if len(chunk.get('chunk_content', '')) > 200 else chunk.get('chunk_content', '')
-            })
-
-        # 3. Avaliar cobertura da resposta ideal pelas frases
-        answer_covered = False
-        covered_sentences_count = 0
-        coverage_details = []
-        coverage_percentage = 0.0 # Inicializa coverage_percentage
-
-        # Divide a resposta ideal em frases e as limpa
-        # Usa um regex mais robusto para split de frases, considerando múltiplos delimitadores
-        ideal_answer_sentences_raw = re.split(r'(?<!\w\.\w.)(?<![A-Z][a-z]\.)(?<=\.|\?|\!)\s', ideal_answer)
-        ideal_answer_sentences = [clean_text_for_embedding(s).strip() for s in ideal_answer_sentences_raw if clean_text_for_embedding(s).strip()]
-
-        if not ideal_answer_sentences:
-            print(f"  Aviso: Resposta ideal vazia ou não divisível em frases após limpeza para '{question}'.")
-            status = "Resposta Ideal Vazia/Inválida"
-        else:
-            for ideal_sentence in ideal_answer_sentences:
-                sentence_clean = clean_text_for_embedding(ideal_sentence)
-                if len(sentence_clean) > EMBEDDING_TEXT_MAX_LENGTH:
-                    sentence_clean = sentence_clean[:EMBEDDING_TEXT_MAX_LENGTH]
-                sentence_embedding = embed_func(sentence_clean)
-
-                sentence_covered_by_chunk = False
-                best_similarity_for_sentence = 0.0
-                covered_by_chunk_info = "N/A"
-
-                if sentence_embedding is None:
-                    coverage_details.append({
-                        "frase_ideal": ideal_sentence,
-                        "status": "Falha no Embedding da Frase",
-                        "similaridade_max": 0.0,
-                        "chunk_correspondente": "N/A"
-                    })
-                    continue
-
-                for item in relevant_chunks_with_similarity:
-                    chunk_content_for_embedding = item['chunk'].get('embedding') # Usa o embedding do chunk diretamente
-                    if chunk_content_for_embedding: # Verifica se o embedding do chunk é válido
-                        current_similarity = cosine_similarity(sentence_embedding, chunk_content_for_embedding)
-                        if current_similarity > best_similarity_for_sentence:
-                            best_similarity_for_sentence = current_similarity
-                            covered_by_chunk_info = f"Doc: {item['chunk'].get('document_title', 'N/A')} | Sec: {item['chunk'].get('chunk_title', 'N/A')}"
-
-                        if current_similarity >= MIN_SENTENCE_SIMILARITY_THRESHOLD:
-                            sentence_covered_by_chunk = True
-                            break # Já encontrou um chunk relevante para esta frase
-
-                if sentence_covered_by_chunk:
-                    covered_sentences_count += 1
-
-                coverage_details.append({
-                    "frase_ideal": ideal_sentence,
-                    "status": "Coberta" if sentence_covered_by_chunk else "Não Coberta",
-                    "similaridade_max": f"{best_similarity_for_sentence:.4f}",
-                    "chunk_correspondente": covered_by_chunk_info
-                })
-
-            # Determinar o status geral da cobertura
-            total_sentences = len(ideal_answer_sentences)
-            if total_sentences > 0:
-                coverage_percentage = covered_sentences_count / total_sentences
-                if coverage_percentage >= MIN_PHRASES_COVERED_PERCENTAGE:
-                    answer_covered = True
-
-            status = "Encontrada (Cobertura Suficiente)" if answer_covered else "Não Encontrada (Cobertura Insuficiente)"
-            print(f"  Status: {status}. Frases cobertas: {covered_sentences_count}/{total_sentences} ({coverage_percentage*100:.2f}%)")
-
-        if answer_covered:
-            found_in_top_k_count += 1
-
-        evaluation_results.append({
-            "pergunta": question,
-            "resposta_ideal": ideal_answer,
-            "status": status,
-            "cobertura_detalhes": coverage_details,
-            "top_k_chunks_relevantes": top_chunks_report # Adiciona os chunks mais relevantes para a pergunta
-        })
+                "status": status,
+                "cobertura_detalhes": coverage_details,
+                "top_k_chunks_relevantes": top_chunks_report # Adiciona os chunks mais relevantes para a pergunta
+            }
 
-    # Salvar resultados da avaliação
-    # MODIFICADO: usa output_json_path
-    try:
-        with open(output_json_path, 'w', encoding='utf-8') as f:
-            json.dump(evaluation_results, f, ensure_ascii=False, indent=4)
-        print(f"\nResultados da avaliação salvos em '{output_json_path}'.")
-    except Exception as e:
-        print(f"Erro ao salvar os resultados da avaliação: {e}")
-        return False
 
+def print_evaluation_summary(evaluation_results: Iterable[dict]) -> None:
+    """Imprime o resumo da avaliação (perguntas encontradas e cobertura geral)."""
+    # Percorre os resultados uma única vez: aceita a lista ou a leitura incremental de um JSONL
+    total_questions = 0
+    found_in_top_k_count = 0
+    for item in evaluation_results:
+        total_questions += 1
+        if item['status'].startswith("Encontrada"):
+            found_in_top_k_count += 1
     print(f"\n--- Resumo da Avaliação ---")
     print(f"Total de perguntas avaliadas: {total_questions}")
     if total_questions > 0:
@@ -297,24 +637,53 @@ def evaluate_coverage(
         print(f"Porcentagem de cobertura geral: {(found_in_top_k_count / total_questions * 100):.2f}%")
     else:
         print("Nenhuma pergunta foi avaliada.")
-
-
-    return True
+    print(f"Memória ao final da avaliação: {format_memory_usage()}")
+    summary = cache_summary()
+    if summary:
+        print(summary)
 
 def cli_main():
     """Ponto de entrada de linha de comando para avaliação de cobertura."""
     parser = argparse.ArgumentParser(description="Avalia a cobertura da documentação usando embeddings.")
     parser.add_argument("qa_filepath", help="Caminho para o arquivo CSV de perguntas e respostas ideais.")
-    parser.add_argument("embeddings_filepath", help="Caminho para o arquivo JSON de chunks processados com embeddings.")
+    parser.add_argument("embeddings_filepath", help="Caminho para o arquivo de chunks processados com embeddings (JSON ou store binário .npy).")
     parser.add_argument("-k", "--top_k_chunks", type=int, default=5, help="Número de chunks mais relevantes a considerar (padrão: 5).")
-    parser.add_argument("-o", "--output", default="evaluation_results.json", help="Arquivo de saída para os resultados da avaliação (padrão: evaluation_results.json).")
+    parser.add_argument("-o", "--output", default="evaluation_results.json", help="Arquivo de saída para os resultados da avaliação (padrão: evaluation_results.json). Com extensão .jsonl, cada resultado é gravado assim que a pergunta é avaliada.")
+    parser.add_argument(
+        "--ann",
+        action="store_true",
+        help="Busca os chunks relevantes no índice aproximado (<embeddings>.ivf.npz, criado com 'docs-tc-ann-index') em vez da busca exata.",
+    )
+    parser.add_argument("--nprobe", type=int, help="Partições do índice aproximado visitadas por pergunta (mais partições, mais recall; padrão gravado no índice).")
+    parser.add_argument(
+        "--doc-shortlist",
+        type=int,
+        metavar="N",
+        help="Busca em dois estágios: pontua só os chunks dos N documentos cujo centróide é mais similar à pergunta (índice <embeddings>.docs.npz, criado com 'generate_embeddings --doc-index').",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Retoma uma avaliação interrompida: mantém os resultados já gravados no arquivo .jsonl de saída e avalia só as perguntas restantes.",
+    )
     parser.add_argument(
         "--provider",
-        choices=["gemini", "openai"],
-        help="Provedor usado para gerar embeddings das perguntas (detectado automaticamente).",
+        choices=["gemini", "openai", "local"],
+        help="Provedor usado para gerar embeddings das perguntas (detectado automaticamente); use o mesmo da geração dos embeddings.",
     )
     parser.add_argument("--gemini-api-key", help="Chave da API do Google Gemini (opcional)")
     parser.add_argument("--openai-api-key", help="Chave da API OpenAI (opcional)")
+    parser.add_argument(
+        "--load-mode",
+        choices=["auto", "mmap", "memory"],
+        default="auto",
+        help="Carregamento da matriz de embeddings: mmap (somente leitura, compartilhada entre processos), memory (cópia completa) ou auto (mmap se houver store .npy, padrão).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Máximo de requisições de embedding simultâneas (padrão depende do provedor).",
+    )
     args = parser.parse_args()
 
     success = evaluate_coverage(
@@ -325,6 +694,12 @@ def cli_main():
         provider=args.provider,
         gemini_api_key=args.gemini_api_key,
         openai_api_key=args.openai_api_key,
+        load_mode=args.load_mode,
+        concurrency=args.concurrency,
+        resume=args.resume,
+        ann=args.ann,
+        nprobe=args.nprobe,
+        doc_shortlist=args.doc_shortlist,
     )
     if not success:
         print("\nA avaliação de cobertura da documentação falhou.")
@@ -3,6 +3,8 @@ import re
 import json
 import os
 
+from profiling import span
+
 def extract_docs_from_consolidated_md(input_md_path="corpus_consolidated.md", output_json_path="raw_docs.json"):
     """
     Lê o arquivo MD consolidado, divide-o em documentos individuais
@@ -17,6 +19,29 @@ def extract_docs_from_consolidated_md(input_md_path="corpus_consolidated.md", ou
     with open(input_md_path, 'r', encoding='utf-8') as f:
         full_content = f.read()
 
+    with span("extract.parse") as phase:
+        extracted_docs = extract_docs_from_markdown_text(full_content)
+        phase.set(items=len(extracted_docs))
+
+    # Verifica se algum documento foi realmente extraído
+    if not extracted_docs:
+        print("Atenção: Nenhum documento válido foi extraído do arquivo consolidado.")
+        return False
+
+    try:
+        with span("extract.write"), open(output_json_path, 'w', encoding='utf-8') as f:
+            json.dump(extracted_docs, f, ensure_ascii=False, indent=4)
+        print(f"Extração concluída. Salvou {len(extracted_docs)} documentos em '{output_json_path}'.")
+        return True
+    except Exception as e:
+        print(f"Erro ao salvar o arquivo JSON de documentos brutos: {e}")
+        return False
+
+def extract_docs_from_markdown_text(full_content):
+    """
+    Divide o conteúdo de um MD consolidado em documentos individuais.
+    Retorna uma lista de dicionários com title, slug, content e filepath.
+    """
     # Padrão para identificar o início de um novo documento e capturar o caminho do arquivo
     # E também o conteúdo de metadados
     doc_sections = re.split(r'(^## Arquivo: (.*?)\.md$)', full_content, flags=re.MULTILINE)
@@ -65,19 +90,7 @@ def extract_docs_from_consolidated_md(input_md_path="corpus_consolidated.md", ou
             "filepath": current_doc_filepath
         })
 
-    # Verifica se algum documento foi realmente extraído
-    if not extracted_docs:
-        print("Atenção: Nenhum documento válido foi extraído do arquivo consolidado.")
-        return False
-
-    try:
-        with open(output_json_path, 'w', encoding='utf-8') as f:
-            json.dump(extracted_docs, f, ensure_ascii=False, indent=4)
-        print(f"Extração concluída. Salvou {len(extracted_docs)} documentos em '{output_json_path}'.")
-        return True
-    except Exception as e:
-        print(f"Erro ao salvar o arquivo JSON de documentos brutos: {e}")
-        return False
+    return extracted_docs
 
 def extract_metadata_and_content(doc_full_text, default_filepath):
     """
@@ -0,0 +1,289 @@
+"""Servidor HTTP local que imita as APIs de embeddings da OpenAI e da DeepInfra, para benchmarks reprodutíveis."""
+
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+from embedding_providers import LocalProvider
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+class FakeServerConfig:
+    """
+    Comportamento do servidor falso.
+
+    ``latency_ms`` é a latência média de cada requisição e
+    ``latency_spread_ms`` sua dispersão (amplitude na distribuição uniforme,
+    desvio padrão aproximado na lognormal); ``per_item_latency_ms`` soma um
+    custo por texto do lote. ``rpm`` limita requisições por minuto (0 =
+    sem limite, excedentes recebem 429 com ``Retry-After``);
+    ``rate_limit_rate`` e ``error_rate`` são probabilidades de responder
+    429 ou 5xx aleatoriamente. Lotes com mais de ``max_batch_items`` textos
+    recebem 400.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 1536,
+        latency_ms: float = 50.0,
+        latency_distribution: str = "fixed",
+        latency_spread_ms: float = 0.0,
+        per_item_latency_ms: float = 0.0,
+        rpm: int = 0,
+        rate_limit_rate: float = 0.0,
+        error_rate: float = 0.0,
+        max_batch_items: int = 2048,
+        seed: Optional[int] = 0,
+        verbose: bool = False,
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribuição de latência inválida: '{latency_distribution}'.")
+        self.dimension = dimension
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_spread_ms = latency_spread_ms
+        self.per_item_latency_ms = per_item_latency_ms
+        self.rpm = rpm
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.max_batch_items = max_batch_items
+        self.seed = seed
+        self.verbose = verbose
+
+
+class FakeEmbeddingServer(ThreadingHTTPServer):
+    """
+    Servidor com as rotas ``POST /v1/embeddings`` (formato OpenAI),
+    ``POST /v1/inference/<modelo>`` (formato DeepInfra) e ``GET /stats``.
+
+    Os vetores vêm do provedor local (determinísticos para o mesmo texto).
+    Cada requisição passa, nesta ordem, pelo limite de requisições por
+    minuto, pelas falhas injetadas e pelo limite de tamanho do lote antes
+    de aguardar a latência sorteada.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: FakeServerConfig):
+        super().__init__(address, _FakeEmbeddingHandler)
+        self.config = config
+        self.embedder = LocalProvider(dimension=config.dimension)
+        self.stats: Counter = Counter()
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._accepted: deque = deque()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def sample_latency(self, items: int) -> float:
+        """Latência sorteada (em segundos) para um lote com ``items`` textos."""
+        config = self.config
+        with self._lock:
+            if config.latency_distribution == "uniform":
+                latency = self._random.uniform(
+                    config.latency_ms - config.latency_spread_ms / 2, config.latency_ms + config.latency_spread_ms / 2
+                )
+            elif config.latency_distribution == "exponential":
+                latency = self._random.expovariate(1.0 / config.latency_ms) if config.latency_ms > 0 else 0.0
+            elif config.latency_distribution == "lognormal" and config.latency_ms > 0:
+                sigma = (config.latency_spread_ms / config.latency_ms) if config.latency_spread_ms else 0.0
+                latency = config.latency_ms * self._random.lognormvariate(-sigma * sigma / 2, sigma)
+            else:
+                latency = config.latency_ms
+        return max(0.0, latency + config.per_item_latency_ms * items) / 1000.0
+
+    def admit(self, items: int) -> Optional[Tuple[int, Dict[str, Any], Dict[str, str]]]:
+        """Retorna ``(status, corpo, cabeçalhos)`` de uma falha a simular, ou ``None`` para atender."""
+        config = self.config
+        with self._lock:
+            self.stats["requests"] += 1
+            now = time.monotonic()
+            while self._accepted and now - self._accepted[0] >= 60.0:
+                self._accepted.popleft()
+            if config.rpm and len(self._accepted) >= config.rpm:
+                self.stats["rate_limited"] += 1
+                retry_after = max(1, int(60.0 - (now - self._accepted[0])) + 1)
+                return 429, _error("Rate limit reached for requests", "rate_limit_exceeded"), {"Retry-After": str(retry_after)}
+            if config.rate_limit_rate and self._random.random() < config.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return 429, _error("Rate limit reached for requests", "rate_limit_exceeded"), {"Retry-After": "1"}
+            if config.error_rate and self._random.random() < config.error_rate:
+                self.stats["server_errors"] += 1
+                status = self._random.choice((500, 502, 503))
+                return status, _error("The server had an error while processing your request.", "server_error"), {}
+            if items > config.max_batch_items:
+                self.stats["rejected"] += 1
+                return 400, _error(
+                    f"Too many inputs: {items} > {config.max_batch_items}.", "invalid_request_error"
+                ), {}
+            self._accepted.append(now)
+            return None
+
+    def record_success(self, items: int) -> None:
+        with self._lock:
+            self.stats["ok"] += 1
+            self.stats["texts"] += items
+
+
+def _error(message: str, error_type: str) -> Dict[str, Any]:
+    return {"error": {"message": message, "type": error_type}}
+
+
+class _FakeEmbeddingHandler(BaseHTTPRequestHandler):
+    server: FakeEmbeddingServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.server._lock:
+                self._send(200, dict(self.server.stats))
+        else:
+            self._send(404, _error(f"Unknown path {self.path}", "not_found"))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, _error("Invalid JSON body.", "invalid_request_error"))
+            return
+
+        if self.path.rstrip("/") == "/v1/embeddings":
+            texts = body.get("input", [])
+            texts = [texts] if isinstance(texts, str) else list(texts)
+            api = "openai"
+        elif self.path.startswith("/v1/inference/"):
+            texts = list(body.get("inputs", []))
+            api = "deepinfra"
+        else:
+            self._send(404, _error(f"Unknown path {self.path}", "not_found"))
+            return
+
+        failure = self.server.admit(len(texts))
+        if failure is not None:
+            status, payload, headers = failure
+            self._send(status, payload, headers)
+            return
+
+        time.sleep(self.server.sample_latency(len(texts)))
+        matrix = self.server.embedder.embed_matrix([str(text) for text in texts])
+        tokens = sum(len(str(text)) // 4 + 1 for text in texts)
+        if api == "openai":
+            base64_output = body.get("encoding_format") == "base64"
+            data = [
+                {
+                    "object": "embedding",
+                    "index": index,
+                    "embedding": base64.b64encode(row.astype("<f4").tobytes()).decode("ascii") if base64_output else row.tolist(),
+                }
+                for index, row in enumerate(matrix)
+            ]
+            payload = {
+                "object": "list",
+                "data": data,
+                "model": body.get("model", "fake"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        else:
+            payload = {"embeddings": matrix.tolist(), "input_tokens": tokens}
+        self.server.record_success(len(texts))
+        self._send(200, payload)
+
+    def _send(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):  # noqa: A002 - assinatura de BaseHTTPRequestHandler
+        if self.server.config.verbose:
+            super().log_message(format, *args)
+
+
+def start_server(
+    config: Optional[FakeServerConfig] = None, host: str = "127.0.0.1", port: int = 0
+) -> Tuple[FakeEmbeddingServer, threading.Thread]:
+    """Inicia o servidor em uma thread (porta 0 = porta livre) e o retorna com a thread."""
+    server = FakeEmbeddingServer((host, port), config or FakeServerConfig())
+    thread = threading.Thread(target=server.serve_forever, name="fake-embedding-server", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def environment_for(server: FakeEmbeddingServer) -> Dict[str, str]:
+    """Variáveis de ambiente que apontam o toolkit para ``server``."""
+    return {
+        "DOCS_CLI_OPENAI_BASE_URL": f"{server.base_url}/v1",
+        "DOCS_CLI_DEEPINFRA_BASE_URL": f"{server.base_url}/v1/inference",
+    }
+
+
+def cli_main():
+    """Interface de linha de comando para o servidor de embeddings falso."""
+    parser = argparse.ArgumentParser(
+        description="Servidor local que imita as APIs de embeddings da OpenAI e da DeepInfra (para benchmarks)."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (padrão: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Porta (padrão: 8765; 0 escolhe uma porta livre).")
+    parser.add_argument("--dimension", type=int, default=1536, help="Dimensão dos vetores retornados (padrão: 1536).")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latência média por requisição em ms (padrão: 50).")
+    parser.add_argument(
+        "--latency-distribution",
+        choices=LATENCY_DISTRIBUTIONS,
+        default="fixed",
+        help="Distribuição da latência (padrão: fixed).",
+    )
+    parser.add_argument("--latency-spread-ms", type=float, default=0.0, help="Dispersão da latência em ms (uniform/lognormal).")
+    parser.add_argument("--per-item-latency-ms", type=float, default=0.0, help="Latência adicional por texto do lote, em ms.")
+    parser.add_argument("--rpm", type=int, default=0, help="Limite de requisições por minuto (0 = sem limite); excedentes recebem 429.")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Probabilidade de responder 429 aleatoriamente.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidade de responder 5xx aleatoriamente.")
+    parser.add_argument("--max-batch-items", type=int, default=2048, help="Máximo de textos por requisição (acima disso: 400).")
+    parser.add_argument("--seed", type=int, default=0, help="Semente dos sorteios de latência e falhas (padrão: 0).")
+    parser.add_argument("--verbose", action="store_true", help="Registra cada requisição no console.")
+    args = parser.parse_args()
+
+    config = FakeServerConfig(
+        dimension=args.dimension,
+        latency_ms=args.latency_ms,
+        latency_distribution=args.latency_distribution,
+        latency_spread_ms=args.latency_spread_ms,
+        per_item_latency_ms=args.per_item_latency_ms,
+        rpm=args.rpm,
+        rate_limit_rate=args.rate_limit_rate,
+        error_rate=args.error_rate,
+        max_batch_items=args.max_batch_items,
+        seed=args.seed,
+        verbose=args.verbose,
+    )
+    server = FakeEmbeddingServer((args.host, args.port), config)
+    print(f"Servidor de embeddings falso em {server.base_url}")
+    print("Para apontar o toolkit para ele:")
+    for name, value in environment_for(server).items():
+        print(f"  export {name}={value}")
+    print("Estatísticas em GET /stats. Ctrl+C para encerrar.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nEstatísticas: {json.dumps(dict(server.stats), ensure_ascii=False)}")
+
+
+if __name__ == "__main__":
+    cli_main()
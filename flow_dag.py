@@ -0,0 +1,197 @@
+"""Grafo de dependências das etapas de full_flow/custom_flow, execução concorrente dos ramos independentes e caminho crítico."""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Etapas na ordem usada pelo fluxo completo
+FULL_FLOW_STEPS = (
+    "merge",
+    "clean_csv",
+    "extract",
+    "generate_embeddings",
+    "evaluate",
+    "report_md",
+    "report_html",
+)
+
+# Artefato produzido por cada etapa e artefatos que cada etapa consome.
+# ``embed_questions`` é interna ao executor em processo: gera os embeddings
+# das perguntas enquanto os do corpus ainda estão sendo gerados.
+STEP_OUTPUTS: Dict[str, str] = {
+    "merge": "corpus",
+    "extract": "raw_docs",
+    "generate_embeddings": "embeddings",
+    "clean_csv": "qa_pairs",
+    "embed_questions": "question_embeddings",
+    "evaluate": "evaluation_results",
+    "report_md": "md_report",
+    "report_html": "html_report",
+}
+STEP_INPUTS: Dict[str, tuple] = {
+    "merge": (),
+    "extract": ("corpus",),
+    "generate_embeddings": ("raw_docs",),
+    "clean_csv": (),
+    "embed_questions": ("qa_pairs",),
+    "evaluate": ("qa_pairs", "embeddings", "question_embeddings"),
+    "report_md": ("evaluation_results",),
+    "report_html": ("evaluation_results",),
+}
+
+
+# Sinalizado quando o fluxo é interrompido (Ctrl-C): as etapas rodam em
+# threads, que não recebem o KeyboardInterrupt, e consultam ``check_cancelled``
+_cancelled = threading.Event()
+
+
+class FlowCancelled(Exception):
+    """Levantada numa etapa em andamento quando o fluxo foi interrompido (Ctrl-C)."""
+
+
+def check_cancelled() -> None:
+    """Levanta ``FlowCancelled`` se o fluxo em andamento foi interrompido."""
+    if _cancelled.is_set():
+        raise FlowCancelled("Fluxo interrompido.")
+
+
+class StepTiming:
+    """Início e fim (em segundos desde o início do fluxo) de uma etapa executada."""
+
+    def __init__(self, step: str, start: float, end: float):
+        self.step = step
+        self.start = start
+        self.end = end
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+def step_dependencies(steps: Sequence[str]) -> List[Tuple[int, ...]]:
+    """
+    Para cada posição de ``steps``, as posições anteriores das quais a etapa depende.
+
+    Uma etapa depende das anteriores que produzem um artefato que ela lê,
+    das que leem o artefato que ela vai sobrescrever e das que produzem o
+    mesmo artefato. Etapas posteriores na lista nunca são dependências,
+    então a ordem sequencial continua sendo uma ordem válida.
+    """
+    dependencies = []
+    for index, step in enumerate(steps):
+        output, inputs = STEP_OUTPUTS[step], STEP_INPUTS[step]
+        dependencies.append(tuple(
+            previous_index
+            for previous_index, previous in enumerate(steps[:index])
+            if STEP_OUTPUTS[previous] in inputs
+            or output in STEP_INPUTS[previous]
+            or STEP_OUTPUTS[previous] == output
+        ))
+    return dependencies
+
+
+def run_dag(
+    steps: Sequence[str],
+    dependencies: Sequence[Sequence[int]],
+    run_step: Callable[[int], None],
+    max_workers: int = 1,
+) -> List[StepTiming]:
+    """
+    Executa ``run_step(posição)`` para cada etapa assim que suas dependências terminam.
+
+    Até ``max_workers`` etapas rodam ao mesmo tempo, em threads; entre as
+    prontas, a de menor posição começa primeiro (com ``max_workers=1`` a
+    execução segue a ordem de ``steps``). Se uma etapa falhar, nenhuma nova
+    é iniciada, as que estão em andamento terminam e a exceção é relançada.
+    Com Ctrl-C, o KeyboardInterrupt é relançado sem esperar as etapas em
+    andamento, que são avisadas por ``check_cancelled``.
+    Retorna o tempo de cada etapa, na ordem de ``steps``.
+    """
+    _cancelled.clear()
+    origin = time.perf_counter()
+    timings: List[Optional[StepTiming]] = [None] * len(steps)
+    pending = set(range(len(steps)))
+    done = set()
+    failure: Optional[BaseException] = None
+
+    def timed(index: int) -> StepTiming:
+        start = time.perf_counter() - origin
+        run_step(index)
+        return StepTiming(steps[index], start, time.perf_counter() - origin)
+
+    # Sem ``with``: a saída do bloco esperaria as etapas em andamento mesmo após Ctrl-C
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="flow-step")
+    running = {}
+    try:
+        while pending or running:
+            if failure is None:
+                for index in sorted(pending):
+                    if len(running) >= max_workers:
+                        break
+                    if all(dependency in done for dependency in dependencies[index]):
+                        pending.discard(index)
+                        running[executor.submit(timed, index)] = index
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = running.pop(future)
+                try:
+                    timings[index] = future.result()
+                except BaseException as e:  # inclui SystemExit de etapas que abortam o fluxo
+                    if failure is None:
+                        failure = e
+                else:
+                    done.add(index)
+    except KeyboardInterrupt:
+        _cancelled.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown(wait=True)
+    if failure is not None:
+        raise failure
+    return timings
+
+
+def critical_path(timings: Sequence[StepTiming], dependencies: Sequence[Sequence[int]]) -> Tuple[List[int], float]:
+    """
+    Caminho de maior duração somada no grafo (posições das etapas) e essa duração.
+
+    É o tempo mínimo do fluxo mesmo com concorrência ilimitada: acelerar
+    etapas fora dele não reduz o tempo total.
+    """
+    longest: List[float] = []
+    previous: List[Optional[int]] = []
+    for index, timing in enumerate(timings):
+        best = max(dependencies[index], key=lambda dependency: longest[dependency], default=None)
+        longest.append(timing.duration + (longest[best] if best is not None else 0.0))
+        previous.append(best)
+    if not timings:
+        return [], 0.0
+    index = max(range(len(timings)), key=lambda position: longest[position])
+    total = longest[index]
+    path = []
+    while index is not None:
+        path.append(index)
+        index = previous[index]
+    return path[::-1], total
+
+
+def format_timing_report(timings: Sequence[StepTiming], dependencies: Sequence[Sequence[int]]) -> str:
+    """Relatório de tempo por etapa, com o caminho crítico marcado e o tempo total (wall clock)."""
+    path, path_total = critical_path(timings, dependencies)
+    on_path = set(path)
+    wall_clock = max((timing.end for timing in timings), default=0.0)
+    width = max((len(timing.step) for timing in timings), default=0)
+    lines = ["⏱️ Tempo por etapa (* = caminho crítico):"]
+    for index, timing in enumerate(timings):
+        marker = "*" if index in on_path else " "
+        lines.append(
+            f"  {marker} {timing.step:<{width}}  {timing.duration:8.2f}s  (de {timing.start:.2f}s a {timing.end:.2f}s)"
+        )
+    lines.append(
+        f"Tempo total: {wall_clock:.2f}s (soma das etapas: {sum(timing.duration for timing in timings):.2f}s). "
+        f"Caminho crítico: {' -> '.join(timings[index].step for index in path)} ({path_total:.2f}s)."
+    )
+    return "\n".join(lines)
@@ -2,25 +2,37 @@
 
 import json
 import os
-import google.generativeai as genai
-import openai
 from dotenv import load_dotenv
 import time
 import re
-import requests  # Adicionado para DeepInfra
 import sys  # Garantir importação para uso em cli_main()
+import textwrap
 
+from async_embedding import get_concurrency, run_concurrently
+from ann_index import build_ann_index
+from batching import get_batch_limits, plan_batches
+from embedding_cache import cache_summary
+from embedding_checkpoint import EmbeddingCheckpoint, checkpoint_key, checkpoint_path
+from embedding_providers import DEEPINFRA_EMBEDDING_MODEL, OPENAI_EMBEDDING_MODEL, embedding_namespace, get_provider
+from embedding_store import embeddings_from_chunks, is_store_path, load_embeddings, save_embedding_store, store_paths
+from flow_dag import FlowCancelled
+from lazy_imports import LazyModule
+from profiling import span
 from utils import (
     clean_text_for_embedding,
-    generate_embedding_with_retry,
+    generate_gemini_embeddings_batch,
     GEMINI_EMBEDDING_MODEL,
 )
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
+# Importado só quando o provedor Gemini é usado
+genai = LazyModule("google.generativeai")
+
 # --- Configuração de Modelos de Embedding para cada Provedor ---
-OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"  # Modelo do OpenAI
+# Os modelos padrão (OPENAI_EMBEDDING_MODEL, DEEPINFRA_EMBEDDING_MODEL, ...)
+# ficam em embedding_providers.py
 
 # Limite de tokens/caracteres (ajuste conforme o provedor e modelo)
 # OpenAI 'text-embedding-ada-002' tem um contexto de 8191 tokens.
@@ -101,35 +113,32 @@ def split_content_into_semantic_chunks(document_content, doc_title, filepath, do
 def generate_embedding_deepinfra(texts, api_key):
     """
     Gera embeddings usando a API da DeepInfra/Maritaca para uma lista de textos.
+    Textos já presentes no cache local não são reenviados.
     """
-    url = "https://api.deepinfra.com/v1/inference/intfloat/multilingual-e5-large"
-    headers = {"Authorization": f"bearer {api_key}"}
-    payload = {"inputs": texts}
-    response = requests.post(url, headers=headers, json=payload)
-    if response.status_code == 200:
-        data = response.json()
-        return data["embeddings"]
-    else:
-        print(f"Erro DeepInfra: {response.status_code} {response.text}")
-        return [None] * len(texts)
+    return get_provider("deepinfra", api_key, DEEPINFRA_EMBEDDING_MODEL).embed(texts)
+
 
 def generate_embedding_openai(texts_batch, openai_api_key_to_use):
-    """Gera embeddings usando a API da OpenAI para uma lista de textos."""
-    client = openai.OpenAI(api_key=openai_api_key_to_use)
-    embeddings_list = []
-    try:
-        response = client.embeddings.create(
-            input=texts_batch,
-            model=OPENAI_EMBEDDING_MODEL,
-        )
-        embeddings_list = [item.embedding for item in response.data]
-        return embeddings_list
-    except openai.APIError as e:
-        print(f"Erro OpenAI API: {e}")
-        return [None] * len(texts_batch)
-    except Exception as e:
-        print(f"Erro inesperado ao gerar embeddings com OpenAI: {e}")
-        return [None] * len(texts_batch)
+    """
+    Gera embeddings usando a API da OpenAI para uma lista de textos.
+    Textos já presentes no cache local não são reenviados.
+    """
+    return get_provider("openai", openai_api_key_to_use, OPENAI_EMBEDDING_MODEL).embed(texts_batch)
+
+def write_json_array(path, items):
+    """
+    Grava ``items`` como um array JSON (mesmo formato de ``json.dump(..., indent=4)``)
+    um item por vez, sem montar a lista inteira em memória.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        count = 0
+        for item in items:
+            f.write("[\n" if count == 0 else ",\n")
+            f.write(textwrap.indent(json.dumps(item, ensure_ascii=False, indent=4), "    "))
+            count += 1
+        f.write("\n]" if count else "[]")
+    return count
+
 
 def generate_embeddings_for_docs(
     input_json_path="raw_docs.json",
@@ -138,15 +147,211 @@ def generate_embeddings_for_docs(
     provider="gemini",
     deepinfra_api_key_param=None,
     openai_api_key_param=None,
+    output_format=None,
+    batch_max_items=None,
+    batch_max_chars=None,
+    concurrency=None,
+    resume=False,
+    raw_docs=None,
+    incremental=False,
 ):
     """
     Lê o JSON com dados de documentos (já separados), divide cada um em chunks,
-    gera embeddings para cada chunk, e salva o resultado final em um novo JSON.
-    Suporta Gemini, DeepInfra/Maritaca e OpenAI.
+    gera embeddings para cada chunk, e salva o resultado final em um novo JSON
+    ou, com ``output_format="npy"``, no store binário (matriz ``.npy`` +
+    metadados ``.meta.jsonl``). Se ``output_format`` for omitido, o formato é
+    inferido pela extensão de ``output_json_path``. Se ``raw_docs`` (a lista
+    de documentos) for fornecido, ``input_json_path`` não é lido.
+    Suporta Gemini, DeepInfra/Maritaca, OpenAI e o provedor local (offline,
+    sem chave de API).
+
+    Os chunks de todos os documentos são agrupados em requisições limitadas
+    por ``batch_max_items`` textos e ``batch_max_chars`` caracteres (padrões
+    em ``batching.PROVIDER_BATCH_LIMITS``); a saída mantém a ordem dos chunks
+    nos documentos. Até ``concurrency`` requisições ficam em andamento ao
+    mesmo tempo (padrões em ``async_embedding.PROVIDER_CONCURRENCY``).
+
+    Cada lote concluído é gravado em ``<saída>.partial.jsonl`` (ver
+    ``embedding_checkpoint``) em vez de ficar em memória; a saída final é
+    escrita em streaming a partir desse checkpoint, que é removido ao final.
+    Com ``resume=True``, um checkpoint deixado por uma execução interrompida
+    é reaproveitado e os chunks já presentes nele não são reenviados.
+
+    Com ``incremental=True``, os embeddings dos chunks cujo texto (e
+    provedor/modelo) não mudou são copiados da saída existente, pelo campo
+    ``content_hash`` de cada chunk; só os chunks novos ou alterados são
+    enviados ao provedor.
+    """
+    if output_format is None:
+        output_format = "npy" if is_store_path(output_json_path) else "json"
+
+    with span("generate_embeddings.load") as phase:
+        if raw_docs is None:
+            raw_docs = load_raw_docs(input_json_path)
+            if raw_docs is None:
+                return False
+        phase.set(items=len(raw_docs))
+
+        previous = load_previous_embeddings(output_json_path) if incremental else None
+
+    embedded = _embed_raw_docs(
+        raw_docs,
+        checkpoint_path(output_json_path),
+        provider=provider,
+        gemini_api_key=gemini_api_key_param,
+        deepinfra_api_key=deepinfra_api_key_param,
+        openai_api_key=openai_api_key_param,
+        batch_max_items=batch_max_items,
+        batch_max_chars=batch_max_chars,
+        concurrency=concurrency,
+        resume=resume,
+        previous=previous,
+    )
+    if embedded is None:
+        return False
+    all_processed_chunks, checkpoint, embedding_for = embedded
+
+    if output_format == "npy":
+        try:
+            with span("generate_embeddings.write", items=len(all_processed_chunks)):
+                rows = save_embedding_store(_chunks_with_embeddings(all_processed_chunks, embedding_for), output_json_path)
+            checkpoint.discard()
+            matrix_path, metadata_path = store_paths(output_json_path)
+            print(f"\nGeração de embeddings concluída. Salvou {rows} embeddings em '{matrix_path}' e os metadados de {len(all_processed_chunks)} chunks em '{metadata_path}'.")
+            return True
+        except Exception as e:
+            print(f"Erro ao salvar o store de embeddings: {e}")
+            checkpoint.close()
+            print(f"Os embeddings continuam em '{checkpoint.path}'; use --resume para gravar a saída sem reenviá-los.")
+            return False
+
+    try:
+        with span("generate_embeddings.write", items=len(all_processed_chunks)):
+            write_json_array(output_json_path, _chunks_with_embeddings(all_processed_chunks, embedding_for))
+        checkpoint.discard()
+        print(f"\nGeração de embeddings concluída. Salvou {len(all_processed_chunks)} chunks com embeddings em '{output_json_path}'.")
+        return True
+    except Exception as e:
+        print(f"Erro ao salvar o arquivo JSON: {e}")
+        checkpoint.close()
+        print(f"Os embeddings continuam em '{checkpoint.path}'; use --resume para gravar a saída sem reenviá-los.")
+        return False
+
+
+def embed_documents(
+    raw_docs,
+    checkpoint_file,
+    provider="gemini",
+    gemini_api_key=None,
+    deepinfra_api_key=None,
+    openai_api_key=None,
+    batch_max_items=None,
+    batch_max_chars=None,
+    concurrency=None,
+    resume=False,
+):
+    """
+    Versão em memória de ``generate_embeddings_for_docs``: gera os embeddings
+    dos chunks de ``raw_docs`` e retorna ``(chunks, matriz)`` no mesmo formato
+    de ``embedding_store.load_embeddings``, sem gravar arquivo de saída.
+
+    O checkpoint ``checkpoint_file`` continua sendo usado durante a geração
+    (e pode ser retomado com ``resume=True``); ele é removido ao final.
+    Retorna ``None`` se nenhum chunk for processado ou se a geração for
+    interrompida.
+    """
+    embedded = _embed_raw_docs(
+        raw_docs,
+        checkpoint_file,
+        provider=provider,
+        gemini_api_key=gemini_api_key,
+        deepinfra_api_key=deepinfra_api_key,
+        openai_api_key=openai_api_key,
+        batch_max_items=batch_max_items,
+        batch_max_chars=batch_max_chars,
+        concurrency=concurrency,
+        resume=resume,
+    )
+    if embedded is None:
+        return None
+    all_processed_chunks, checkpoint, embedding_for = embedded
+    chunks, matrix = embeddings_from_chunks(_chunks_with_embeddings(all_processed_chunks, embedding_for))
+    checkpoint.discard()
+    print(f"\nGeração de embeddings concluída: {matrix.shape[0]} embeddings de {len(all_processed_chunks)} chunks.")
+    return chunks, matrix
+
+
+def load_raw_docs(input_json_path):
+    """Lê a lista de documentos de ``input_json_path`` (saída da extração) ou retorna ``None`` em caso de erro."""
+    if not os.path.exists(input_json_path):
+        print(f"Erro: O arquivo '{input_json_path}' não foi encontrado. Por favor, execute o script de extração (ex: 'extract_consolidated_md_to_raw_json.py') primeiro.")
+        return None
+
+    print(f"Gerando embeddings para documentos de '{input_json_path}'...")
+
+    try:
+        with open(input_json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"Erro ao decodificar JSON de '{input_json_path}': {e}")
+        return None
+    except Exception as e:
+        print(f"Erro inesperado ao carregar '{input_json_path}': {e}")
+        return None
+
+
+def load_previous_embeddings(output_path):
+    """
+    Embeddings de uma execução anterior gravada em ``output_path``, como
+    ``{content_hash: vetor}``, ou ``None`` se não houver saída anterior.
+    """
+    existing_path = store_paths(output_path)[0] if is_store_path(output_path) else output_path
+    if not os.path.exists(existing_path):
+        return None
+    try:
+        # Em memória (sem mmap): a saída será sobrescrita enquanto os vetores são copiados
+        chunks, matrix = load_embeddings(output_path, load_mode="memory")
+    except Exception as e:
+        print(f"Aviso: não foi possível ler os embeddings anteriores de '{output_path}' ({e}); todos os chunks serão gerados.")
+        return None
+    return {chunk["content_hash"]: matrix[chunk["row"]] for chunk in chunks if chunk.get("content_hash")}
+
+
+def _chunks_with_embeddings(all_processed_chunks, embedding_for):
+    """Chunks na ordem original, cada um com o embedding de ``embedding_for(posição)`` (ou ``None``)."""
+    for position, chunk in enumerate(all_processed_chunks):
+        yield dict(chunk, embedding=embedding_for(position))
+
+
+def _embed_raw_docs(
+    raw_docs,
+    checkpoint_file,
+    provider="gemini",
+    gemini_api_key=None,
+    deepinfra_api_key=None,
+    openai_api_key=None,
+    batch_max_items=None,
+    batch_max_chars=None,
+    concurrency=None,
+    resume=False,
+    previous=None,
+):
+    """
+    Divide ``raw_docs`` em chunks e grava os embeddings no checkpoint.
+
+    Chunks cujo ``content_hash`` está em ``previous`` (ver
+    ``load_previous_embeddings``) reaproveitam o vetor anterior e não são
+    reenviados.
+
+    Retorna ``(chunks, checkpoint, embedding_for)``: os chunks (sem os
+    vetores), o ``EmbeddingCheckpoint`` ainda aberto e a função que devolve
+    o embedding do chunk em cada posição. Retorna ``None`` se não houver
+    chunks ou se a geração for interrompida (o checkpoint é preservado para
+    ``--resume``).
     """
-    actual_gemini_api_key = gemini_api_key_param or os.getenv("GOOGLE_API_KEY")
-    actual_openai_api_key = openai_api_key_param or os.getenv("OPENAI_API_KEY")
-    actual_deepinfra_api_key = deepinfra_api_key_param or os.getenv("DEEPINFRA_API_KEY")
+    actual_gemini_api_key = gemini_api_key or os.getenv("GOOGLE_API_KEY")
+    actual_openai_api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
+    actual_deepinfra_api_key = deepinfra_api_key or os.getenv("DEEPINFRA_API_KEY")
 
     if provider.lower() == "gemini" and not actual_gemini_api_key:
         raise ValueError(
@@ -164,105 +369,148 @@ def generate_embeddings_for_docs(
         if provider.lower() == "gemini":
             configure_api(actual_gemini_api_key)
 
-    if not os.path.exists(input_json_path):
-        print(f"Erro: O arquivo '{input_json_path}' não foi encontrado. Por favor, execute o script de extração (ex: 'extract_consolidated_md_to_raw_json.py') primeiro.")
-        return False
-
-    print(f"Gerando embeddings para documentos de '{input_json_path}'...")
-
-    try:
-        with open(input_json_path, 'r', encoding='utf-8') as f:
-            raw_docs = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"Erro ao decodificar JSON de '{input_json_path}': {e}")
-        return False
-    except Exception as e:
-        print(f"Erro inesperado ao carregar '{input_json_path}': {e}")
-        return False
-
-    all_processed_chunks = [] 
+    all_processed_chunks = []
+    # Posições (em all_processed_chunks) e textos dos chunks que precisam de embedding
+    pending_positions = []
+    pending_texts = []
     total_raw_docs = len(raw_docs)
-    
-    for i, doc_data in enumerate(raw_docs):
-        doc_title = doc_data.get("title", "Título Desconhecido")
-        doc_content_full = doc_data.get("content", "")
-        file_path_relative = doc_data.get("filepath", "N/A")
-        doc_slug = doc_data.get("slug", "")
+    namespace = embedding_namespace(provider)
 
-        print(f"\n--- Processando documento {i + 1}/{total_raw_docs}: '{doc_title}' ({file_path_relative}) ---")
-        chunks_for_doc = split_content_into_semantic_chunks(doc_content_full, doc_title, file_path_relative, doc_slug)
-        if not chunks_for_doc:
-            print(f"Atenção: Nenhum chunk válido gerado para o documento '{doc_title}'. Pulando.")
-            continue
+    with span("generate_embeddings.chunk", items=total_raw_docs):
+        for i, doc_data in enumerate(raw_docs):
+            doc_title = doc_data.get("title", "Título Desconhecido")
+            doc_content_full = doc_data.get("content", "")
+            file_path_relative = doc_data.get("filepath", "N/A")
+            doc_slug = doc_data.get("slug", "")
 
-        # Preparar textos para embedding em lote (para OpenAI e DeepInfra)
-        texts_for_batch_embedding = []
-        chunks_for_batch_processing = []
-        for chunk_idx, chunk in enumerate(chunks_for_doc):
-            embedding_text_raw = f"Documento: {chunk['document_title']}. Seção: {chunk['chunk_title']}. Conteúdo: {chunk['chunk_content']}"
-            embedding_text_cleaned = clean_text_for_embedding(embedding_text_raw)
-            current_max_len = EMBEDDING_TEXT_MAX_LENGTH_GEMINI
-            if provider.lower() == "openai":
-                current_max_len = EMBEDDING_TEXT_MAX_LENGTH_OPENAI
-            if len(embedding_text_cleaned) > current_max_len:
-                embedding_text_cleaned = embedding_text_cleaned[:current_max_len]
-                print(
-                    f"  Truncando chunk {chunk_idx+1} de '{chunk['chunk_title']}' para {current_max_len} caracteres para embedding."
-                )
+            print(f"\n--- Processando documento {i + 1}/{total_raw_docs}: '{doc_title}' ({file_path_relative}) ---")
+            chunks_for_doc = split_content_into_semantic_chunks(doc_content_full, doc_title, file_path_relative, doc_slug)
+            if not chunks_for_doc:
+                print(f"Atenção: Nenhum chunk válido gerado para o documento '{doc_title}'. Pulando.")
+                continue
+
+            for chunk_idx, chunk in enumerate(chunks_for_doc):
+                embedding_text_raw = f"Documento: {chunk['document_title']}. Seção: {chunk['chunk_title']}. Conteúdo: {chunk['chunk_content']}"
+                embedding_text_cleaned = clean_text_for_embedding(embedding_text_raw)
+                current_max_len = EMBEDDING_TEXT_MAX_LENGTH_GEMINI
+                if provider.lower() == "openai":
+                    current_max_len = EMBEDDING_TEXT_MAX_LENGTH_OPENAI
+                if len(embedding_text_cleaned) > current_max_len:
+                    embedding_text_cleaned = embedding_text_cleaned[:current_max_len]
+                    print(
+                        f"  Truncando chunk {chunk_idx+1} de '{chunk['chunk_title']}' para {current_max_len} caracteres para embedding."
+                    )
 
-            if not embedding_text_cleaned.strip():
-                print(
-                    f"  Atenção: Texto limpo para embedding vazio para chunk '{chunk['chunk_title']}'. Pulando embedding."
-                )
-                chunk["embedding"] = None
-                all_processed_chunks.append(chunk)
-            else:
-                if provider.lower() == "gemini":
+                if not embedding_text_cleaned.strip():
                     print(
-                        f"  Gerando embedding (Gemini) para chunk {chunk_idx+1} de '{chunk['chunk_title']}'..."
+                        f"  Atenção: Texto limpo para embedding vazio para chunk '{chunk['chunk_title']}'. Pulando embedding."
                     )
-                    chunk_embedding = generate_embedding_with_retry(
-                        embedding_text_cleaned,
-                        actual_gemini_api_key,
-                        model=GEMINI_EMBEDDING_MODEL,
-                    )
-                    if chunk_embedding is not None:
-                        chunk["embedding"] = chunk_embedding
-                    else:
-                        print(
-                            f"  Atenção: Falha ao gerar embedding (Gemini) para chunk '{chunk['chunk_title']}'."
-                        )
-                        chunk["embedding"] = None
-                    all_processed_chunks.append(chunk)
                 else:
-                    texts_for_batch_embedding.append(embedding_text_cleaned)
-                    chunks_for_batch_processing.append(chunk)
-
-        if provider.lower() == "openai" and texts_for_batch_embedding:
-            print(f"  Gerando embeddings para {len(texts_for_batch_embedding)} chunks com OpenAI...")
-            embeddings_batch = generate_embedding_openai(texts_for_batch_embedding, actual_openai_api_key)
-            for chunk, embedding in zip(chunks_for_batch_processing, embeddings_batch):
-                chunk["embedding"] = embedding
-                all_processed_chunks.append(chunk)
-        elif provider.lower() in ["deepinfra", "maritaca"] and texts_for_batch_embedding:
-            print(f"  Gerando embeddings para {len(texts_for_batch_embedding)} chunks com DeepInfra...")
-            embeddings_batch = generate_embedding_deepinfra(texts_for_batch_embedding, actual_deepinfra_api_key)
-            for chunk, embedding in zip(chunks_for_batch_processing, embeddings_batch):
-                chunk["embedding"] = embedding
+                    # Hash do texto enviado (e do modelo): permite reaproveitar o vetor em execuções incrementais
+                    chunk["content_hash"] = checkpoint_key(namespace, embedding_text_cleaned)
+                    pending_positions.append(len(all_processed_chunks))
+                    pending_texts.append(embedding_text_cleaned)
+                chunk["embedding"] = None
                 all_processed_chunks.append(chunk)
+
+    pending_keys = [all_processed_chunks[position]["content_hash"] for position in pending_positions]
+    position_keys = dict(zip(pending_positions, pending_keys))
+    reused = {}
+    if previous is not None:
+        reused = {position: previous[key] for position, key in position_keys.items() if key in previous}
+        remaining = [index for index, position in enumerate(pending_positions) if position not in reused]
+        print(
+            f"\nAtualização incremental: {len(reused)} chunks inalterados reaproveitados da saída anterior, "
+            f"{len(remaining)} novos ou alterados."
+        )
+        pending_texts = [pending_texts[index] for index in remaining]
+        pending_keys = [pending_keys[index] for index in remaining]
+        pending_positions = [pending_positions[index] for index in remaining]
+
+    checkpoint = EmbeddingCheckpoint(checkpoint_file, resume=resume)
+    if resume and len(checkpoint):
+        remaining = [index for index, key in enumerate(pending_keys) if key not in checkpoint]
+        print(
+            f"\nRetomando a partir de '{checkpoint.path}': {len(pending_texts) - len(remaining)} chunks já têm embedding, "
+            f"{len(remaining)} restantes."
+        )
+        pending_texts = [pending_texts[index] for index in remaining]
+        pending_keys = [pending_keys[index] for index in remaining]
+        pending_positions = [pending_positions[index] for index in remaining]
+
+    if pending_texts:
+        # Lotes montados com chunks de todos os documentos, dentro do orçamento do provedor
+        limits = get_batch_limits(provider, max_items=batch_max_items, max_chars=batch_max_chars)
+        batches = plan_batches(pending_texts, max_chars=limits["max_chars"], max_items=limits["max_items"])
+        provider_label = {"openai": "OpenAI", "gemini": "Gemini", "local": "Local"}.get(provider.lower(), "DeepInfra")
+        max_in_flight = get_concurrency(provider, concurrency)
+        print(
+            f"\nGerando embeddings para {len(pending_texts)} chunks com {provider_label} em {len(batches)} requisições "
+            f"(até {limits['max_items']} textos / {limits['max_chars']} caracteres por requisição, "
+            f"{max_in_flight} simultâneas)..."
+        )
+
+        def embed_batch(batch):
+            batch_texts = [pending_texts[index] for index in batch]
+            if provider.lower() == "gemini":
+                return generate_gemini_embeddings_batch(
+                    batch_texts, actual_gemini_api_key, model=GEMINI_EMBEDDING_MODEL
+                )
+            elif provider.lower() == "openai":
+                return generate_embedding_openai(batch_texts, actual_openai_api_key)
+            elif provider.lower() == "local":
+                return get_provider("local").embed(batch_texts)
+            return generate_embedding_deepinfra(batch_texts, actual_deepinfra_api_key)
+
+        completed = [0]
+
+        def store_batch(batch_number, embeddings_batch):
+            # Chamado à medida que cada requisição termina (em qualquer ordem)
+            batch = batches[batch_number]
+            completed[0] += 1
+            print(
+                f"  Lote {batch_number + 1}/{len(batches)} concluído ({completed[0]}/{len(batches)}): "
+                f"{len(batch)} chunks, {sum(len(pending_texts[index]) for index in batch)} caracteres"
+            )
+            for index, embedding in zip(batch, embeddings_batch):
+                if embedding is None:
+                    chunk = all_processed_chunks[pending_positions[index]]
+                    print(f"  Atenção: Falha ao gerar embedding ({provider_label}) para chunk '{chunk['chunk_title']}'.")
+            # Os vetores vão para o checkpoint em disco, não para os chunks em memória
+            checkpoint.append_many([pending_keys[index] for index in batch], embeddings_batch)
+
+        try:
+            with span("generate_embeddings.embed", items=len(pending_texts)):
+                run_concurrently(batches, embed_batch, concurrency=max_in_flight, on_result=store_batch)
+        except (KeyboardInterrupt, FlowCancelled):
+            checkpoint.close()
+            print(
+                f"\nInterrompido. {len(checkpoint)} embeddings preservados em '{checkpoint.path}'; "
+                "execute novamente com --resume para continuar de onde parou."
+            )
+            return None
+        except ImportError as e:
+            checkpoint.close()
+            print(f"Erro de configuração do provedor {provider_label}: {e}")
+            return None
 
     if not all_processed_chunks:
+        checkpoint.discard()
         print("Nenhum chunk processado com sucesso (sem embeddings ou dados de entrada).")
-        return False
+        return None
+
+    summary = cache_summary()
+    if summary:
+        print(summary)
+
+    def embedding_for(position):
+        if position in reused:
+            return reused[position].tolist()
+        key = position_keys.get(position)
+        return checkpoint.get(key) if key else None
+
+    return all_processed_chunks, checkpoint, embedding_for
 
-    try:
-        with open(output_json_path, 'w', encoding='utf-8') as f:
-            json.dump(all_processed_chunks, f, ensure_ascii=False, indent=4)
-        print(f"\nGeração de embeddings concluída. Salvou {len(all_processed_chunks)} chunks com embeddings em '{output_json_path}'.")
-        return True
-    except Exception as e:
-        print(f"Erro ao salvar o arquivo JSON: {e}")
-        return False
 
 def cli_main():
     """Interface de linha de comando para gerar embeddings."""
@@ -273,12 +521,41 @@ def cli_main():
     parser.add_argument("--gemini-api-key", help="Chave da API do Google Gemini (opcional, pode ser fornecida via GOOGLE_API_KEY no .env)")
     parser.add_argument(
         "--provider",
-        choices=["gemini", "deepinfra", "maritaca", "openai"],
+        choices=["gemini", "deepinfra", "maritaca", "openai", "local"],
         default="gemini",
-        help="Provedor de embeddings: gemini (padrão), deepinfra, maritaca ou openai.",
+        help="Provedor de embeddings: gemini (padrão), deepinfra, maritaca, openai ou local (offline, sem chave de API).",
     )
     parser.add_argument("--deepinfra-api-key", help="Chave da API DeepInfra/Maritaca (opcional, pode ser fornecida via DEEPINFRA_API_KEY no .env)")
     parser.add_argument("--openai-api-key", help="Chave da API OpenAI (opcional, pode ser fornecida via OPENAI_API_KEY no .env)")
+    parser.add_argument(
+        "--format",
+        choices=["json", "npy"],
+        default=None,
+        help="Formato de saída: json ou npy (matriz .npy + metadados .meta.jsonl). Inferido pela extensão se omitido.",
+    )
+    parser.add_argument("--batch-max-items", type=int, help="Máximo de textos por requisição (padrão depende do provedor).")
+    parser.add_argument("--batch-max-chars", type=int, help="Máximo de caracteres somados por requisição (padrão depende do provedor).")
+    parser.add_argument("--concurrency", type=int, help="Máximo de requisições de embedding simultâneas (padrão depende do provedor).")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Retoma uma geração interrompida a partir do checkpoint <saída>.partial.jsonl, sem reenviar os chunks já processados.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reaproveita da saída existente os embeddings dos chunks inalterados; só chunks novos ou alterados são enviados.",
+    )
+    parser.add_argument(
+        "--ann",
+        action="store_true",
+        help="Cria também o índice aproximado (IVF, <saída>.ivf.npz) usado por 'evaluate --ann' em corpora muito grandes.",
+    )
+    parser.add_argument(
+        "--doc-index",
+        action="store_true",
+        help="Cria também o índice de centróides por documento (<saída>.docs.npz) usado por 'evaluate --doc-shortlist'.",
+    )
     args = parser.parse_args()
     success = generate_embeddings_for_docs(
         args.input_json_path,
@@ -287,7 +564,17 @@ def cli_main():
         provider=args.provider,
         deepinfra_api_key_param=args.deepinfra_api_key,
         openai_api_key_param=args.openai_api_key,
+        output_format=args.format,
+        batch_max_items=args.batch_max_items,
+        batch_max_chars=args.batch_max_chars,
+        concurrency=args.concurrency,
+        resume=args.resume,
+        incremental=args.incremental,
     )
+    if success and args.ann:
+        success = build_ann_index(args.output_json_path)
+    if success and args.doc_index:
+        success = build_ann_index(args.output_json_path, documents=True)
     if not success:
         print("A geração de embeddings falhou.")
         sys.exit(1)
@@ -4,6 +4,9 @@ import json
 import os
 from datetime import datetime
 
+from profiling import span
+from results_io import load_results
+
 def generate_md_report(evaluation_json_path="evaluation_results.json", output_md_path="coverage_report.md", top_k_chunks=5):
     """
     Gera um relatório Markdown a partir do JSON de avaliação.
@@ -14,8 +17,8 @@ def generate_md_report(evaluation_json_path="evaluation_results.json", output_md
 
     print(f"Lendo dados de avaliação de '{evaluation_json_path}'...")
     try:
-        with open(evaluation_json_path, 'r', encoding='utf-8') as f:
-            evaluation_results = json.load(f)
+        # Aceita tanto a lista JSON quanto o JSONL gravado incrementalmente (--output *.jsonl)
+        evaluation_results = load_results(evaluation_json_path)
     except json.JSONDecodeError as e:
         print(f"Erro ao decodificar JSON de '{evaluation_json_path}': {e}")
         return False
@@ -23,6 +26,13 @@ def generate_md_report(evaluation_json_path="evaluation_results.json", output_md
         print(f"Erro inesperado ao carregar '{evaluation_json_path}': {e}")
         return False
 
+    return write_md_report(evaluation_results, output_md_path, top_k_chunks)
+
+def write_md_report(evaluation_results, output_md_path="coverage_report.md", top_k_chunks=5):
+    """
+    Gera o relatório Markdown a partir dos resultados de avaliação já carregados
+    (lista de dicionários no formato de evaluation_results.json).
+    """
     if not evaluation_results:
         print("Atenção: Nenhum resultado de avaliação válido encontrado no JSON.")
         return False
@@ -90,7 +100,7 @@ def generate_md_report(evaluation_json_path="evaluation_results.json", output_md
             md_content += "* Nenhum chunk relevante encontrado.\n\n"
     
     try:
-        with open(output_md_path, 'w', encoding='utf-8') as f:
+        with span("report_md.write", items=len(evaluation_results)), open(output_md_path, 'w', encoding='utf-8') as f:
             f.write(md_content)
         print(f"Relatório Markdown gerado com sucesso em '{output_md_path}'.")
         return True
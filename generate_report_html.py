@@ -12,6 +12,9 @@ from datetime import datetime
 import argparse # Make sure argparse is imported
 import sys      # Make sure sys is imported
 
+from profiling import span
+from results_io import load_results
+
 # ... (keep your generate_html_report function as is) ...
 def generate_html_report(evaluation_json_path="evaluation_results.json", output_html_path="coverage_report.html", top_k_chunks=5):
     """Gera um relatório HTML a partir do JSON de avaliação.
@@ -27,8 +30,8 @@ def generate_html_report(evaluation_json_path="evaluation_results.json", output_
 
     print(f"Lendo dados de avaliação de '{evaluation_json_path}'...")
     try:
-        with open(evaluation_json_path, 'r', encoding='utf-8') as f:
-            evaluation_results = json.load(f)
+        # Aceita tanto a lista JSON quanto o JSONL gravado incrementalmente (--output *.jsonl)
+        evaluation_results = load_results(evaluation_json_path)
     except json.JSONDecodeError as e:
         print(f"Erro ao decodificar JSON de '{evaluation_json_path}': {e}")
         return False
@@ -36,6 +39,13 @@ def generate_html_report(evaluation_json_path="evaluation_results.json", output_
         print(f"Erro inesperado ao carregar '{evaluation_json_path}': {e}")
         return False
 
+    return write_html_report(evaluation_results, output_html_path, top_k_chunks)
+
+def write_html_report(evaluation_results, output_html_path="coverage_report.html", top_k_chunks=5):
+    """
+    Gera o relatório HTML a partir dos resultados de avaliação já carregados
+    (lista de dicionários no formato de evaluation_results.json).
+    """
     if not evaluation_results:
         print("Atenção: Nenhum resultado de avaliação válido encontrado no JSON.")
         return False
@@ -182,7 +192,7 @@ def generate_html_report(evaluation_json_path="evaluation_results.json", output_
     """
 
     try:
-        with open(output_html_path, 'w', encoding='utf-8') as f:
+        with span("report_html.write", items=len(evaluation_results)), open(output_html_path, 'w', encoding='utf-8') as f:
             f.write(html_content)
         print(f"Relatório HTML gerado com sucesso em '{output_html_path}'.")
         return True
@@ -0,0 +1,46 @@
+"""Importação sob demanda de bibliotecas pesadas (SDKs dos provedores de embeddings e pandas)."""
+
+import importlib
+import threading
+from types import ModuleType
+
+
+class LazyModule:
+    """
+    Referência a um módulo que só é importado no primeiro acesso a um atributo.
+
+    Cada etapa do ``docs-cli`` roda em um interpretador novo; importar os SDKs
+    (``google.generativeai``, ``openai``, ``requests``) e o pandas no
+    carregamento dos scripts custaria segundos por etapa mesmo quando o
+    caminho executado não os usa (``--help``, provedor local, relatórios).
+
+    Se o módulo não estiver instalado, o acesso ao atributo levanta
+    ``ImportError`` (e não ``AttributeError``), com a mensagem original.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            with self.__dict__["_lock"]:
+                module = self.__dict__["_module"]
+                if module is None:
+                    module = importlib.import_module(self.__dict__["_name"])
+                    self.__dict__["_module"] = module
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        """Indica se o módulo já foi importado."""
+        return self.__dict__["_module"] is not None
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        state = "importado" if self.loaded else "não importado"
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
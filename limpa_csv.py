@@ -8,13 +8,18 @@ Autor: Paulo Duarte
 Data: 2024-03-19
 """
 
-import pandas as pd
 import os
 from pathlib import Path
 import argparse
 import sys
 import re
 
+from lazy_imports import LazyModule
+from profiling import span
+
+# Importado na primeira leitura de CSV (--help e clean_text não precisam dele)
+pd = LazyModule("pandas")
+
 def clean_text(text):
     """
     Realiza limpeza básica do texto
@@ -54,74 +59,22 @@ def clean_csv_data(input_file, output_file=None, question_col='question',
         dict: Estatísticas do processamento
     """
     
-    # Padrões padrão de respostas inválidas se nenhum for fornecido
-    if invalid_patterns is None:
-        invalid_patterns = [
-            "Please select from dropdown",
-            "Enter filename",
-            "1 2 3 4 5",
-            "Use + or - signs",
-            "Select an option",
-            "Click here",
-            "Choose from",
-            "Please choose",
-            "Select from",
-            "Choose one",
-            "Select one"
-        ]
-    
     try:
         # Ler o arquivo CSV
         print(f"📖 Lendo arquivo: {input_file}")
-        df = pd.read_csv(input_file, encoding=encoding)
-        
-        # Verificar se as colunas existem
-        required_cols = [question_col, response_col]
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            raise ValueError(f"Colunas não encontradas no CSV: {', '.join(missing_cols)}")
+        with span("clean_csv.read") as phase:
+            df = pd.read_csv(input_file, encoding=encoding)
+            phase.set(items=len(df))
         
-        print(f"✅ Arquivo carregado com sucesso!")
-        print(f"📊 Linhas originais: {len(df)}")
-        print(f"📋 Colunas: {list(df.columns)}")
-        
-        # Criar cópia para trabalhar
-        df_clean = df.copy()
-        
-        # Contador de linhas removidas por motivo
-        removal_stats = {
-            'invalid_patterns': 0,
-            'short_responses': 0,
-            'empty_responses': 0,
-            'duplicates': 0
-        }
-        
-        # Remover linhas com respostas vazias
-        empty_mask = df_clean[response_col].isna() | (df_clean[response_col].astype(str).str.strip() == '')
-        removal_stats['empty_responses'] = empty_mask.sum()
-        df_clean = df_clean[~empty_mask]
-        
-        # Remover linhas com respostas muito curtas
-        short_mask = df_clean[response_col].astype(str).str.len() < min_length
-        removal_stats['short_responses'] = short_mask.sum()
-        df_clean = df_clean[~short_mask]
-        
-        # Remover linhas que contêm os padrões inválidos
-        for pattern in invalid_patterns:
-            mask = df_clean[response_col].astype(str).str.contains(pattern, case=False, na=False)
-            if mask.any():
-                df_clean = df_clean[~mask]
-                removal_stats['invalid_patterns'] += mask.sum()
-                print(f"🗑️  Removidas {mask.sum()} linhas com padrão: '{pattern}'")
-        
-        # Remover duplicatas
-        original_len = len(df_clean)
-        df_clean = df_clean.drop_duplicates(subset=[question_col, response_col])
-        removal_stats['duplicates'] = original_len - len(df_clean)
-        
-        # Limpar o texto das respostas se solicitado
-        if clean_text_flag:
-            df_clean[response_col] = df_clean[response_col].apply(clean_text)
+        with span("clean_csv.clean", items=len(df)):
+            df_clean, removal_stats = clean_qa_dataframe(
+                df,
+                question_col=question_col,
+                response_col=response_col,
+                min_length=min_length,
+                invalid_patterns=invalid_patterns,
+                clean_text_flag=clean_text_flag,
+            )
         
         # Gerar nome do arquivo de saída se não fornecido
         if output_file is None:
@@ -129,21 +82,11 @@ def clean_csv_data(input_file, output_file=None, question_col='question',
             output_file = input_path.parent / f"{input_path.stem}_clean{input_path.suffix}"
         
         # Salvar arquivo limpo
-        df_clean.to_csv(output_file, index=False, encoding=encoding)
+        with span("clean_csv.write", items=len(df_clean)):
+            df_clean.to_csv(output_file, index=False, encoding=encoding)
         print(f"💾 Arquivo limpo salvo: {output_file}")
         
-        # Preparar estatísticas
-        total_removed = sum(removal_stats.values())
-        stats = {
-            'original_rows': len(df),
-            'removed_rows': total_removed,
-            'final_rows': len(df_clean),
-            'removal_rate': (total_removed / len(df)) * 100,
-            'removal_details': removal_stats,
-            'output_file': str(output_file)
-        }
-        
-        return stats
+        return cleaning_stats(df, df_clean, removal_stats, output_file)
         
     except FileNotFoundError:
         print(f"❌ Erro: Arquivo '{input_file}' não encontrado!")
@@ -152,6 +95,112 @@ def clean_csv_data(input_file, output_file=None, question_col='question',
         print(f"❌ Erro durante o processamento: {str(e)}")
         return None
 
+def clean_qa_dataframe(df, question_col='question', response_col='response', min_length=10,
+                       invalid_patterns=None, clean_text_flag=True):
+    """
+    Aplica a limpeza de clean_csv_data a um DataFrame já carregado, sem ler ou gravar arquivos
+    
+    Args:
+        df (pandas.DataFrame): Dados originais (não são modificados)
+        question_col (str): Nome da coluna de perguntas
+        response_col (str): Nome da coluna de respostas
+        min_length (int): Tamanho mínimo para considerar uma resposta válida
+        invalid_patterns (list): Lista de padrões inválidos para remover
+        clean_text_flag (bool): Se deve limpar o texto das respostas
+    
+    Returns:
+        tuple: (DataFrame limpo, contagem de linhas removidas por motivo)
+    """
+    
+    # Padrões padrão de respostas inválidas se nenhum for fornecido
+    if invalid_patterns is None:
+        invalid_patterns = [
+            "Please select from dropdown",
+            "Enter filename",
+            "1 2 3 4 5",
+            "Use + or - signs",
+            "Select an option",
+            "Click here",
+            "Choose from",
+            "Please choose",
+            "Select from",
+            "Choose one",
+            "Select one"
+        ]
+    
+    # Verificar se as colunas existem
+    required_cols = [question_col, response_col]
+    missing_cols = [col for col in required_cols if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Colunas não encontradas no CSV: {', '.join(missing_cols)}")
+    
+    print(f"✅ Arquivo carregado com sucesso!")
+    print(f"📊 Linhas originais: {len(df)}")
+    print(f"📋 Colunas: {list(df.columns)}")
+    
+    # Criar cópia para trabalhar
+    df_clean = df.copy()
+    
+    # Contador de linhas removidas por motivo
+    removal_stats = {
+        'invalid_patterns': 0,
+        'short_responses': 0,
+        'empty_responses': 0,
+        'duplicates': 0
+    }
+    
+    # Remover linhas com respostas vazias
+    empty_mask = df_clean[response_col].isna() | (df_clean[response_col].astype(str).str.strip() == '')
+    removal_stats['empty_responses'] = empty_mask.sum()
+    df_clean = df_clean[~empty_mask]
+    
+    # Remover linhas com respostas muito curtas
+    short_mask = df_clean[response_col].astype(str).str.len() < min_length
+    removal_stats['short_responses'] = short_mask.sum()
+    df_clean = df_clean[~short_mask]
+    
+    # Remover linhas que contêm os padrões inválidos
+    for pattern in invalid_patterns:
+        mask = df_clean[response_col].astype(str).str.contains(pattern, case=False, na=False)
+        if mask.any():
+            df_clean = df_clean[~mask]
+            removal_stats['invalid_patterns'] += mask.sum()
+            print(f"🗑️  Removidas {mask.sum()} linhas com padrão: '{pattern}'")
+    
+    # Remover duplicatas
+    original_len = len(df_clean)
+    df_clean = df_clean.drop_duplicates(subset=[question_col, response_col])
+    removal_stats['duplicates'] = original_len - len(df_clean)
+    
+    # Limpar o texto das respostas se solicitado
+    if clean_text_flag:
+        df_clean[response_col] = df_clean[response_col].apply(clean_text)
+    
+    return df_clean, removal_stats
+
+def cleaning_stats(df, df_clean, removal_stats, output_file=None):
+    """
+    Monta o dicionário de estatísticas usado por print_summary
+    
+    Args:
+        df (pandas.DataFrame): Dados originais
+        df_clean (pandas.DataFrame): Dados após a limpeza
+        removal_stats (dict): Linhas removidas por motivo
+        output_file (str, optional): Arquivo onde os dados limpos foram salvos
+    
+    Returns:
+        dict: Estatísticas do processamento
+    """
+    total_removed = sum(removal_stats.values())
+    return {
+        'original_rows': len(df),
+        'removed_rows': total_removed,
+        'final_rows': len(df_clean),
+        'removal_rate': (total_removed / len(df)) * 100 if len(df) else 0.0,
+        'removal_details': removal_stats,
+        'output_file': str(output_file) if output_file is not None else None
+    }
+
 def print_summary(stats):
     """
     Imprime um resumo formatado das estatísticas
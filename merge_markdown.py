@@ -3,6 +3,73 @@
 import os
 import glob
 from pathlib import Path
+
+from profiling import span
+
+def build_consolidated_markdown(input_directory):
+    """
+    Monta o conteúdo consolidado de todos os arquivos .md de um diretório.
+
+    Args:
+        input_directory (str): Caminho para o diretório com os arquivos .md
+
+    Returns:
+        str | None: Texto consolidado, ou None se o diretório não existir ou não tiver arquivos .md
+    """
+    
+    # Caminho completo do diretório
+    docs_path = Path(input_directory)
+    
+    if not docs_path.exists():
+        print(f"Erro: O diretório '{input_directory}' não foi encontrado.")
+        return None
+    
+    # Busca todos os arquivos .md recursivamente
+    md_files = list(docs_path.rglob('*.md'))
+    
+    if not md_files:
+        print("Nenhum arquivo .md encontrado no diretório especificado.")
+        return None
+    
+    print(f"Encontrados {len(md_files)} arquivos Markdown.")
+    
+    # Ordena os arquivos por caminho para manter consistência
+    md_files.sort(key=lambda x: str(x))
+    
+    # Cabeçalho do documento consolidado
+    parts = ["# Corpus Consolidada\n\n", "---\n\n"]
+    
+    with span("merge.read", items=len(md_files)):
+        for md_file in md_files:
+            try:
+                # Caminho relativo para melhor organização
+                relative_path = md_file.relative_to(docs_path)
+            
+                # Lê o conteúdo do arquivo
+                with open(md_file, 'r', encoding='utf-8') as current_file:
+                    content = current_file.read()
+            
+                # Adiciona separador, título da seção e o conteúdo
+                parts.append(f"\n\n## Arquivo: {relative_path}\n\n")
+                parts.append("---\n\n")
+                parts.append(content)
+                parts.append("\n\n")
+            
+                print(f"Processado: {relative_path}")
+            
+            except Exception as e:
+                print(f"Erro ao processar {md_file}: {str(e)}")
+    
+    return "".join(parts)
+
+def print_consolidated_stats(consolidated_text):
+    """Imprime linhas e caracteres do conteúdo consolidado."""
+    lines = len(consolidated_text.splitlines())
+    chars = len(consolidated_text)
+    
+    print(f"Estatísticas do arquivo consolidado:")
+    print(f"- Linhas: {lines:,}")
+    print(f"- Caracteres: {chars:,}")
 
 def consolidate_markdown_files(input_directory, output_file):
     """
@@ -12,62 +79,17 @@ def consolidate_markdown_files(input_directory, output_file):
         input_directory (str): Caminho para o diretório com os arquivos .md
         output_file (str): Nome do arquivo de saída consolidado
     """
-    
-    # Caminho completo do diretório
-    docs_path = Path(input_directory)
-    
-    if not docs_path.exists():
-        print(f"Erro: O diretório '{input_directory}' não foi encontrado.")
+    consolidated_text = build_consolidated_markdown(input_directory)
+    if consolidated_text is None:
         return
     
-    # Busca todos os arquivos .md recursivamente
-    md_files = list(docs_path.rglob('*.md'))
-    
-    if not md_files:
-        print("Nenhum arquivo .md encontrado no diretório especificado.")
-        return
-    
-    print(f"Encontrados {len(md_files)} arquivos Markdown.")
-    
-    # Ordena os arquivos por caminho para manter consistência
-    md_files.sort(key=lambda x: str(x))
-    
-    with open(output_file, 'w', encoding='utf-8') as consolidated_file:
-        # Cabeçalho do documento consolidado
-        consolidated_file.write("# Corpus Consolidada\n\n")
-        consolidated_file.write("---\n\n")
-        
-        for md_file in md_files:
-            try:
-                # Caminho relativo para melhor organização
-                relative_path = md_file.relative_to(docs_path)
-                
-                # Adiciona separador e título da seção
-                consolidated_file.write(f"\n\n## Arquivo: {relative_path}\n\n")
-                consolidated_file.write("---\n\n")
-                
-                # Lê e adiciona o conteúdo do arquivo
-                with open(md_file, 'r', encoding='utf-8') as current_file:
-                    content = current_file.read()
-                    consolidated_file.write(content)
-                    consolidated_file.write("\n\n")
-                
-                print(f"Processado: {relative_path}")
-                
-            except Exception as e:
-                print(f"Erro ao processar {md_file}: {str(e)}")
+    with span("merge.write"), open(output_file, 'w', encoding='utf-8') as consolidated_file:
+        consolidated_file.write(consolidated_text)
     
     print(f"\nConsolidação concluída! Arquivo salvo como: {output_file}")
     
     # Estatísticas do arquivo gerado
-    with open(output_file, 'r', encoding='utf-8') as f:
-        lines = len(f.readlines())
-        f.seek(0)
-        chars = len(f.read())
-    
-    print(f"Estatísticas do arquivo consolidado:")
-    print(f"- Linhas: {lines:,}")
-    print(f"- Caracteres: {chars:,}")
+    print_consolidated_stats(consolidated_text)
 
 def main():
     """Executa a consolidação de Markdown usando valores padrão."""
@@ -0,0 +1,326 @@
+"""Executor em processo para full_flow e custom_flow: as etapas trocam objetos Python em vez de arquivos."""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from build_manifest import DEFAULT_MANIFEST, STAGE_FILES, BuildManifest
+from embedding_checkpoint import checkpoint_path
+from embedding_store import load_embeddings
+from evaluate_coverage import embed_questions, evaluate_qa_pairs, load_qa_pairs, print_evaluation_summary, qa_pairs_from_rows
+from extract_data_from_markdown import extract_docs_from_markdown_text
+from flow_dag import FULL_FLOW_STEPS, STEP_INPUTS, STEP_OUTPUTS, StepTiming, format_timing_report, run_dag, step_dependencies
+from generate_embeddings import embed_documents, generate_embeddings_for_docs, load_raw_docs
+from generate_report import write_md_report
+from generate_report_html import write_html_report
+from limpa_csv import clean_qa_dataframe, cleaning_stats, pd, print_summary
+from merge_markdown import build_consolidated_markdown, print_consolidated_stats
+from profiling import span
+from results_io import load_results, write_results
+
+# Atributo de PipelineConfig com o arquivo de cada artefato
+ARTIFACT_FILES: Dict[str, str] = {
+    "corpus": "corpus_file",
+    "raw_docs": "raw_docs_file",
+    "embeddings": "embeddings_file",
+    "qa_pairs": "cleaned_qa_file",
+    "evaluation_results": "eval_results_file",
+    "md_report": "md_report_file",
+    "html_report": "html_report_file",
+}
+
+# Artefatos sempre gravados em disco (resultado final do fluxo)
+FINAL_ARTIFACTS = ("md_report", "html_report")
+
+
+class PipelineError(Exception):
+    """Falha em uma etapa do pipeline; ``step`` indica qual."""
+
+    def __init__(self, step: str, message: str):
+        super().__init__(message)
+        self.step = step
+
+
+class PipelineConfig:
+    """
+    Entradas, arquivos e opções de um fluxo (mesmos nomes das opções de
+    ``full_flow``/``custom_flow`` no docs-cli).
+
+    Com ``save_intermediate=False``, um artefato consumido por uma etapa
+    posterior da mesma execução fica apenas em memória; os demais (e os
+    relatórios) são gravados nos arquivos configurados.
+
+    Com ``incremental=True``, todas as saídas são gravadas, as etapas
+    atualizadas segundo o manifesto ``manifest_file`` (ver
+    ``build_manifest``) são puladas e só os chunks novos ou alterados
+    recebem embeddings novos.
+
+    Com ``parallel=True``, etapas independentes (ver ``flow_dag``) rodam
+    ao mesmo tempo, e os embeddings das perguntas são gerados enquanto os
+    do corpus ainda estão em andamento.
+    """
+
+    def __init__(
+        self,
+        doc_input_dir: str = "docs",
+        qa_input_file: str = "qa-data.csv",
+        corpus_file: str = "corpus_consolidated.md",
+        raw_docs_file: str = "raw_docs.json",
+        embeddings_file: str = "embeddings.json",
+        cleaned_qa_file: str = "qa_data_clean.csv",
+        eval_results_file: str = "evaluation_results.json",
+        md_report_file: str = "coverage_report.md",
+        html_report_file: str = "coverage_report.html",
+        top_k: int = 5,
+        provider: Optional[str] = None,
+        gemini_api_key: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        save_intermediate: bool = False,
+        incremental: bool = False,
+        manifest_file: str = DEFAULT_MANIFEST,
+        parallel: bool = False,
+    ):
+        self.doc_input_dir = doc_input_dir
+        self.qa_input_file = qa_input_file
+        self.corpus_file = corpus_file
+        self.raw_docs_file = raw_docs_file
+        self.embeddings_file = embeddings_file
+        self.cleaned_qa_file = cleaned_qa_file
+        self.eval_results_file = eval_results_file
+        self.md_report_file = md_report_file
+        self.html_report_file = html_report_file
+        self.top_k = top_k
+        self.provider = provider or ("openai" if os.getenv("OPENAI_API_KEY") else "gemini")
+        self.gemini_api_key = gemini_api_key
+        self.concurrency = concurrency
+        self.save_intermediate = save_intermediate
+        self.incremental = incremental
+        self.manifest_file = manifest_file
+        self.parallel = parallel
+
+    def path_for(self, artifact: str) -> str:
+        return getattr(self, ARTIFACT_FILES[artifact])
+
+
+class InProcessPipeline:
+    """
+    Executa uma sequência de etapas no processo atual.
+
+    Cada etapa chama diretamente a função do script correspondente e guarda
+    o resultado em ``artifacts``; a etapa seguinte o recebe como objeto
+    Python. Um artefato que não foi produzido nesta execução (por exemplo,
+    ``custom_flow evaluate report_md``) é lido do arquivo configurado.
+    O tempo de cada etapa fica em ``timings``.
+    """
+
+    def __init__(self, steps: Sequence[str], config: PipelineConfig):
+        unknown = [step for step in steps if step not in STEP_OUTPUTS]
+        if unknown:
+            raise ValueError(f"Etapas desconhecidas: {', '.join(unknown)}")
+        self.steps: List[str] = list(steps)
+        if config.parallel and not config.incremental and "evaluate" in self.steps:
+            # Os embeddings das perguntas só dependem do CSV: geram-se em paralelo com os do corpus.
+            # No modo incremental a avaliação pode ser pulada, então ela mesma gera os seus.
+            self.steps.insert(self.steps.index("evaluate"), "embed_questions")
+        self.config = config
+        self.artifacts: Dict[str, Any] = {}
+        self.manifest = BuildManifest(config.manifest_file) if config.incremental else None
+        self.timings: List[StepTiming] = []
+
+    def run(self) -> Dict[str, Any]:
+        """Executa as etapas (em ordem ou, com ``parallel``, por ramos independentes) e retorna os artefatos produzidos."""
+        dependencies = step_dependencies(self.steps)
+        max_workers = len(self.steps) if self.config.parallel else 1
+        self.timings = run_dag(self.steps, dependencies, self._run_step, max_workers=max_workers)
+        print("\n" + format_timing_report(self.timings, dependencies))
+        return self.artifacts
+
+    def _run_step(self, index: int) -> None:
+        step = self.steps[index]
+        options = vars(self.config)
+        tracked = self.manifest is not None and step in STAGE_FILES
+        if tracked and self.manifest.is_up_to_date(step, options):
+            # As etapas seguintes leem a saída do arquivo (ver _require)
+            print(f"\n⏭️ Etapa {step} inalterada desde a última execução. Pulando.")
+            return
+        print(f"\n--- Executando etapa (em processo): {step} ---")
+        write_output = self.should_write(index)
+        try:
+            with span(step, category="stage"):
+                getattr(self, f"_run_{step}")(write_output)
+        except PipelineError:
+            raise
+        except (OSError, ValueError) as e:
+            raise PipelineError(step, str(e)) from e
+        except Exception as e:
+            # Entrada malformada (ex: campo ausente) ou SDK ausente: a etapa falha como no modo em subprocesso
+            raise PipelineError(step, f"{type(e).__name__}: {e}") from e
+        if tracked:
+            self.manifest.record(step, options)
+        print(f"✅ Etapa {step} concluída.")
+
+    def should_write(self, index: int) -> bool:
+        """Indica se a saída da etapa ``index`` deve ser gravada em disco."""
+        output = STEP_OUTPUTS[self.steps[index]]
+        if output not in ARTIFACT_FILES:
+            return False
+        # O modo incremental compara hashes dos arquivos, então todos precisam existir
+        if self.config.save_intermediate or self.config.incremental or output in FINAL_ARTIFACTS:
+            return True
+        return not any(output in STEP_INPUTS[later] for later in self.steps[index + 1:])
+
+    def _needed_later(self, step: str, artifact: str) -> bool:
+        position = self.steps.index(step)
+        return any(artifact in STEP_INPUTS[later] for later in self.steps[position + 1:])
+
+    def _require(self, step: str, artifact: str) -> Any:
+        """Artefato produzido por uma etapa anterior ou, na falta dela, lido do arquivo configurado."""
+        if artifact in self.artifacts:
+            return self.artifacts[artifact]
+        path = self.config.path_for(artifact)
+        if not os.path.exists(path):
+            raise PipelineError(step, f"O arquivo '{path}' não foi encontrado (nenhuma etapa anterior o produziu).")
+        print(f"Lendo '{artifact}' de '{path}'...")
+        if artifact == "corpus":
+            with open(path, 'r', encoding='utf-8') as f:
+                value = f.read()
+        elif artifact == "raw_docs":
+            value = load_raw_docs(path)
+        elif artifact == "embeddings":
+            value = load_embeddings(path, load_mode="auto")
+        elif artifact == "qa_pairs":
+            value = load_qa_pairs(path)
+        elif artifact == "evaluation_results":
+            value = load_results(path)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        if value is None:
+            raise PipelineError(step, f"Não foi possível ler '{path}'.")
+        self.artifacts[artifact] = value
+        return value
+
+    def _run_merge(self, write_output: bool) -> None:
+        corpus = build_consolidated_markdown(self.config.doc_input_dir)
+        if corpus is None:
+            raise PipelineError("merge", f"Nenhum arquivo .md consolidado a partir de '{self.config.doc_input_dir}'.")
+        if write_output:
+            with span("merge.write"), open(self.config.corpus_file, 'w', encoding='utf-8') as f:
+                f.write(corpus)
+            print(f"Corpus consolidado salvo em '{self.config.corpus_file}'.")
+        print_consolidated_stats(corpus)
+        self.artifacts["corpus"] = corpus
+
+    def _run_extract(self, write_output: bool) -> None:
+        corpus = self._require("extract", "corpus")
+        with span("extract.parse") as phase:
+            raw_docs = extract_docs_from_markdown_text(corpus)
+            phase.set(items=len(raw_docs))
+        if not raw_docs:
+            raise PipelineError("extract", "Nenhum documento válido foi extraído do corpus consolidado.")
+        if write_output:
+            with span("extract.write"), open(self.config.raw_docs_file, 'w', encoding='utf-8') as f:
+                json.dump(raw_docs, f, ensure_ascii=False, indent=4)
+            print(f"Salvou {len(raw_docs)} documentos em '{self.config.raw_docs_file}'.")
+        else:
+            print(f"{len(raw_docs)} documentos extraídos.")
+        self.artifacts["raw_docs"] = raw_docs
+
+    def _run_generate_embeddings(self, write_output: bool) -> None:
+        config = self.config
+        raw_docs = self._require("generate_embeddings", "raw_docs")
+        if write_output:
+            success = generate_embeddings_for_docs(
+                config.raw_docs_file,
+                config.embeddings_file,
+                gemini_api_key_param=config.gemini_api_key,
+                provider=config.provider,
+                concurrency=config.concurrency,
+                raw_docs=raw_docs,
+                incremental=config.incremental,
+            )
+            if not success:
+                raise PipelineError("generate_embeddings", "A geração de embeddings falhou.")
+            if self._needed_later("generate_embeddings", "embeddings"):
+                # Relê o que acabou de ser gravado (o store .npy é mapeado, sem cópia)
+                self.artifacts["embeddings"] = load_embeddings(config.embeddings_file, load_mode="auto")
+            return
+        embedded = embed_documents(
+            raw_docs,
+            checkpoint_path(config.embeddings_file),
+            provider=config.provider,
+            gemini_api_key=config.gemini_api_key,
+            concurrency=config.concurrency,
+        )
+        if embedded is None:
+            raise PipelineError("generate_embeddings", "A geração de embeddings falhou.")
+        self.artifacts["embeddings"] = embedded
+
+    def _run_embed_questions(self, write_output: bool) -> None:
+        config = self.config
+        qa_pairs = self._require("embed_questions", "qa_pairs")
+        self.artifacts["question_embeddings"] = embed_questions(
+            qa_pairs,
+            provider=config.provider,
+            gemini_api_key=config.gemini_api_key,
+            concurrency=config.concurrency,
+        )
+
+    def _run_clean_csv(self, write_output: bool) -> None:
+        config = self.config
+        print(f"📖 Lendo arquivo: {config.qa_input_file}")
+        with span("clean_csv.read") as phase:
+            df = pd.read_csv(config.qa_input_file, encoding="utf-8")
+            phase.set(items=len(df))
+        with span("clean_csv.clean", items=len(df)):
+            df_clean, removal_stats = clean_qa_dataframe(df)
+        if write_output:
+            with span("clean_csv.write", items=len(df_clean)):
+                df_clean.to_csv(config.cleaned_qa_file, index=False, encoding="utf-8")
+            print(f"💾 Arquivo limpo salvo: {config.cleaned_qa_file}")
+        print_summary(cleaning_stats(df, df_clean, removal_stats, config.cleaned_qa_file if write_output else None))
+        # Valores ausentes viram texto vazio, como na leitura do CSV gravado
+        rows = df_clean.fillna("").astype(str).to_dict("records")
+        self.artifacts["qa_pairs"] = qa_pairs_from_rows(rows)
+
+    def _run_evaluate(self, write_output: bool) -> None:
+        config = self.config
+        qa_pairs = self._require("evaluate", "qa_pairs")
+        processed_chunks, embedding_matrix = self._require("evaluate", "embeddings")
+        if not qa_pairs:
+            raise PipelineError("evaluate", "Nenhum par de pergunta-resposta válido encontrado.")
+        if not processed_chunks:
+            raise PipelineError("evaluate", "Nenhum chunk com embedding válido encontrado.")
+        evaluation_results = evaluate_qa_pairs(
+            qa_pairs,
+            processed_chunks,
+            embedding_matrix,
+            top_k_chunks=config.top_k,
+            provider=config.provider,
+            gemini_api_key=config.gemini_api_key,
+            concurrency=config.concurrency,
+            question_embeddings=self.artifacts.get("question_embeddings"),
+        )
+        if write_output:
+            with span("evaluate.write", items=len(evaluation_results)):
+                write_results(config.eval_results_file, evaluation_results)
+            print(f"\nResultados da avaliação salvos em '{config.eval_results_file}'.")
+        print_evaluation_summary(evaluation_results)
+        self.artifacts["evaluation_results"] = evaluation_results
+
+    def _run_report_md(self, write_output: bool) -> None:
+        evaluation_results = self._require("report_md", "evaluation_results")
+        if not write_md_report(evaluation_results, self.config.md_report_file, self.config.top_k):
+            raise PipelineError("report_md", "A geração do relatório Markdown falhou.")
+        self.artifacts["md_report"] = self.config.md_report_file
+
+    def _run_report_html(self, write_output: bool) -> None:
+        evaluation_results = self._require("report_html", "evaluation_results")
+        if not write_html_report(evaluation_results, self.config.html_report_file, self.config.top_k):
+            raise PipelineError("report_html", "A geração do relatório HTML falhou.")
+        self.artifacts["html_report"] = self.config.html_report_file
+
+
+def run_pipeline(steps: Sequence[str], config: PipelineConfig) -> Dict[str, Any]:
+    """Executa ``steps`` em processo (ver ``InProcessPipeline``) e retorna os artefatos."""
+    return InProcessPipeline(steps, config).run()
@@ -0,0 +1,157 @@
+"""Execução de subprocessos com a saída transmitida linha a linha (com horário), progresso/ETA e as últimas linhas para o resumo de falhas."""
+
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import IO, Deque, List, Optional, Sequence, Tuple
+
+# Quantas linhas finais (stdout + stderr) são guardadas para o resumo de uma falha
+OUTPUT_TAIL_LINES = 40
+
+# Intervalo mínimo entre duas linhas de progresso repassadas sem --verbose (segundos)
+PROGRESS_INTERVAL = 1.0
+
+# Linhas de progresso dos scripts do toolkit: o grupo 1 é o tipo, os grupos 2 e 3 são "feitos/total"
+PROGRESS_PATTERN = re.compile(
+    r"(Lote) \d+/\d+ concluído \((\d+)/(\d+)\)"
+    r"|(?:--- )?(Avaliando Pergunta|Processando documento) (\d+)/(\d+)"
+)
+
+
+def format_duration(seconds: float) -> str:
+    """Duração legível: ``45s``, ``3m05s`` ou ``2h07m``."""
+    seconds = int(round(max(0.0, seconds)))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{(seconds % 3600) // 60:02d}m"
+
+
+class ProgressTracker:
+    """
+    Reconhece linhas de progresso (``PROGRESS_PATTERN``) e estima o tempo restante.
+
+    A estimativa usa a taxa média desde a primeira linha do mesmo tipo;
+    um novo tipo de progresso (ou uma contagem que volta atrás) reinicia a
+    medição.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._kind: Optional[str] = None
+        self._started = 0.0
+        self._first_done = 0
+
+    def update(self, line: str) -> Optional[Tuple[int, int, Optional[float]]]:
+        """Para uma linha de progresso, retorna ``(feitos, total, segundos restantes ou None)``; senão ``None``."""
+        match = PROGRESS_PATTERN.search(line)
+        if not match:
+            return None
+        groups = match.groups()
+        kind, done, total = groups[0:3] if groups[0] else groups[3:6]
+        done, total = int(done), int(total)
+        now = self._clock()
+        if kind != self._kind or done < self._first_done:
+            self._kind, self._started, self._first_done = kind, now, done
+            return done, total, None
+        completed = done - self._first_done
+        if completed <= 0:
+            return done, total, None
+        return done, total, (now - self._started) / completed * (total - done)
+
+
+class StreamedProcess:
+    """
+    Executa ``command`` transmitindo stdout e stderr à medida que o processo escreve.
+
+    Cada linha recebe o horário e o rótulo da etapa. Com ``verbose``, toda
+    a saída é repassada; sem ele, apenas stderr e as linhas de progresso
+    (no máximo uma a cada ``PROGRESS_INTERVAL`` segundos, mais a última),
+    acrescidas do tempo restante estimado. Nada é acumulado além das
+    últimas ``tail_lines`` linhas, mostradas se o processo falhar.
+    """
+
+    def __init__(
+        self,
+        command: Sequence[str],
+        verbose: bool = False,
+        label: Optional[str] = None,
+        tail_lines: int = OUTPUT_TAIL_LINES,
+        out: Optional[IO[str]] = None,
+        err: Optional[IO[str]] = None,
+    ):
+        self.command = list(command)
+        self.verbose = verbose
+        self.label = label or os.path.basename(self.command[0])
+        self.tail: Deque[str] = deque(maxlen=tail_lines)
+        self.returncode: Optional[int] = None
+        self._out = out
+        self._err = err
+        self._lock = threading.Lock()
+        self._progress = ProgressTracker()
+        self._last_progress = float("-inf")
+
+    def run(self) -> int:
+        """Executa o processo até o fim e retorna o código de saída."""
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        process = subprocess.Popen(
+            self.command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+            env=env,
+        )
+        readers = [
+            threading.Thread(target=self._pump, args=(process.stdout, False), daemon=True),
+            threading.Thread(target=self._pump, args=(process.stderr, True), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            self.returncode = process.wait()
+        except KeyboardInterrupt:
+            # O filho recebe o mesmo Ctrl+C; espera ele encerrar antes de propagar
+            process.wait()
+            raise
+        finally:
+            for reader in readers:
+                reader.join()
+        return self.returncode
+
+    def _pump(self, stream: IO[str], is_stderr: bool) -> None:
+        for raw_line in iter(stream.readline, ""):
+            self._handle_line(raw_line.rstrip("\r\n"), is_stderr)
+        stream.close()
+
+    def _handle_line(self, line: str, is_stderr: bool) -> None:
+        with self._lock:
+            self.tail.append(line)
+            progress = self._progress.update(line)
+            if is_stderr:
+                self._emit(line, self._err or sys.stderr)
+                return
+            if progress is not None:
+                done, total, remaining = progress
+                now = time.monotonic()
+                if not self.verbose and done < total and now - self._last_progress < PROGRESS_INTERVAL:
+                    return
+                self._last_progress = now
+                eta = f" [{done}/{total}, ETA {format_duration(remaining)}]" if remaining is not None else f" [{done}/{total}]"
+                self._emit(line.strip() + eta, self._out or sys.stdout)
+            elif self.verbose:
+                self._emit(line, self._out or sys.stdout)
+
+    def _emit(self, line: str, stream: IO[str]) -> None:
+        print(f"[{time.strftime('%H:%M:%S')} {self.label}] {line}", file=stream, flush=True)
+
+    def failure_summary(self) -> List[str]:
+        """Últimas linhas da saída (stdout e stderr, na ordem em que chegaram)."""
+        return list(self.tail)
@@ -0,0 +1,328 @@
+"""Perfil de execução (--profile): tempo, CPU, memória, itens e chamadas de API por etapa e fase, em JSON e no formato Chrome trace."""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Arquivo JSONL onde cada processo (docs-cli e os scripts que ele executa) grava seus spans.
+# Definida pelo docs-cli com --profile; sem ela, span() e count_api_call() não fazem nada.
+PROFILE_ENV = "DOCS_CLI_PROFILE"
+
+TRACE_VERSION = 1
+
+# Contadores de chamadas de API do processo (atualizados pelos provedores de embeddings)
+_api_lock = threading.Lock()
+_api_counters: Dict[str, int] = {"api_calls": 0, "api_errors": 0, "api_bytes": 0}
+
+
+def profiling_enabled() -> bool:
+    return bool(os.getenv(PROFILE_ENV))
+
+
+def count_api_call(request_bytes: int, failed: bool = False) -> None:
+    """Registra uma requisição a um provedor (bytes de texto enviados)."""
+    with _api_lock:
+        _api_counters["api_calls"] += 1
+        _api_counters["api_bytes"] += request_bytes
+        if failed:
+            _api_counters["api_errors"] += 1
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Pico de memória residente (MB) do processo ou, com ``children``, do maior subprocesso já encerrado."""
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss é em bytes no macOS e em KB no Linux
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def _children_cpu() -> float:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - Windows
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Span:
+    """
+    Um intervalo medido: tempo de relógio, CPU, pico de RSS e contadores.
+
+    CPU, pico de RSS e chamadas de API são do processo inteiro durante o
+    intervalo, então spans simultâneos no mesmo processo se sobrepõem. Com
+    ``children=True``, CPU e pico de RSS incluem os subprocessos encerrados
+    no intervalo, e as chamadas de API ficam a cargo das fases gravadas por
+    eles. ``items`` (e outros atributos) é informado por quem abre o span,
+    com ``set``.
+    """
+
+    def __init__(self, name: str, category: str, children: bool, attributes: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.children = children
+        self.attributes = dict(attributes)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._start = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time() + (_children_cpu() if self.children else 0.0)
+        with _api_lock:
+            self._api = dict(_api_counters)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() + (_children_cpu() if self.children else 0.0) - self._cpu
+        peak = peak_rss_mb()
+        if self.children:
+            peak = max(filter(None, (peak, peak_rss_mb(children=True))), default=None)
+        with _api_lock:
+            api = {key: value - self._api[key] for key, value in _api_counters.items()}
+        event = {
+            "name": self.name,
+            "cat": self.category,
+            "stage": self.name.split(".")[0],
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "process": os.path.basename(sys.argv[0]) if sys.argv else "",
+            "start": self._start,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss_mb": peak,
+            "failed": exc_type is not None,
+        }
+        if not self.children:
+            event.update(api)
+        event.update(self.attributes)
+        _write_event(event)
+
+
+class _NullSpan:
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_write_lock = threading.Lock()
+
+
+def span(name: str, category: str = "phase", children: bool = False, **attributes: Any):
+    """
+    Mede o bloco ``with`` se o perfil estiver ativo (senão, não faz nada).
+
+    ``name`` é ``"<etapa>"`` ou ``"<etapa>.<fase>"`` (ex: ``"evaluate.search"``);
+    ``attributes`` (como ``items=``) vão para o evento.
+    """
+    if not profiling_enabled():
+        return _NULL_SPAN
+    return Span(name, category, children, attributes)
+
+
+def _write_event(event: Dict[str, Any]) -> None:
+    path = os.getenv(PROFILE_ENV)
+    if not path:
+        return
+    line = (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+    # Uma única escrita em modo append por evento: processos concorrentes não se misturam
+    with _write_lock:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def read_events(events_path: str) -> List[Dict[str, Any]]:
+    events = []
+    try:
+        with open(events_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return sorted(events, key=lambda event: event["start"])
+
+
+def _summed(events: List[Dict[str, Any]], key: str) -> int:
+    return sum(event.get(key) or 0 for event in events)
+
+
+def _stage_items(phases: List[Dict[str, Any]]) -> Optional[int]:
+    # Itens da última fase que os informou (em geral a gravação: o que a etapa produziu)
+    counted = [phase["items"] for phase in phases if phase.get("items") is not None]
+    return counted[-1] if counted else None
+
+
+def _phase_totals(phases: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    # Fases repetidas (ex: uma por documento) são somadas; o pico de RSS é o maior
+    totals: Dict[str, Dict[str, Any]] = {}
+    for phase in phases:
+        name = phase["name"].split(".", 1)[-1]
+        total = totals.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None, "items": 0, "api_calls": 0, "api_bytes": 0})
+        total["calls"] += 1
+        for key in ("wall_s", "cpu_s"):
+            total[key] = round(total[key] + phase[key], 6)
+        for key in ("items", "api_calls", "api_bytes"):
+            total[key] += phase.get(key) or 0
+        if phase.get("peak_rss_mb") is not None:
+            total["peak_rss_mb"] = max(total["peak_rss_mb"] or 0.0, phase["peak_rss_mb"])
+    return totals
+
+
+def build_trace(events: List[Dict[str, Any]], command: List[str]) -> Dict[str, Any]:
+    """
+    Relatório do perfil: um resumo por etapa e os spans brutos.
+
+    O resumo de cada etapa usa o span da etapa (tempo, CPU e pico de RSS).
+    Chamadas de API vêm do próprio span quando ele as mediu (etapa em
+    processo) ou da soma das fases dela gravadas pelo subprocesso; os itens
+    são os da última fase que os informou. Um comando sem etapas (ex:
+    ``docs-cli evaluate``) é resumido como etapa.
+    """
+    origin = min((event["start"] for event in events), default=0.0)
+    stage_events = [event for event in events if event["cat"] == "stage"]
+    if not stage_events:
+        stage_events = [event for event in events if event["cat"] == "command"]
+    phases = [event for event in events if event["cat"] == "phase"]
+    stages = []
+    for stage in stage_events:
+        stage_phases = [phase for phase in phases if phase["stage"] == stage["name"]]
+
+        def measured(key):
+            return stage[key] if stage.get(key) is not None else _summed(stage_phases, key)
+
+        items = stage["items"] if stage.get("items") is not None else _stage_items(stage_phases)
+
+        stages.append({
+            "stage": stage["name"],
+            "start_s": round(stage["start"] - origin, 6),
+            "wall_s": stage["wall_s"],
+            "cpu_s": stage["cpu_s"],
+            "peak_rss_mb": stage["peak_rss_mb"],
+            "items": items,
+            "api_calls": measured("api_calls"),
+            "api_errors": measured("api_errors"),
+            "api_bytes": measured("api_bytes"),
+            "phases": _phase_totals(stage_phases),
+        })
+    wall = max((event["start"] + event["wall_s"] for event in events), default=origin) - origin
+    return {
+        "version": TRACE_VERSION,
+        "command": command,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(origin)) if events else None,
+        "wall_s": round(wall, 6),
+        "stages": stages,
+        "spans": [dict(event, start_s=round(event["start"] - origin, 6)) for event in events],
+    }
+
+
+def chrome_trace(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Eventos no formato Chrome trace (chrome://tracing, Perfetto): um evento "X" por span."""
+    trace_events = []
+    for event in events:
+        args = {key: value for key, value in event.items() if key not in ("name", "cat", "pid", "tid", "start")}
+        trace_events.append({
+            "name": event["name"],
+            "cat": event["cat"],
+            "ph": "X",
+            "ts": int(event["start"] * 1_000_000),
+            "dur": int(event["wall_s"] * 1_000_000),
+            "pid": event["pid"],
+            "tid": event["tid"],
+            "args": args,
+        })
+    processes = {event["pid"]: event.get("process") or str(event["pid"]) for event in events}
+    for pid, process in processes.items():
+        trace_events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": process}})
+    return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+
+def format_profile_summary(trace: Dict[str, Any]) -> str:
+    """Tabela curta com o resumo de cada etapa, para o console."""
+    lines = [f"📊 Perfil ({trace['wall_s']:.2f}s no total):"]
+    width = max((len(stage["stage"]) for stage in trace["stages"]), default=0)
+    for stage in trace["stages"]:
+        rss = f"{stage['peak_rss_mb']:.0f} MB" if stage["peak_rss_mb"] is not None else "n/d"
+        lines.append(
+            f"  {stage['stage']:<{width}}  {stage['wall_s']:8.2f}s  CPU {stage['cpu_s']:7.2f}s  pico RSS {rss:>8}  "
+            f"itens {stage['items'] or 0}  API {stage['api_calls']} chamadas / {stage['api_bytes'] / 1024:.0f} KB"
+        )
+    return "\n".join(lines)
+
+
+class ProfileSession:
+    """
+    Ativa o perfil no processo atual e nos subprocessos (via ``PROFILE_ENV``)
+    e, em ``finish``, consolida os eventos em ``output_path`` (JSON) e,
+    opcionalmente, em ``chrome_trace_path``.
+    """
+
+    def __init__(
+        self,
+        output_path: Optional[str],
+        chrome_trace_path: Optional[str] = None,
+        command: Optional[List[str]] = None,
+        command_name: Optional[str] = None,
+    ):
+        self.output_path = output_path
+        self.chrome_trace_path = chrome_trace_path
+        self.command = list(command if command is not None else sys.argv)
+        self.command_name = command_name
+        self.events_path = f"{output_path or chrome_trace_path}.events.jsonl"
+        self._command_span: Optional[Span] = None
+        self._finished = False
+
+    def start(self) -> "ProfileSession":
+        if os.path.exists(self.events_path):
+            os.remove(self.events_path)
+        os.environ[PROFILE_ENV] = os.path.abspath(self.events_path)
+        if self.command_name:
+            # Span do comando inteiro (incluindo os subprocessos), fechado em finish
+            self._command_span = Span(self.command_name, "command", True, {})
+            self._command_span.__enter__()
+        # Grava o relatório mesmo quando o fluxo termina com sys.exit
+        atexit.register(self.finish)
+        return self
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        if self._finished:
+            return None
+        self._finished = True
+        if self._command_span is not None:
+            self._command_span.__exit__(None, None, None)
+        os.environ.pop(PROFILE_ENV, None)
+        events = read_events(self.events_path)
+        trace = build_trace(events, self.command)
+        if self.output_path:
+            with open(self.output_path, "w", encoding="utf-8") as f:
+                json.dump(trace, f, ensure_ascii=False, indent=2)
+        if self.chrome_trace_path:
+            with open(self.chrome_trace_path, "w", encoding="utf-8") as f:
+                json.dump(chrome_trace(events), f)
+        if os.path.exists(self.events_path):
+            os.remove(self.events_path)
+        print("\n" + format_profile_summary(trace))
+        written = [path for path in (self.output_path, self.chrome_trace_path) if path]
+        print(f"Perfil gravado em: {', '.join(written)}")
+        return trace
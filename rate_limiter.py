@@ -0,0 +1,194 @@
+"""Rate limiting por provedor (token bucket de requisições e tokens por minuto), seguro entre threads e processos."""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # pragma: no cover - Windows: coordenação apenas dentro do processo
+    fcntl = None  # type: ignore
+
+# Limites padrão por provedor: requisições por minuto (rpm) e tokens por minuto (tpm).
+# ``None`` desativa o respectivo limite.
+PROVIDER_RATE_LIMITS: Dict[str, Dict[str, Optional[int]]] = {
+    "gemini": {"rpm": 150, "tpm": 1_000_000},
+    "openai": {"rpm": 3000, "tpm": 1_000_000},
+    "deepinfra": {"rpm": 180, "tpm": None},
+}
+
+# Usado para provedores sem limites conhecidos
+DEFAULT_RATE_LIMITS: Dict[str, Optional[int]] = {"rpm": 60, "tpm": None}
+
+# Aproximação de tokens a partir de caracteres (mesma usada em batching.py)
+CHARS_PER_TOKEN = 4
+
+# Esperas a partir deste valor (em segundos) são informadas no console
+_REPORT_WAIT_SECONDS = 1.0
+
+
+def estimate_tokens(texts: Sequence[str]) -> int:
+    """Estimativa de tokens de uma requisição com ``texts`` (~4 caracteres por token)."""
+    return sum(len(text) // CHARS_PER_TOKEN + 1 for text in texts)
+
+
+class RateLimiter:
+    """
+    Limitador token bucket com dois baldes: requisições e tokens por minuto.
+
+    Cada balde começa cheio (capacidade igual ao limite por minuto) e é
+    reabastecido continuamente, de modo que rajadas curtas passam sem espera
+    e, depois delas, cada chamada aguarda apenas o necessário para o déficit
+    em vez de bloquear até o fim de uma janela fixa. ``acquire`` só consome
+    dos baldes quando ambos têm saldo suficiente.
+
+    Com ``state_dir``, o estado dos baldes fica em ``<state_dir>/<provedor>.json``
+    e é lido/atualizado sob um lock de arquivo (``fcntl.flock``), de modo que
+    vários processos no mesmo host compartilham o mesmo orçamento.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        rpm: Optional[int],
+        tpm: Optional[int] = None,
+        state_dir: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.provider = provider
+        self.capacities: Dict[str, float] = {}
+        if rpm:
+            self.capacities["requests"] = float(rpm)
+        if tpm:
+            self.capacities["tokens"] = float(tpm)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._levels: Dict[str, float] = dict(self.capacities)
+        self._updated = clock()
+        self._state_path: Optional[Path] = None
+        if state_dir and fcntl is not None:
+            Path(state_dir).mkdir(parents=True, exist_ok=True)
+            self._state_path = Path(state_dir) / f"{provider}.json"
+        self.total_wait = 0.0
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Bloqueia até haver saldo para uma requisição com ``tokens`` tokens e o consome.
+
+        Um pedido maior que a capacidade do balde de tokens é limitado à
+        capacidade (passa quando o balde está cheio). Retorna o tempo total
+        de espera, em segundos.
+        """
+        cost = {"requests": 1.0, "tokens": float(tokens)}
+        cost = {name: min(cost[name], capacity) for name, capacity in self.capacities.items()}
+        waited = 0.0
+        while True:
+            with self._lock:
+                wait = self._try_consume(cost)
+            if wait <= 0:
+                self.total_wait += waited
+                return waited
+            if wait >= _REPORT_WAIT_SECONDS:
+                print(f"  Limite de requisições do {self.provider} atingido. Aguardando {wait:.2f} segundos...")
+            self._sleep(wait)
+            waited += wait
+
+    def _try_consume(self, cost: Dict[str, float]) -> float:
+        """Consome ``cost`` se houver saldo (retorna 0) ou retorna a espera necessária."""
+        if self._state_path is None:
+            return self._consume_levels(cost)
+        with open(self._state_path.with_suffix(".lock"), "a+") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                self._load_state()
+                wait = self._consume_levels(cost)
+                self._save_state()
+                return wait
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _consume_levels(self, cost: Dict[str, float]) -> float:
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._updated = now
+        wait = 0.0
+        for name, capacity in self.capacities.items():
+            level = min(capacity, self._levels.get(name, capacity) + elapsed * capacity / 60.0)
+            self._levels[name] = level
+            if level < cost[name]:
+                wait = max(wait, (cost[name] - level) * 60.0 / capacity)
+        if wait > 0:
+            return wait
+        for name in self.capacities:
+            self._levels[name] -= cost[name]
+        return 0.0
+
+    def _load_state(self) -> None:
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self._levels = {name: float(state["levels"][name]) for name in self.capacities if name in state["levels"]}
+            self._updated = float(state["updated"])
+        except (OSError, ValueError, KeyError, TypeError):
+            # Estado ausente ou corrompido: recomeça com os baldes cheios
+            self._levels = dict(self.capacities)
+            self._updated = self._clock()
+
+    def _save_state(self) -> None:
+        tmp_path = self._state_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"levels": self._levels, "updated": self._updated}, f)
+        os.replace(tmp_path, self._state_path)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limits(provider: str) -> Dict[str, Optional[int]]:
+    """
+    Retorna ``{"rpm", "tpm"}`` de ``provider``.
+
+    As variáveis ``DOCS_CLI_<PROVEDOR>_RPM`` e ``DOCS_CLI_<PROVEDOR>_TPM``
+    têm prioridade sobre ``PROVIDER_RATE_LIMITS``; o valor 0 desativa o limite.
+    """
+    provider_key = "deepinfra" if provider.lower() == "maritaca" else provider.lower()
+    limits = dict(PROVIDER_RATE_LIMITS.get(provider_key, DEFAULT_RATE_LIMITS))
+    for key in ("rpm", "tpm"):
+        env_value = os.getenv(f"DOCS_CLI_{provider_key.upper()}_{key.upper()}")
+        if env_value:
+            limits[key] = int(env_value) or None
+    return limits
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """
+    Limitador compartilhado (por processo) de ``provider``.
+
+    Se ``DOCS_CLI_RATE_LIMIT_DIR`` estiver definida, o estado é coordenado
+    entre processos por meio de arquivos nesse diretório.
+    """
+    provider_key = "deepinfra" if provider.lower() == "maritaca" else provider.lower()
+    with _limiters_lock:
+        limiter = _limiters.get(provider_key)
+        if limiter is None:
+            limits = get_rate_limits(provider_key)
+            limiter = RateLimiter(
+                provider_key,
+                rpm=limits["rpm"],
+                tpm=limits["tpm"],
+                state_dir=os.getenv("DOCS_CLI_RATE_LIMIT_DIR") or None,
+            )
+            _limiters[provider_key] = limiter
+        return limiter
+
+
+def reset_rate_limiters() -> None:
+    """Descarta os limitadores criados (usado ao mudar a configuração, por exemplo em testes)."""
+    with _limiters_lock:
+        _limiters.clear()
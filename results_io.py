@@ -0,0 +1,152 @@
+"""Leitura e gravação dos resultados da avaliação em JSON (lista) ou JSONL (um resultado por linha)."""
+
+import json
+import os
+from collections import Counter
+from typing import Iterable, Iterator, List, Tuple
+
+# Status gravados pela avaliação quando o provedor não devolve um embedding
+QUESTION_EMBEDDING_FAILED = "Falha no Embedding da Pergunta"
+SENTENCE_EMBEDDING_FAILED = "Falha no Embedding da Frase"
+
+
+def is_jsonl_path(path: str) -> bool:
+    """Indica se o caminho usa o formato JSONL (extensão ``.jsonl``)."""
+    return str(path).lower().endswith(".jsonl")
+
+
+def result_key(item: dict) -> Tuple[str, str]:
+    """Identifica uma pergunta (par pergunta/resposta ideal) em resultados e pares do CSV."""
+    return item["pergunta"], item["resposta_ideal"]
+
+
+def is_failed_result(result: dict) -> bool:
+    """
+    Indica se o resultado foi afetado por uma falha ao gerar embeddings (da
+    pergunta ou de alguma frase da resposta ideal), por exemplo numa queda do
+    provedor; esses resultados são avaliados de novo ao retomar.
+    """
+    if result.get("status") == QUESTION_EMBEDDING_FAILED:
+        return True
+    return any(detail.get("status") == SENTENCE_EMBEDDING_FAILED for detail in result.get("cobertura_detalhes") or [])
+
+
+def _iter_jsonl(path: str) -> Iterator[dict]:
+    """
+    Itera sobre os resultados de um arquivo JSONL, lendo uma linha por vez.
+    Uma última linha sem quebra de linha que não seja JSON válido (gravação
+    interrompida) é descartada; uma linha inválida no meio do arquivo levanta
+    ``json.JSONDecodeError``.
+    """
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                if line.endswith(b"\n"):
+                    raise
+                print(f"Aviso: última linha incompleta de '{path}' ignorada (gravação interrompida).")
+                return
+            yield result
+
+
+def iter_results(path: str) -> Iterator[dict]:
+    """
+    Itera sobre os resultados de avaliação gravados em ``path``: uma lista
+    JSON (``evaluation_results.json``) ou um resultado por linha (``.jsonl``,
+    lido sob demanda, sem carregar o arquivo inteiro).
+    """
+    if not is_jsonl_path(path):
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+    yield from _iter_jsonl(path)
+
+
+def load_results(path: str) -> List[dict]:
+    """Carrega todos os resultados de avaliação de ``path`` (JSON ou JSONL)."""
+    return list(iter_results(path))
+
+
+def write_results(path: str, results: Iterable[dict]) -> int:
+    """Grava os resultados no formato indicado pela extensão de ``path``. Retorna quantos foram gravados."""
+    if is_jsonl_path(path):
+        with JsonlResultsWriter(path) as writer:
+            for result in results:
+                writer.write(result)
+        return writer.written
+    results = list(results)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+    return len(results)
+
+
+class JsonlResultsWriter:
+    """
+    Grava resultados de avaliação em JSONL, um por linha, descarregando o
+    arquivo a cada pergunta: uma falha no meio da avaliação preserva tudo o
+    que já foi avaliado.
+
+    Com ``resume=True`` um arquivo existente é mantido, sem uma eventual
+    última linha incompleta e sem os resultados com falha de embedding
+    (``is_failed_result``), e ``pending`` filtra as perguntas que ele já
+    contém; sem ``resume`` o arquivo é recriado.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.written = 0
+        self.completed = 0
+        self.retried = 0
+        self._completed: Counter = Counter()
+        if resume and os.path.exists(path):
+            self._keep_completed()
+            mode = "a"
+        else:
+            mode = "w"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, mode, encoding="utf-8")
+
+    def _keep_completed(self) -> None:
+        # Regrava o arquivo só com os resultados concluídos, uma linha por vez
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for result in _iter_jsonl(self.path):
+                if is_failed_result(result):
+                    self.retried += 1
+                    continue
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+                self._completed[result_key(result)] += 1
+                self.completed += 1
+        os.replace(tmp_path, self.path)
+
+    def pending(self, qa_pairs: Iterable[dict]) -> List[dict]:
+        """Pares ainda sem resultado no arquivo (perguntas repetidas contam uma vez por ocorrência)."""
+        remaining = Counter(self._completed)
+        pending = []
+        for qa in qa_pairs:
+            key = result_key(qa)
+            if remaining[key] > 0:
+                remaining[key] -= 1
+            else:
+                pending.append(qa)
+        return pending
+
+    def write(self, result: dict) -> None:
+        """Acrescenta um resultado ao arquivo e o descarrega imediatamente."""
+        self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.written += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "JsonlResultsWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,160 @@
+"""Motor de recuperação vetorizado (top-k por similaridade de cosseno) sobre chunks com embeddings."""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class ChunkIndex:
+    """
+    Índice exato de chunks para busca top-k por similaridade de cosseno.
+
+    Todos os embeddings válidos são carregados uma única vez em uma matriz
+    float32 com linhas normalizadas, de modo que cada consulta (ou lote de
+    consultas) é resolvida com um único produto de matrizes e a seleção dos
+    melhores resultados usa ``argpartition`` em vez de ordenar tudo.
+
+    Matrizes somente leitura (por exemplo, abertas com ``mmap``) não são
+    copiadas: guarda-se apenas o inverso das normas de cada linha, aplicado
+    às pontuações de cada consulta.
+
+    Com ``ann`` (um ``ann_index.IVFIndex`` da mesma matriz), cada consulta
+    só pontua as linhas candidatas devolvidas pelo índice: a busca fica
+    aproximada e deixa de ser O(chunks).
+    """
+
+    def __init__(self, chunks: Sequence[Dict[str, Any]], matrix: np.ndarray, copy: bool = True, ann: Any = None):
+        if len(chunks) != matrix.shape[0]:
+            raise ValueError(
+                f"Número de chunks ({len(chunks)}) difere do número de linhas da matriz ({matrix.shape[0]})."
+            )
+        self.chunks = list(chunks)
+        self._inv_norms: Optional[np.ndarray] = None
+        if copy:
+            matrix = np.array(matrix, dtype=np.float32)
+        elif matrix.dtype != np.float32:
+            matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.flags.writeable:
+            self.matrix = _normalize_rows(matrix)
+        else:
+            self.matrix = matrix
+            norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))
+            norms[norms == 0] = 1.0
+            self._inv_norms = (1.0 / norms).astype(np.float32)
+        if ann is not None and (ann.rows != len(self.chunks) or ann.dimension != self.dimension):
+            raise ValueError(
+                f"Índice aproximado ({ann.rows} x {ann.dimension}) não corresponde à matriz ({len(self.chunks)} x {self.dimension})."
+            )
+        self.ann = ann
+
+    @classmethod
+    def from_chunks(cls, processed_chunks: Sequence[Dict[str, Any]], dimension: Optional[int] = None) -> "ChunkIndex":
+        """
+        Cria o índice a partir de chunks com a chave ``embedding``.
+
+        Chunks sem embedding ou com dimensão diferente de ``dimension`` são
+        ignorados. Se ``dimension`` não for informada, usa a do primeiro
+        embedding válido.
+        """
+        valid_chunks = []
+        vectors = []
+        for chunk_info in processed_chunks:
+            chunk_embedding = chunk_info.get('embedding')
+            if chunk_embedding is None or len(chunk_embedding) == 0:
+                continue
+            if dimension is None:
+                dimension = len(chunk_embedding)
+            if len(chunk_embedding) != dimension:
+                continue
+            valid_chunks.append(chunk_info)
+            vectors.append(chunk_embedding)
+
+        if not vectors:
+            return cls([], np.zeros((0, dimension or 0), dtype=np.float32))
+        return cls(valid_chunks, np.asarray(vectors, dtype=np.float32), copy=False)
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def dimension(self) -> int:
+        """Dimensão dos embeddings indexados."""
+        return self.matrix.shape[1]
+
+    def vector(self, row: int) -> np.ndarray:
+        """Embedding normalizado da linha ``row``."""
+        if self._inv_norms is None:
+            return self.matrix[row]
+        return self.matrix[row] * self._inv_norms[row]
+
+    def search(self, query_embedding, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Retorna os ``top_k`` chunks mais similares a uma consulta."""
+        return self.search_batch([query_embedding], top_k=top_k)[0]
+
+    def search_batch(self, query_embeddings, top_k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Retorna, para cada consulta do lote, os ``top_k`` chunks mais similares.
+
+        Cada resultado é um dicionário ``{'similarity', 'chunk', 'row'}`` em
+        ordem decrescente de similaridade; empates mantêm a ordem original
+        dos chunks, como na ordenação estável da implementação anterior.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        if len(self) == 0 or top_k <= 0 or queries.shape[1] != self.dimension:
+            return [[] for _ in range(queries.shape[0])]
+
+        normalized = _normalize_rows(queries.copy())
+        if self.ann is not None:
+            return [
+                self._top_k_from_candidates(query, rows, top_k)
+                for query, rows in zip(normalized, self.ann.candidate_rows(normalized))
+            ]
+        scores = normalized @ self.matrix.T
+        if self._inv_norms is not None:
+            scores *= self._inv_norms
+        return [self._top_k_from_scores(row_scores, top_k) for row_scores in scores]
+
+    def _top_k_from_candidates(self, query: np.ndarray, rows: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        # rows vem em ordem crescente: o desempate por menor índice é o mesmo da busca exata
+        scores = self.matrix[rows] @ query
+        if self._inv_norms is not None:
+            scores *= self._inv_norms[rows]
+        return [
+            {'similarity': float(scores[position]), 'chunk': self.chunks[rows[position]], 'row': int(rows[position])}
+            for position in top_k_rows(scores, top_k)
+        ]
+
+    def _top_k_from_scores(self, scores: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        rows = top_k_rows(scores, top_k)
+        return [
+            {'similarity': float(scores[row]), 'chunk': self.chunks[row], 'row': int(row)}
+            for row in rows
+        ]
+
+
+def top_k_rows(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Índices das ``top_k`` maiores pontuações em ordem decrescente.
+
+    Usa ``argpartition`` para evitar a ordenação completa; todos os
+    candidatos empatados com o k-ésimo valor são considerados para que o
+    desempate por menor índice seja determinístico.
+    """
+    n = scores.shape[0]
+    if top_k >= n:
+        candidates = np.arange(n)
+    else:
+        kth_value = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+        candidates = np.flatnonzero(scores >= kth_value)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:top_k]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normaliza (no próprio array) as linhas pela norma L2, mantendo linhas nulas como zero."""
+    norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))
+    norms[norms == 0] = 1.0
+    matrix /= norms[:, None]
+    return matrix
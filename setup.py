@@ -16,6 +16,25 @@ setup(
         "generate_report",
         "generate_report_html",
         "style_checker",
+        "retrieval",
+        "embedding_store",
+        "embedding_cache",
+        "embedding_checkpoint",
+        "batching",
+        "async_embedding",
+        "rate_limiter",
+        "embedding_providers",
+        "fake_embedding_server",
+        "pipeline",
+        "build_manifest",
+        "flow_dag",
+        "process_output",
+        "profiling",
+        "benchmark",
+        "lazy_imports",
+        "results_io",
+        "coverage_sweep",
+        "ann_index",
     ]
     # Não é necessário entry_points aqui se todos estiverem no pyproject.toml [project.scripts]
     # Não é necessário install_requires aqui se estiver no pyproject.toml [project.dependencies]
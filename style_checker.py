@@ -15,10 +15,15 @@ from typing import List, Dict, Any
 load_dotenv()
 
 
+from embedding_cache import cache_summary
+from embedding_providers import get_provider
+from embedding_store import load_embeddings
+from retrieval import ChunkIndex
 from utils import (
     clean_text_for_embedding,
-    generate_embedding_with_retry,
+    generate_gemini_embeddings_batch,
     GEMINI_EMBEDDING_MODEL,
+    format_memory_usage,
 )
 
 
@@ -39,30 +44,40 @@ def check_style(
     embeddings_path: str = "style_embeddings.json",
     api_key: str | None = None,
     threshold: float = 0.8,
+    load_mode: str = "auto",
+    provider: str = "gemini",
 ) -> List[Dict[str, Any]]:
-    """Analisa o texto e retorna sentenças fora do padrão de estilo."""
+    """
+    Analisa o texto e retorna sentenças fora do padrão de estilo.
+
+    ``load_mode`` controla como a matriz de embeddings é aberta (veja
+    ``embedding_store.LOAD_MODES``). ``provider`` deve ser o mesmo usado
+    para gerar os embeddings do guia de estilo (``gemini`` ou ``local``).
+    """
     if not os.path.exists(embeddings_path):
         raise FileNotFoundError(f"Embeddings file '{embeddings_path}' not found")
 
-    with open(embeddings_path, "r", encoding="utf-8") as f:
-        style_data = json.load(f)
+    style_chunks, style_matrix = load_embeddings(embeddings_path, load_mode=load_mode)
+    style_index = ChunkIndex(style_chunks, style_matrix, copy=False)
 
     sentences = [s.strip() for s in re.split(r"[.!?]+", text) if s.strip()]
-    flagged: List[Dict[str, Any]] = []
-    for sentence in sentences:
-        clean_sentence = clean_text_for_embedding(sentence)
-        embedding = generate_embedding_with_retry(
-            clean_sentence, api_key or os.getenv("GOOGLE_API_KEY"), model=GEMINI_EMBEDDING_MODEL
+    # Todas as frases são enviadas em requisições de lote
+    cleaned_sentences = [clean_text_for_embedding(sentence) for sentence in sentences]
+    if provider == "local":
+        embeddings = get_provider("local").embed(cleaned_sentences)
+    else:
+        embeddings = generate_gemini_embeddings_batch(
+            cleaned_sentences,
+            api_key or os.getenv("GOOGLE_API_KEY"),
+            model=GEMINI_EMBEDDING_MODEL,
         )
+    flagged: List[Dict[str, Any]] = []
+    for sentence, embedding in zip(sentences, embeddings):
         if embedding is None:
             continue
         best_sim = 0.0
-        for item in style_data:
-            style_emb = item.get("embedding")
-            if style_emb:
-                sim = cosine_similarity(embedding, style_emb)
-                if sim > best_sim:
-                    best_sim = sim
+        for item in style_index.search(embedding, top_k=1):
+            best_sim = max(best_sim, item["similarity"])
         if best_sim < threshold:
             flagged.append({"sentence": sentence, "similarity": best_sim})
     return flagged
@@ -76,7 +91,7 @@ def cli_main() -> None:
     parser.add_argument("input_file", help="Arquivo de texto a verificar")
     parser.add_argument(
         "embeddings_file",
-        help="Arquivo JSON com embeddings do guia de estilo",
+        help="Arquivo com embeddings do guia de estilo (JSON ou store binário .npy)",
     )
     parser.add_argument(
         "threshold",
@@ -87,6 +102,18 @@ def cli_main() -> None:
         "--api_key",
         help="Chave de API opcional (senão usa GOOGLE_API_KEY do ambiente)",
     )
+    parser.add_argument(
+        "--load-mode",
+        choices=["auto", "mmap", "memory"],
+        default="auto",
+        help="Carregamento da matriz de embeddings: mmap, memory ou auto (padrão).",
+    )
+    parser.add_argument(
+        "--provider",
+        choices=["gemini", "local"],
+        default="gemini",
+        help="Provedor dos embeddings das frases; use o mesmo da geração dos embeddings do guia (padrão: gemini).",
+    )
     args = parser.parse_args()
 
     with open(args.input_file, "r", encoding="utf-8") as f:
@@ -97,12 +124,18 @@ def cli_main() -> None:
         embeddings_path=args.embeddings_file,
         api_key=args.api_key,
         threshold=args.threshold,
+        load_mode=args.load_mode,
+        provider=args.provider,
     )
     print(json.dumps(issues, ensure_ascii=False, indent=2))
     if issues:
         print("Trechos fora do padrão encontrados.")
     else:
         print("Nenhum problema de estilo encontrado.")
+    print(f"Memória: {format_memory_usage()}", file=sys.stderr)
+    summary = cache_summary()
+    if summary:
+        print(summary, file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+import csv
+import json
+import os
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Stub dependencies before import (the local provider needs no API)
+fake_google = types.ModuleType("google")
+fake_genai = types.ModuleType("google.generativeai")
+fake_google.generativeai = fake_genai
+sys.modules.setdefault("google", fake_google)
+sys.modules.setdefault("google.generativeai", fake_genai)
+fake_dotenv = types.ModuleType("dotenv")
+setattr(fake_dotenv, "load_dotenv", lambda *a, **k: None)
+sys.modules.setdefault("dotenv", fake_dotenv)
+sys.modules.setdefault("openai", types.ModuleType("openai"))
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from ann_index import IVFIndex, ann_index_path, build_ann_index, document_key, load_ann_index
+from embedding_store import save_embedding_store
+from retrieval import ChunkIndex
+
+
+def clustered_matrix(rows=600, dimension=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(12, dimension))
+    return (centers[rng.integers(0, 12, size=rows)] + rng.normal(size=(rows, dimension)) * 0.3).astype(np.float32)
+
+
+def test_ivf_partitions_every_row_once_and_full_probe_is_exact():
+    matrix = clustered_matrix()
+    index = IVFIndex.build(matrix, nlist=10, nprobe=2)
+
+    assert index.nlist == 10 and index.nprobe == 2
+    assert sorted(index.list_rows.tolist()) == list(range(len(matrix)))
+    assert index.list_offsets[-1] == len(matrix)
+
+    chunks = [{"row": row} for row in range(len(matrix))]
+    exact = ChunkIndex(chunks, matrix)
+    approximate = ChunkIndex(chunks, matrix, ann=IVFIndex(index.centroids, index.list_offsets, index.list_rows, nprobe=10))
+    queries = matrix[::37] + 0.05
+    for found, expected in zip(approximate.search_batch(queries, top_k=5), exact.search_batch(queries, top_k=5)):
+        assert [item["row"] for item in found] == [item["row"] for item in expected]
+        assert [item["similarity"] for item in found] == pytest.approx([item["similarity"] for item in expected], abs=1e-6)
+
+    # A partial probe only scores the candidate partitions
+    candidates = index.candidate_rows(queries[:1] / np.linalg.norm(queries[:1]))[0]
+    assert 0 < len(candidates) < len(matrix) and np.all(np.diff(candidates) > 0)
+    assert all(item["row"] in set(candidates.tolist()) for item in ChunkIndex(chunks, matrix, ann=index).search(queries[0], top_k=3))
+
+
+def test_document_index_groups_chunks_per_document_and_full_shortlist_is_exact(tmp_path):
+    matrix = clustered_matrix(rows=90)
+    chunks = [{"row": row, "document_filepath": f"doc{row % 7}.md", "document_slug": f"d{row % 7}"} for row in range(len(matrix))]
+    index = IVFIndex.from_documents(chunks, matrix, nprobe=2)
+
+    assert index.nlist == 7 and index.nprobe == 2
+    assert index.labels == [f"doc{doc}.md" for doc in range(7)]
+    for doc in range(7):
+        rows = index.list_rows[index.list_offsets[doc]:index.list_offsets[doc + 1]].tolist()
+        assert rows == list(range(doc, len(matrix), 7))
+    members = matrix[doc::7] / np.linalg.norm(matrix[doc::7], axis=1, keepdims=True)
+    expected_centroid = members.sum(axis=0) / np.linalg.norm(members.sum(axis=0))
+    assert index.centroids[doc] == pytest.approx(expected_centroid, abs=1e-5)
+    assert document_key({"document_slug": "s", "document_title": "T"}) == "s"
+
+    # Shortlisting every document is the exact search
+    queries = matrix[::11] + 0.05
+    exact = ChunkIndex(chunks, matrix).search_batch(queries, top_k=4)
+    everything = IVFIndex(index.centroids, index.list_offsets, index.list_rows, nprobe=7)
+    for found, expected in zip(ChunkIndex(chunks, matrix, ann=everything).search_batch(queries, top_k=4), exact):
+        assert [item["row"] for item in found] == [item["row"] for item in expected]
+
+    index.save(str(tmp_path / "emb.docs.npz"))
+    loaded = IVFIndex.load(str(tmp_path / "emb.docs.npz"))
+    assert loaded.labels == index.labels and loaded.nprobe == 2
+
+
+def test_index_is_persisted_next_to_the_store_and_checked_for_staleness(tmp_path, capsys):
+    matrix = clustered_matrix(rows=100)
+    store = tmp_path / "emb.npy"
+    save_embedding_store([{"chunk_title": str(row), "embedding": vector.tolist()} for row, vector in enumerate(matrix)], str(store))
+
+    assert build_ann_index(str(store), nlist=4, nprobe=3)
+    assert ann_index_path(str(store)) == str(tmp_path / "emb.ivf.npz")
+    loaded = load_ann_index(str(store), matrix)
+    assert (loaded.nlist, loaded.nprobe, loaded.rows) == (4, 3, 100)
+    assert load_ann_index(str(store), matrix, nprobe=1).nprobe == 1
+
+    # A different matrix, or embeddings newer than the index, fall back to the exact search
+    assert load_ann_index(str(store), matrix[:50]) is None
+    later = os.path.getmtime(ann_index_path(str(store))) + 10
+    os.utime(store, (later, later))
+    assert load_ann_index(str(store), matrix) is None
+    assert "desatualizado" in capsys.readouterr().out
+    assert load_ann_index(str(tmp_path / "other.npy"), matrix) is None
+
+
+def test_evaluate_coverage_can_search_through_the_ann_index(tmp_path, monkeypatch):
+    import generate_embeddings
+    from evaluate_coverage import evaluate_coverage
+
+    monkeypatch.setenv("DOCS_CLI_CACHE", "0")
+    raw_docs = [
+        {"title": "Instalação", "content": "## Instalar\nPara instalar o pacote execute pip install docs-cli.", "filepath": "i.md", "slug": "i"},
+        {"title": "Receitas", "content": "## Bolo\nMisture farinha, ovos e açúcar para o bolo de cenoura.", "filepath": "r.md", "slug": "r"},
+    ]
+    raw_path = tmp_path / "raw.json"
+    raw_path.write_text(json.dumps(raw_docs), encoding="utf-8")
+    store_path = tmp_path / "emb.npy"
+    assert generate_embeddings.generate_embeddings_for_docs(str(raw_path), str(store_path), provider="local")
+    assert build_ann_index(str(store_path), nlist=2, nprobe=2)
+
+    qa_file = tmp_path / "qa.csv"
+    with open(qa_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["question", "response"])
+        writer.writeheader()
+        writer.writerow({"question": "Como instalar o pacote?", "response": "Para instalar o pacote execute pip install docs-cli."})
+
+    out_file = tmp_path / "out.json"
+    assert evaluate_coverage(str(qa_file), str(store_path), top_k_chunks=1, output_json_path=str(out_file), provider="local", ann=True)
+    result = json.loads(out_file.read_text(encoding="utf-8"))[0]
+    assert result["top_k_chunks_relevantes"][0]["document_title"] == "Instalação"
+    assert result["status"].startswith("Encontrada")
+
+    # Two-stage search: only the chunks of the closest document are scored
+    assert build_ann_index(str(store_path), documents=True)
+    assert ann_index_path(str(store_path), documents=True) == str(tmp_path / "emb.docs.npz")
+    assert evaluate_coverage(str(qa_file), str(store_path), top_k_chunks=2, output_json_path=str(out_file), provider="local", doc_shortlist=1)
+    result = json.loads(out_file.read_text(encoding="utf-8"))[0]
+    assert [chunk["document_title"] for chunk in result["top_k_chunks_relevantes"]] == ["Instalação"]
+    assert not evaluate_coverage(str(qa_file), str(store_path), output_json_path=str(out_file), provider="local", ann=True, doc_shortlist=1)
+
+
+def test_index_of_a_json_does_not_share_the_store_index_name():
+    assert ann_index_path("out/emb.npy") == "out/emb.ivf.npz"
+    assert ann_index_path("out/emb.json") == "out/emb.json.ivf.npz"
+    assert ann_index_path("out/emb.json", documents=True) == "out/emb.json.docs.npz"
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from async_embedding import gather_bounded, get_concurrency, run_concurrently
+
+
+def test_run_concurrently_keeps_input_order_and_bounds_in_flight():
+    lock = threading.Lock()
+    state = {"in_flight": 0, "max_in_flight": 0}
+
+    def slow_square(value):
+        with lock:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        # Later items finish first, so completion order differs from input order
+        time.sleep(0.002 * (10 - value))
+        with lock:
+            state["in_flight"] -= 1
+        return value * value
+
+    completed = []
+    results = run_concurrently(
+        list(range(10)), slow_square, concurrency=3, on_result=lambda i, r: completed.append(i)
+    )
+    assert results == [value * value for value in range(10)]
+    assert sorted(completed) == list(range(10))
+    assert 1 < state["max_in_flight"] <= 3
+
+
+def test_run_concurrently_sequential_and_inside_running_loop():
+    assert run_concurrently(["a", "b"], str.upper, concurrency=1) == ["A", "B"]
+
+    async def inside_loop():
+        return run_concurrently([1, 2, 3], lambda v: v + 1, concurrency=2)
+
+    assert asyncio.run(inside_loop()) == [2, 3, 4]
+    assert asyncio.run(gather_bounded([1, 2], lambda v: -v, 2)) == [-1, -2]
+
+
+def test_get_concurrency_overrides(monkeypatch):
+    assert get_concurrency("openai") == 8
+    monkeypatch.setenv("DOCS_CLI_DEEPINFRA_CONCURRENCY", "2")
+    assert get_concurrency("maritaca") == 2
+    assert get_concurrency("deepinfra", 5) == 5
+    with pytest.raises(ValueError):
+        get_concurrency("gemini", 0)
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from batching import get_batch_limits, plan_batches
+
+
+def test_plan_batches_respects_item_and_char_budgets():
+    texts = ["aaaa", "bb", "cccccc", "d", "eeeeeeeeeeee", "f"]
+    batches = plan_batches(texts, max_chars=8, max_items=2)
+    assert batches == [[0, 1], [2, 3], [4], [5]]
+    assert [i for batch in batches for i in batch] == list(range(len(texts)))
+
+
+def test_plan_batches_empty_input():
+    assert plan_batches([], max_chars=10, max_items=10) == []
+
+
+def test_get_batch_limits_overrides(monkeypatch):
+    monkeypatch.setenv("DOCS_CLI_OPENAI_BATCH_MAX_ITEMS", "7")
+    limits = get_batch_limits("openai")
+    assert limits["max_items"] == 7
+    assert get_batch_limits("openai", max_items=3)["max_items"] == 3
+    assert get_batch_limits("maritaca") == get_batch_limits("deepinfra")
+    with pytest.raises(ValueError):
+        get_batch_limits("openai", max_chars=0)
@@ -0,0 +1,136 @@
+import csv
+import json
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+if not hasattr(pd, "read_csv"):
+    pytest.skip("pandas is stubbed by another test module", allow_module_level=True)
+
+# Stub dependencies before import (the local provider needs no API)
+fake_google = types.ModuleType("google")
+fake_genai = types.ModuleType("google.generativeai")
+fake_google.generativeai = fake_genai
+sys.modules.setdefault("google", fake_google)
+sys.modules.setdefault("google.generativeai", fake_genai)
+fake_dotenv = types.ModuleType("dotenv")
+setattr(fake_dotenv, "load_dotenv", lambda *a, **k: None)
+sys.modules.setdefault("dotenv", fake_dotenv)
+sys.modules.setdefault("openai", types.ModuleType("openai"))
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import benchmark
+from benchmark import BENCHMARK_STAGES, benchmark_paths, generate_corpus, generate_qa_csv, run_benchmark, write_results
+
+
+def test_generated_corpus_has_requested_shape(tmp_path):
+    sample = generate_corpus(str(tmp_path / "docs"), docs=3, sections=4, section_words=40, seed=7)
+
+    files = sorted((tmp_path / "docs").rglob("*.md"))
+    assert len(files) == 3
+    text = files[0].read_text(encoding="utf-8")
+    assert text.startswith("## Metadata_Start\n## title: Documento 0")
+    assert text.count("## Seção ") == 4
+    assert sample and all(sentence.endswith(".") for sentence in sample)
+    # Same seed, same corpus
+    generate_corpus(str(tmp_path / "again"), docs=3, sections=4, section_words=40, seed=7)
+    assert (tmp_path / "again" / files[0].relative_to(tmp_path / "docs")).read_text(encoding="utf-8") == text
+
+
+def test_generated_qa_csv_mixes_covered_new_and_invalid_answers(tmp_path):
+    corpus_sentences = ["Cliente configura banco de dados."]
+    path = tmp_path / "qa.csv"
+    generate_qa_csv(str(path), rows=200, sentences=2, corpus_sentences=corpus_sentences, invalid_ratio=0.1, seed=1)
+
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 200
+    answers = [row["response"] for row in rows]
+    assert any(answer == "Cliente configura banco de dados. Cliente configura banco de dados." for answer in answers)
+    assert any(answer in benchmark.INVALID_ANSWERS for answer in answers)
+    assert len({row["question"] for row in rows}) == 200
+
+
+def test_run_benchmark_measures_every_stage(tmp_path, monkeypatch):
+    monkeypatch.setenv("DOCS_CLI_CACHE", "0")
+    paths = benchmark_paths(str(tmp_path))
+    sample = generate_corpus(paths["docs"], docs=4, sections=2, section_words=30)
+    generate_qa_csv(paths["qa"], rows=6, corpus_sentences=sample)
+
+    results = run_benchmark(str(tmp_path), provider="local", top_k=2, isolate=False)
+
+    assert [result["stage"] for result in results] == list(BENCHMARK_STAGES)
+    by_stage = {result["stage"]: result for result in results}
+    assert by_stage["merge"]["items"] == 4
+    assert by_stage["clean_csv"]["items"] == 6
+    assert by_stage["evaluate"]["items"] == by_stage["report_html"]["items"] > 0
+    assert all(result["seconds"] >= 0 and result["input_mb"] >= 0 for result in results)
+    assert Path(paths["html_report"]).exists()
+
+    write_results(str(tmp_path / "results.json"), {"docs": 4}, results)
+    saved = json.loads((tmp_path / "results.json").read_text(encoding="utf-8"))
+    assert saved["parameters"] == {"docs": 4}
+    assert [stage["stage"] for stage in saved["stages"]] == list(BENCHMARK_STAGES)
+
+
+def test_isolated_stage_reports_its_own_peak_memory(tmp_path):
+    paths = benchmark_paths(str(tmp_path))
+    generate_corpus(paths["docs"], docs=2, sections=1, section_words=20)
+
+    (result,) = run_benchmark(str(tmp_path), stages=["merge"], isolate=True)
+
+    assert result["items"] == 2
+    assert result["peak_rss_mb"] >= result["baseline_rss_mb"] > 0
+
+
+def test_commands_do_not_import_heavy_sdks_at_load_time():
+    from benchmark import IMPORT_TIME_BUDGETS, measure_import
+
+    for module in IMPORT_TIME_BUDGETS:
+        result = measure_import(module, repeat=1)
+        assert result["unexpected_modules"] == [], module
+
+
+def test_scoring_benchmark_compares_loop_and_matrix_paths():
+    from benchmark import benchmark_scoring
+
+    result = benchmark_scoring(questions=30, sentences=4, top_k=3, dimension=16, distinct=10)
+
+    assert result["mismatches"] == 0
+    assert result["loop_s"] > 0 and result["matrix_s"] > 0
+    assert 0 < result["covered_sentences"] < 30 * 4
+
+
+def test_ann_benchmark_reports_recall_per_nprobe():
+    from benchmark import benchmark_ann
+
+    result = benchmark_ann(rows=3000, dimension=16, queries=20, nprobes=(1, 1000))
+
+    assert result["nlist"] == 55
+    first, full = result["nprobes"]
+    assert full["nprobe"] == 55 and full["recall"] == 1.0
+    assert first["candidates"] < full["candidates"] == 3000
+
+
+def test_document_index_benchmark_reports_recall_per_shortlist():
+    from benchmark import benchmark_document_index
+
+    result = benchmark_document_index(docs=40, sections=20, dimension=16, queries=20, shortlists=(1, 1000))
+
+    first, full = result["shortlists"]
+    assert first["shortlist"] == 1 and first["candidates"] == 20
+    assert full["shortlist"] == 40 and full["recall"] == 1.0 and full["candidates"] == 800
+
+
+def test_each_mode_writes_its_own_default_results_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["benchmark.py", "--scoring", "--scoring-questions", "5"])
+    benchmark.cli_main()
+
+    assert [path.name for path in tmp_path.iterdir()] == ["benchmark_scoring.json"]
+    assert "scoring" in json.loads((tmp_path / "benchmark_scoring.json").read_text(encoding="utf-8"))
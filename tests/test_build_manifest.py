@@ -0,0 +1,141 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import docs_tc
+from build_manifest import BuildManifest, file_digest
+
+
+def make_options(tmp_path, **overrides):
+    options = {
+        "raw_docs_file": str(tmp_path / "raw.json"),
+        "embeddings_file": str(tmp_path / "emb.json"),
+        "provider": "local",
+    }
+    options.update(overrides)
+    return options
+
+
+def test_stage_is_up_to_date_until_input_params_or_output_change(tmp_path):
+    options = make_options(tmp_path)
+    (tmp_path / "raw.json").write_text("[1]", encoding="utf-8")
+    (tmp_path / "emb.json").write_text("[2]", encoding="utf-8")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    manifest = BuildManifest(manifest_path)
+    assert not manifest.is_up_to_date("generate_embeddings", options)
+    manifest.record("generate_embeddings", options)
+
+    # Reloaded from disk
+    manifest = BuildManifest(manifest_path)
+    assert manifest.is_up_to_date("generate_embeddings", options)
+    assert not manifest.is_up_to_date("generate_embeddings", make_options(tmp_path, provider="openai"))
+
+    (tmp_path / "emb.json").write_text("[3]", encoding="utf-8")
+    assert not manifest.is_up_to_date("generate_embeddings", options)
+    (tmp_path / "emb.json").write_text("[2]", encoding="utf-8")
+    assert manifest.is_up_to_date("generate_embeddings", options)
+
+    (tmp_path / "raw.json").write_text("[1, 4]", encoding="utf-8")
+    assert not manifest.is_up_to_date("generate_embeddings", options)
+
+
+def test_embedding_model_change_with_same_provider_invalidates_stage(tmp_path, monkeypatch):
+    options = make_options(tmp_path)
+    (tmp_path / "raw.json").write_text("[1]", encoding="utf-8")
+    (tmp_path / "emb.json").write_text("[2]", encoding="utf-8")
+    monkeypatch.delenv("DOCS_CLI_LOCAL_DIMENSION", raising=False)
+    manifest = BuildManifest(str(tmp_path / "manifest.json"))
+    manifest.record("generate_embeddings", options)
+    assert manifest.stages["generate_embeddings"]["params"]["provider"] == "local:hashed-ngrams-v1-512"
+    assert manifest.is_up_to_date("generate_embeddings", options)
+
+    monkeypatch.setenv("DOCS_CLI_LOCAL_DIMENSION", "64")
+    assert not manifest.is_up_to_date("generate_embeddings", options)
+
+
+def test_provider_param_does_not_import_numpy():
+    # The docs-cli process resolves the embedding model for the manifest without loading NumPy
+    code = (
+        "import sys; from build_manifest import _param_value; "
+        "assert _param_value('provider', 'local').startswith('local:'); "
+        "print('numpy' in sys.modules)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=str(ROOT), capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_stage_with_missing_output_is_never_up_to_date(tmp_path):
+    options = make_options(tmp_path)
+    (tmp_path / "raw.json").write_text("[1]", encoding="utf-8")
+    manifest = BuildManifest(str(tmp_path / "manifest.json"))
+    manifest.record("generate_embeddings", options)
+    assert not manifest.is_up_to_date("generate_embeddings", options)
+
+
+def test_directory_digest_tracks_markdown_files(tmp_path):
+    (tmp_path / "a.md").write_text("# A", encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("ignored", encoding="utf-8")
+    first = file_digest(str(tmp_path))
+    (tmp_path / "notes.txt").write_text("still ignored", encoding="utf-8")
+    assert file_digest(str(tmp_path)) == first
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.md").write_text("# B", encoding="utf-8")
+    assert file_digest(str(tmp_path)) != first
+    assert file_digest(str(tmp_path / "missing.md")) is None
+
+
+def test_incremental_full_flow_skips_unchanged_steps(monkeypatch, tmp_path):
+    calls = []
+    commands = []
+    outputs = {
+        "docs-tc-merge-markdown": lambda cmd: cmd[2],
+        "docs-tc-clean-csv": lambda cmd: cmd[2],
+        "docs-tc-extract-data": lambda cmd: cmd[2],
+        "docs-tc-generate-embeddings": lambda cmd: cmd[2],
+        "docs-tc-evaluate-coverage": lambda cmd: cmd[cmd.index("-o") + 1],
+        "docs-tc-generate-report-md": lambda cmd: cmd[2],
+        "docs-tc-generate-report-html": lambda cmd: cmd[2],
+    }
+
+    def fake_run_script(cmd, verbose=False):
+        calls.append(cmd[0])
+        commands.append(cmd)
+        # The cleaned CSV mirrors its input; every other step writes a fixed output
+        content = Path(cmd[1]).read_text(encoding="utf-8") if cmd[0] == "docs-tc-clean-csv" else cmd[0]
+        Path(outputs[cmd[0]](cmd)).write_text(content, encoding="utf-8")
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.md").write_text("# A", encoding="utf-8")
+    (tmp_path / "qa.csv").write_text("question,response\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(docs_tc, "run_script", fake_run_script)
+    monkeypatch.setattr(docs_tc, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(docs_tc, "CONFIG_FILE", tmp_path / "config.json")
+    argv = ["docs_tc.py", "full_flow", "docs", "qa.csv", "--provider", "local", "--incremental"]
+    monkeypatch.setattr(sys, "argv", argv)
+
+    docs_tc.main()
+    assert len(calls) == 7
+    assert commands[3][0] == "docs-tc-generate-embeddings"
+    assert "--incremental" in commands[3]
+    assert (tmp_path / ".docs-cli-manifest.json").exists()
+
+    calls.clear()
+    docs_tc.main()
+    assert calls == []
+
+    # Only the changed branch reruns; the evaluation output is unchanged, so the reports stay cached
+    (tmp_path / "qa.csv").write_text("question,response\nQ?,R\n", encoding="utf-8")
+    calls.clear()
+    docs_tc.main()
+    assert calls == ["docs-tc-clean-csv", "docs-tc-evaluate-coverage"]
+
+    calls.clear()
+    monkeypatch.setattr(sys, "argv", argv + ["--eval_top_k", "3"])
+    docs_tc.main()
+    assert calls == ["docs-tc-evaluate-coverage", "docs-tc-generate-report-md", "docs-tc-generate-report-html"]
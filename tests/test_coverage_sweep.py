@@ -0,0 +1,106 @@
+import csv
+import json
+import sys
+import types
+from pathlib import Path
+
+# Stub dependencies before import (the local provider needs no API)
+fake_google = types.ModuleType("google")
+fake_genai = types.ModuleType("google.generativeai")
+fake_google.generativeai = fake_genai
+sys.modules.setdefault("google", fake_google)
+sys.modules.setdefault("google.generativeai", fake_genai)
+fake_dotenv = types.ModuleType("dotenv")
+setattr(fake_dotenv, "load_dotenv", lambda *a, **k: None)
+sys.modules.setdefault("dotenv", fake_dotenv)
+sys.modules.setdefault("openai", types.ModuleType("openai"))
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import pytest
+
+from coverage_sweep import run_sweep
+from evaluate_coverage import evaluate_coverage
+
+# One sentence per section, so each chunk covers a single answer sentence
+SECTIONS = [
+    ("Instalação", ["Para instalar o pacote execute pip install docs-cli.", "O pacote requer Python 3.10."]),
+    ("Configuração", ["As chaves ficam no arquivo env na raiz do projeto.", "Defina GOOGLE_API_KEY antes de gerar embeddings."]),
+    ("Relatórios", ["O relatório HTML mostra as frases cobertas por pergunta.", "O relatório Markdown resume a cobertura geral."]),
+    ("Receitas", ["Misture farinha, ovos e açúcar para o bolo de cenoura.", "Asse por quarenta minutos."]),
+]
+
+QA_ROWS = [
+    ("Como instalar?", "Para instalar o pacote execute pip install docs-cli. O pacote requer Python 3.10."),
+    ("Onde ficam as chaves?", "As chaves ficam no arquivo env na raiz do projeto. Defina GOOGLE_API_KEY antes de gerar embeddings."),
+    ("Como instalar e configurar?", "Para instalar o pacote execute pip install docs-cli. Defina GOOGLE_API_KEY antes de gerar embeddings."),
+    ("O que o relatório mostra?", "O relatório HTML mostra as frases cobertas. A cobertura é calculada por limiar de similaridade."),
+    ("Como fazer bolo?", "Misture farinha, ovos e açúcar para o bolo de cenoura. Sirva com calda de chocolate."),
+    ("Pergunta sem resposta", "Click here"),
+]
+
+
+@pytest.fixture
+def evaluation_inputs(tmp_path, monkeypatch):
+    import generate_embeddings
+
+    monkeypatch.setenv("DOCS_CLI_CACHE", "0")
+    raw_docs = [
+        {
+            "title": title,
+            "content": "\n".join(f"## {title} {part}\n{sentence}" for part, sentence in enumerate(sentences)),
+            "filepath": f"{index}.md",
+            "slug": str(index),
+        }
+        for index, (title, sentences) in enumerate(SECTIONS)
+    ]
+    raw_path = tmp_path / "raw.json"
+    raw_path.write_text(json.dumps(raw_docs), encoding="utf-8")
+    store_path = tmp_path / "emb.npy"
+    assert generate_embeddings.generate_embeddings_for_docs(str(raw_path), str(store_path), provider="local")
+
+    qa_file = tmp_path / "qa.csv"
+    with open(qa_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["question", "response"])
+        writer.writeheader()
+        for question, response in QA_ROWS:
+            writer.writerow({"question": question, "response": response})
+    return str(qa_file), str(store_path)
+
+
+def test_sweep_matches_full_evaluation_for_each_top_k(evaluation_inputs, tmp_path):
+    qa_file, store_path = evaluation_inputs
+    output = tmp_path / "sweep.csv"
+
+    results = run_sweep(
+        qa_file, store_path, top_ks=[1, 2, 4], thresholds=[0.65, 0.9], min_coverages=[0.5, 0.7],
+        output_path=str(output), provider="local",
+    )
+
+    assert [(r["top_k"], r["threshold"], r["min_coverage"]) for r in results[:4]] == [
+        (1, 0.65, 0.5), (1, 0.65, 0.7), (1, 0.9, 0.5), (1, 0.9, 0.7),
+    ]
+    by_config = {(r["top_k"], r["threshold"], r["min_coverage"]): r for r in results}
+    for top_k in (1, 2, 4):
+        evaluated = tmp_path / f"eval_{top_k}.json"
+        assert evaluate_coverage(qa_file, store_path, top_k_chunks=top_k, output_json_path=str(evaluated), provider="local")
+        evaluation = json.loads(evaluated.read_text(encoding="utf-8"))
+        found = sum(1 for item in evaluation if item["status"].startswith("Encontrada"))
+        covered = sum(1 for item in evaluation for detail in item["cobertura_detalhes"] if detail["status"] == "Coberta")
+        assert (by_config[(top_k, 0.65, 0.7)]["found"], by_config[(top_k, 0.65, 0.7)]["sentences_covered"]) == (found, covered)
+
+    # More chunks, a lower threshold or a lower percentage never finds fewer answers
+    assert by_config[(4, 0.65, 0.5)]["found"] >= by_config[(1, 0.65, 0.5)]["found"] > 0
+    assert by_config[(2, 0.65, 0.5)]["found"] >= by_config[(2, 0.65, 0.7)]["found"] >= by_config[(2, 0.9, 0.7)]["found"]
+    assert all(r["questions"] == len(QA_ROWS) for r in results)
+
+    with open(output, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 12 and rows[0]["top_k"] == "1"
+
+
+def test_sweep_rejects_invalid_grid(evaluation_inputs):
+    qa_file, store_path = evaluation_inputs
+    assert run_sweep(qa_file, store_path, top_ks=[0, 5], output_path=None, provider="local") is None
+    assert run_sweep(qa_file, store_path, thresholds=[], output_path=None, provider="local") is None
@@ -12,21 +12,22 @@ import subprocess
 import docs_tc
 
 
-def test_run_script_success(monkeypatch):
-    def fake_run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace"):
-        return subprocess.CompletedProcess(cmd, 0, stdout="ok", stderr="")
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    result = docs_tc.run_script(["echo", "hi"])
+def test_run_script_success(capsys):
+    result = docs_tc.run_script([sys.executable, "-c", "print('ok')"], verbose=True)
     assert isinstance(result, subprocess.CompletedProcess)
     assert result.returncode == 0
+    assert "] ok" in capsys.readouterr().out
 
 
-def test_run_script_failure(monkeypatch):
-    def fake_run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace"):
-        return subprocess.CompletedProcess(cmd, 1, stdout="", stderr="err")
-    monkeypatch.setattr(subprocess, "run", fake_run)
-    result = docs_tc.run_script(["bad", "cmd"])
+def test_run_script_failure(capsys):
+    code = "import sys; print('step 1'); print('err', file=sys.stderr); sys.exit(3)"
+    result = docs_tc.run_script([sys.executable, "-c", code])
     assert result is None
+    captured = capsys.readouterr()
+    # stdout is not echoed without verbose, but the failure summary repeats the tail
+    assert "] step 1" not in captured.out
+    assert "Código de saída: 3" in captured.err
+    assert "  step 1" in captured.err and "  err" in captured.err
 
 
 def test_main_merge_invokes_run_script(monkeypatch, tmp_path):
@@ -71,6 +72,24 @@ def test_main_style_check_invokes_run_script(monkeypatch, tmp_path):
     ]
 
 
+def test_main_evaluate_sweep_forwards_the_grid(monkeypatch, tmp_path):
+    called = {}
+    def fake_run_script(cmd, verbose=False):
+        called["cmd"] = cmd
+        return True
+    monkeypatch.setattr(docs_tc, "run_script", fake_run_script)
+    monkeypatch.setattr(docs_tc, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(docs_tc, "CONFIG_FILE", tmp_path / "config.json")
+    monkeypatch.setattr(sys, "argv", [
+        "docs_tc.py", "evaluate_sweep", "qa.csv", "emb.npy", "-k", "3", "10", "--thresholds", "0.6", "--provider", "local",
+    ])
+    docs_tc.main()
+    assert called["cmd"] == [
+        "docs-tc-coverage-sweep", "qa.csv", "emb.npy", "-o", "coverage_sweep.csv",
+        "--top-k", "3", "10", "--thresholds", "0.6", "--provider", "local",
+    ]
+
+
 def test_main_full_flow_invokes_all_steps(monkeypatch, tmp_path):
     called = []
     def fake_run_script(cmd, verbose=False):
@@ -0,0 +1,136 @@
+import sys
+import time
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+fake_google = types.ModuleType("google")
+fake_genai = types.ModuleType("google.generativeai")
+setattr(fake_genai, "embed_content", lambda model=None, content=None: {"embedding": [0.1, 0.2]})
+fake_google.generativeai = fake_genai
+sys.modules.setdefault("google", fake_google)
+sys.modules.setdefault("google.generativeai", fake_genai)
+
+import embedding_cache
+from embedding_cache import EmbeddingCache, cached_embeddings
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    cache.put("openai", "m", "hello", [0.5, -1.25])
+    assert cache.get("openai", "m", "hello") == [0.5, -1.25]
+    assert cache.get("openai", "other-model", "hello") is None
+    assert cache.hits == 1 and cache.misses == 1
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["total_hits"] == 1 and stats["total_misses"] == 1
+
+
+def test_cached_embeddings_only_embeds_missing_unique_texts(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    cache.put("gemini", "m", "a", [1.0])
+    calls = []
+
+    def embed_missing(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    result = cached_embeddings("gemini", "m", ["a", "bb", "bb", "ccc"], embed_missing, cache=cache)
+    assert result == [[1.0], [2.0], [2.0], [3.0]]
+    assert calls == [["bb", "ccc"]]
+
+    calls.clear()
+    cached_embeddings("gemini", "m", ["a", "bb", "ccc"], embed_missing, cache=cache)
+    assert calls == []
+
+
+def test_failed_embeddings_are_not_cached(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    cached_embeddings("gemini", "m", ["x"], lambda texts: [None], cache=cache)
+    assert cache.stats()["entries"] == 0
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    for text in ["old", "mid", "new"]:
+        cache.put("p", "m", text, [1.0, 2.0])  # 16 bytes each
+        time.sleep(0.01)
+    cache.get("p", "m", "old")  # "old" becomes the most recently used
+    removed = cache.prune(max_bytes=32)
+    assert removed == 1
+    assert cache.get("p", "m", "mid") is None
+    assert cache.get("p", "m", "old") == [1.0, 2.0]
+    assert cache.clear() == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_generate_embedding_with_retry_uses_cache(monkeypatch, tmp_path):
+    import embedding_providers
+    import utils
+
+    monkeypatch.setenv("DOCS_CLI_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(embedding_cache, "_default_cache", None)
+    calls = []
+
+    def fake_api(self, texts):
+        calls.extend(texts)
+        return [[0.3, 0.4] for _ in texts]
+
+    monkeypatch.setattr(embedding_providers.GeminiProvider, "embed_batch", fake_api)
+    assert utils.generate_embedding_with_retry("texto", "KEY") == [0.3, 0.4]
+    assert utils.generate_embedding_with_retry("texto", "KEY") == [0.3, 0.4]
+    assert calls == ["texto"]
+    embedding_cache._default_cache.close()
+
+
+def test_reads_are_flushed_in_batches(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path=path)
+    cache.put("p", "m", "a", [1.0])
+    changes = cache._conn.total_changes
+    for _ in range(3):
+        assert cache.get("p", "m", "a") == [1.0]
+    assert cache.get("p", "m", "b") is None
+    assert cache._conn.total_changes == changes  # reads do not write or commit
+    cache.close()
+    stats = EmbeddingCache(path=path).stats()
+    assert stats["total_hits"] == 3 and stats["total_misses"] == 1
+
+
+def test_sqlite_errors_fall_back_to_embedding_and_warn_once(monkeypatch, tmp_path, capsys):
+    import sqlite3
+
+    monkeypatch.setattr(embedding_cache, "_cache_error_reported", False)
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    read_fails = EmbeddingCache(path=str(tmp_path / "read.sqlite"))
+    write_fails = EmbeddingCache(path=str(tmp_path / "write.sqlite"))
+    monkeypatch.setattr(read_fails, "get_many", locked)
+    monkeypatch.setattr(write_fails, "put_many", locked)
+    embed = lambda texts: [[float(len(t))] for t in texts]
+    assert cached_embeddings("p", "m", ["a", "bb"], embed, cache=read_fails) == [[1.0], [2.0]]
+    assert cached_embeddings("p", "m", ["ccc"], embed, cache=read_fails) == [[3.0]]
+    assert cached_embeddings("p", "m", ["dddd"], embed, cache=write_fails) == [[4.0]]
+    assert capsys.readouterr().out.count("erro no cache de embeddings") == 1
+
+
+def test_unavailable_default_cache_warns_once(monkeypatch, capsys):
+    import sqlite3
+
+    attempts = []
+
+    def broken_cache():
+        attempts.append(1)
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(embedding_cache, "_default_cache", None)
+    monkeypatch.setattr(embedding_cache, "_default_cache_disabled", False)
+    monkeypatch.setattr(embedding_cache, "EmbeddingCache", broken_cache)
+    assert embedding_cache.get_default_cache() is None
+    assert embedding_cache.get_default_cache() is None
+    assert attempts == [1]
+    assert capsys.readouterr().out.count("indisponível") == 1
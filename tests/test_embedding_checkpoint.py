@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from embedding_checkpoint import EmbeddingCheckpoint, checkpoint_key, checkpoint_path
+
+
+def test_checkpoint_roundtrip_and_skips_failed_embeddings(tmp_path):
+    path = checkpoint_path(str(tmp_path / "emb.json"))
+    checkpoint = EmbeddingCheckpoint(path)
+    keys = [checkpoint_key("openai:m", text) for text in ("a", "b", "c")]
+
+    assert checkpoint.append_many(keys, [[1.0, 2.0], None, [3.0, 4.0]]) == 2
+    assert keys[0] in checkpoint and keys[1] not in checkpoint
+    checkpoint.close()
+
+    reopened = EmbeddingCheckpoint(path, resume=True)
+    assert len(reopened) == 2
+    assert reopened.get(keys[2]) == [3.0, 4.0]
+    assert reopened.get(keys[1]) is None
+    reopened.discard()
+    assert not Path(path).exists()
+
+
+def test_checkpoint_drops_truncated_last_line(tmp_path):
+    path = str(tmp_path / "emb.json.partial.jsonl")
+    checkpoint = EmbeddingCheckpoint(path)
+    checkpoint.append_many(["k1"], [[1.0]])
+    checkpoint.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "k2", "embed')
+
+    resumed = EmbeddingCheckpoint(path, resume=True)
+    assert "k2" not in resumed
+    resumed.append_many(["k3"], [[3.0]])
+    assert resumed.get("k1") == [1.0]
+    assert resumed.get("k3") == [3.0]
+    resumed.close()
+    assert len(Path(path).read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_namespace_changes_the_key():
+    assert checkpoint_key("openai:a", "texto") != checkpoint_key("local:b", "texto")
@@ -0,0 +1,137 @@
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+fake_google = types.ModuleType("google")
+fake_genai = types.ModuleType("google.generativeai")
+fake_google.generativeai = fake_genai
+sys.modules.setdefault("google", fake_google)
+sys.modules.setdefault("google.generativeai", fake_genai)
+
+import embedding_providers
+from embedding_providers import get_provider
+
+
+@pytest.fixture(autouse=True)
+def isolated_providers(monkeypatch):
+    monkeypatch.setenv("DOCS_CLI_CACHE", "0")
+    monkeypatch.setattr(embedding_providers.time, "sleep", lambda seconds: None)
+    embedding_providers.reset_providers()
+    yield
+    embedding_providers.reset_providers()
+
+
+def test_openai_client_is_created_once_and_batches_requests(monkeypatch):
+    created = []
+    requests_sent = []
+
+    class FakeEmbeddings:
+        def create(self, input=None, model=None):
+            requests_sent.append(list(input))
+            data = [types.SimpleNamespace(embedding=[float(len(text))]) for text in input]
+            return types.SimpleNamespace(data=data)
+
+    class FakeClient:
+        def __init__(self, api_key=None, **kwargs):
+            created.append(api_key)
+            self.embeddings = FakeEmbeddings()
+
+    monkeypatch.setattr(embedding_providers, "openai", types.SimpleNamespace(OpenAI=FakeClient))
+    monkeypatch.setenv("DOCS_CLI_OPENAI_BATCH_MAX_ITEMS", "2")
+
+    provider = get_provider("openai", "KEY")
+    assert provider.dimension == 1536
+    assert provider.max_batch_items == 2
+    assert provider.embed(["a", "bb", "ccc"]) == [[1.0], [2.0], [3.0]]
+    assert provider.embed(["dddd"]) == [[4.0]]
+    assert get_provider("openai", "KEY") is provider
+    assert created == ["KEY"]
+    assert requests_sent == [["a", "bb"], ["ccc"], ["dddd"]]
+
+
+def test_deepinfra_reuses_session_and_retries(monkeypatch):
+    sessions = []
+    responses = [
+        types.SimpleNamespace(status_code=503, text="busy"),
+        types.SimpleNamespace(status_code=200, json=lambda: {"embeddings": [[0.5, 0.5]]}),
+    ]
+
+    class FakeSession:
+        def __init__(self):
+            sessions.append(self)
+            self.headers = {}
+            self.posts = []
+
+        def mount(self, prefix, adapter):
+            pass
+
+        def post(self, url, json=None):
+            self.posts.append((url, json))
+            return responses.pop(0)
+
+    fake_requests = types.SimpleNamespace(
+        Session=FakeSession,
+        adapters=types.SimpleNamespace(HTTPAdapter=lambda **kwargs: kwargs),
+    )
+    monkeypatch.setattr(embedding_providers, "requests", fake_requests)
+
+    provider = get_provider("maritaca", "KEY")
+    assert provider.name == "deepinfra"
+    assert provider.embed(["texto"]) == [[0.5, 0.5]]
+    assert len(sessions) == 1
+    assert len(sessions[0].posts) == 2
+    assert sessions[0].headers["Authorization"] == "bearer KEY"
+    assert sessions[0].posts[0][0].endswith("/intfloat/multilingual-e5-large")
+
+
+def test_failed_requests_return_none_and_unknown_provider_raises(monkeypatch):
+    def failing(self, texts):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(sys.modules["google.generativeai"], "configure", lambda api_key=None: None, raising=False)
+    monkeypatch.setattr(embedding_providers.GeminiProvider, "_request", failing)
+    assert get_provider("gemini", "KEY").embed(["a", "b"]) == [None, None]
+    with pytest.raises(ValueError):
+        get_provider("nope")
+
+
+def test_missing_sdk_raises_without_retrying(monkeypatch):
+    class MissingOpenAI:
+        def __getattr__(self, name):
+            raise ImportError("No module named 'openai'")
+
+    calls = []
+    monkeypatch.setattr(embedding_providers, "openai", MissingOpenAI())
+    monkeypatch.setattr(embedding_providers, "count_api_call", lambda *args, **kwargs: calls.append(kwargs))
+
+    with pytest.raises(ImportError, match="openai package is required"):
+        get_provider("openai", "KEY").embed_batch(["a"])
+    assert calls == []
+
+
+def test_provider_without_request_cannot_be_created():
+    class Incomplete(embedding_providers.EmbeddingProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError, match="_request"):
+        Incomplete()
+
+
+def test_local_provider_is_deterministic_and_batch_independent():
+    provider = get_provider("local")
+    texts = ["Como instalar o pacote", "Instalação do pacote com pip", "Receita de bolo de cenoura", ""]
+    matrix = provider.embed_matrix(texts)
+    assert matrix.shape == (4, provider.dimension)
+    assert abs(float(matrix[0] @ matrix[0]) - 1.0) < 1e-5
+    assert not matrix[3].any()
+    assert float(matrix[0] @ matrix[1]) > float(matrix[0] @ matrix[2])
+
+    fresh = embedding_providers.LocalProvider()
+    single = fresh.embed([texts[1]])[0]
+    assert max(abs(a - b) for a, b in zip(single, matrix[1].tolist())) < 1e-6
+    assert len(embedding_providers.LocalProvider(dimension=64).embed(["x"])[0]) == 64
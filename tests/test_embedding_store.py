@@ -0,0 +1,91 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from embedding_store import load_embeddings, save_embedding_store, store_paths
+
+
+CHUNKS = [
+    {"document_title": "Doc", "chunk_title": "A", "embedding": [1.0, 0.0]},
+    {"document_title": "Doc", "chunk_title": "B", "embedding": None},
+    {"document_title": "Doc", "chunk_title": "C", "embedding": [0.0, 2.0]},
+]
+
+
+def test_json_sidecar_does_not_share_the_store_name():
+    assert store_paths("out/embeddings.npy") == ("out/embeddings.npy", "out/embeddings.meta.jsonl")
+    assert store_paths("out/embeddings.json") == ("out/embeddings.json.npy", "out/embeddings.json.meta.jsonl")
+
+
+def test_save_and_load_store_roundtrip(tmp_path):
+    path = str(tmp_path / "emb.npy")
+    rows = save_embedding_store([dict(c) for c in CHUNKS], path)
+    assert rows == 2
+
+    lines = (tmp_path / "emb.meta.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["row"] for line in lines] == [0, None, 1]
+
+    chunks, matrix = load_embeddings(path)
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (2, 2)
+    assert [c["chunk_title"] for c in chunks] == ["A", "C"]
+    assert "embedding" not in chunks[0]
+    assert matrix[1].tolist() == [0.0, 2.0]
+
+
+def test_load_embeddings_from_json_matches_store(tmp_path):
+    json_path = tmp_path / "emb.json"
+    json_path.write_text(json.dumps(CHUNKS), encoding="utf-8")
+    chunks, matrix = load_embeddings(str(json_path))
+    assert [c["row"] for c in chunks] == [0, 1]
+    assert matrix.tolist() == [[1.0, 0.0], [0.0, 2.0]]
+
+
+def test_mmap_mode_creates_and_reuses_sidecar(tmp_path):
+    json_path = tmp_path / "emb.json"
+    json_path.write_text(json.dumps(CHUNKS), encoding="utf-8")
+
+    chunks, matrix = load_embeddings(str(json_path), load_mode="mmap")
+    assert isinstance(matrix, np.memmap)
+    assert not matrix.flags.writeable
+    assert (tmp_path / "emb.json.npy").exists() and not (tmp_path / "emb.npy").exists()
+    assert [c["chunk_title"] for c in chunks] == ["A", "C"]
+
+    _, reused = load_embeddings(str(json_path), load_mode="auto")
+    assert isinstance(reused, np.memmap)
+
+    _, in_memory = load_embeddings(str(json_path), load_mode="memory")
+    assert not isinstance(in_memory, np.memmap)
+
+
+def test_separate_store_never_replaces_the_json(tmp_path):
+    json_path = tmp_path / "emb.json"
+    json_path.write_text(json.dumps([{"chunk_title": str(i), "embedding": [1.0, float(i)]} for i in range(5)]), encoding="utf-8")
+    # An explicit store with the same base name, written after the JSON
+    save_embedding_store([dict(c) for c in CHUNKS], str(tmp_path / "emb.npy"))
+
+    chunks, _ = load_embeddings(str(json_path), load_mode="auto")
+    assert len(chunks) == 5
+
+
+def test_sidecar_is_stale_once_the_json_is_rewritten(tmp_path, capsys):
+    json_path = tmp_path / "emb.json"
+    json_path.write_text(json.dumps(CHUNKS), encoding="utf-8")
+    load_embeddings(str(json_path), load_mode="mmap")
+    _, matrix = load_embeddings(str(json_path), load_mode="auto")
+    assert isinstance(matrix, np.memmap)
+    assert f"Usando o store binário '{json_path}.npy', gerado a partir de '{json_path}'." in capsys.readouterr().out
+
+    # Rewritten within the same mtime tick: the recorded size still tells them apart
+    stat = os.stat(json_path)
+    json_path.write_text(json.dumps(CHUNKS[:1]), encoding="utf-8")
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    chunks, matrix = load_embeddings(str(json_path), load_mode="auto")
+    assert not isinstance(matrix, np.memmap)
+    assert [c["chunk_title"] for c in chunks] == ["A"]
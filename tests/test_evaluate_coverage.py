@@ -4,18 +4,7 @@ import json
 import csv
 from pathlib import Path
 
-# Stub dependencies before import
-fake_numpy = types.ModuleType("numpy")
-class FakeArray(list):
-    @property
-    def size(self):
-        return len(self)
-
-fake_numpy.array = lambda x: FakeArray(x)
-fake_numpy.dot = lambda a, b: sum(i*j for i,j in zip(a,b))
-fake_numpy.linalg = types.SimpleNamespace(norm=lambda v: sum(x*x for x in v) ** 0.5)
-sys.modules.setdefault("numpy", fake_numpy)
-
+# Stub dependencies before import (numpy itself is real: the retrieval engine needs it)
 fake_google = types.ModuleType("google")
 fake_genai = types.ModuleType("google.generativeai")
 setattr(fake_genai, "embed_content", lambda model=None, content=None: {"embedding": [1.0, 0.0]})
@@ -68,8 +57,8 @@ def test_evaluate_coverage_simple_flow(monkeypatch, tmp_path):
 
     monkeypatch.setattr(
         sys.modules['evaluate_coverage'],
-        'generate_embedding_with_retry',
-        lambda text, api_key, model=None: [1.0, 0.0],
+        'generate_gemini_embeddings_batch',
+        lambda texts, api_key, model=None: [[1.0, 0.0] for _ in texts],
     )
 
     result = evaluate_coverage(
@@ -85,3 +74,174 @@ def test_evaluate_coverage_simple_flow(monkeypatch, tmp_path):
     with open(out_file, "r", encoding="utf-8") as f:
         data = json.load(f)
     assert data[0]["status"].startswith("Encontrada")
+
+
+def test_evaluate_coverage_reads_binary_store(monkeypatch, tmp_path):
+    from embedding_store import save_embedding_store
+
+    qa_file = tmp_path / "qa.csv"
+    with open(qa_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["question", "response"])
+        writer.writeheader()
+        writer.writerow({"question": "Q1", "response": "A."})
+
+    store_file = tmp_path / "chunks.npy"
+    save_embedding_store([
+        {
+            "document_title": "Doc",
+            "chunk_title": "Sec",
+            "document_filepath": "d.md",
+            "embedding": [0.0, 1.0],
+            "chunk_content": "content",
+        }
+    ], str(store_file))
+
+    out_file = tmp_path / "out.json"
+    monkeypatch.setattr(
+        sys.modules['evaluate_coverage'],
+        'generate_gemini_embeddings_batch',
+        lambda texts, api_key, model=None: [[1.0, 0.0] for _ in texts],
+    )
+
+    result = evaluate_coverage(
+        qa_filepath=str(qa_file),
+        chunks_filepath=str(store_file),
+        top_k_chunks=1,
+        output_json_path=str(out_file),
+        provider="gemini",
+        gemini_api_key="KEY",
+    )
+
+    assert result is True
+    with open(out_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    assert data[0]["status"].startswith("Não Encontrada")
+    assert data[0]["top_k_chunks_relevantes"][0]["chunk_title"] == "Sec"
+
+
+def test_local_provider_end_to_end_offline(monkeypatch, tmp_path):
+    import generate_embeddings
+
+    monkeypatch.setenv("DOCS_CLI_CACHE", "0")
+    raw_docs = [
+        {"title": "Instalação", "content": "## Instalar\nPara instalar o pacote execute pip install docs-cli.", "filepath": "i.md", "slug": "i"},
+        {"title": "Receitas", "content": "## Bolo\nMisture farinha, ovos e açúcar para o bolo de cenoura.", "filepath": "r.md", "slug": "r"},
+    ]
+    raw_path = tmp_path / "raw.json"
+    raw_path.write_text(json.dumps(raw_docs), encoding="utf-8")
+    store_path = tmp_path / "emb.npy"
+    assert generate_embeddings.generate_embeddings_for_docs(str(raw_path), str(store_path), provider="local")
+
+    qa_file = tmp_path / "qa.csv"
+    with open(qa_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["question", "response"])
+        writer.writeheader()
+        writer.writerow({"question": "Como instalar o pacote?", "response": "Para instalar o pacote execute pip install docs-cli."})
+
+    out_file = tmp_path / "out.json"
+    assert evaluate_coverage(str(qa_file), str(store_path), top_k_chunks=1, output_json_path=str(out_file), provider="local")
+    result = json.loads(out_file.read_text(encoding="utf-8"))[0]
+    assert result["top_k_chunks_relevantes"][0]["document_title"] == "Instalação"
+    assert result["status"].startswith("Encontrada")
+
+
+def test_jsonl_output_streams_results_and_resumes(monkeypatch, tmp_path):
+    qa_file = tmp_path / "qa.csv"
+    with open(qa_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["question", "response"])
+        writer.writeheader()
+        for question in ["Q1", "Q2", "Q3"]:
+            writer.writerow({"question": question, "response": "A."})
+
+    chunks_file = tmp_path / "chunks.json"
+    chunks_file.write_text(json.dumps([{"chunk_title": "Sec", "embedding": [1.0, 0.0], "chunk_content": "c"}]), encoding="utf-8")
+
+    embedded = []
+
+    def fake_batch(texts, api_key, model=None):
+        embedded.extend(texts)
+        return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr(sys.modules['evaluate_coverage'], 'generate_gemini_embeddings_batch', fake_batch)
+    out_file = tmp_path / "out.jsonl"
+    options = dict(top_k_chunks=1, output_json_path=str(out_file), provider="gemini", gemini_api_key="KEY", concurrency=1)
+
+    assert evaluate_coverage(str(qa_file), str(chunks_file), **options)
+    lines = out_file.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["pergunta"] for line in lines] == ["Q1", "Q2", "Q3"]
+
+    # Simulate a crash while the second result was being written
+    out_file.write_text(lines[0] + "\n" + lines[1][:20], encoding="utf-8")
+    embedded.clear()
+
+    assert evaluate_coverage(str(qa_file), str(chunks_file), resume=True, **options)
+    assert embedded == ["Q2", "A.", "Q3"]
+    results = [json.loads(line) for line in out_file.read_text(encoding="utf-8").splitlines()]
+    assert [result["pergunta"] for result in results] == ["Q1", "Q2", "Q3"]
+
+    # Resuming a finished evaluation embeds nothing; --resume needs a JSONL output
+    embedded.clear()
+    assert evaluate_coverage(str(qa_file), str(chunks_file), resume=True, **options)
+    assert embedded == []
+    options["output_json_path"] = str(tmp_path / "out.json")
+    assert evaluate_coverage(str(qa_file), str(chunks_file), resume=True, **options) is False
+
+
+def test_question_texts_are_deduplicated_and_sent_in_provider_batches(monkeypatch, capsys):
+    from evaluate_coverage import embed_questions
+
+    calls = []
+
+    def fake_batch(texts, api_key, model=None):
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    monkeypatch.setattr(sys.modules['evaluate_coverage'], 'generate_gemini_embeddings_batch', fake_batch)
+    monkeypatch.setenv("DOCS_CLI_GEMINI_BATCH_MAX_ITEMS", "2")
+    qa_pairs = [
+        {"pergunta": "Q1", "resposta_ideal": "Instale. Configure."},
+        {"pergunta": "Q22", "resposta_ideal": "Configure."},
+        {"pergunta": "Q1", "resposta_ideal": "Instale."},
+    ]
+
+    batches = embed_questions(qa_pairs, provider="gemini", gemini_api_key="KEY", concurrency=1)
+
+    assert calls == [["Q1", "Instale."], ["Configure.", "Q22"]]
+    assert batches == [
+        [[2.0, 1.0], [8.0, 1.0], [10.0, 1.0]],
+        [[3.0, 1.0], [10.0, 1.0]],
+        [[2.0, 1.0], [8.0, 1.0]],
+    ]
+    out = capsys.readouterr().out
+    assert "7 textos, 4 distintos (3 repetidos ignorados), em 2 requisições de lote" in out
+    assert "1 requisições a menos que uma por pergunta (3)" in out
+
+
+def test_matrix_sentence_scoring_matches_the_pairwise_loop():
+    import numpy as np
+    from evaluate_coverage import score_sentence_coverage, score_sentence_coverage_loop
+
+    rng = np.random.default_rng(3)
+    for _ in range(200):
+        k = int(rng.integers(1, 6))
+        chunks = rng.normal(size=(k, 32)).astype(np.float32)
+        chunks /= np.linalg.norm(chunks, axis=1, keepdims=True)
+        # Sentences near a random chunk, with noise spanning both sides of the threshold
+        anchors = chunks[rng.integers(0, k, size=6)]
+        sentences = (anchors + rng.normal(size=(6, 32)) * rng.uniform(0.05, 1.5, size=(6, 1))).tolist()
+        sentences.append([0.0] * 32)
+
+        fast = score_sentence_coverage(sentences, list(chunks), 0.65)
+        slow = score_sentence_coverage_loop(sentences, list(chunks), 0.65)
+
+        assert fast[0] == slow[0]
+        assert [f"{value:.4f}" for value in fast[1]] == [f"{value:.4f}" for value in slow[1]]
+        assert fast[2] == slow[2]
+
+    # Ties keep the first chunk; only chunks up to the first hit are considered
+    chunk = [1.0, 0.0]
+    assert score_sentence_coverage([[1.0, 0.0]], [chunk, chunk], 0.65) == ([True], [1.0], [0])
+    weak, strong = [0.6, 0.8], [1.0, 0.0]
+    assert score_sentence_coverage([[1.0, 0.0]], [[0.7, 0.714], weak, strong], 0.65)[2] == [0]
+    assert score_sentence_coverage([[-1.0, 0.0]], [chunk], 0.65) == ([False], [0.0], [-1])
+    assert score_sentence_coverage([], [chunk], 0.65) == ([], [], [])
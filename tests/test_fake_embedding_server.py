@@ -0,0 +1,117 @@
+import base64
+import json
+import sys
+import types
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+fake_google = types.ModuleType("google")
+fake_genai = types.ModuleType("google.generativeai")
+fake_google.generativeai = fake_genai
+sys.modules.setdefault("google", fake_google)
+sys.modules.setdefault("google.generativeai", fake_genai)
+
+from fake_embedding_server import FakeServerConfig, environment_for, start_server
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def factory(**options):
+        options.setdefault("latency_ms", 0)
+        options.setdefault("dimension", 16)
+        server, _ = start_server(FakeServerConfig(**options), port=0)
+        servers.append(server)
+        return server
+
+    yield factory
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def post(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read()), dict(response.headers)
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read()), dict(error.headers)
+
+
+def test_openai_shape_returns_deterministic_vectors_in_order(serve):
+    server = serve()
+    url = environment_for(server)["DOCS_CLI_OPENAI_BASE_URL"] + "/embeddings"
+
+    status, body, _ = post(url, {"input": ["alpha beta", "gamma"], "model": "m"})
+    _, again, _ = post(url, {"input": ["gamma"], "model": "m"})
+
+    assert status == 200
+    assert [item["index"] for item in body["data"]] == [0, 1]
+    assert len(body["data"][0]["embedding"]) == 16
+    assert body["data"][1]["embedding"] == pytest.approx(again["data"][0]["embedding"])
+    assert body["usage"]["total_tokens"] > 0
+
+
+def test_openai_base64_encoding_matches_float_output(serve):
+    server = serve()
+    url = f"{server.base_url}/v1/embeddings"
+
+    _, floats, _ = post(url, {"input": ["texto"], "model": "m"})
+    _, encoded, _ = post(url, {"input": ["texto"], "model": "m", "encoding_format": "base64"})
+
+    decoded = np.frombuffer(base64.b64decode(encoded["data"][0]["embedding"]), dtype="<f4")
+    assert decoded.tolist() == pytest.approx(floats["data"][0]["embedding"], abs=1e-6)
+
+
+def test_deepinfra_shape(serve):
+    server = serve()
+    url = environment_for(server)["DOCS_CLI_DEEPINFRA_BASE_URL"] + "/BAAI/bge-m3"
+
+    status, body, _ = post(url, {"inputs": ["um", "dois", "tres"]})
+
+    assert status == 200
+    assert len(body["embeddings"]) == 3
+    assert body["input_tokens"] > 0
+
+
+def test_batch_cap_rpm_and_injected_errors(serve):
+    capped = serve(max_batch_items=2, rpm=1)
+    url = f"{capped.base_url}/v1/embeddings"
+
+    assert post(url, {"input": ["a", "b", "c"]})[0] == 400
+    assert post(url, {"input": ["a"]})[0] == 200
+    status, _, headers = post(url, {"input": ["a"]})
+    assert status == 429
+    assert int(headers["Retry-After"]) >= 1
+
+    failing = serve(error_rate=1.0)
+    assert post(f"{failing.base_url}/v1/embeddings", {"input": ["a"]})[0] in (500, 502, 503)
+
+    with urllib.request.urlopen(f"{capped.base_url}/stats", timeout=5) as response:
+        stats = json.loads(response.read())
+    assert stats == {"requests": 3, "rejected": 1, "ok": 1, "texts": 1, "rate_limited": 1}
+
+
+def test_latency_distributions_are_non_negative():
+    from fake_embedding_server import FakeEmbeddingServer
+
+    for distribution in ("fixed", "uniform", "exponential", "lognormal"):
+        config = FakeServerConfig(latency_ms=20, latency_distribution=distribution, latency_spread_ms=40, per_item_latency_ms=1)
+        server = FakeEmbeddingServer(("127.0.0.1", 0), config)
+        try:
+            samples = [server.sample_latency(items=5) for _ in range(50)]
+        finally:
+            server.server_close()
+        assert all(sample >= 0 for sample in samples)
+        assert sum(samples) / len(samples) > 0
@@ -0,0 +1,134 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import docs_tc
+from async_embedding import run_concurrently
+from flow_dag import FULL_FLOW_STEPS, FlowCancelled, StepTiming, critical_path, format_timing_report, run_dag, step_dependencies
+
+
+def test_full_flow_dependencies():
+    steps = list(FULL_FLOW_STEPS)
+    dependencies = dict(zip(steps, ({steps[i] for i in deps} for deps in step_dependencies(steps))))
+    assert dependencies["merge"] == set()
+    assert dependencies["clean_csv"] == set()
+    assert dependencies["extract"] == {"merge"}
+    assert dependencies["generate_embeddings"] == {"extract"}
+    assert dependencies["evaluate"] == {"clean_csv", "generate_embeddings"}
+    assert dependencies["report_md"] == {"evaluate"}
+    assert dependencies["report_html"] == {"evaluate"}
+
+
+def test_step_that_overwrites_an_input_waits_for_its_reader():
+    # evaluate reads the embeddings file that the later generate_embeddings rewrites
+    assert step_dependencies(["evaluate", "generate_embeddings"]) == [(), (0,)]
+
+
+def test_run_dag_overlaps_independent_steps():
+    steps = ["merge", "clean_csv", "extract"]
+    clean_started = threading.Event()
+
+    def run_step(index):
+        if steps[index] == "merge":
+            # Only finishes if clean_csv starts while merge is still running
+            assert clean_started.wait(timeout=5)
+        elif steps[index] == "clean_csv":
+            clean_started.set()
+
+    timings = run_dag(steps, step_dependencies(steps), run_step, max_workers=3)
+    assert [timing.step for timing in timings] == steps
+    assert timings[2].start >= timings[0].end
+
+
+def test_run_dag_sequential_keeps_list_order():
+    steps = list(FULL_FLOW_STEPS)
+    order = []
+    run_dag(steps, step_dependencies(steps), lambda index: order.append(steps[index]), max_workers=1)
+    assert order == steps
+
+
+def test_run_dag_stops_scheduling_after_failure():
+    steps = ["merge", "extract", "clean_csv"]
+    ran = []
+
+    def run_step(index):
+        ran.append(steps[index])
+        if steps[index] == "merge":
+            raise SystemExit(1)
+
+    with pytest.raises(SystemExit):
+        run_dag(steps, step_dependencies(steps), run_step, max_workers=1)
+    assert ran == ["merge"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs POSIX signals")
+def test_ctrl_c_during_parallel_run_cancels_running_steps():
+    steps = ["merge", "clean_csv"]
+    cancelled = []
+
+    def run_step(index):
+        # Four seconds of embedding requests, unless the flow is interrupted
+        try:
+            run_concurrently(range(80), lambda item: time.sleep(0.05), concurrency=1 + index)
+        except FlowCancelled:
+            cancelled.append(steps[index])
+
+    threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGINT)).start()
+    started = time.perf_counter()
+    with pytest.raises(KeyboardInterrupt):
+        run_dag(steps, step_dependencies(steps), run_step, max_workers=2)
+    assert time.perf_counter() - started < 1.5
+
+    deadline = time.perf_counter() + 2
+    while len(cancelled) < 2 and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    assert sorted(cancelled) == ["clean_csv", "merge"]
+
+
+def test_critical_path_follows_longest_chain():
+    steps = ["merge", "clean_csv", "extract", "generate_embeddings", "evaluate"]
+    timings = [
+        StepTiming("merge", 0.0, 1.0),
+        StepTiming("clean_csv", 0.0, 3.0),
+        StepTiming("extract", 1.0, 2.0),
+        StepTiming("generate_embeddings", 2.0, 10.0),
+        StepTiming("evaluate", 10.0, 11.0),
+    ]
+    path, total = critical_path(timings, step_dependencies(steps))
+    assert [steps[index] for index in path] == ["merge", "extract", "generate_embeddings", "evaluate"]
+    assert total == pytest.approx(11.0)
+    report = format_timing_report(timings, step_dependencies(steps))
+    assert "Tempo total: 11.00s" in report
+    assert "merge -> extract -> generate_embeddings -> evaluate (11.00s)" in report
+
+
+def test_full_flow_parallel_runs_clean_csv_alongside_corpus_branch(monkeypatch, tmp_path, capsys):
+    called = []
+    lock = threading.Lock()
+
+    def fake_run_script(cmd, verbose=False):
+        with lock:
+            called.append(cmd[0])
+        if cmd[0] == "docs-tc-merge-markdown":
+            time.sleep(0.05)
+        return subprocess.CompletedProcess(cmd, 0, stdout="", stderr="")
+
+    monkeypatch.setattr(docs_tc, "run_script", fake_run_script)
+    monkeypatch.setattr(docs_tc, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(docs_tc, "CONFIG_FILE", tmp_path / "config.json")
+    monkeypatch.setattr(sys, "argv", ["docs_tc.py", "full_flow", "docs", "qa.csv", "--provider", "local", "--parallel"])
+    docs_tc.main()
+
+    assert sorted(called[:2]) == ["docs-tc-clean-csv", "docs-tc-merge-markdown"]
+    assert called[2:5] == ["docs-tc-extract-data", "docs-tc-generate-embeddings", "docs-tc-evaluate-coverage"]
+    assert sorted(called[5:]) == ["docs-tc-generate-report-html", "docs-tc-generate-report-md"]
+    assert "Caminho crítico: merge -> extract -> generate_embeddings -> evaluate" in capsys.readouterr().out
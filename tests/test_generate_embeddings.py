@@ -39,3 +39,145 @@ def test_split_content_into_semantic_chunks_basic():
     assert chunks[0]["document_slug"] == "test-doc"
     assert "Paragraph one" in chunks[0]["chunk_content"]
     assert chunks[1]["chunk_title"] == "Section Two"
+
+
+def test_generate_embeddings_packs_chunks_across_documents(monkeypatch, tmp_path):
+    import json
+    import generate_embeddings
+
+    raw_docs = [
+        {"title": f"Doc {i}", "content": f"## Sec A\nTexto {i} a.\n## Sec B\nTexto {i} b.", "filepath": f"d{i}.md", "slug": f"d{i}"}
+        for i in range(5)
+    ]
+    input_path = tmp_path / "raw.json"
+    input_path.write_text(json.dumps(raw_docs), encoding="utf-8")
+    output_path = tmp_path / "emb.json"
+
+    calls = []
+
+    def fake_openai(texts, api_key):
+        calls.append(list(texts))
+        return [[float(len(calls)), float(j)] for j in range(len(texts))]
+
+    monkeypatch.setattr(generate_embeddings, "generate_embedding_openai", fake_openai)
+    assert generate_embeddings.generate_embeddings_for_docs(
+        str(input_path),
+        str(output_path),
+        provider="openai",
+        openai_api_key_param="KEY",
+        batch_max_items=4,
+    )
+
+    assert [len(batch) for batch in calls] == [4, 4, 2]
+    chunks = json.loads(output_path.read_text(encoding="utf-8"))
+    assert [(c["document_slug"], c["chunk_title"]) for c in chunks] == [
+        (f"d{i}", sec) for i in range(5) for sec in ("Sec A", "Sec B")
+    ]
+    assert chunks[5]["embedding"] == [2.0, 1.0]
+    assert "Texto 2 b" in calls[1][1]
+
+
+def test_interrupted_generation_resumes_from_checkpoint(monkeypatch, tmp_path):
+    import json
+    import generate_embeddings
+    from embedding_checkpoint import checkpoint_path
+
+    raw_docs = [
+        {"title": f"Doc {i}", "content": f"## Sec A\nTexto {i} a.\n## Sec B\nTexto {i} b.", "filepath": f"d{i}.md", "slug": f"d{i}"}
+        for i in range(3)
+    ]
+    input_path = tmp_path / "raw.json"
+    input_path.write_text(json.dumps(raw_docs), encoding="utf-8")
+    output_path = tmp_path / "emb.json"
+    calls = []
+    interrupt_at = [3]
+
+    def fake_openai(texts, api_key):
+        calls.append(list(texts))
+        if len(calls) == interrupt_at[0]:
+            raise KeyboardInterrupt
+        return [[float(len(text)), 1.0] for text in texts]
+
+    monkeypatch.setattr(generate_embeddings, "generate_embedding_openai", fake_openai)
+    options = dict(provider="openai", openai_api_key_param="KEY", batch_max_items=2, concurrency=1)
+
+    assert not generate_embeddings.generate_embeddings_for_docs(str(input_path), str(output_path), **options)
+    assert not output_path.exists()
+    assert len(open(checkpoint_path(str(output_path)), encoding="utf-8").readlines()) == 4
+
+    calls.clear()
+    interrupt_at[0] = None
+    assert generate_embeddings.generate_embeddings_for_docs(str(input_path), str(output_path), resume=True, **options)
+
+    assert [len(batch) for batch in calls] == [2]
+    assert "Texto 2 a" in calls[0][0]
+    chunks = json.loads(output_path.read_text(encoding="utf-8"))
+    assert len(chunks) == 6
+    assert all(chunk["embedding"][1] == 1.0 for chunk in chunks)
+    assert not (tmp_path / "emb.json.partial.jsonl").exists()
+
+
+def test_run_without_resume_discards_stale_checkpoint(monkeypatch, tmp_path):
+    import json
+    import generate_embeddings
+
+    input_path = tmp_path / "raw.json"
+    input_path.write_text(json.dumps([{"title": "Doc", "content": "## Sec\nTexto.", "slug": "doc"}]), encoding="utf-8")
+    output_path = tmp_path / "emb.npy"
+    stale = tmp_path / "emb.npy.partial.jsonl"
+    stale.write_text('{"key": "old", "embedding": [9.0]}\n', encoding="utf-8")
+    calls = []
+
+    def fake_openai(texts, api_key):
+        calls.append(list(texts))
+        return [[0.5, 0.5] for _ in texts]
+
+    monkeypatch.setattr(generate_embeddings, "generate_embedding_openai", fake_openai)
+    assert generate_embeddings.generate_embeddings_for_docs(
+        str(input_path), str(output_path), provider="openai", openai_api_key_param="KEY"
+    )
+
+    assert len(calls) == 1
+    assert not stale.exists()
+    import numpy as np
+    assert np.load(output_path).tolist() == [[0.5, 0.5]]
+
+
+def test_incremental_run_embeds_only_changed_chunks(monkeypatch, tmp_path):
+    import json
+    import generate_embeddings
+
+    raw_docs = [
+        {"title": "Doc", "content": "## Sec A\nTexto a.\n## Sec B\nTexto b.", "slug": "doc"},
+        {"title": "Outro", "content": "## Sec C\nTexto c.", "slug": "outro"},
+    ]
+    input_path = tmp_path / "raw.json"
+    input_path.write_text(json.dumps(raw_docs), encoding="utf-8")
+    output_path = tmp_path / "emb.npy"
+    calls = []
+    runs = [1]
+
+    def fake_openai(texts, api_key):
+        calls.append(list(texts))
+        return [[float(len(text)), float(runs[0])] for text in texts]
+
+    monkeypatch.setattr(generate_embeddings, "generate_embedding_openai", fake_openai)
+    options = dict(provider="openai", openai_api_key_param="KEY", incremental=True)
+    assert generate_embeddings.generate_embeddings_for_docs(str(input_path), str(output_path), **options)
+    assert sum(len(batch) for batch in calls) == 3
+
+    raw_docs[0]["content"] = "## Sec A\nTexto a.\n## Sec B\nTexto b alterado."
+    raw_docs.append({"title": "Novo", "content": "## Sec D\nTexto d.", "slug": "novo"})
+    input_path.write_text(json.dumps(raw_docs), encoding="utf-8")
+    calls.clear()
+    runs[0] = 2
+    assert generate_embeddings.generate_embeddings_for_docs(str(input_path), str(output_path), **options)
+
+    assert len(calls) == 1
+    assert len(calls[0]) == 2
+    assert "alterado" in calls[0][0] and "Texto d" in calls[0][1]
+    from embedding_store import load_embeddings
+    chunks, matrix = load_embeddings(str(output_path))
+    assert [chunk["chunk_title"] for chunk in chunks] == ["Sec A", "Sec B", "Sec C", "Sec D"]
+    # Unchanged chunks keep the vectors from the first run (second component = run number)
+    assert matrix[:, 1].tolist() == [1.0, 2.0, 1.0, 2.0]
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from lazy_imports import LazyModule
+
+
+def test_module_is_imported_on_first_attribute_access(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    colorsys = LazyModule("colorsys")
+    assert not colorsys.loaded
+    assert "colorsys" not in sys.modules
+
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert colorsys.loaded
+    assert "colorsys" in sys.modules
+
+
+def test_missing_module_raises_import_error_on_use():
+    sdk = LazyModule("docs_cli_sdk_that_does_not_exist")
+    with pytest.raises(ImportError):
+        sdk.Client
+
+
+def test_attributes_can_be_replaced_before_loading():
+    sdk = LazyModule("docs_cli_sdk_that_does_not_exist")
+    sdk.Client = "fake"
+    assert sdk.Client == "fake"
+    assert not sdk.loaded
@@ -7,7 +7,11 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
 # Provide a minimal pandas stub so limpa_csv imports without the real library
-sys.modules.setdefault("pandas", types.ModuleType("pandas"))
+# (the real one is kept when installed, since other test modules need it)
+try:
+    import pandas  # noqa: F401
+except ImportError:
+    sys.modules.setdefault("pandas", types.ModuleType("pandas"))
 
 from limpa_csv import clean_text
 
@@ -0,0 +1,213 @@
+import json
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+if not hasattr(pd, "read_csv"):
+    pytest.skip("pandas is stubbed by another test module", allow_module_level=True)
+
+# Stub dependencies before import (the local provider needs no API)
+fake_google = types.ModuleType("google")
+fake_genai = types.ModuleType("google.generativeai")
+fake_google.generativeai = fake_genai
+sys.modules.setdefault("google", fake_google)
+sys.modules.setdefault("google.generativeai", fake_genai)
+fake_dotenv = types.ModuleType("dotenv")
+setattr(fake_dotenv, "load_dotenv", lambda *a, **k: None)
+sys.modules.setdefault("dotenv", fake_dotenv)
+sys.modules.setdefault("openai", types.ModuleType("openai"))
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import docs_tc
+from pipeline import FULL_FLOW_STEPS, PipelineConfig, PipelineError, run_pipeline
+
+
+DOCS = {
+    "instalacao.md": (
+        "## Metadata_Start\n## title: Instalação\n## slug: instalacao\n## Metadata_End\n\n"
+        "## Instalar\nPara instalar o pacote execute pip install docs-cli no terminal.\n"
+    ),
+    "receitas/bolo.md": (
+        "## Metadata_Start\n## title: Receitas\n## slug: bolo\n## Metadata_End\n\n"
+        "## Bolo\nMisture farinha, ovos e açúcar para preparar o bolo de cenoura.\n"
+    ),
+}
+QA_CSV = (
+    "question,response\n"
+    "Como instalar o pacote?,Para instalar o pacote execute pip install docs-cli no terminal.\n"
+    "Como fazer bolo?,Misture farinha ovos e açúcar para preparar o bolo de cenoura.\n"
+    "Pergunta inválida?,Click here\n"
+)
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    monkeypatch.setenv("DOCS_CLI_CACHE", "0")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    for name, content in DOCS.items():
+        path = tmp_path / "docs" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+    (tmp_path / "qa.csv").write_text(QA_CSV, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def make_config(workspace, **options):
+    return PipelineConfig(
+        doc_input_dir=str(workspace / "docs"),
+        qa_input_file=str(workspace / "qa.csv"),
+        top_k=1,
+        provider="local",
+        **options,
+    )
+
+
+def test_full_flow_in_process_keeps_intermediates_in_memory(workspace):
+    artifacts = run_pipeline(FULL_FLOW_STEPS, make_config(workspace))
+
+    assert sorted(path.name for path in workspace.iterdir()) == [
+        "coverage_report.html",
+        "coverage_report.md",
+        "docs",
+        "qa.csv",
+    ]
+    results = artifacts["evaluation_results"]
+    assert len(results) == 2
+    assert results[0]["status"].startswith("Encontrada")
+    assert results[0]["top_k_chunks_relevantes"][0]["document_title"] == "Instalação"
+
+
+def test_in_process_results_match_file_based_stages(workspace):
+    import evaluate_coverage
+    import extract_data_from_markdown
+    import generate_embeddings
+    import limpa_csv
+    import merge_markdown
+
+    run_pipeline(FULL_FLOW_STEPS, make_config(workspace, save_intermediate=True))
+    in_process = json.loads((workspace / "evaluation_results.json").read_text(encoding="utf-8"))
+    for name in ("corpus_consolidated.md", "raw_docs.json", "embeddings.json", "qa_data_clean.csv"):
+        assert (workspace / name).exists()
+
+    merge_markdown.consolidate_markdown_files(str(workspace / "docs"), "corpus_files.md")
+    assert extract_data_from_markdown.extract_docs_from_consolidated_md("corpus_files.md", "raw_files.json")
+    assert generate_embeddings.generate_embeddings_for_docs("raw_files.json", "emb_files.json", provider="local")
+    assert limpa_csv.clean_csv_data("qa.csv", "qa_files.csv") is not None
+    assert evaluate_coverage.evaluate_coverage(
+        "qa_files.csv", "emb_files.json", top_k_chunks=1, output_json_path="eval_files.json", provider="local"
+    )
+
+    assert (workspace / "corpus_files.md").read_text(encoding="utf-8") == (workspace / "corpus_consolidated.md").read_text(encoding="utf-8")
+    assert json.loads((workspace / "eval_files.json").read_text(encoding="utf-8")) == in_process
+
+
+def test_custom_flow_reads_missing_inputs_from_files(workspace):
+    run_pipeline(["clean_csv", "merge", "extract", "generate_embeddings"], make_config(workspace))
+    assert (workspace / "embeddings.json").exists()
+    assert (workspace / "qa_data_clean.csv").exists()
+    assert not (workspace / "raw_docs.json").exists()
+
+    artifacts = run_pipeline(["evaluate", "report_md"], make_config(workspace))
+    assert len(artifacts["evaluation_results"]) == 2
+    assert (workspace / "coverage_report.md").exists()
+    assert not (workspace / "evaluation_results.json").exists()
+
+
+def test_missing_input_raises_pipeline_error(workspace):
+    with pytest.raises(PipelineError) as error:
+        run_pipeline(["report_html"], make_config(workspace))
+    assert error.value.step == "report_html"
+
+
+def test_malformed_input_raises_pipeline_error(workspace):
+    (workspace / "evaluation_results.json").write_text('[{"status": "Encontrada"}]', encoding="utf-8")
+    with pytest.raises(PipelineError) as error:
+        run_pipeline(["report_md"], make_config(workspace))
+    assert error.value.step == "report_md"
+    assert str(error.value) == "KeyError: 'pergunta'"
+
+
+def test_docs_cli_full_flow_in_process_skips_subprocesses(workspace, monkeypatch):
+    monkeypatch.setattr(docs_tc, "CONFIG_DIR", workspace / ".docs-cli")
+    monkeypatch.setattr(docs_tc, "CONFIG_FILE", workspace / ".docs-cli" / "config.json")
+    monkeypatch.setattr(docs_tc, "run_script", lambda *a, **k: pytest.fail("run_script should not be called"))
+    monkeypatch.setattr(sys, "argv", [
+        "docs_tc.py", "full_flow", "docs", "qa.csv", "--provider", "local", "--eval_top_k", "1", "--in-process",
+    ])
+
+    docs_tc.main()
+
+    assert (workspace / "coverage_report.md").exists()
+    assert (workspace / "coverage_report.html").exists()
+
+
+def test_incremental_in_process_run_skips_unchanged_steps(workspace, capsys):
+    config = make_config(workspace, incremental=True)
+    run_pipeline(FULL_FLOW_STEPS, config)
+    # Incremental runs keep every intermediate file, whose hashes feed the manifest
+    assert (workspace / "embeddings.json").exists()
+    assert (workspace / ".docs-cli-manifest.json").exists()
+    capsys.readouterr()
+
+    run_pipeline(FULL_FLOW_STEPS, make_config(workspace, incremental=True))
+    assert capsys.readouterr().out.count("inalterada desde a última execução") == len(FULL_FLOW_STEPS)
+
+    (workspace / "docs" / "instalacao.md").write_text(
+        DOCS["instalacao.md"] + "\n## Atualizar\nPara atualizar execute pip install -U docs-cli.\n", encoding="utf-8"
+    )
+    artifacts = run_pipeline(FULL_FLOW_STEPS, make_config(workspace, incremental=True))
+    out = capsys.readouterr().out
+    assert "Etapa clean_csv inalterada" in out
+    assert "Executando etapa (em processo): generate_embeddings" in out
+    assert "novos ou alterados" in out
+    assert len(artifacts["evaluation_results"]) == 2
+
+
+def test_parallel_in_process_run_matches_sequential(workspace):
+    from pipeline import InProcessPipeline
+
+    sequential = run_pipeline(FULL_FLOW_STEPS, make_config(workspace))["evaluation_results"]
+    pipeline = InProcessPipeline(FULL_FLOW_STEPS, make_config(workspace, parallel=True))
+    parallel = pipeline.run()["evaluation_results"]
+
+    assert parallel == sequential
+    # Question embeddings are produced by their own step, concurrently with the corpus branch
+    steps = [timing.step for timing in pipeline.timings]
+    assert steps.index("embed_questions") < steps.index("evaluate")
+    assert "question_embeddings" in pipeline.artifacts
+
+
+def test_docs_cli_profile_reports_each_in_process_stage(workspace, monkeypatch):
+    import profiling
+
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    monkeypatch.setattr(docs_tc, "CONFIG_DIR", workspace / ".docs-cli")
+    monkeypatch.setattr(docs_tc, "CONFIG_FILE", workspace / ".docs-cli" / "config.json")
+    # The report is written at exit; capture the hook instead of waiting for the interpreter
+    finishers = []
+    monkeypatch.setattr(profiling.atexit, "register", finishers.append)
+    monkeypatch.setattr(sys, "argv", [
+        "docs_tc.py", "--profile", "profile.json", "--chrome-trace", "trace.json",
+        "full_flow", "docs", "qa.csv", "--provider", "local", "--eval_top_k", "1", "--in-process",
+    ])
+
+    docs_tc.main()
+    for finish in finishers:
+        finish()
+
+    trace = json.loads((workspace / "profile.json").read_text(encoding="utf-8"))
+    stages = {stage["stage"]: stage for stage in trace["stages"]}
+    assert list(stages) == list(FULL_FLOW_STEPS)
+    assert stages["merge"]["items"] == 2
+    assert stages["clean_csv"]["items"] == 3
+    assert stages["extract"]["items"] == 2
+    assert set(stages["generate_embeddings"]["phases"]) == {"chunk", "embed"}
+    assert set(stages["evaluate"]["phases"]) == {"embed", "search"}
+    assert all(stage["wall_s"] >= 0 and stage["cpu_s"] >= 0 for stage in stages.values())
+    assert json.loads((workspace / "trace.json").read_text(encoding="utf-8"))["traceEvents"]
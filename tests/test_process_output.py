@@ -0,0 +1,77 @@
+import io
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from process_output import ProgressTracker, StreamedProcess, format_duration
+
+
+def test_progress_tracker_estimates_remaining_time():
+    now = [100.0]
+    tracker = ProgressTracker(clock=lambda: now[0])
+    assert tracker.update("qualquer coisa") is None
+    assert tracker.update("  Lote 1/10 concluído (1/10): 5 chunks") == (1, 10, None)
+    now[0] = 104.0
+    done, total, remaining = tracker.update("  Lote 7/10 concluído (3/10): 5 chunks")
+    assert (done, total) == (3, 10)
+    assert remaining == 14.0  # 2 batches in 4s -> 2s each, 7 left
+
+    # A different kind of progress restarts the estimate
+    assert tracker.update("--- Avaliando Pergunta 1/4: 'Como?' ---") == (1, 4, None)
+
+
+def test_format_duration():
+    assert format_duration(42) == "42s"
+    assert format_duration(185) == "3m05s"
+    assert format_duration(7620) == "2h07m"
+
+
+def test_streamed_process_forwards_lines_while_running():
+    code = (
+        "import sys, time\n"
+        "print('--- Processando documento 1/2: a ---')\n"
+        "sys.stdout.flush()\n"
+        "time.sleep(0.5)\n"
+        "print('--- Processando documento 2/2: b ---')\n"
+    )
+    out = io.StringIO()
+    seen_at = []
+
+    class Recorder(io.StringIO):
+        def write(self, text):
+            if text.strip():
+                seen_at.append(time.monotonic())
+            return out.write(text)
+
+    started = time.monotonic()
+    process = StreamedProcess([sys.executable, "-c", code], label="extract", out=Recorder(), err=io.StringIO())
+    assert process.run() == 0
+    finished = time.monotonic()
+
+    lines = out.getvalue().splitlines()
+    assert len(lines) == 2
+    assert "extract] --- Processando documento 1/2: a --- [1/2]" in lines[0]
+    assert lines[1].endswith("[2/2, ETA 0s]")
+    # The first line arrived well before the child exited
+    assert seen_at[0] - started < finished - started - 0.3
+
+
+def test_streamed_process_keeps_only_a_bounded_tail():
+    code = (
+        "import sys, time\n"
+        "for i in range(500): print(i)\n"
+        "sys.stdout.flush(); time.sleep(0.2)\n"
+        "print('boom', file=sys.stderr)\n"
+        "sys.exit(1)"
+    )
+    out, err = io.StringIO(), io.StringIO()
+    process = StreamedProcess([sys.executable, "-c", code], tail_lines=5, out=out, err=err)
+    assert process.run() == 1
+    summary = process.failure_summary()
+    assert len(summary) == 5
+    assert "boom" in summary and "499" in summary
+    assert out.getvalue() == ""
+    assert "boom" in err.getvalue()
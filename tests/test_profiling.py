@@ -0,0 +1,117 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import profiling
+from profiling import PROFILE_ENV, ProfileSession, build_trace, chrome_trace, count_api_call, read_events, span
+
+
+@pytest.fixture
+def events_file(tmp_path, monkeypatch):
+    path = tmp_path / "events.jsonl"
+    monkeypatch.setenv(PROFILE_ENV, str(path))
+    return path
+
+
+def test_span_is_a_no_op_without_profile(tmp_path, monkeypatch):
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    with span("evaluate.search", items=3) as phase:
+        phase.set(items=4)
+    assert phase is profiling._NULL_SPAN
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_span_records_time_items_and_api_calls(events_file):
+    with span("generate_embeddings.embed") as phase:
+        count_api_call(120)
+        count_api_call(80, failed=True)
+        phase.set(items=5)
+    with pytest.raises(RuntimeError):
+        with span("generate_embeddings.write"):
+            raise RuntimeError("disco cheio")
+
+    embed, write = read_events(str(events_file))
+    assert embed["name"] == "generate_embeddings.embed"
+    assert embed["stage"] == "generate_embeddings"
+    assert embed["cat"] == "phase"
+    assert embed["items"] == 5
+    assert (embed["api_calls"], embed["api_errors"], embed["api_bytes"]) == (2, 1, 200)
+    assert embed["wall_s"] >= 0 and embed["cpu_s"] >= 0
+    assert embed["failed"] is False
+    assert write["failed"] is True and write["api_calls"] == 0
+
+
+def event(name, cat, start, wall, **fields):
+    return dict(
+        {"name": name, "cat": cat, "stage": name.split(".")[0], "pid": 1, "tid": 1, "process": "docs-cli",
+         "start": start, "wall_s": wall, "cpu_s": wall / 2, "peak_rss_mb": 50.0, "failed": False},
+        **fields,
+    )
+
+
+def test_build_trace_summarizes_stages_from_their_phases():
+    events = [
+        event("generate_embeddings", "stage", 100.0, 3.0),
+        event("generate_embeddings.load", "phase", 100.1, 0.2, items=2, api_calls=0, api_bytes=0),
+        event("generate_embeddings.embed", "phase", 100.4, 1.0, items=10, api_calls=2, api_bytes=300),
+        event("generate_embeddings.embed", "phase", 101.4, 1.0, items=6, api_calls=1, api_bytes=100),
+        event("generate_embeddings.write", "phase", 102.5, 0.4, items=16, api_calls=0, api_bytes=0),
+        event("evaluate", "stage", 103.0, 2.0, items=4, api_calls=1, api_errors=0, api_bytes=50),
+        event("full_flow", "command", 99.5, 6.0),
+    ]
+
+    trace = build_trace(events, ["docs-cli", "full_flow"])
+
+    assert trace["wall_s"] == pytest.approx(6.0)
+    assert [stage["stage"] for stage in trace["stages"]] == ["generate_embeddings", "evaluate"]
+    embeddings, evaluate = trace["stages"]
+    assert embeddings["start_s"] == pytest.approx(0.5)
+    # Items come from the last phase that reported them; API calls are summed
+    assert (embeddings["items"], embeddings["api_calls"], embeddings["api_bytes"]) == (16, 3, 400)
+    assert embeddings["phases"]["embed"]["calls"] == 2
+    assert embeddings["phases"]["embed"]["items"] == 16
+    assert (evaluate["items"], evaluate["api_calls"]) == (4, 1)
+    assert len(trace["spans"]) == len(events)
+
+    # A single command (no stages) is summarized as its own stage
+    single = build_trace([event("evaluate", "command", 0.0, 1.0), event("evaluate.search", "phase", 0.1, 0.5, items=7)], [])
+    assert [(stage["stage"], stage["items"]) for stage in single["stages"]] == [("evaluate", 7)]
+
+
+def test_chrome_trace_uses_complete_events_in_microseconds():
+    trace = chrome_trace([event("merge.read", "phase", 10.0, 0.25, items=3)])
+    complete, metadata = trace["traceEvents"]
+    assert complete["ph"] == "X"
+    assert (complete["ts"], complete["dur"]) == (10_000_000, 250_000)
+    assert complete["args"]["items"] == 3
+    assert metadata == {"name": "process_name", "ph": "M", "pid": 1, "args": {"name": "docs-cli"}}
+
+
+def test_session_collects_spans_from_subprocesses(tmp_path, monkeypatch, capsys):
+    monkeypatch.delenv(PROFILE_ENV, raising=False)
+    profile_path = tmp_path / "profile.json"
+    chrome_path = tmp_path / "trace.json"
+    session = ProfileSession(str(profile_path), str(chrome_path), command=["docs-cli", "merge"], command_name="merge").start()
+    child = "from profiling import span\nwith span('merge.read', items=3):\n    pass\n"
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    with span("merge", category="stage", children=True):
+        subprocess.run([sys.executable, "-c", child], check=True, env=env)
+
+    trace = session.finish()
+
+    assert PROFILE_ENV not in os.environ
+    assert not Path(session.events_path).exists()
+    assert json.loads(profile_path.read_text(encoding="utf-8")) == trace
+    assert [(stage["stage"], stage["items"]) for stage in trace["stages"]] == [("merge", 3)]
+    assert {span_event["cat"] for span_event in trace["spans"]} == {"command", "stage", "phase"}
+    assert len({span_event["pid"] for span_event in trace["spans"]}) == 2
+    assert json.loads(chrome_path.read_text(encoding="utf-8"))["traceEvents"]
+    assert "📊 Perfil" in capsys.readouterr().out
+    assert session.finish() is None
@@ -0,0 +1,89 @@
+import sys
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import rate_limiter
+from rate_limiter import RateLimiter, estimate_tokens, get_rate_limiter, get_rate_limits
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_burst_then_waits_only_for_deficit():
+    clock = FakeClock()
+    limiter = RateLimiter("test", rpm=60, clock=clock.time, sleep=clock.sleep)
+    for _ in range(60):
+        assert limiter.acquire() == 0.0
+    # One request per second refills, so the next call waits ~1s instead of a full minute
+    waited = limiter.acquire()
+    assert 0.99 < waited < 1.01
+    assert len(clock.sleeps) == 1
+
+
+def test_token_budget_limits_large_requests():
+    clock = FakeClock()
+    limiter = RateLimiter("test", rpm=None, tpm=600, clock=clock.time, sleep=clock.sleep)
+    assert limiter.acquire(tokens=500) == 0.0
+    # 400 missing tokens at 10 tokens/s
+    assert abs(limiter.acquire(tokens=500) - 40.0) < 1e-6
+    # Requests larger than the bucket are capped at its capacity
+    clock.now += 60
+    assert limiter.acquire(tokens=10_000) == 0.0
+
+
+def test_thread_safe_consumption():
+    clock = FakeClock()
+    lock = threading.Lock()
+
+    def locked_sleep(seconds):
+        with lock:
+            clock.sleep(seconds)
+
+    limiter = RateLimiter("test", rpm=50, clock=clock.time, sleep=locked_sleep)
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert clock.sleeps == []
+    assert limiter._levels["requests"] < 1.0
+
+
+def test_shared_state_across_limiters(tmp_path):
+    clock = FakeClock()
+    first = RateLimiter("shared", rpm=2, state_dir=str(tmp_path), clock=clock.time, sleep=clock.sleep)
+    second = RateLimiter("shared", rpm=2, state_dir=str(tmp_path), clock=clock.time, sleep=clock.sleep)
+    if rate_limiter.fcntl is None:  # pragma: no cover - Windows
+        return
+    first.acquire()
+    second.acquire()
+    # Both "processes" drew from the same bucket, so a third request must wait
+    assert first.acquire() > 0
+    assert (tmp_path / "shared.json").exists()
+
+
+def test_limits_from_env(monkeypatch):
+    monkeypatch.setenv("DOCS_CLI_OPENAI_RPM", "10")
+    monkeypatch.setenv("DOCS_CLI_OPENAI_TPM", "0")
+    assert get_rate_limits("openai") == {"rpm": 10, "tpm": None}
+    rate_limiter.reset_rate_limiters()
+    try:
+        limiter = get_rate_limiter("openai")
+        assert limiter.capacities == {"requests": 10.0}
+        assert get_rate_limiter("openai") is limiter
+    finally:
+        rate_limiter.reset_rate_limiters()
+    assert estimate_tokens(["abcdefgh", ""]) == 4
@@ -0,0 +1,88 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from results_io import JsonlResultsWriter, is_jsonl_path, iter_results, load_results, write_results
+
+
+def result(question, answer="A.", status="Encontrada (Cobertura Suficiente)"):
+    return {"pergunta": question, "resposta_ideal": answer, "status": status}
+
+
+def test_json_and_jsonl_round_trip(tmp_path):
+    results = [result("Q1"), result("Ação?", status="Não Encontrada (Cobertura Insuficiente)")]
+    for name in ["out.json", "out.jsonl"]:
+        path = str(tmp_path / name)
+        assert write_results(path, iter(results)) == 2
+        assert load_results(path) == results
+    assert is_jsonl_path("a/B.JSONL") and not is_jsonl_path("evaluation_results.json")
+    assert len((tmp_path / "out.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_truncated_last_line_is_skipped_and_corrupt_middle_line_fails(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text(json.dumps(result("Q1")) + "\n" + '{"pergunta": "Q', encoding="utf-8")
+    assert load_results(str(path)) == [result("Q1")]
+
+    path.write_text("{não é json\n" + json.dumps(result("Q1")) + "\n", encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        load_results(str(path))
+
+
+def test_jsonl_results_are_parsed_lazily(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text(json.dumps(result("Q1")) + "\n{não é json\n", encoding="utf-8")
+    results = iter_results(str(path))
+    # The first result is available before the corrupt line is read
+    assert next(results) == result("Q1")
+    with pytest.raises(json.JSONDecodeError):
+        next(results)
+
+
+def test_resume_drops_partial_line_and_filters_completed_pairs(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text(json.dumps(result("Q1")) + "\n" + json.dumps(result("Q1"))[:10], encoding="utf-8")
+
+    with JsonlResultsWriter(str(path), resume=True) as writer:
+        assert writer.completed == 1
+        # A repeated question only counts as done once per stored result
+        pending = writer.pending([result("Q1"), result("Q1"), result("Q2")])
+        assert [qa["pergunta"] for qa in pending] == ["Q1", "Q2"]
+        for qa in pending:
+            writer.write(result(qa["pergunta"]))
+
+    assert [item["pergunta"] for item in load_results(str(path))] == ["Q1", "Q1", "Q2"]
+
+    with JsonlResultsWriter(str(path)) as writer:
+        assert writer.completed == 0
+    assert load_results(str(path)) == []
+
+
+def test_resume_keeps_complete_last_line_without_newline(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text(json.dumps(result("Q1")) + "\n" + json.dumps(result("Q2")), encoding="utf-8")
+
+    with JsonlResultsWriter(str(path), resume=True) as writer:
+        assert writer.completed == 2
+        assert writer.pending([result("Q1"), result("Q2"), result("Q3")]) == [result("Q3")]
+        writer.write(result("Q3"))
+
+    assert [item["pergunta"] for item in load_results(str(path))] == ["Q1", "Q2", "Q3"]
+
+
+def test_resume_retries_results_with_embedding_failures(tmp_path):
+    path = tmp_path / "out.jsonl"
+    sentence_failure = dict(result("Q3"), cobertura_detalhes=[{"status": "Falha no Embedding da Frase"}])
+    write_results(str(path), [result("Q1"), result("Q2", status="Falha no Embedding da Pergunta"), sentence_failure])
+
+    with JsonlResultsWriter(str(path), resume=True) as writer:
+        assert (writer.completed, writer.retried) == (1, 2)
+        assert [qa["pergunta"] for qa in writer.pending([result("Q1"), result("Q2"), result("Q3")])] == ["Q2", "Q3"]
+
+    # The failed rows are dropped from the file, so retried questions are not duplicated
+    assert load_results(str(path)) == [result("Q1")]
@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from retrieval import ChunkIndex, top_k_rows
+import numpy as np
+
+
+def test_search_matches_full_sort_with_ties():
+    chunks = [
+        {"embedding": [1.0, 0.0], "name": "A"},
+        {"embedding": [0.0, 1.0], "name": "B"},
+        {"embedding": [2.0, 0.0], "name": "C"},
+        {"embedding": [0.0, 0.0], "name": "Z"},
+        {"embedding": [1.0, 1.0], "name": "D"},
+    ]
+    index = ChunkIndex.from_chunks(chunks)
+    top = index.search([1.0, 0.0], top_k=3)
+    assert [item["chunk"]["name"] for item in top] == ["A", "C", "D"]
+    assert abs(top[0]["similarity"] - 1.0) < 1e-6
+
+
+def test_from_chunks_skips_invalid_embeddings():
+    chunks = [
+        {"embedding": None},
+        {"embedding": []},
+        {"embedding": [1.0, 0.0, 0.0]},
+        {"embedding": [0.5, 0.5]},
+    ]
+    index = ChunkIndex.from_chunks(chunks, dimension=2)
+    assert len(index) == 1
+    assert index.search([1.0, 0.0, 0.0], top_k=2) == []
+
+
+def test_search_batch_returns_one_list_per_query():
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(50, 8))
+    index = ChunkIndex.from_chunks([{"embedding": row.tolist()} for row in matrix])
+    queries = rng.normal(size=(4, 8))
+    results = index.search_batch(queries, top_k=5)
+    assert len(results) == 4
+    for query, result in zip(queries, results):
+        expected = np.argsort(-(matrix @ query / np.linalg.norm(matrix, axis=1)), kind="stable")[:5]
+        assert [item["row"] for item in result] == expected.tolist()
+
+
+def test_top_k_rows_prefers_lower_index_on_ties():
+    scores = np.array([0.5, 0.9, 0.5, 0.5, 0.1], dtype=np.float32)
+    assert top_k_rows(scores, 3).tolist() == [1, 0, 2]
+
+
+def test_read_only_matrix_is_not_copied_and_scores_match():
+    rng = np.random.default_rng(1)
+    matrix = rng.normal(size=(30, 4)).astype(np.float32)
+    chunks = [{"name": i} for i in range(30)]
+    writable = ChunkIndex(chunks, matrix)
+    read_only = matrix.copy()
+    read_only.flags.writeable = False
+    shared = ChunkIndex(chunks, read_only, copy=False)
+    assert shared.matrix is read_only
+
+    query = rng.normal(size=4)
+    expected = writable.search(query, top_k=5)
+    result = shared.search(query, top_k=5)
+    assert [item["row"] for item in result] == [item["row"] for item in expected]
+    assert np.allclose(shared.vector(3), writable.vector(3), atol=1e-6)
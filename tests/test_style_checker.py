@@ -3,11 +3,6 @@ from pathlib import Path
 import types
 import sys
 
-fake_numpy = types.ModuleType("numpy")
-fake_numpy.array = lambda x: x
-fake_numpy.dot = lambda a, b: sum(i * j for i, j in zip(a, b))
-fake_numpy.linalg = types.SimpleNamespace(norm=lambda v: sum(x * x for x in v) ** 0.5)
-sys.modules.setdefault("numpy", fake_numpy)
 fake_google = types.ModuleType("google")
 fake_genai = types.ModuleType("google.generativeai")
 setattr(fake_genai, "embed_content", lambda model=None, content=None: {"embedding": [1.0, 0.0]})
@@ -32,12 +27,10 @@ def test_check_style_flags_sentence(monkeypatch, tmp_path):
     with open(emb_file, "w", encoding="utf-8") as f:
         json.dump([{"text": "ok", "embedding": [1.0, 0.0]}], f)
 
-    def fake_embed(text, api_key, model=None):
-        if "bad" in text:
-            return [0.0, 1.0]
-        return [1.0, 0.0]
+    def fake_embed(texts, api_key, model=None):
+        return [[0.0, 1.0] if "bad" in text else [1.0, 0.0] for text in texts]
 
-    monkeypatch.setattr(style_checker, "generate_embedding_with_retry", fake_embed)
+    monkeypatch.setattr(style_checker, "generate_gemini_embeddings_batch", fake_embed)
 
     text = "good sentence. bad style."
     issues = style_checker.check_style(text, str(emb_file), api_key="X", threshold=0.8)
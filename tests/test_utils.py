@@ -26,3 +26,36 @@ def test_clean_text_handles_links_and_code():
     md = "See [docs](http://example.com) `code`\n```python\nprint('hi')\n```"
     assert clean_text_for_embedding(md) == "See"
 
+
+
+def test_format_memory_usage_reports_available_fields():
+    from utils import format_memory_usage
+    text = format_memory_usage({"rss": 10.0, "peak_rss": 12.5, "rss_anon": None, "rss_file": None})
+    assert text == "RSS: 10.0 MB, pico RSS: 12.5 MB"
+
+
+def test_gemini_batch_sends_many_texts_per_request(monkeypatch):
+    import embedding_providers
+    import utils
+
+    calls = {"configure": 0, "requests": []}
+
+    def fake_embed_content(model=None, content=None):
+        calls["requests"].append(list(content))
+        return {"embedding": [[float(len(text))] for text in content]}
+
+    def fake_configure(api_key=None):
+        calls["configure"] += 1
+
+    monkeypatch.setattr(embedding_providers.genai, "embed_content", fake_embed_content, raising=False)
+    monkeypatch.setattr(embedding_providers.genai, "configure", fake_configure, raising=False)
+    embedding_providers.reset_providers()
+    monkeypatch.setenv("DOCS_CLI_CACHE", "0")
+
+    texts = [f"t{i}" for i in range(150)]
+    result = utils.generate_gemini_embeddings_batch(texts, "KEY")
+    assert [len(batch) for batch in calls["requests"]] == [100, 50]
+    assert result[0] == [2.0] and result[-1] == [4.0]
+    utils.generate_gemini_embeddings_batch(["x"], "KEY")
+    assert calls["configure"] == 1
+    embedding_providers.reset_providers()
@@ -1,26 +1,14 @@
 """Funções utilitárias de limpeza de texto e geração de embeddings."""
 
 import re
-import time
-from typing import Optional
+import sys
+from typing import Dict, Optional
 
-import google.generativeai as genai
-
-try:
-    import openai  # type: ignore
-except Exception:  # pragma: no cover - openai may not be installed in tests
-    openai = None  # type: ignore
-
-# Modelo padrão para geração de embeddings com Gemini
-GEMINI_EMBEDDING_MODEL = "models/embedding-001"
-
-# Modelo padrão para geração de embeddings com OpenAI
-OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
-
-# --- Variáveis de controle para Rate Limiting (Gemini) ---
-REQUEST_LIMIT_PER_MINUTE_GEMINI = 150
-_gemini_request_count = 0
-_gemini_last_request_time = time.time()
+from embedding_providers import (
+    GEMINI_EMBEDDING_MODEL,
+    OPENAI_EMBEDDING_MODEL,
+    get_provider,
+)
 
 
 def clean_text_for_embedding(text):
@@ -42,59 +30,62 @@ def clean_text_for_embedding(text):
 
 
 def generate_embedding_with_retry(text_content, api_key, model=GEMINI_EMBEDDING_MODEL):
-    """Gera embedding com Gemini, aplicando retry e rate limiting."""
-    global _gemini_request_count, _gemini_last_request_time
-
-    genai.configure(api_key=api_key)
+    """Gera embedding com Gemini, consultando o cache e aplicando retry e rate limiting."""
+    return get_provider("gemini", api_key, model).embed([text_content])[0]
 
-    current_time = time.time()
-    elapsed_time = current_time - _gemini_last_request_time
 
-    if elapsed_time < 60 and _gemini_request_count >= REQUEST_LIMIT_PER_MINUTE_GEMINI:
-        sleep_duration = 60 - elapsed_time
-        print(f"  Atingido limite de requisições por minuto. Aguardando {sleep_duration:.2f} segundos...")
-        time.sleep(sleep_duration)
-        _gemini_request_count = 0
-        _gemini_last_request_time = time.time()
-    elif elapsed_time >= 60:
-        _gemini_request_count = 0
-        _gemini_last_request_time = time.time()
-
-    _gemini_request_count += 1
-
-    retries = 3
-    for attempt in range(retries):
-        try:
-            response = genai.embed_content(model=model, content=text_content)  # type: ignore
-            return response["embedding"]
-        except Exception as e:
-            print(f"Erro ao gerar embedding (tentativa {attempt+1}/{retries}): {e}")
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)
-            else:
-                return None
-    return None
+def generate_gemini_embeddings_batch(texts, api_key, model=GEMINI_EMBEDDING_MODEL):
+    """
+    Gera embeddings com Gemini para uma lista de textos, enviando vários textos
+    por requisição (endpoint de lote). Consulta o cache antes e aplica o mesmo
+    retry e rate limiting das chamadas individuais. Retorna um embedding (ou
+    ``None``) por texto, na ordem de entrada.
+    """
+    return get_provider("gemini", api_key, model).embed(texts)
 
 
 def generate_openai_embedding(
     text_content: str, api_key: str, model: str = OPENAI_EMBEDDING_MODEL
 ) -> Optional[list]:
-    """Gera embedding usando a API da OpenAI."""
-    if openai is None:
-        raise ImportError("openai package is required for OpenAI embeddings")
-
-    client = openai.OpenAI(api_key=api_key)
-    retries = 3
-    for attempt in range(retries):
+    """Gera embedding usando a API da OpenAI, consultando o cache antes."""
+    return get_provider("openai", api_key, model).embed([text_content])[0]
+
+
+def memory_usage() -> Dict[str, Optional[float]]:
+    """
+    Retorna o uso de memória residente do processo atual, em MB.
+
+    Chaves: ``rss`` (atual), ``peak_rss`` (pico), ``rss_anon`` (memória
+    privada/heap) e ``rss_file`` (páginas de arquivos mapeados, como a
+    matriz aberta com mmap, compartilhadas via page cache). Valores
+    indisponíveis na plataforma ficam como ``None``.
+    """
+    usage: Dict[str, Optional[float]] = {"rss": None, "peak_rss": None, "rss_anon": None, "rss_file": None}
+    fields = {"VmRSS:": "rss", "VmHWM:": "peak_rss", "RssAnon:": "rss_anon", "RssFile:": "rss_file"}
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if parts and parts[0] in fields:
+                    usage[fields[parts[0]]] = int(parts[1]) / 1024.0
+    except OSError:
+        pass
+
+    if usage["peak_rss"] is None:
         try:
-            resp = client.embeddings.create(input=[text_content], model=model)
-            return resp.data[0].embedding
-        except Exception as e:  # pragma: no cover - rede externa
-            print(
-                f"Erro ao gerar embedding com OpenAI (tentativa {attempt+1}/{retries}): {e}"
-            )
-            if attempt < retries - 1:
-                time.sleep(2 ** attempt)
-            else:
-                return None
-    return None
+            import resource
+
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss é em bytes no macOS e em KB no Linux
+            usage["peak_rss"] = peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+        except Exception:  # pragma: no cover - resource indisponível (Windows)
+            pass
+    return usage
+
+
+def format_memory_usage(usage: Optional[Dict[str, Optional[float]]] = None) -> str:
+    """Formata ``memory_usage()`` em uma linha legível."""
+    usage = usage or memory_usage()
+    labels = [("rss", "RSS"), ("peak_rss", "pico RSS"), ("rss_anon", "heap"), ("rss_file", "mapeado")]
+    parts = [f"{label}: {usage[key]:.1f} MB" for key, label in labels if usage.get(key) is not None]
+    return ", ".join(parts) if parts else "indisponível"